@@ -0,0 +1,93 @@
+"""
+Admin API routes for inspecting hub internals.
+"""
+
+import logging
+from typing import List
+from uuid import UUID
+
+from fastapi import APIRouter, Depends
+from pydantic import BaseModel
+
+from app.hub.hub import DataHub
+from app.ws.router import get_hub
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+logger = logging.getLogger(__name__)
+
+
+class ConnectionStats(BaseModel):
+    """Response schema for per-connection outbound queue statistics."""
+
+    dashboard_id: UUID
+    policy: str
+    raw_frames: bool
+    delta: bool
+    projected_feeds: int
+    max_rate: float | None
+    queue_depth: int
+    max_queue: int
+    high_water_mark: int
+    sent: int
+    raw_sent: int
+    dropped: int
+    conflated: int
+    rate_limited: int
+    connected_at: float
+    # Hub shard running the connection's queue (None if not sharded)
+    shard: int | None = None
+
+
+class HistoryStats(BaseModel):
+    """Response schema for per-feed history memory usage."""
+
+    feed_id: UUID
+    compressed: bool
+    events: int
+    bytes: int
+    bytes_per_point: float
+    window_minutes: float
+    max_points: int
+    max_bytes: int | None
+    last_viewed: float | None
+    evicted: int
+
+
+class HistoryStoreStats(BaseModel):
+    """Response schema for durable history store counters."""
+
+    pending: int
+    written: int
+    dropped: int
+    failed: int
+    deleted: int
+    compactions: int
+    retention_hours: float
+
+
+class HistoryAccounting(BaseModel):
+    """Response schema for process-wide history memory accounting."""
+
+    budget_bytes: int | None
+    used_bytes: int
+    evicted: int
+    store: HistoryStoreStats | None
+    feeds: List[HistoryStats]
+
+
+@router.get("/connections", response_model=List[ConnectionStats])
+def list_connections(hub: DataHub = Depends(get_hub)) -> List[ConnectionStats]:
+    """List WebSocket connections with queue depth and drop counters."""
+    stats = [ConnectionStats(**entry) for entry in hub.get_connection_stats()]
+
+    # Connections falling furthest behind first
+    stats.sort(key=lambda s: (s.queue_depth, s.dropped), reverse=True)
+    return stats
+
+
+@router.get("/history", response_model=HistoryAccounting)
+def get_history_accounting(hub: DataHub = Depends(get_hub)) -> HistoryAccounting:
+    """Get history memory usage against the budget, largest feeds first."""
+    accounting = HistoryAccounting(**hub.get_history_accounting())
+    accounting.feeds.sort(key=lambda s: s.bytes, reverse=True)
+    return accounting
@@ -0,0 +1,141 @@
+"""
+Alert API routes.
+"""
+
+import logging
+from typing import List
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlmodel import col, select
+
+from app.api.deps import SessionDep
+from app.hub.hub import DataHub
+from app.models import (
+    AlertEventRecord,
+    AlertRule,
+    AlertRuleCreate,
+    AlertRuleRead,
+    AlertRuleUpdate,
+    FeedDefinition,
+)
+from app.ws.router import get_hub
+
+router = APIRouter(prefix="/alerts", tags=["alerts"])
+logger = logging.getLogger(__name__)
+
+
+def _read(rule: AlertRule, hub: DataHub) -> AlertRuleRead:
+    """Build the response for a rule, with its current state."""
+    return AlertRuleRead.model_validate(rule, update={"state": hub.alerts.state(rule.id)})
+
+
+@router.get("/rules", response_model=List[AlertRuleRead])
+def list_alert_rules(
+    session: SessionDep,
+    feed_id: UUID | None = None,
+    hub: DataHub = Depends(get_hub),
+) -> List[AlertRuleRead]:
+    """List alert rules, optionally only those on one feed."""
+    statement = select(AlertRule)
+    if feed_id is not None:
+        statement = statement.where(AlertRule.feed_id == feed_id)
+    return [_read(rule, hub) for rule in session.exec(statement).all()]
+
+
+@router.post("/rules", response_model=AlertRuleRead, status_code=status.HTTP_201_CREATED)
+async def create_alert_rule(
+    rule: AlertRuleCreate,
+    session: SessionDep,
+    hub: DataHub = Depends(get_hub),
+) -> AlertRuleRead:
+    """Create an alert rule; it is evaluated from the next event on."""
+    if not session.get(FeedDefinition, rule.feed_id):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown feed: {rule.feed_id}",
+        )
+
+    db_rule = AlertRule.model_validate(rule)
+    session.add(db_rule)
+    session.commit()
+    session.refresh(db_rule)
+    await hub.apply_alert_rule(db_rule)
+
+    logger.info(f"Created alert rule {db_rule.id}: {db_rule.name}")
+    return _read(db_rule, hub)
+
+
+@router.get("/rules/{rule_id}", response_model=AlertRuleRead)
+def get_alert_rule(
+    rule_id: UUID,
+    session: SessionDep,
+    hub: DataHub = Depends(get_hub),
+) -> AlertRuleRead:
+    """Get an alert rule by ID."""
+    rule = session.get(AlertRule, rule_id)
+    if not rule:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Alert rule not found")
+
+    return _read(rule, hub)
+
+
+@router.patch("/rules/{rule_id}", response_model=AlertRuleRead)
+async def update_alert_rule(
+    rule_id: UUID,
+    rule_update: AlertRuleUpdate,
+    session: SessionDep,
+    hub: DataHub = Depends(get_hub),
+) -> AlertRuleRead:
+    """Update an alert rule."""
+    rule = session.get(AlertRule, rule_id)
+    if not rule:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Alert rule not found")
+
+    for field, value in rule_update.model_dump(exclude_unset=True).items():
+        setattr(rule, field, value)
+
+    session.add(rule)
+    session.commit()
+    session.refresh(rule)
+    await hub.apply_alert_rule(rule)
+
+    logger.info(f"Updated alert rule {rule_id}")
+    return _read(rule, hub)
+
+
+@router.delete("/rules/{rule_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_alert_rule(
+    rule_id: UUID,
+    session: SessionDep,
+    hub: DataHub = Depends(get_hub),
+) -> None:
+    """Delete an alert rule."""
+    rule = session.get(AlertRule, rule_id)
+    if not rule:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Alert rule not found")
+
+    session.delete(rule)
+    session.commit()
+    await hub.remove_alert_rule(rule_id)
+
+    logger.info(f"Deleted alert rule {rule_id}")
+
+
+@router.get("/events", response_model=List[AlertEventRecord])
+def list_alert_events(
+    session: SessionDep,
+    rule_id: UUID | None = None,
+    feed_id: UUID | None = None,
+    limit: int = Query(100, ge=1, le=1000),
+) -> List[AlertEventRecord]:
+    """List recorded alert state transitions, newest first."""
+    statement = select(AlertEventRecord)
+    if rule_id is not None:
+        statement = statement.where(AlertEventRecord.rule_id == rule_id)
+    if feed_id is not None:
+        statement = statement.where(AlertEventRecord.feed_id == feed_id)
+    statement = statement.order_by(
+        col(AlertEventRecord.ts).desc(), col(AlertEventRecord.id).desc()
+    )
+    return list(session.exec(statement.limit(limit)).all())
@@ -4,15 +4,19 @@ Feed API routes.
 
 import json
 import logging
-from typing import List
+from datetime import datetime
+from typing import Dict, List
 from uuid import UUID
 
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from pydantic import BaseModel
 
 from app.api.deps import SessionDep
 from app.feeds import FEED_METADATA, FEED_TYPES, get_feed_class
+from app.hub.downsample import DownsampleMode
+from app.hub.hub import DataHub
 from app.models import FeedCreate, FeedDefinition, FeedRead, FeedUpdate
+from app.ws.router import get_hub
 from sqlmodel import select
 
 router = APIRouter(prefix="/feeds", tags=["feeds"])
@@ -145,6 +149,97 @@ def delete_feed(feed_id: UUID, session: SessionDep) -> None:
     logger.info(f"Deleted feed {feed_id}")
 
 
+class HistorySeries(BaseModel):
+    """Response schema for one downsampled payload key."""
+
+    ts: List[datetime]
+    values: List[float]
+
+
+class FeedHistory(BaseModel):
+    """Response schema for downsampled feed history."""
+
+    feed_id: UUID
+    mode: DownsampleMode
+    points: int
+    series: Dict[str, HistorySeries]
+
+
+@router.get("/{feed_id}/history", response_model=FeedHistory)
+async def get_feed_history(
+    feed_id: UUID,
+    session: SessionDep,
+    mode: DownsampleMode = DownsampleMode.LTTB,
+    points: int = Query(500, ge=1, le=10000),
+    since: datetime | None = None,
+    until: datetime | None = None,
+    keys: List[str] | None = Query(None),
+    hub: DataHub = Depends(get_hub),
+) -> FeedHistory:
+    """Get a feed's history, downsampled to at most `points` per key."""
+    feed = session.get(FeedDefinition, feed_id)
+    if not feed:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Feed not found")
+
+    history = await hub.query_downsampled_history(
+        feed_id, points, mode=mode, since=since, until=until, keys=keys
+    )
+    return FeedHistory(
+        feed_id=feed_id,
+        mode=mode,
+        points=points,
+        series={key: HistorySeries(ts=ts, values=values) for key, (ts, values) in history.items()},
+    )
+
+
+class AggregateResult(BaseModel):
+    """Response schema for one rolling aggregate."""
+
+    name: str
+    key: str
+    window_minutes: float
+    count: int
+    sum: float
+    min: float | None
+    max: float | None
+    mean: float | None
+    variance: float | None
+    quantiles: Dict[str, float | None]
+
+
+class FeedAggregates(BaseModel):
+    """Response schema for a feed's rolling aggregates."""
+
+    feed_id: UUID
+    aggregates: List[AggregateResult]
+
+
+@router.get("/{feed_id}/aggregates", response_model=FeedAggregates)
+def get_feed_aggregates(
+    feed_id: UUID,
+    session: SessionDep,
+    hub: DataHub = Depends(get_hub),
+) -> FeedAggregates:
+    """Get the current values of a feed's rolling aggregates."""
+    feed = session.get(FeedDefinition, feed_id)
+    if not feed:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Feed not found")
+
+    # Attached from the feed config by FeedManager, or at start-up on workers
+    return FeedAggregates(
+        feed_id=feed_id,
+        aggregates=[
+            AggregateResult(
+                name=spec.name,
+                key=spec.key,
+                window_minutes=spec.window.total_seconds() / 60,
+                **result,
+            )
+            for spec, result in hub.get_aggregates(feed_id)
+        ],
+    )
+
+
 class FeedTestResult(BaseModel):
     """Response schema for feed test results."""
 
@@ -155,8 +250,12 @@ class FeedTestResult(BaseModel):
 
 
 @router.post("/{feed_id}/test", response_model=FeedTestResult)
-async def test_feed(feed_id: UUID, session: SessionDep) -> FeedTestResult:
-    """Test a feed by fetching data once."""
+async def test_feed(
+    feed_id: UUID,
+    session: SessionDep,
+    hub: DataHub = Depends(get_hub),
+) -> FeedTestResult:
+    """Test a feed by fetching data once (derived feeds read the live hub)."""
     import asyncio
     from datetime import datetime, timezone
 
@@ -183,7 +282,7 @@ async def test_feed(feed_id: UUID, session: SessionDep) -> FeedTestResult:
 
     # Instantiate and test feed
     try:
-        feed_instance = feed_class(feed_id=feed.id, config=config, hub=None)
+        feed_instance = feed_class(feed_id=feed.id, config=config, hub=hub)
         data = await feed_instance.fetch_data()
 
         return FeedTestResult(
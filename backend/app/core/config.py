@@ -4,7 +4,7 @@ Core configuration module for Pulseboard.
 Uses pydantic-settings to load configuration from environment variables.
 """
 
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Literal
 
 from pydantic import field_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -47,6 +47,43 @@ class Settings(BaseSettings):
 
     # Data Hub settings
     history_window_minutes: int = 10
+    history_capacity: int = 4096  # max events kept per feed
+    history_compression: bool = False  # keep older history in compressed blocks
+    history_block_size: int = 512  # events per compressed block
+    history_segment_dir: str = ""  # memory-mapped history segments (empty = disabled)
+    history_segment_minutes: float = 15.0
+    history_segment_records: int = 65536  # max records per segment file
+    history_memory_budget_mb: int = 0  # history memory across all feeds (0 = no limit)
+    history_store_enabled: bool = False  # persist history to the database
+    history_store_retention_hours: float = 24.0
+    history_store_batch_size: int = 500
+    history_store_flush_interval_sec: float = 1.0
+    hub_role: Literal["standalone", "runner", "worker"] = "standalone"
+    hub_relay_socket: str = "/tmp/pulseboard-relay.sock"
+    hub_relay_queue_size: int = 10000  # events queued per worker
+    hub_snapshot_path: str = ""  # hub state snapshot file (empty = disabled)
+    hub_snapshot_interval_sec: float = 60.0  # 0 = only on shutdown
+    hub_dispatch_queue_size: int = 10000
+    hub_shards: int = 0  # event-loop threads running connection queues (0 = hub loop)
+    hub_aggregate_slices: int = 60  # steps a rolling aggregate window slides in
+    hub_aggregate_accuracy: float = 0.01  # relative error of aggregate quantiles
+    alert_check_interval_sec: float = 1.0  # how often absence rules are checked
+    alert_flush_interval_sec: float = 1.0  # how often alert events are written
+    alert_rule_reload_sec: float = 30.0  # rule reloads in runner/worker processes
+    feed_demand_driven: bool = False  # pause feeds no connected dashboard uses
+    feed_idle_grace_sec: float = 60.0  # wait before pausing an unwatched feed
+    ws_send_timeout_sec: float = 5.0
+    ws_queue_size: int = 1000
+    ws_slow_consumer_policy: str = "drop_oldest"  # drop_oldest, conflate or disconnect
+    ws_high_water_mark: int = 800
+    ws_disconnect_after_sec: float = 10.0
+    ws_serializer: str = "auto"  # auto, pydantic or json
+    ws_raw_frames: bool = False  # write frames straight to transports (see .env.example)
+    ws_delta_keyframe_interval: int = 100  # full update every N for delta clients
+    ws_batch_window_ms: float = 0.0  # coalesce updates per dashboard (0 = off)
+    ws_payload_projection: bool = True  # send only the payload keys panels show
+    ws_snapshot_history_points: int = 100  # history backfill per key on connect
+    ws_snapshot_history_mode: str = "lttb"  # lttb, minmax, avg, last or raw
 
     # Logging
     log_level: str = "INFO"
@@ -4,8 +4,10 @@ Feeds package with registry of available feed types.
 
 from typing import Dict, Type
 
+from .aggregate import AggregateFeed
 from .base import BaseFeed
 from .crypto_price import CryptoPriceFeed
+from .derived import DerivedFeed
 from .http_json import HttpJsonFeed
 from .system_metrics import SystemMetricsFeed
 
@@ -14,6 +16,8 @@ FEED_TYPES: Dict[str, Type[BaseFeed]] = {
     "system_metrics": SystemMetricsFeed,
     "http_json": HttpJsonFeed,
     "crypto_price": CryptoPriceFeed,
+    "aggregate": AggregateFeed,
+    "derived": DerivedFeed,
 }
 
 # Metadata for feed types used by API and UI
@@ -45,6 +49,24 @@ FEED_METADATA: Dict[str, dict] = {
             "interval_sec": 30,
         },
     },
+    "aggregate": {
+        "name": "Aggregate",
+        "description": "Publish rolling statistics (mean, p95, ...) of another feed's "
+        "payload keys, as set in that feed's aggregates config.",
+        "default_config": {
+            "source_feed_id": "",
+            "interval_sec": 10,
+        },
+    },
+    "derived": {
+        "name": "Derived",
+        "description": "Compute values from other feeds with expressions such as "
+        "rate(host.net_bytes_sent) / 1024, updated whenever an input publishes.",
+        "default_config": {
+            "inputs": {"host": ""},
+            "outputs": {"value": "host.cpu_percent"},
+        },
+    },
 }
 
 
@@ -66,6 +88,8 @@ __all__ = [
     "SystemMetricsFeed",
     "HttpJsonFeed",
     "CryptoPriceFeed",
+    "AggregateFeed",
+    "DerivedFeed",
     "FEED_TYPES",
     "FEED_METADATA",
     "get_feed_class",
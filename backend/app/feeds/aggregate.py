@@ -0,0 +1,42 @@
+"""
+Aggregate feed publishing another feed's rolling aggregates.
+"""
+
+from typing import Any, Dict
+from uuid import UUID
+
+from app.hub.aggregates import aggregate_payload
+
+from .base import BaseFeed
+
+
+class AggregateFeed(BaseFeed):
+    """
+    Synthetic feed that reports the rolling aggregates the hub keeps for
+    another feed (see the "aggregates" option of every feed).
+
+    Payload keys are named <key>_<window>_<statistic>, e.g.
+    cpu_percent_5m_mean or latency_ms_1h_p95.
+
+    Config options:
+        - source_feed_id: Feed whose aggregates to publish (required)
+        - interval_sec: How often to publish (default: 10)
+    """
+
+    async def fetch_data(self) -> Dict[str, Any]:
+        """
+        Read the source feed's aggregates from the hub.
+
+        Returns:
+            Dict with one key per aggregate statistic
+        """
+        source = self.config.get("source_feed_id")
+        if not source:
+            raise ValueError("source_feed_id is required in config")
+        if self.hub is None:
+            raise ValueError("Aggregate feeds read from a running hub")
+
+        results = self.hub.get_aggregates(UUID(str(source)))
+        if not results:
+            raise ValueError(f"Feed {source} has no aggregates configured")
+        return aggregate_payload(results)
@@ -20,6 +20,18 @@ class BaseFeed(ABC):
 
     Each feed knows how to fetch or receive data from a source
     and publish events to the DataHub.
+
+    Config options common to all feeds:
+        - interval_sec: How often to fetch
+        - history_minutes: How long the hub keeps this feed's history
+        - history_max_points: Maximum number of history events kept
+        - history_max_bytes: Maximum approximate bytes of history kept
+        - aggregates: Rolling aggregates of payload keys kept by the hub
+          (see app.hub.aggregates); such feeds are always on
+        - always_on: Keep fetching at full rate even when no dashboard
+          using the feed is connected (demand-driven mode only)
+        - idle_interval_sec: How often to fetch while nobody is watching
+          (demand-driven mode only; default: not at all)
     """
 
     def __init__(self, feed_id: UUID, config: Dict[str, Any], hub: "DataHub"):
@@ -37,6 +49,9 @@ class BaseFeed(ABC):
         self._running = False
         self._task: asyncio.Task | None = None
         self._stop_requested = False
+        # False while dormant (nobody watching, see FeedManager)
+        self.active = True
+        self._wake = asyncio.Event()
         self.logger = logging.getLogger(f"{__name__}.{self.__class__.__name__}")
 
     @abstractmethod
@@ -52,6 +67,42 @@ class BaseFeed(ABC):
         """
         ...
 
+    @property
+    def always_on(self) -> bool:
+        """Whether the feed keeps running at full rate without subscribers."""
+        # Aggregates need every event, watched or not
+        return bool(self.config.get("always_on", False) or self.config.get("aggregates"))
+
+    def set_active(self, active: bool) -> None:
+        """
+        Switch between the normal interval and dormant mode.
+
+        A feed woken from dormancy fetches right away.
+
+        Args:
+            active: Whether anyone is watching the feed
+        """
+        if active == self.active:
+            return
+        self.active = active
+        self._wake.set()
+        self.logger.info(f"Feed {self.feed_id} {'activated' if active else 'dormant'}")
+
+    async def _wait(self) -> None:
+        """Sleep until the next fetch is due, or the feed is activated."""
+        while True:
+            if self.active:
+                interval = self.config.get("interval_sec", 5)
+            else:
+                interval = self.config.get("idle_interval_sec")
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=interval)
+            except asyncio.TimeoutError:
+                return
+            self._wake.clear()
+            if self.active:
+                return
+
     async def run(self) -> None:
         """
         Main run loop that fetches data and publishes events.
@@ -72,7 +123,7 @@ class BaseFeed(ABC):
                 # Sleep between iterations so cancellation stops before the next
                 # publish when stop() is called mid-sleep.
                 try:
-                    await asyncio.sleep(interval)
+                    await self._wait()
                 except asyncio.CancelledError:
                     self.logger.info(f"Feed {self.feed_id} cancelled")
                     break
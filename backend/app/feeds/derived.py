@@ -0,0 +1,64 @@
+"""
+Derived feed computed from other feeds' events.
+"""
+
+from typing import Any, Dict
+
+from app.hub.derived import DerivedComputation
+
+from .base import BaseFeed
+
+
+class DerivedFeed(BaseFeed):
+    """
+    Feed whose payload is computed from other feeds (see app.hub.derived).
+
+    Nothing is polled: the hub evaluates the expressions whenever one of
+    the inputs publishes, so the feed only registers itself with the hub.
+
+    Config options:
+        - inputs: Input feed ID per name used in the expressions (required)
+        - outputs: Expression per output payload key, e.g.
+          {"sent_kbps": "rate(host.net_bytes_sent) / 1024"}
+        - expression: Single expression, published as "value"
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        """Initialize derived feed."""
+        super().__init__(*args, **kwargs)
+        self.computation: DerivedComputation | None = None
+
+    async def fetch_data(self) -> Dict[str, Any]:
+        """
+        Compute the payload from the inputs' latest events.
+
+        Rates need two events of an input, so they are missing here.
+
+        Returns:
+            Dict with every output that can be computed
+        """
+        computation = DerivedComputation.from_config(self.feed_id, self.config)
+        if self.hub is None:
+            raise ValueError("Derived feeds are computed from their inputs in a running hub")
+        return computation.evaluate(self.hub.latest)
+
+    async def start(self) -> None:
+        """Compile the expressions and subscribe to the input feeds."""
+        self.computation = DerivedComputation.from_config(self.feed_id, self.config)
+        self.hub.derived.add(self.computation)
+        self._running = True
+        self.logger.info(
+            f"Derived feed {self.feed_id} subscribed to {len(self.computation.inputs)} inputs"
+        )
+
+    async def stop(self) -> None:
+        """Unsubscribe from the input feeds."""
+        self._running = False
+        if self.computation is not None:
+            self.hub.derived.remove(self.feed_id)
+            self.computation = None
+        self.logger.info(f"Feed {self.feed_id} stopped")
+
+    def is_running(self) -> bool:
+        """Check if feed is currently subscribed to its inputs."""
+        return self._running
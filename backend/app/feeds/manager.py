@@ -2,6 +2,7 @@
 FeedManager for managing feed lifecycle.
 """
 
+import asyncio
 import json
 import logging
 from typing import Dict
@@ -10,7 +11,9 @@ from uuid import UUID
 from sqlmodel import Session, select
 
 from app.db.session import get_session
+from app.hub.aggregates import AggregateSpec
 from app.hub.hub import DataHub
+from app.hub.retention import RetentionPolicy
 from app.models import FeedDefinition
 
 from . import get_feed_class
@@ -26,19 +29,31 @@ class FeedManager:
     - Loads feed definitions from database
     - Instantiates and starts feeds
     - Provides methods to start/stop/reload feeds
+    - In demand-driven mode, puts feeds that no connected dashboard uses to
+      sleep after a grace period and wakes them when one connects again
+      (feeds configured with always_on keep running)
     """
 
-    def __init__(self, hub: DataHub):
+    def __init__(self, hub: DataHub, demand_driven: bool = False, grace_period: float = 60.0):
         """
         Initialize FeedManager.
 
         Args:
             hub: DataHub instance for feeds to publish to
+            demand_driven: Only run feeds at full rate while subscribed
+            grace_period: Seconds after the last subscriber leaves before a
+                feed goes dormant
         """
         self.hub = hub
         self.feeds: Dict[UUID, BaseFeed] = {}
+        self.demand_driven = demand_driven
+        self.grace_period = grace_period
+        self._dormant_timers: Dict[UUID, asyncio.TimerHandle] = {}
         self.logger = logging.getLogger(__name__)
 
+        if demand_driven:
+            hub.on_demand_change = self._on_demand_change
+
     async def load_feeds(self, session: Session) -> None:
         """
         Load all enabled feeds from database and start them.
@@ -83,10 +98,26 @@ class FeedManager:
         try:
             config = json.loads(feed_def.config_json)
         except json.JSONDecodeError as e:
-            raise ValueError(f"Invalid config JSON for feed {feed_def.id}: {e}")
+            raise ValueError(f"Invalid config JSON for feed {feed_def.id}: {e}") from e
+
+        # Apply per-feed history retention overrides
+        try:
+            retention = RetentionPolicy.from_config(config)
+        except ValueError as e:
+            raise ValueError(f"Invalid retention config for feed {feed_def.id}: {e}") from e
+        self.hub.set_retention(feed_def.id, retention)
+
+        # Attach rolling aggregates of payload keys
+        try:
+            aggregates = AggregateSpec.from_config(config)
+        except ValueError as e:
+            raise ValueError(f"Invalid aggregates config for feed {feed_def.id}: {e}") from e
+        self.hub.set_aggregates(feed_def.id, aggregates)
 
         # Instantiate feed
         feed = feed_class(feed_id=feed_def.id, config=config, hub=self.hub)
+        if self.demand_driven and not feed.always_on and not self.hub.has_subscribers(feed.feed_id):
+            feed.active = False
 
         # Start feed
         await feed.start()
@@ -108,6 +139,7 @@ class FeedManager:
             self.logger.warning(f"Feed {feed_id} not found in manager")
             return
 
+        self._cancel_dormant_timer(feed_id)
         await feed.stop()
         del self.feeds[feed_id]
 
@@ -116,6 +148,44 @@ class FeedManager:
 
         self.logger.info(f"Stopped feed {feed_id}")
 
+    def _on_demand_change(self, feed_id: UUID, wanted: bool) -> None:
+        """
+        Wake a feed when it gets a subscriber, or schedule it to go dormant.
+
+        Args:
+            feed_id: Feed identifier
+            wanted: Whether any dashboard now subscribes to the feed
+        """
+        feed = self.feeds.get(feed_id)
+        if feed is None or feed.always_on:
+            return
+
+        self._cancel_dormant_timer(feed_id)
+        if wanted:
+            feed.set_active(True)
+        else:
+            self._dormant_timers[feed_id] = asyncio.get_running_loop().call_later(
+                self.grace_period, self._make_dormant, feed_id
+            )
+
+    def _make_dormant(self, feed_id: UUID) -> None:
+        """
+        Put a feed to sleep once its grace period has passed.
+
+        Args:
+            feed_id: Feed identifier
+        """
+        self._dormant_timers.pop(feed_id, None)
+        feed = self.feeds.get(feed_id)
+        if feed is not None and not self.hub.has_subscribers(feed_id):
+            feed.set_active(False)
+
+    def _cancel_dormant_timer(self, feed_id: UUID) -> None:
+        """Cancel a feed's pending switch to dormant mode, if any."""
+        timer = self._dormant_timers.pop(feed_id, None)
+        if timer is not None:
+            timer.cancel()
+
     async def restart_feed(self, session: Session, feed_id: UUID) -> None:
         """
         Restart a feed (stop and start with fresh config).
@@ -178,3 +248,16 @@ class FeedManager:
         """
         feed = self.feeds.get(feed_id)
         return feed is not None and feed.is_running()
+
+    def is_feed_active(self, feed_id: UUID) -> bool:
+        """
+        Check if a feed is running and not dormant.
+
+        Args:
+            feed_id: Feed identifier
+
+        Returns:
+            True if the feed is fetching at its normal interval
+        """
+        feed = self.feeds.get(feed_id)
+        return feed is not None and feed.is_running() and feed.active
@@ -0,0 +1,444 @@
+"""
+Incremental streaming aggregates over feed payload keys.
+
+A feed's config can ask the hub to keep rolling statistics of some of its
+payload keys, updated as events are published rather than computed from
+history on every request:
+
+    "aggregates": [
+        {"key": "cpu_percent", "window_minutes": 5},
+        {"key": "latency_ms", "window_minutes": 60, "quantiles": [0.5, 0.95, 0.99]}
+    ]
+
+Each aggregate keeps count, sum, min, max, mean and variance of the key's
+numeric values over the window, plus quantile estimates. The window slides
+in steps of window / slices: events are grouped into time slices, and a
+whole slice leaves the window once it is older than the window. Adding an
+event is O(1); reading the statistics costs O(slices).
+
+Quantiles come from a DDSketch-style log-bucketed histogram with bounded
+relative error. Unlike a t-digest, its buckets can be decremented, so the
+expiring slices are subtracted from it exactly.
+"""
+
+import math
+from collections import deque
+from datetime import timedelta
+from typing import Any, Deque, Dict, List, Sequence, Tuple
+
+from .history import is_number
+
+# Quantiles reported when an aggregate does not list its own
+DEFAULT_QUANTILES = (0.5, 0.95, 0.99)
+
+# Statistics reported by every aggregate, in payload order
+STATISTICS = ("count", "sum", "min", "max", "mean", "variance")
+
+# Magnitudes below this count as zero in the quantile sketch
+_MIN_INDEXABLE = 1e-9
+
+
+class QuantileSketch:
+    """
+    Log-bucketed histogram for quantile estimates (DDSketch).
+
+    Values are counted in buckets whose bounds grow geometrically, so every
+    estimate is within relative_accuracy of a value actually added. Counts
+    can be removed again, which makes the sketch usable over a sliding
+    window.
+    """
+
+    __slots__ = ("relative_accuracy", "_log_gamma", "positive", "negative", "zero", "count")
+
+    def __init__(self, relative_accuracy: float = 0.01):
+        """
+        Initialize quantile sketch.
+
+        Args:
+            relative_accuracy: Maximum relative error of quantile estimates
+        """
+        self.relative_accuracy = relative_accuracy
+        gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(gamma)
+        self.positive: Dict[int, int] = {}
+        self.negative: Dict[int, int] = {}
+        self.zero = 0
+        self.count = 0
+
+    def _index(self, magnitude: float) -> int:
+        """Get the bucket index for a positive magnitude."""
+        return math.ceil(math.log(magnitude) / self._log_gamma)
+
+    def _value(self, index: int) -> float:
+        """Get the representative value of a bucket."""
+        return 2 * math.exp(index * self._log_gamma) / (1 + math.exp(self._log_gamma))
+
+    def add(self, value: float, count: int = 1) -> None:
+        """
+        Add (or, with a negative count, remove) occurrences of a value.
+
+        Args:
+            value: Value to count
+            count: Number of occurrences
+        """
+        self.count += count
+        if value > _MIN_INDEXABLE:
+            buckets, index = self.positive, self._index(value)
+        elif value < -_MIN_INDEXABLE:
+            buckets, index = self.negative, self._index(-value)
+        else:
+            self.zero += count
+            return
+        total = buckets.get(index, 0) + count
+        if total:
+            buckets[index] = total
+        else:
+            del buckets[index]
+
+    def subtract(self, other: "QuantileSketch") -> None:
+        """
+        Remove the values counted by another sketch with the same accuracy.
+
+        Args:
+            other: Sketch holding a subset of this sketch's values
+        """
+        for buckets, removed in ((self.positive, other.positive), (self.negative, other.negative)):
+            for index, count in removed.items():
+                total = buckets.get(index, 0) - count
+                if total:
+                    buckets[index] = total
+                else:
+                    buckets.pop(index, None)
+        self.zero -= other.zero
+        self.count -= other.count
+
+    def quantile(self, q: float) -> float | None:
+        """
+        Estimate a quantile.
+
+        Args:
+            q: Quantile between 0 and 1
+
+        Returns:
+            Estimated value, or None if the sketch is empty
+        """
+        if self.count <= 0:
+            return None
+        rank = q * (self.count - 1)
+
+        seen = 0
+        for index in sorted(self.negative, reverse=True):
+            seen += self.negative[index]
+            if seen > rank:
+                return -self._value(index)
+        seen += self.zero
+        if seen > rank:
+            return 0.0
+        for index in sorted(self.positive):
+            seen += self.positive[index]
+            if seen > rank:
+                return self._value(index)
+        return self._value(max(self.positive)) if self.positive else 0.0
+
+
+def quantile_label(q: float) -> str:
+    """
+    Get the name a quantile is reported under, e.g. "p95" for 0.95.
+
+    Args:
+        q: Quantile between 0 and 1
+
+    Returns:
+        Label
+    """
+    return f"p{q * 100:g}"
+
+
+def window_label(window: timedelta) -> str:
+    """
+    Get a short label for a window length, e.g. "5m" or "1h".
+
+    Args:
+        window: Window length
+
+    Returns:
+        Label
+    """
+    seconds = window.total_seconds()
+    if seconds % 3600 == 0:
+        return f"{seconds / 3600:g}h"
+    if seconds % 60 == 0:
+        return f"{seconds / 60:g}m"
+    return f"{seconds:g}s"
+
+
+class AggregateSpec:
+    """
+    One rolling aggregate of a feed payload key.
+
+    Read from the feed's config "aggregates" list, each entry with:
+        - key: Payload key to aggregate
+        - window_minutes: Length of the sliding window
+        - quantiles: Quantiles to estimate (default: 0.5, 0.95, 0.99)
+    """
+
+    __slots__ = ("key", "window", "quantiles")
+
+    def __init__(
+        self, key: str, window: timedelta, quantiles: Sequence[float] = DEFAULT_QUANTILES
+    ):
+        """
+        Initialize aggregate spec.
+
+        Args:
+            key: Payload key to aggregate
+            window: Length of the sliding window
+            quantiles: Quantiles to estimate
+        """
+        self.key = key
+        self.window = window
+        self.quantiles = tuple(quantiles)
+
+    @property
+    def name(self) -> str:
+        """Name of the aggregate, e.g. "cpu_percent_5m"."""
+        return f"{self.key}_{window_label(self.window)}"
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, AggregateSpec):
+            return NotImplemented
+        return (self.key, self.window, self.quantiles) == (
+            other.key,
+            other.window,
+            other.quantiles,
+        )
+
+    def __hash__(self) -> int:
+        return hash((self.key, self.window, self.quantiles))
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> List["AggregateSpec"]:
+        """
+        Build the aggregates listed in a feed config.
+
+        Args:
+            config: Feed configuration dictionary
+
+        Returns:
+            List of AggregateSpec (empty if the config lists none)
+
+        Raises:
+            ValueError: If an entry is malformed
+        """
+        entries = config.get("aggregates")
+        if entries is None:
+            return []
+        if not isinstance(entries, list):
+            raise ValueError(f"aggregates must be a list, got {entries!r}")
+
+        specs = []
+        for entry in entries:
+            if not isinstance(entry, dict):
+                raise ValueError(f"aggregate must be an object, got {entry!r}")
+            key = entry.get("key")
+            if not isinstance(key, str) or not key:
+                raise ValueError(f"aggregate key must be a non-empty string, got {key!r}")
+            minutes = entry.get("window_minutes")
+            if isinstance(minutes, bool) or not isinstance(minutes, (int, float)) or minutes <= 0:
+                raise ValueError(f"window_minutes must be a positive number, got {minutes!r}")
+            quantiles = entry.get("quantiles", DEFAULT_QUANTILES)
+            if not isinstance(quantiles, (list, tuple)) or not all(
+                not isinstance(q, bool) and isinstance(q, (int, float)) and 0 <= q <= 1
+                for q in quantiles
+            ):
+                raise ValueError(f"quantiles must be numbers between 0 and 1, got {quantiles!r}")
+            specs.append(cls(key, timedelta(minutes=minutes), quantiles))
+        return specs
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Get the spec as config-style values.
+
+        Returns:
+            Dict with key, window_minutes and quantiles
+        """
+        return {
+            "key": self.key,
+            "window_minutes": self.window.total_seconds() / 60,
+            "quantiles": list(self.quantiles),
+        }
+
+
+class _Slice:
+    """Statistics of the values that arrived during one time slice."""
+
+    __slots__ = ("index", "count", "mean", "m2", "min", "max", "sketch")
+
+    def __init__(self, index: int, relative_accuracy: float):
+        self.index = index
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self.sketch = QuantileSketch(relative_accuracy)
+
+    def add(self, value: float) -> None:
+        """Add a value (Welford's online update)."""
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        self.sketch.add(value)
+
+
+class RollingAggregate:
+    """
+    Sliding-window statistics of one payload key.
+
+    Count, mean and variance are combined from the per-slice values when
+    read (Chan et al.), so no running sum ever has values subtracted from
+    it; the window's quantile sketch is kept up to date as slices expire.
+    """
+
+    def __init__(self, spec: AggregateSpec, slices: int = 60, relative_accuracy: float = 0.01):
+        """
+        Initialize rolling aggregate.
+
+        Args:
+            spec: What to aggregate
+            slices: Number of time slices the window is divided into
+            relative_accuracy: Maximum relative error of quantile estimates
+        """
+        self.spec = spec
+        self.relative_accuracy = relative_accuracy
+        window = spec.window // timedelta(microseconds=1)
+        self._slice_width = max(1, window // max(1, slices))
+        self._window = window
+        self._slices: Deque[_Slice] = deque()
+        self._sketch = QuantileSketch(relative_accuracy)
+
+    def add(self, ts: int, value: float) -> None:
+        """
+        Add a value.
+
+        Values arriving out of order are counted in the newest slice.
+
+        Args:
+            ts: Event timestamp in microseconds since the Unix epoch
+            value: Numeric value
+        """
+        index = ts // self._slice_width
+        if not self._slices or index > self._slices[-1].index:
+            self._slices.append(_Slice(index, self.relative_accuracy))
+            self.expire(ts)
+        self._slices[-1].add(value)
+        self._sketch.add(value)
+
+    def add_event(self, ts: int, payload: Dict[str, Any]) -> None:
+        """
+        Add an event's value of the aggregated key, if it is a number.
+
+        Args:
+            ts: Event timestamp in microseconds since the Unix epoch
+            payload: Event payload
+        """
+        value = payload.get(self.spec.key)
+        if is_number(value):
+            self.add(ts, float(value))
+
+    def add_series(self, xs: Sequence[int], ys: Sequence[float]) -> None:
+        """
+        Add recorded values, e.g. from history when the aggregate is created.
+
+        Args:
+            xs: Timestamps in microseconds since the Unix epoch, oldest first
+            ys: Values
+        """
+        for ts, value in zip(xs, ys, strict=True):
+            self.add(ts, value)
+
+    def expire(self, now: int) -> None:
+        """
+        Drop the slices that have left the window.
+
+        Args:
+            now: Current time in microseconds since the Unix epoch
+        """
+        # A slice leaves once its end is a whole window old
+        oldest = (now - self._window) // self._slice_width
+        slices = self._slices
+        while slices and slices[0].index < oldest:
+            self._sketch.subtract(slices.popleft().sketch)
+
+    def result(self, now: int | None = None) -> Dict[str, Any]:
+        """
+        Get the window's statistics.
+
+        Args:
+            now: Current time in microseconds since the Unix epoch, to drop
+                slices the feed has not pushed out itself (None to skip)
+
+        Returns:
+            Dict with count, sum, min, max, mean, variance (population) and
+            quantiles by label; values are None while the window is empty
+        """
+        if now is not None:
+            self.expire(now)
+
+        count = 0
+        mean = 0.0
+        m2 = 0.0
+        low = math.inf
+        high = -math.inf
+        for part in self._slices:
+            if not part.count:
+                continue
+            total = count + part.count
+            delta = part.mean - mean
+            mean += delta * part.count / total
+            m2 += part.m2 + delta * delta * count * part.count / total
+            count = total
+            low = min(low, part.min)
+            high = max(high, part.max)
+
+        empty = count == 0
+        return {
+            "count": count,
+            "sum": mean * count,
+            "min": None if empty else low,
+            "max": None if empty else high,
+            "mean": None if empty else mean,
+            "variance": None if empty else m2 / count,
+            "quantiles": {
+                quantile_label(q): self._sketch.quantile(q) for q in self.spec.quantiles
+            },
+        }
+
+
+def aggregate_payload(results: Sequence[Tuple[AggregateSpec, Dict[str, Any]]]) -> Dict[str, Any]:
+    """
+    Flatten aggregate results into a feed payload.
+
+    Keys are named <key>_<window>_<statistic>, e.g. cpu_percent_5m_mean or
+    latency_ms_1h_p95, so panels can show them like any other field.
+    Statistics of an empty window are left out.
+
+    Args:
+        results: (spec, result) pairs
+
+    Returns:
+        Payload dict
+    """
+    payload: Dict[str, Any] = {}
+    for spec, result in results:
+        values = [(name, result[name]) for name in STATISTICS]
+        values.extend(result["quantiles"].items())
+        for name, value in values:
+            if value is not None:
+                payload[f"{spec.name}_{name}"] = value
+    return payload
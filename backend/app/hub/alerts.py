@@ -0,0 +1,651 @@
+"""
+Alert rules evaluated on the publish path.
+
+Rules watch one payload key of one feed and fire when its value (threshold
+rules) or per-second rate of change (rate rules) moves past a threshold,
+or when the key has not been published for a while (absence rules).
+
+Rules are indexed by feed and key, and within a key by sorted threshold.
+A rule can only change state when the value crosses its threshold, so each
+event looks up just the rules whose thresholds lie between the previous
+and the new value; publishing costs the same with ten rules on a key as
+with ten thousand, unless they all flip at once. Absence rules cannot be
+triggered by an event and are checked by a periodic sweep instead.
+
+State transitions are written to the database in the background, like
+feed history, so evaluation never waits on disk I/O.
+"""
+
+import asyncio
+import logging
+import time
+from bisect import bisect_left, bisect_right
+from collections import deque
+from datetime import datetime
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Sequence, Set
+from uuid import UUID
+
+from sqlalchemy.engine import Engine
+from sqlmodel import Session, SQLModel, select
+
+from app.models import AlertEventRecord, AlertKind, AlertOperator, AlertRule, AlertState
+
+from .events import FeedEvent
+from .history import is_number, to_micros
+
+# SQLModel classes do not declare __table__ to type checkers
+_RULES = SQLModel.metadata.tables[AlertRule.__tablename__]
+_EVENTS = SQLModel.metadata.tables[AlertEventRecord.__tablename__]
+
+
+class ActiveRule:
+    """An enabled alert rule and its current state."""
+
+    __slots__ = (
+        "id",
+        "name",
+        "feed_id",
+        "key",
+        "kind",
+        "operator",
+        "threshold",
+        "duration",
+        "state",
+        "since",
+    )
+
+    def __init__(
+        self,
+        id: UUID,
+        name: str,
+        feed_id: UUID,
+        key: str,
+        kind: AlertKind = AlertKind.THRESHOLD,
+        operator: AlertOperator = AlertOperator.ABOVE,
+        threshold: float = 0.0,
+        duration: float = 60.0,
+    ):
+        """
+        Initialize rule.
+
+        Args:
+            id: Rule identifier
+            name: Rule name
+            feed_id: Feed the rule watches
+            key: Payload key the rule watches
+            kind: Threshold, rate or absence rule
+            operator: Which side of the threshold breaches the rule
+            threshold: Value (or rate per second) the key is compared to
+            duration: Seconds without the key before an absence rule fires
+        """
+        self.id = id
+        self.name = name
+        self.feed_id = feed_id
+        self.key = key
+        self.kind = AlertKind(kind)
+        self.operator = AlertOperator(operator)
+        self.threshold = float(threshold)
+        self.duration = float(duration)
+        self.state = AlertState.OK
+        self.since: datetime | None = None
+
+    @classmethod
+    def from_model(cls, rule: AlertRule) -> "ActiveRule":
+        """
+        Create from a database rule.
+
+        Args:
+            rule: AlertRule
+
+        Returns:
+            ActiveRule in the OK state
+        """
+        return cls(
+            rule.id,
+            rule.name,
+            rule.feed_id,
+            rule.key,
+            kind=rule.kind,
+            operator=rule.operator,
+            threshold=rule.threshold,
+            duration=rule.duration_sec,
+        )
+
+    @property
+    def definition(self) -> tuple:
+        """What the rule evaluates; rules with equal definitions share state."""
+        return (self.feed_id, self.key, self.kind, self.operator, self.threshold, self.duration)
+
+    def breached(self, value: float) -> bool:
+        """
+        Check whether a value breaches the threshold.
+
+        Args:
+            value: Value or rate
+
+        Returns:
+            True if the rule should be firing
+        """
+        if self.operator is AlertOperator.ABOVE:
+            return value > self.threshold
+        return value < self.threshold
+
+
+class AlertTransition:
+    """A rule changing state."""
+
+    __slots__ = ("rule", "state", "value", "ts")
+
+    def __init__(
+        self, rule: ActiveRule, state: AlertState, value: float | None, ts: datetime
+    ):
+        """
+        Initialize transition.
+
+        Args:
+            rule: Rule that changed state
+            state: New state
+            value: Value or rate that caused it (None for absence rules)
+            ts: When it happened (naive UTC)
+        """
+        self.rule = rule
+        self.state = state
+        self.value = value
+        self.ts = ts
+
+    @property
+    def feed_id(self) -> UUID:
+        """Feed the rule watches."""
+        return self.rule.feed_id
+
+    def to_message(self) -> Dict[str, Any]:
+        """
+        Build the WebSocket message announcing the transition.
+
+        Returns:
+            Message dict of type "alert"
+        """
+        rule = self.rule
+        return {
+            "type": "alert",
+            "rule_id": str(rule.id),
+            "name": rule.name,
+            "feed_id": str(rule.feed_id),
+            "key": rule.key,
+            "kind": rule.kind.value,
+            "state": self.state.value,
+            "value": self.value,
+            "ts": self.ts.isoformat(),
+        }
+
+    def to_row(self) -> Dict[str, Any]:
+        """
+        Build the alert event row persisting the transition.
+
+        Returns:
+            Column values for AlertEventRecord
+        """
+        return {
+            "rule_id": self.rule.id,
+            "feed_id": self.rule.feed_id,
+            "state": self.state,
+            "value": self.value,
+            "ts": self.ts,
+        }
+
+
+class ThresholdIndex:
+    """
+    Rules on one signal of one payload key, sorted by threshold.
+
+    Remembers the last value seen, so that candidates() returns only the
+    rules whose threshold the new value crossed.
+    """
+
+    __slots__ = ("above", "above_rules", "below", "below_rules", "last")
+
+    def __init__(self) -> None:
+        """Initialize an empty index."""
+        self.above: List[float] = []
+        self.above_rules: List[ActiveRule] = []
+        self.below: List[float] = []
+        self.below_rules: List[ActiveRule] = []
+        self.last: float | None = None
+
+    def __len__(self) -> int:
+        return len(self.above) + len(self.below)
+
+    def _lists(self, rule: ActiveRule) -> tuple[List[float], List[ActiveRule]]:
+        if rule.operator is AlertOperator.ABOVE:
+            return self.above, self.above_rules
+        return self.below, self.below_rules
+
+    def add(self, rule: ActiveRule) -> None:
+        """
+        Add a rule.
+
+        Args:
+            rule: Threshold or rate rule
+        """
+        thresholds, rules = self._lists(rule)
+        i = bisect_right(thresholds, rule.threshold)
+        thresholds.insert(i, rule.threshold)
+        rules.insert(i, rule)
+
+    def remove(self, rule: ActiveRule) -> None:
+        """
+        Remove a rule.
+
+        Args:
+            rule: Rule previously added
+        """
+        thresholds, rules = self._lists(rule)
+        i = bisect_left(thresholds, rule.threshold)
+        while rules[i] is not rule:
+            i += 1
+        del thresholds[i]
+        del rules[i]
+
+    def candidates(self, value: float) -> Iterator[ActiveRule]:
+        """
+        Record a new value and get the rules it may have changed the state of.
+
+        Args:
+            value: New value or rate
+
+        Yields:
+            Rules whose threshold lies between the last value and this one
+            (every rule for the first value)
+        """
+        last = self.last
+        self.last = value
+        if last is None:
+            yield from self.above_rules
+            yield from self.below_rules
+            return
+
+        lo, hi = (last, value) if last <= value else (value, last)
+        # value > t changes for t in [lo, hi)
+        yield from self.above_rules[
+            bisect_left(self.above, lo) : bisect_left(self.above, hi)
+        ]
+        # value < t changes for t in (lo, hi]
+        yield from self.below_rules[
+            bisect_right(self.below, lo) : bisect_right(self.below, hi)
+        ]
+
+
+class _KeyRules:
+    """All rules on one payload key of one feed."""
+
+    __slots__ = ("values", "rates", "absence", "last_seen", "prev_ts", "prev_value")
+
+    def __init__(self, now: float):
+        self.values: ThresholdIndex | None = None
+        self.rates: ThresholdIndex | None = None
+        self.absence: List[ActiveRule] = []
+        # Monotonic time the key was last published (or watching started)
+        self.last_seen = now
+        # Previous numeric value and its timestamp, for rates
+        self.prev_ts: int | None = None
+        self.prev_value: float | None = None
+
+    def __bool__(self) -> bool:
+        return bool(self.values or self.rates or self.absence)
+
+
+class AlertEngine:
+    """Evaluates alert rules against published events."""
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        """
+        Initialize engine.
+
+        Args:
+            clock: Monotonic time source for absence rules
+        """
+        self.clock = clock
+        self.rules: Dict[UUID, ActiveRule] = {}
+        # Feed -> payload key -> rules on it
+        self._keys: Dict[UUID, Dict[str, _KeyRules]] = {}
+        # Absence rule id -> rules on its key
+        self._absence: Dict[UUID, _KeyRules] = {}
+
+        self.logger = logging.getLogger(__name__)
+
+    def watches(self, feed_id: UUID) -> bool:
+        """Check whether any rule watches a feed."""
+        return feed_id in self._keys
+
+    def state(self, rule_id: UUID) -> AlertState:
+        """Get a rule's current state (OK for unknown or disabled rules)."""
+        rule = self.rules.get(rule_id)
+        return rule.state if rule is not None else AlertState.OK
+
+    def firing(self, feed_ids: Iterable[UUID]) -> List[AlertTransition]:
+        """
+        Get the rules currently firing on some feeds.
+
+        Args:
+            feed_ids: Feed identifiers
+
+        Returns:
+            The transition that put each firing rule in that state
+        """
+        feed_ids = set(feed_ids)
+        return [
+            AlertTransition(rule, rule.state, None, rule.since or datetime.utcnow())
+            for rule in self.rules.values()
+            if rule.state is AlertState.FIRING and rule.feed_id in feed_ids
+        ]
+
+    def add(self, model: AlertRule) -> List[AlertTransition]:
+        """
+        Add or replace a rule.
+
+        A rule whose definition is unchanged keeps its state; otherwise it
+        restarts from OK and is checked against the key's last value.
+
+        Args:
+            model: Database rule (disabled rules are removed)
+
+        Returns:
+            Transitions caused by the change
+        """
+        rule = ActiveRule.from_model(model)
+        existing = self.rules.get(rule.id)
+        if existing is not None and model.enabled and existing.definition == rule.definition:
+            existing.name = rule.name
+            return []
+
+        transitions = self.remove(rule.id)
+        if not model.enabled:
+            return transitions
+
+        self.rules[rule.id] = rule
+        keys = self._keys.setdefault(rule.feed_id, {})
+        entry = keys.get(rule.key)
+        if entry is None:
+            entry = keys[rule.key] = _KeyRules(self.clock())
+
+        if rule.kind is AlertKind.ABSENCE:
+            entry.absence.append(rule)
+            self._absence[rule.id] = entry
+            return transitions
+
+        if rule.kind is AlertKind.RATE:
+            if entry.rates is None:
+                entry.rates = ThresholdIndex()
+            index = entry.rates
+        else:
+            if entry.values is None:
+                entry.values = ThresholdIndex()
+            index = entry.values
+        index.add(rule)
+        if index.last is not None and rule.breached(index.last):
+            transitions.append(self._transition(rule, AlertState.FIRING, index.last))
+        return transitions
+
+    def remove(self, rule_id: UUID) -> List[AlertTransition]:
+        """
+        Remove a rule; one that was firing is resolved.
+
+        Args:
+            rule_id: Rule identifier
+
+        Returns:
+            Transitions caused by the removal
+        """
+        rule = self.rules.pop(rule_id, None)
+        if rule is None:
+            return []
+
+        keys = self._keys[rule.feed_id]
+        entry = keys[rule.key]
+        if rule.kind is AlertKind.ABSENCE:
+            entry.absence.remove(rule)
+            del self._absence[rule.id]
+        else:
+            index = entry.rates if rule.kind is AlertKind.RATE else entry.values
+            if index is not None:
+                index.remove(rule)
+        if not entry:
+            del keys[rule.key]
+            if not keys:
+                del self._keys[rule.feed_id]
+
+        if rule.state is AlertState.FIRING:
+            return [self._transition(rule, AlertState.OK, None)]
+        return []
+
+    def set_rules(self, models: Sequence[AlertRule]) -> List[AlertTransition]:
+        """
+        Replace all rules, keeping the state of unchanged ones.
+
+        Args:
+            models: Database rules
+
+        Returns:
+            Transitions caused by the change
+        """
+        transitions = []
+        ids: Set[UUID] = set()
+        for model in models:
+            ids.add(model.id)
+            transitions.extend(self.add(model))
+        for rule_id in [rule_id for rule_id in self.rules if rule_id not in ids]:
+            transitions.extend(self.remove(rule_id))
+        return transitions
+
+    def evaluate(self, event: FeedEvent) -> List[AlertTransition]:
+        """
+        Evaluate the rules on a published event's feed.
+
+        Args:
+            event: Published event
+
+        Returns:
+            Rules that changed state
+        """
+        keys = self._keys.get(event.feed_id)
+        if not keys:
+            return []
+
+        transitions: List[AlertTransition] = []
+        payload = event.payload
+        ts = event.ts
+        for key, entry in keys.items():
+            if key not in payload:
+                continue
+
+            if entry.absence:
+                entry.last_seen = self.clock()
+                for rule in entry.absence:
+                    if rule.state is AlertState.FIRING:
+                        transitions.append(self._transition(rule, AlertState.OK, None, ts))
+
+            value = payload[key]
+            if not is_number(value):
+                continue
+            value = float(value)
+
+            if entry.values is not None:
+                self._check(entry.values, value, ts, transitions)
+
+            if entry.rates is not None:
+                micros = to_micros(ts)
+                prev_ts, prev_value = entry.prev_ts, entry.prev_value
+                if prev_ts is None or prev_value is None:
+                    entry.prev_ts, entry.prev_value = micros, value
+                elif micros > prev_ts:
+                    rate = (value - prev_value) * 1_000_000 / (micros - prev_ts)
+                    self._check(entry.rates, rate, ts, transitions)
+                    entry.prev_ts, entry.prev_value = micros, value
+                # Late or same-time events leave the baseline alone
+
+        return transitions
+
+    def check_absence(self, now: float | None = None) -> List[AlertTransition]:
+        """
+        Fire absence rules whose key has not been published for too long.
+
+        Args:
+            now: Monotonic time (defaults to the engine's clock)
+
+        Returns:
+            Rules that started firing
+        """
+        if now is None:
+            now = self.clock()
+        transitions = []
+        for rule_id, entry in self._absence.items():
+            rule = self.rules[rule_id]
+            if rule.state is AlertState.OK and now - entry.last_seen >= rule.duration:
+                transitions.append(self._transition(rule, AlertState.FIRING, None))
+        return transitions
+
+    def _check(
+        self,
+        index: ThresholdIndex,
+        value: float,
+        ts: datetime,
+        transitions: List[AlertTransition],
+    ) -> None:
+        """Record a value in an index and collect the rules it flipped."""
+        for rule in index.candidates(value):
+            state = AlertState.FIRING if rule.breached(value) else AlertState.OK
+            if state is not rule.state:
+                transitions.append(self._transition(rule, state, value, ts))
+
+    @staticmethod
+    def _transition(
+        rule: ActiveRule, state: AlertState, value: float | None, ts: datetime | None = None
+    ) -> AlertTransition:
+        """Move a rule to a new state."""
+        ts = ts or datetime.utcnow()
+        rule.state = state
+        rule.since = ts
+        return AlertTransition(rule, state, value, ts)
+
+
+class AlertStore:
+    """
+    Durable storage of alert rules and write-behind log of their transitions.
+
+    Transitions are queued by the hub and written in batches by a
+    background task.
+    """
+
+    def __init__(
+        self,
+        engine: Engine,
+        flush_interval: float = 1.0,
+        max_pending: int = 10_000,
+        read_only: bool = False,
+    ):
+        """
+        Initialize alert store.
+
+        Args:
+            engine: SQLAlchemy engine (normally app.db.base.engine)
+            flush_interval: Seconds between writes
+            max_pending: Maximum transitions waiting to be written
+            read_only: Only load rules; transitions added are ignored (for
+                worker processes, where the feed runner does the writing)
+        """
+        self.engine = engine
+        self.flush_interval = flush_interval
+        self.max_pending = max(1, max_pending)
+        self.read_only = read_only
+
+        self._pending: Deque[AlertTransition] = deque()
+        self._writer_task: asyncio.Task | None = None
+
+        # Counters
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+
+        self.logger = logging.getLogger(__name__)
+
+    @property
+    def pending(self) -> int:
+        """Number of transitions waiting to be written."""
+        return len(self._pending)
+
+    async def start(self) -> None:
+        """Create the tables if needed and start the writer task."""
+        for table in (_RULES, _EVENTS):
+            await asyncio.to_thread(table.create, self.engine, checkfirst=True)
+        if self.read_only:
+            return
+        if self._writer_task is None or self._writer_task.done():
+            self._writer_task = asyncio.create_task(self._writer_loop())
+
+    async def stop(self) -> None:
+        """Stop the writer task and write any pending transitions."""
+        if self._writer_task is not None and not self._writer_task.done():
+            self._writer_task.cancel()
+            try:
+                await self._writer_task
+            except asyncio.CancelledError:
+                pass
+        self._writer_task = None
+
+        await self.flush()
+
+    def add(self, transition: AlertTransition) -> None:
+        """
+        Queue a transition for writing without waiting.
+
+        Args:
+            transition: AlertTransition to persist
+        """
+        if self.read_only:
+            return
+        if len(self._pending) >= self.max_pending:
+            self._pending.popleft()
+            self.dropped += 1
+        self._pending.append(transition)
+
+    async def _writer_loop(self) -> None:
+        """Write pending transitions periodically."""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def flush(self) -> None:
+        """Write all pending transitions."""
+        if not self._pending:
+            return
+        batch = list(self._pending)
+        self._pending.clear()
+        try:
+            await asyncio.to_thread(self._write_batch, batch)
+            self.written += len(batch)
+        except Exception as e:
+            self.failed += len(batch)
+            self.logger.error(f"Failed to write {len(batch)} alert events: {e}")
+
+    def _write_batch(self, batch: List[AlertTransition]) -> None:
+        """Insert a batch of transitions in one transaction (runs in a worker thread)."""
+        with self.engine.begin() as conn:
+            conn.execute(
+                _EVENTS.insert(),
+                [transition.to_row() for transition in batch],
+            )
+
+    async def load_rules(self) -> List[AlertRule]:
+        """
+        Read the enabled alert rules.
+
+        Returns:
+            List of AlertRules
+        """
+        return await asyncio.to_thread(self._load_rules)
+
+    def _load_rules(self) -> List[AlertRule]:
+        """Read the enabled rules (runs in a worker thread)."""
+        with Session(self.engine) as session:
+            statement = select(AlertRule).where(AlertRule.enabled == True)  # noqa: E712
+            return list(session.exec(statement).all())
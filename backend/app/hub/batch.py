@@ -0,0 +1,115 @@
+"""
+Batched feed updates.
+
+With a coalescing window configured, the hub collects updates for a while
+and sends each dashboard the ones it subscribes to in a single frame:
+
+    {"type": "feed_batch", "updates": [<feed_update or feed_delta>, ...]}
+
+Within a window, updates of the same feed collapse to the latest one.
+Rate-limited connections (see ClientConnection.max_rate) get the updates
+they held back in the same form.
+
+On connect, a dashboard's initial state likewise goes out as one frame,
+with the latest update of every feed plus a history backfill:
+
+    {"type": "snapshot", "updates": [<feed_update>, ...], "epoch": "...",
+     "history": {"<feed_id>": {"<key>": {"ts": [...], "values": [...]}}},
+     "resync_required": ["<feed_id>", ...]}
+
+A client resuming after a reconnect gets the updates it missed instead,
+oldest first, for feeds the hub can still replay; feeds listed in
+resync_required could not be replayed and are sent as on a fresh connect.
+"""
+
+from typing import List
+
+from app.ws.broadcast import Frame
+
+from .delta import FeedUpdate
+
+_BATCH_PREFIX = b'{"type":"feed_batch","updates":['
+_BATCH_SUFFIX = b"]}"
+_SNAPSHOT_PREFIX = b'{"type":"snapshot","updates":['
+
+
+def batch_frame(frames: List[Frame]) -> Frame:
+    """
+    Wrap already-encoded update frames in a feed_batch frame.
+
+    Args:
+        frames: Encoded feed_update or feed_delta messages
+
+    Returns:
+        feed_batch frame
+    """
+    return Frame(_BATCH_PREFIX + b",".join(frame.data for frame in frames) + _BATCH_SUFFIX)
+
+
+class FeedBatch:
+    """
+    Updates of several feeds sent as a single frame.
+
+    Like FeedUpdate, the batch is turned into a frame only when written:
+    delta-protocol connections get their own, while the plain form is
+    built once and shared by the dashboard's other connections.
+    """
+
+    __slots__ = ("updates", "_full")
+
+    def __init__(self, updates: List[FeedUpdate]):
+        """
+        Initialize feed batch.
+
+        Args:
+            updates: Updates to send, at most one per feed
+        """
+        self.updates = updates
+        self._full: Frame | None = None
+
+    @property
+    def full(self) -> Frame:
+        """feed_batch frame of plain feed_update messages."""
+        if self._full is None:
+            self._full = batch_frame([update.full for update in self.updates])
+        return self._full
+
+
+def snapshot_frame(frames: List[Frame], fields: bytes) -> Frame:
+    """
+    Wrap already-encoded update frames and other fields in a snapshot frame.
+
+    Args:
+        frames: Encoded feed_update messages
+        fields: Encoded, non-empty JSON object of the snapshot's other fields
+
+    Returns:
+        snapshot frame
+    """
+    # Splice the fields object's members in after the updates
+    return Frame(
+        _SNAPSHOT_PREFIX + b",".join(frame.data for frame in frames) + b"]," + fields[1:]
+    )
+
+
+class FeedSnapshot:
+    """
+    Initial state of a connection's feeds, sent as a single frame.
+
+    The updates are resolved when written, like a FeedBatch, so delta and
+    projected connections get the right form of each.
+    """
+
+    __slots__ = ("updates", "fields")
+
+    def __init__(self, updates: List[FeedUpdate], fields: bytes):
+        """
+        Initialize feed snapshot.
+
+        Args:
+            updates: Latest update of each feed, or replayed updates
+            fields: Encoded JSON object with the epoch, history backfill
+                and resync_required fields
+        """
+        self.updates = updates
+        self.fields = fields
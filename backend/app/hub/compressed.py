@@ -0,0 +1,441 @@
+"""
+Compressed history buffer.
+
+Events are appended to an uncompressed open block (a regular HistoryBuffer).
+When the open block fills up it is sealed: timestamps and integer columns
+are delta-of-delta encoded and float columns XOR encoded (see gorilla.py).
+Sealed blocks are decoded on read, keeping a couple of recently decoded
+blocks around so sequential reads decode each block once.
+"""
+
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Iterator, List, Tuple
+from uuid import UUID
+
+from .events import FeedEvent
+from .gorilla import decode_floats, decode_ints, encode_floats, encode_ints
+from .history import (
+    HistoryBuffer,
+    HistoryView,
+    _Column,
+    estimate_size,
+    from_micros,
+    to_micros,
+)
+
+# Number of decoded sealed blocks kept per feed
+_DECODED_CACHE_SIZE = 2
+
+
+class _SealedBlock:
+    """An immutable, encoded run of events."""
+
+    __slots__ = ("abs_start", "count", "skip", "last_ts", "timestamps", "columns", "_nbytes")
+
+    def __init__(self, abs_start: int, buffer: HistoryBuffer):
+        """
+        Encode the rows of a full open block.
+
+        Args:
+            abs_start: Absolute position of the block's first row
+            buffer: Open block to encode
+        """
+        ts, columns = buffer.columns()
+        self.abs_start = abs_start
+        self.count = len(ts)
+        # Rows dropped from the front by trimming or capacity eviction
+        self.skip = 0
+        self.last_ts = ts[-1]
+        self.timestamps = encode_ints(ts)
+
+        # key -> (typecode, encoded values or object list, presence mask or None)
+        self.columns: Dict[str, Tuple[str | None, bytes | list, bytes | None]] = {}
+        for key, column in columns.items():
+            present = None if column.present.count(0) == 0 else bytes(column.present)
+            values: bytes | list
+            if isinstance(column.values, list):
+                values = column.values
+            elif column.typecode == "d":
+                values = encode_floats(column.values)
+            else:
+                values = encode_ints(column.values)
+            self.columns[key] = (column.typecode, values, present)
+
+        self._nbytes = len(self.timestamps)
+        for _, values, present in self.columns.values():
+            if isinstance(values, list):
+                self._nbytes += sum(8 + estimate_size(value) for value in values)
+            else:
+                self._nbytes += len(values)
+            self._nbytes += len(present) if present is not None else 0
+
+    @property
+    def live(self) -> int:
+        """Number of rows not yet dropped."""
+        return self.count - self.skip
+
+    def decode(self, feed_id: UUID) -> HistoryBuffer:
+        """
+        Decode the block into a regular buffer.
+
+        Args:
+            feed_id: Feed the events belong to
+
+        Returns:
+            HistoryBuffer holding every row of the block
+        """
+        columns: Dict[str, _Column] = {}
+        for key, (typecode, values, present) in self.columns.items():
+            column = _Column(typecode, 0)
+            if isinstance(values, list):
+                column.values = list(values)
+            elif typecode == "d":
+                column.values = array("d", decode_floats(values, self.count))
+            else:
+                column.values = array("q", decode_ints(values, self.count))
+            if present is None:
+                column.present = bytearray(b"\x01") * self.count
+            else:
+                column.present = bytearray(present)
+            columns[key] = column
+
+        return HistoryBuffer.from_columns(
+            feed_id, array("q", decode_ints(self.timestamps, self.count)), columns
+        )
+
+    def nbytes(self) -> int:
+        """Approximate bytes held by the block's live rows."""
+        return self._nbytes * self.live // self.count
+
+
+class CompressedHistoryBuffer:
+    """
+    History buffer that keeps older events in compressed blocks.
+
+    Offers the same interface as HistoryBuffer, so it can be used wherever
+    the hub keeps history. Only the newest block_size events are stored
+    uncompressed.
+    """
+
+    def __init__(self, feed_id: UUID, capacity: int = 4096, block_size: int = 512):
+        """
+        Initialize compressed history buffer.
+
+        Args:
+            feed_id: Feed the events belong to
+            capacity: Maximum number of events kept
+            block_size: Number of events per compressed block
+        """
+        self.feed_id = feed_id
+        self.capacity = max(1, capacity)
+        self.block_size = max(1, min(block_size, self.capacity))
+
+        self._blocks: List[_SealedBlock] = []
+        # Parallel lists of block start positions and last timestamps, for bisection
+        self._block_starts: List[int] = []
+        self._block_last: List[int] = []
+        # Decoded timestamps of the oldest block, checked on every trim
+        self._head_ts: Tuple[int, array] | None = None
+        self._open = HistoryBuffer(feed_id, capacity=self.block_size)
+        self._open_base = 0
+        self._count = 0
+        self._offset = 0
+        self._decoded: "OrderedDict[int, HistoryBuffer]" = OrderedDict()
+
+    def __len__(self) -> int:
+        """Number of events in the buffer."""
+        return self._count
+
+    @property
+    def _open_start(self) -> int:
+        """Absolute position of the open block's first live row."""
+        return self._open_base + self._open._offset
+
+    def _decode(self, block: _SealedBlock) -> HistoryBuffer:
+        """Get a sealed block's decoded rows, using the cache."""
+        decoded = self._decoded.get(block.abs_start)
+        if decoded is not None:
+            self._decoded.move_to_end(block.abs_start)
+            return decoded
+
+        decoded = block.decode(self.feed_id)
+        self._decoded[block.abs_start] = decoded
+        if len(self._decoded) > _DECODED_CACHE_SIZE:
+            self._decoded.popitem(last=False)
+        return decoded
+
+    def _head_timestamps(self) -> array:
+        """Get the decoded timestamps of the oldest sealed block."""
+        block = self._blocks[0]
+        if self._head_ts is None or self._head_ts[0] != block.abs_start:
+            self._head_ts = (block.abs_start, array("q", decode_ints(block.timestamps, block.count)))
+        return self._head_ts[1]
+
+    def _pop_block(self) -> None:
+        """Drop the oldest sealed block."""
+        block = self._blocks.pop(0)
+        self._block_starts.pop(0)
+        self._block_last.pop(0)
+        self._decoded.pop(block.abs_start, None)
+        self._offset += block.live
+        self._count -= block.live
+
+    def _skip(self, block: _SealedBlock, skip: int) -> None:
+        """Drop rows from the front of the oldest sealed block."""
+        if skip >= block.count:
+            self._pop_block()
+            return
+        dropped = skip - block.skip
+        block.skip = skip
+        self._offset += dropped
+        self._count -= dropped
+
+    def _seal(self) -> None:
+        """Compress the open block and start a new one."""
+        block = _SealedBlock(self._open_start, self._open)
+        self._blocks.append(block)
+        self._block_starts.append(block.abs_start)
+        self._block_last.append(block.last_ts)
+        self._open_base = block.abs_start + block.count
+        self._open = HistoryBuffer(self.feed_id, capacity=self.block_size)
+
+    def append(self, event: FeedEvent) -> None:
+        """
+        Add an event, dropping the oldest one when full.
+
+        Args:
+            event: FeedEvent to store
+        """
+        if len(self._open) == self.block_size:
+            self._seal()
+
+        # The open block inserts late events in order, but sealed blocks cannot
+        # take insertions: events older than them are clamped to keep order
+        if self._block_last and to_micros(event.ts) < self._block_last[-1]:
+            event = FeedEvent.model_construct(
+                feed_id=event.feed_id, ts=from_micros(self._block_last[-1]), payload=event.payload
+            )
+
+        self._open.append(event)
+        self._count += 1
+
+        # The open block never exceeds capacity, so the oldest event is sealed
+        if self._count > self.capacity:
+            self._skip(self._blocks[0], self._blocks[0].skip + 1)
+
+    def drop_oldest(self, count: int) -> int:
+        """
+        Drop the oldest events.
+
+        Args:
+            count: Number of events to drop
+
+        Returns:
+            Number of events actually dropped
+        """
+        count = min(count, self._count)
+        remaining = count
+        while remaining and self._blocks:
+            block = self._blocks[0]
+            dropped = min(remaining, block.live)
+            self._skip(block, block.skip + dropped)
+            remaining -= dropped
+
+        if remaining:
+            self._open.drop_oldest(remaining)
+            self._offset += remaining
+            self._count -= remaining
+        return count
+
+    def trim_before(self, cutoff: datetime) -> None:
+        """
+        Drop events older than a cutoff.
+
+        Args:
+            cutoff: Events with a timestamp before this are removed
+        """
+        cutoff_us = to_micros(cutoff)
+        while self._blocks and self._blocks[0].last_ts < cutoff_us:
+            self._pop_block()
+
+        if self._blocks:
+            block = self._blocks[0]
+            timestamps = self._head_timestamps()
+            if timestamps[block.skip] < cutoff_us:
+                self._skip(block, bisect_left(timestamps, cutoff_us, block.skip, block.count))
+            return
+
+        before = len(self._open)
+        self._open.trim_before(cutoff)
+        dropped = before - len(self._open)
+        self._offset += dropped
+        self._count -= dropped
+
+    def _locate(self, index: int) -> Tuple[HistoryBuffer, int]:
+        """
+        Find the block holding a logical index.
+
+        Args:
+            index: Logical index (0 is the oldest)
+
+        Returns:
+            (buffer holding the row, index within that buffer)
+        """
+        position = self._offset + index
+        open_start = self._open_start
+        if position >= open_start:
+            return self._open, position - open_start
+
+        block = self._blocks[bisect_right(self._block_starts, position) - 1]
+        return self._decode(block), position - block.abs_start
+
+    def event_at(self, index: int) -> FeedEvent:
+        """
+        Rebuild the event at a logical index (0 is the oldest).
+
+        Args:
+            index: Logical index
+
+        Returns:
+            FeedEvent
+        """
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("history index out of range")
+
+        buffer, local = self._locate(index)
+        return buffer.event_at(local)
+
+    def timestamp_at(self, index: int) -> int:
+        """
+        Get the timestamp (microseconds since epoch) at a logical index.
+
+        Args:
+            index: Logical index
+
+        Returns:
+            Timestamp in microseconds
+        """
+        buffer, local = self._locate(index)
+        return buffer.timestamp_at(local)
+
+    def __iter__(self) -> Iterator[FeedEvent]:
+        """Iterate over events oldest first."""
+        for index in range(self._count):
+            yield self.event_at(index)
+
+    def _bisect(self, micros: int, right: bool) -> int:
+        """
+        Find the logical insertion point for a timestamp.
+
+        Args:
+            micros: Timestamp in microseconds since epoch
+            right: Return the position after equal timestamps
+
+        Returns:
+            Logical index in [0, len(self)]
+        """
+        bisect = bisect_right if right else bisect_left
+        index = bisect(self._block_last, micros)
+        if index < len(self._blocks):
+            block = self._blocks[index]
+            timestamps = self._decode(block)._ts
+            local = bisect(timestamps, micros, block.skip, block.count)
+            return block.abs_start + local - self._offset
+
+        return self._open_start - self._offset + self._open._bisect(micros, right)
+
+    def range(
+        self,
+        since: datetime | None = None,
+        until: datetime | None = None,
+        limit: int | None = None,
+    ) -> HistoryView:
+        """
+        Get a view of events in a time range.
+
+        Args:
+            since: Only include events after this timestamp
+            until: Only include events at or before this timestamp
+            limit: Maximum number of (most recent) events to include
+
+        Returns:
+            HistoryView over the matching events, oldest first
+        """
+        lo = 0 if since is None else self._bisect(to_micros(since), right=True)
+        hi = self._count if until is None else self._bisect(to_micros(until), right=True)
+        if limit:
+            lo = max(lo, hi - limit)
+        hi = max(lo, hi)
+        return HistoryView(self, self._offset + lo, self._offset + hi)
+
+    def events(
+        self,
+        since: datetime | None = None,
+        until: datetime | None = None,
+        limit: int | None = None,
+    ) -> List[FeedEvent]:
+        """
+        Get a materialized list of events in a time range.
+
+        Args:
+            since: Only return events after this timestamp
+            until: Only return events at or before this timestamp
+            limit: Maximum number of (most recent) events to return
+
+        Returns:
+            List of FeedEvents, oldest first
+        """
+        return list(self.range(since=since, until=until, limit=limit))
+
+    def keys(self) -> List[str]:
+        """Payload keys seen in the buffer."""
+        keys: Dict[str, None] = {}
+        for block in self._blocks:
+            keys.update(dict.fromkeys(block.columns))
+        keys.update(dict.fromkeys(self._open.keys()))
+        return list(keys)
+
+    def series(self, key: str, lo: int = 0, hi: int | None = None) -> Tuple[List[int], List[float]]:
+        """
+        Extract one payload key as a numeric series without building events.
+
+        Args:
+            key: Payload key
+            lo: First logical index
+            hi: Logical index after the last row (defaults to the end)
+
+        Returns:
+            (timestamps in microseconds, values as floats)
+        """
+        hi = self._count if hi is None else hi
+        xs: List[int] = []
+        ys: List[float] = []
+        start = self._offset + lo
+        stop = self._offset + hi
+
+        for block in self._blocks:
+            block_stop = block.abs_start + block.count
+            if block_stop <= start or block.abs_start >= stop or key not in block.columns:
+                continue
+            decoded = self._decode(block)
+            bx, by = decoded.series(
+                key, max(start, block.abs_start) - block.abs_start, min(stop, block_stop) - block.abs_start
+            )
+            xs.extend(bx)
+            ys.extend(by)
+
+        open_start = self._open_start
+        if stop > open_start:
+            bx, by = self._open.series(key, max(start, open_start) - open_start, stop - open_start)
+            xs.extend(bx)
+            ys.extend(by)
+        return xs, ys
+
+    def nbytes(self) -> int:
+        """Approximate bytes held by the buffer's storage."""
+        return self._open.nbytes() + sum(block.nbytes() for block in self._blocks)
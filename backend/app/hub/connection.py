@@ -0,0 +1,504 @@
+"""
+Per-connection outbound queues for WebSocket clients.
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from enum import Enum
+from typing import Any, Callable, Coroutine, Dict, FrozenSet, Hashable, Iterable, List, TypeVar
+from uuid import UUID
+
+from fastapi import WebSocket
+
+from app.ws.broadcast import Frame, RawTransport
+
+from .batch import FeedBatch, FeedSnapshot, batch_frame, snapshot_frame
+from .delta import FeedUpdate
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Most queued frames coalesced into one transport write
+_MAX_WRITE_BATCH = 64
+
+# Anything that can be queued on a connection
+OutboundMessage = Frame | str | FeedUpdate | FeedBatch | FeedSnapshot
+
+
+class SlowConsumerPolicy(str, Enum):
+    """What to do when a client cannot keep up with its outbound queue."""
+
+    # Discard the oldest queued message to make room for the new one
+    DROP_OLDEST = "drop_oldest"
+    # Keep only the latest queued message per feed
+    CONFLATE = "conflate"
+    # Close the connection once it stays over the high-water mark too long
+    DISCONNECT = "disconnect"
+
+
+class ClientConnection:
+    """
+    Outbound side of a single WebSocket connection.
+
+    Messages are queued without blocking the caller and written by a
+    dedicated writer task, so a stalled client only ever delays itself.
+    When the server allows it, the shared frame bytes are written straight
+    to the transport instead of going through send_text() (opt-in, see
+    app.ws.broadcast).
+    The queue is bounded; what happens when it fills up is decided by the
+    configured SlowConsumerPolicy.
+
+    A client may also cap its update rate: feed updates are then held and
+    released together at most max_rate times per second, keeping only the
+    latest update per feed.
+
+    The queue may run on a different event loop than the WebSocket (see
+    app.hub.shards); writes are then handed to the WebSocket's loop, a
+    coalesced batch at a time.
+    """
+
+    def __init__(
+        self,
+        dashboard_id: UUID,
+        websocket: WebSocket,
+        on_close: Callable[["ClientConnection"], None],
+        max_queue: int = 1000,
+        policy: SlowConsumerPolicy = SlowConsumerPolicy.DROP_OLDEST,
+        high_water_mark: int | None = None,
+        disconnect_after: float = 10.0,
+        send_timeout: float = 5.0,
+        delta: bool = False,
+        max_rate: float | None = None,
+        projection: Dict[UUID, FrozenSet[str]] | None = None,
+        raw_frames: bool = False,
+        io_loop: asyncio.AbstractEventLoop | None = None,
+    ):
+        """
+        Initialize client connection.
+
+        Args:
+            dashboard_id: Dashboard the connection belongs to
+            websocket: WebSocket connection
+            on_close: Called once when the connection fails or is dropped
+            max_queue: Maximum number of queued outbound messages
+            policy: Slow-consumer policy applied when the queue backs up
+            high_water_mark: Queue depth considered "falling behind"
+                (defaults to 80% of max_queue)
+            disconnect_after: Seconds over the high-water mark before the
+                DISCONNECT policy closes the connection
+            send_timeout: Seconds a single send may take before the
+                connection is considered dead
+            delta: Use the delta protocol for feed updates (see app.hub.delta)
+            max_rate: Maximum feed update releases per second (None for no
+                limit)
+            projection: Payload keys to send per feed (see
+                app.hub.projection); other feeds are sent in full
+            raw_frames: Write frames straight to the transport when the
+                server allows it
+            io_loop: Loop owning the WebSocket, when the queue runs on
+                another loop (None if they are the same)
+        """
+        self.dashboard_id = dashboard_id
+        self.websocket = websocket
+        self.max_queue = max(1, max_queue)
+        self.policy = SlowConsumerPolicy(policy)
+        self.high_water_mark = (
+            high_water_mark if high_water_mark is not None else max(1, self.max_queue * 4 // 5)
+        )
+        self.disconnect_after = disconnect_after
+        self.send_timeout = send_timeout
+        self.connected_at = time.time()
+        self.delta = delta
+        self.projection = projection or {}
+
+        # Sequence number of the last update sent per feed (delta protocol)
+        self.last_seq: Dict[UUID, int] = {}
+
+        # Feed updates held back by the rate limit, latest per feed
+        self.max_rate: float | None = None
+        self._held: Dict[UUID, FeedUpdate] = {}
+        self._held_timer: asyncio.TimerHandle | None = None
+        self._released_at = float("-inf")
+
+        # Direct frame writer, if enabled and the server supports it
+        self._raw = RawTransport.resolve(websocket) if raw_frames else None
+        self.io_loop = io_loop
+
+        # Queued messages keyed by feed ID (conflation) or a unique key
+        self._queue: "OrderedDict[Hashable, OutboundMessage]" = OrderedDict()
+        self._ready = asyncio.Event()
+        self._writer_task: asyncio.Task | None = None
+        self._on_close = on_close
+        self._closed = False
+        self._over_high_water_since: float | None = None
+        self._seq = 0
+
+        # Counters
+        self.sent = 0
+        # Frames written straight to the transport (a subset of sent)
+        self.raw_sent = 0
+        self.dropped = 0
+        self.conflated = 0
+        self.rate_limited = 0
+
+        self.logger = logging.getLogger(__name__)
+        self.set_max_rate(max_rate)
+
+    @property
+    def depth(self) -> int:
+        """Number of messages waiting to be sent."""
+        return len(self._queue)
+
+    @property
+    def closed(self) -> bool:
+        """Whether the connection has been closed."""
+        return self._closed
+
+    def start(self) -> None:
+        """Start the writer task."""
+        if self._writer_task is None and not self._closed:
+            self._writer_task = asyncio.create_task(self._writer_loop())
+
+    def set_max_rate(self, max_rate: float | None) -> None:
+        """
+        Change the connection's update rate limit.
+
+        Args:
+            max_rate: Maximum feed update releases per second (None or 0
+                for no limit)
+        """
+        self.max_rate = max_rate if max_rate and max_rate > 0 else None
+        if self._held_timer is not None:
+            self._held_timer.cancel()
+            self._held_timer = None
+        if self._held:
+            # Rescheduled for the new rate, or sent right away if unlimited
+            self._hold([])
+
+    def enqueue(self, message: OutboundMessage, feed_id: UUID | None = None) -> None:
+        """
+        Queue a message for delivery without waiting for the client.
+
+        Feed updates are turned into frames only when written, so delta
+        frames always build on what the client actually received.
+
+        Args:
+            message: JSON message, shared Frame, FeedUpdate or FeedBatch to send
+            feed_id: Feed the message belongs to (used for conflation)
+        """
+        if self._closed:
+            return
+
+        if self.max_rate is not None and isinstance(message, (FeedUpdate, FeedBatch)):
+            self._hold(message.updates if isinstance(message, FeedBatch) else [message])
+            return
+
+        self._append(message, feed_id)
+
+    def _hold(self, updates: List[FeedUpdate]) -> None:
+        """
+        Hold feed updates until the rate limit allows the next release.
+
+        Args:
+            updates: Feed updates to hold
+        """
+        for update in updates:
+            older = self._held.get(update.feed_id)
+            if older is not None:
+                update = update.collapse(older)
+                self.rate_limited += 1
+            self._held[update.feed_id] = update
+
+        if self._held_timer is not None:
+            return
+        delay = 0.0
+        if self.max_rate is not None:
+            delay = self._released_at + 1 / self.max_rate - time.monotonic()
+        if delay <= 0:
+            self._release_held()
+        else:
+            self._held_timer = asyncio.get_running_loop().call_later(delay, self._release_held)
+
+    def _release_held(self) -> None:
+        """Queue the held feed updates as one message."""
+        self._held_timer = None
+        if self._closed or not self._held:
+            return
+
+        held = list(self._held.values())
+        self._held.clear()
+        self._released_at = time.monotonic()
+        if len(held) == 1:
+            self._append(held[0], held[0].feed_id)
+        else:
+            self._append(FeedBatch(held))
+
+    def _append(self, message: OutboundMessage, feed_id: UUID | None = None) -> None:
+        """
+        Add a message to the outbound queue, applying the slow-consumer policy.
+
+        Args:
+            message: Message to queue
+            feed_id: Feed the message belongs to (used for conflation)
+        """
+        if self.policy is SlowConsumerPolicy.CONFLATE and feed_id is not None:
+            if feed_id in self._queue:
+                # Replace the pending value in place, keeping its position
+                self._queue[feed_id] = message
+                self.conflated += 1
+                self._ready.set()
+                return
+
+        if len(self._queue) >= self.max_queue:
+            if self.policy is SlowConsumerPolicy.DISCONNECT:
+                # Never let a disconnect-policy client grow past its bound
+                self.dropped += 1
+                self._check_high_water()
+                return
+            self._queue.popitem(last=False)
+            self.dropped += 1
+
+        key: Hashable = feed_id
+        if key is None or self.policy is not SlowConsumerPolicy.CONFLATE:
+            self._seq += 1
+            key = ("msg", self._seq)
+        self._queue[key] = message
+        self._ready.set()
+
+        self._check_high_water()
+
+    def _check_high_water(self) -> None:
+        """Track time over the high-water mark and apply DISCONNECT policy."""
+        if len(self._queue) < self.high_water_mark:
+            self._over_high_water_since = None
+            return
+
+        now = time.monotonic()
+        if self._over_high_water_since is None:
+            self._over_high_water_since = now
+            return
+
+        if (
+            self.policy is SlowConsumerPolicy.DISCONNECT
+            and now - self._over_high_water_since >= self.disconnect_after
+        ):
+            self.logger.warning(
+                f"Disconnecting slow client for dashboard {self.dashboard_id}: "
+                f"{len(self._queue)} messages queued for over {self.disconnect_after}s"
+            )
+            self.close()
+            if self.io_loop is None:
+                asyncio.ensure_future(self._close_websocket())
+            else:
+                self._on_io_loop(self._close_websocket())
+
+    def resync(self, feed_ids: Iterable[UUID] | None = None) -> None:
+        """
+        Forget which updates the client holds, so the next ones are keyframes.
+
+        Args:
+            feed_ids: Feeds to resync (all if None)
+        """
+        if feed_ids is None:
+            self.last_seq.clear()
+        else:
+            for feed_id in feed_ids:
+                self.last_seq.pop(feed_id, None)
+
+    def _resolve(self, message: OutboundMessage) -> Frame:
+        """Pick the frame to write for a queued message."""
+        if isinstance(message, str):
+            return Frame(message)
+        if isinstance(message, FeedSnapshot):
+            frames = [self._resolve(update) for update in message.updates]
+            return snapshot_frame(frames, message.fields)
+        if isinstance(message, FeedBatch):
+            if not self.delta and not self.projection:
+                return message.full
+            return batch_frame([self._resolve(update) for update in message.updates])
+        if isinstance(message, Frame):
+            return message
+        keys = self.projection.get(message.feed_id)
+        if keys is not None:
+            message = message.project(keys)
+        if not self.delta:
+            return message.full
+        frame = message.frame_for(self.last_seq.get(message.feed_id))
+        self.last_seq[message.feed_id] = message.seq
+        return frame
+
+    async def send_now(self, message: OutboundMessage) -> bool:
+        """
+        Send a message directly, bypassing the queue.
+
+        Args:
+            message: JSON message, shared Frame, FeedUpdate or FeedBatch to send
+
+        Returns:
+            True if the message was sent, False if the connection failed
+        """
+        frame = self._resolve(message)
+        try:
+            if self._raw is not None and self._raw.is_open():
+                self._raw.write(frame.frame)
+                await asyncio.wait_for(self._raw.drain(), timeout=self.send_timeout)
+                self.raw_sent += 1
+            else:
+                await asyncio.wait_for(
+                    self.websocket.send_text(frame.text), timeout=self.send_timeout
+                )
+            self.sent += 1
+            return True
+        except asyncio.TimeoutError:
+            self.logger.warning(
+                f"Send to connection for dashboard {self.dashboard_id} timed out "
+                f"after {self.send_timeout}s"
+            )
+        except Exception as e:
+            self.logger.warning(
+                f"Failed to send to connection for dashboard {self.dashboard_id}: {e}"
+            )
+        return False
+
+    async def send_frames(self, frames: List[Frame]) -> bool:
+        """
+        Send several frames with a single transport write when possible.
+
+        Args:
+            frames: Frames to send, in order
+
+        Returns:
+            True if every frame was sent, False if the connection failed
+        """
+        if len(frames) == 1 or self._raw is None or not self._raw.is_open():
+            for frame in frames:
+                if not await self.send_now(frame):
+                    return False
+            return True
+
+        try:
+            self._raw.write(b"".join(frame.frame for frame in frames))
+            await asyncio.wait_for(self._raw.drain(), timeout=self.send_timeout)
+            self.sent += len(frames)
+            self.raw_sent += len(frames)
+            return True
+        except asyncio.TimeoutError:
+            self.logger.warning(
+                f"Send to connection for dashboard {self.dashboard_id} timed out "
+                f"after {self.send_timeout}s"
+            )
+        except Exception as e:
+            self.logger.warning(
+                f"Failed to send to connection for dashboard {self.dashboard_id}: {e}"
+            )
+        return False
+
+    def _pop_batch(self) -> List[Frame]:
+        """Take the next message, plus following ones if they can be coalesced."""
+        _, message = self._queue.popitem(last=False)
+        batch = [self._resolve(message)]
+        # Each batch written from another loop costs one hop to the WebSocket's
+        if self._raw is not None or self.io_loop is not None:
+            while self._queue and len(batch) < _MAX_WRITE_BATCH:
+                batch.append(self._resolve(self._queue.popitem(last=False)[1]))
+        return batch
+
+    async def _writer_loop(self) -> None:
+        """Write queued messages to the WebSocket in order."""
+        try:
+            while not self._closed:
+                if not self._queue:
+                    self._ready.clear()
+                    await self._ready.wait()
+                    continue
+
+                batch = self._pop_batch()
+                if len(self._queue) < self.high_water_mark:
+                    self._over_high_water_since = None
+
+                if self.io_loop is not None:
+                    future = self._on_io_loop(self.send_frames(batch))
+                    ok = future is not None and await asyncio.wrap_future(future)
+                elif len(batch) == 1:
+                    ok = await self.send_now(batch[0])
+                else:
+                    ok = await self.send_frames(batch)
+                if not ok:
+                    self.close()
+                    return
+        except asyncio.CancelledError:
+            pass
+
+    def _on_io_loop(self, coro: Coroutine[Any, Any, T]) -> "Future[T] | None":
+        """
+        Run a coroutine on the loop owning the WebSocket.
+
+        Args:
+            coro: Coroutine to run
+
+        Returns:
+            Future of its result, or None if there is no such loop or it has
+            shut down
+        """
+        try:
+            if self.io_loop is not None:
+                return asyncio.run_coroutine_threadsafe(coro, self.io_loop)
+        except RuntimeError:
+            pass
+        coro.close()
+        return None
+
+    async def _close_websocket(self) -> None:
+        """Close the underlying WebSocket, ignoring errors."""
+        try:
+            await self.websocket.close(code=1013)
+        except Exception:
+            pass
+
+    def close(self) -> None:
+        """Stop the writer task and discard queued messages."""
+        if self._closed:
+            return
+
+        self._closed = True
+        self._queue.clear()
+        self._held.clear()
+        if self._held_timer is not None:
+            self._held_timer.cancel()
+            self._held_timer = None
+        self._ready.set()
+
+        task = self._writer_task
+        if task is not None and task is not asyncio.current_task() and not task.done():
+            task.cancel()
+
+        self._on_close(self)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get queue and delivery counters for this connection.
+
+        Returns:
+            Dict with connection statistics
+        """
+        return {
+            "dashboard_id": self.dashboard_id,
+            "policy": self.policy.value,
+            "raw_frames": self._raw is not None,
+            "delta": self.delta,
+            "projected_feeds": len(self.projection),
+            "max_rate": self.max_rate,
+            "queue_depth": self.depth,
+            "max_queue": self.max_queue,
+            "high_water_mark": self.high_water_mark,
+            "sent": self.sent,
+            "raw_sent": self.raw_sent,
+            "dropped": self.dropped,
+            "conflated": self.conflated,
+            "rate_limited": self.rate_limited,
+            "connected_at": self.connected_at,
+        }
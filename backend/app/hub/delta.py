@@ -0,0 +1,214 @@
+"""
+Delta-encoded feed updates.
+
+Connections that opt in to the delta protocol receive feed_delta messages
+carrying only the payload keys that changed since the previous update of
+the feed:
+
+    {"type": "feed_delta", "feed_id": ..., "ts": ..., "seq": 42, "base": 41,
+     "set": {"price": 101.5}, "unset": ["stale_key"]}
+
+A delta applies only on top of update `base`. Whenever a connection does
+not hold that update (first message, dropped or conflated messages, or an
+explicit resync), it gets a keyframe instead: the regular feed_update,
+which carries "seq" as well. The hub also makes every Nth update of a feed
+a keyframe for all connections.
+"""
+
+from typing import Any, Dict, FrozenSet, List, Tuple
+from uuid import UUID
+
+from app.ws.broadcast import Frame
+
+from .events import FeedEvent
+from .serialization import FeedEventEncoder
+
+
+def payload_delta(
+    previous: Dict[str, Any], payload: Dict[str, Any]
+) -> Tuple[Dict[str, Any], List[str]]:
+    """
+    Compute the changed and removed keys between two payloads.
+
+    Values of a different type count as changed even if they compare equal
+    (e.g. 1 and True).
+
+    Args:
+        previous: Payload of the previous update
+        payload: Payload of the new update
+
+    Returns:
+        (changed keys with their new values, removed keys)
+    """
+    changed = {}
+    for key, value in payload.items():
+        if key in previous:
+            old = previous[key]
+            if type(old) is type(value) and old == value:
+                continue
+        changed[key] = value
+    removed = [key for key in previous if key not in payload]
+    return changed, removed
+
+
+class FeedUpdate:
+    """
+    One published event as shared outbound frames.
+
+    Connections not using the delta protocol get the feed_update; delta
+    connections get either a feed_delta or the feed_update as a keyframe,
+    depending on the last update they received. Each form is encoded at most once, on
+    first use, and shared by every recipient.
+    """
+
+    __slots__ = (
+        "event",
+        "seq",
+        "base",
+        "_previous",
+        "_encoder",
+        "_full",
+        "_delta",
+        "_projections",
+    )
+
+    def __init__(
+        self,
+        encoder: FeedEventEncoder,
+        event: FeedEvent,
+        seq: int,
+        previous: Dict[str, Any] | None = None,
+        keyframe: bool = False,
+        base: int | None = None,
+    ):
+        """
+        Initialize feed update.
+
+        Args:
+            encoder: Encoder for the wire messages
+            event: Published event
+            seq: Per-feed sequence number of the event
+            previous: Payload of update base, if known
+            keyframe: Always send the full payload
+            base: Sequence number of the update previous belongs to
+                (defaults to seq - 1)
+        """
+        self.event = event
+        self.seq = seq
+        self.base = None
+        if previous is not None and not keyframe:
+            self.base = base if base is not None else seq - 1
+        self._previous = previous if self.base is not None else None
+        self._encoder = encoder
+        self._full: Frame | None = None
+        self._delta: Frame | None = None
+        self._projections: Dict[FrozenSet[str], "FeedUpdate"] | None = None
+
+    @property
+    def feed_id(self) -> UUID:
+        """Feed the update belongs to."""
+        return self.event.feed_id
+
+    @property
+    def full(self) -> Frame:
+        """feed_update frame, carrying the sequence number."""
+        if self._full is None:
+            self._full = Frame(self._encoder.encode(self.event, seq=self.seq))
+        return self._full
+
+    @property
+    def delta(self) -> Frame:
+        """feed_delta frame relative to update base (the full frame if there is none)."""
+        if self._previous is None:
+            return self.full
+        if self._delta is None:
+            changed, removed = payload_delta(self._previous, self.event.payload)
+            self._delta = Frame(
+                self._encoder.encode_message(
+                    {
+                        "type": "feed_delta",
+                        "feed_id": self.event.feed_id,
+                        "ts": self.event.ts,
+                        "seq": self.seq,
+                        "base": self.base,
+                        "set": changed,
+                        "unset": removed,
+                    }
+                )
+            )
+        return self._delta
+
+    def collapse(self, older: "FeedUpdate") -> "FeedUpdate":
+        """
+        Merge with an older update of the same feed that was never sent.
+
+        The result carries this update's event, with its delta taken against
+        the older update's base, so clients holding that base can still
+        apply it.
+
+        Args:
+            older: Superseded update
+
+        Returns:
+            Update replacing both
+        """
+        if self.base is None:
+            return self
+        if older.base is None:
+            return FeedUpdate(self._encoder, self.event, self.seq, keyframe=True)
+        return FeedUpdate(
+            self._encoder, self.event, self.seq, previous=older._previous, base=older.base
+        )
+
+    def project(self, keys: FrozenSet[str]) -> "FeedUpdate":
+        """
+        Get this update restricted to some payload keys.
+
+        The projection has the same sequence numbers, so deltas and
+        keyframes work as for the full update. It is built once per key set
+        and shared by every connection that needs the same keys.
+
+        Args:
+            keys: Payload keys to keep
+
+        Returns:
+            Projected update
+        """
+        if self._projections is None:
+            self._projections = {}
+        projected = self._projections.get(keys)
+        if projected is None:
+            payload = self.event.payload
+            event = FeedEvent.model_construct(
+                feed_id=self.event.feed_id,
+                ts=self.event.ts,
+                payload={key: payload[key] for key in keys if key in payload},
+            )
+            previous = None
+            if self._previous is not None:
+                previous = {key: self._previous[key] for key in keys if key in self._previous}
+            projected = FeedUpdate(
+                self._encoder,
+                event,
+                self.seq,
+                previous=previous,
+                keyframe=self.base is None,
+                base=self.base,
+            )
+            self._projections[keys] = projected
+        return projected
+
+    def frame_for(self, last_seq: int | None) -> Frame:
+        """
+        Choose the frame for a delta-protocol connection.
+
+        Args:
+            last_seq: Sequence number of the last update of this feed the
+                connection received (None if none)
+
+        Returns:
+            Delta frame if the connection holds the base update, else a keyframe
+        """
+        if self.base is not None and last_seq == self.base:
+            return self.delta
+        return self.full
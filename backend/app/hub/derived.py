@@ -0,0 +1,491 @@
+"""
+Derived feeds: payloads computed from other feeds' events.
+
+A derived feed names its input feeds and gives an expression per output
+payload key:
+
+    {
+        "inputs": {"host": "<feed id>", "other": "<feed id>"},
+        "outputs": {
+            "sent_kbps": "rate(host.net_bytes_sent) / 1024",
+            "cpu_total": "sum(host.cpu_percent, other.cpu_percent)",
+            "mem_ratio": "host.memory_used_gb / host.memory_total_gb"
+        }
+    }
+
+Expressions are parsed once into a tree of closures; only arithmetic,
+comparisons, conditionals, input payload keys (alias.key or
+alias["key"]), numbers and the functions in FUNCTIONS are allowed.
+rate() and delta() take an input payload key and compare it with that
+input's previous event.
+
+The hub keeps a dependency graph from input feeds to the derived feeds
+using them. When a feed publishes, every derived feed downstream of it is
+evaluated once, in dependency order, so each sees its inputs' new events.
+Derived feeds can use other derived feeds as inputs, as long as there are
+no cycles.
+"""
+
+import ast
+import math
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Set, Tuple
+from uuid import UUID
+
+from .events import FeedEvent
+from .history import is_number, to_micros
+
+# Evaluated node: takes the latest event per input alias, returns a number
+# or None when a value is missing or undefined
+Evaluator = Callable[[Mapping[str, FeedEvent]], Any]
+
+# Largest exponent allowed in a ** b, so an expression cannot stall the hub
+_MAX_EXPONENT = 1000
+
+
+def _safe_pow(a: Any, b: Any) -> Any:
+    """Raise to a power in floating point, refusing huge exponents."""
+    if abs(b) > _MAX_EXPONENT:
+        raise OverflowError("exponent too large")
+    return float(a) ** b
+
+
+_BINARY_OPERATORS: Dict[type, Callable[[Any, Any], Any]] = {
+    ast.Add: lambda a, b: a + b,
+    ast.Sub: lambda a, b: a - b,
+    ast.Mult: lambda a, b: a * b,
+    ast.Div: lambda a, b: a / b,
+    ast.FloorDiv: lambda a, b: a // b,
+    ast.Mod: lambda a, b: a % b,
+    ast.Pow: _safe_pow,
+}
+
+_COMPARISONS: Dict[type, Callable[[Any, Any], bool]] = {
+    ast.Lt: lambda a, b: a < b,
+    ast.LtE: lambda a, b: a <= b,
+    ast.Gt: lambda a, b: a > b,
+    ast.GtE: lambda a, b: a >= b,
+    ast.Eq: lambda a, b: a == b,
+    ast.NotEq: lambda a, b: a != b,
+}
+
+# Functions of plain numbers
+FUNCTIONS: Dict[str, Callable[..., Any]] = {
+    "abs": abs,
+    "min": min,
+    "max": max,
+    "sum": lambda *values: sum(values),
+    "round": round,
+    "sqrt": math.sqrt,
+    "log": math.log,
+    "log10": math.log10,
+    "exp": math.exp,
+}
+
+# Functions of an input payload key over successive events
+STATEFUL_FUNCTIONS = ("rate", "delta")
+
+
+class Expression:
+    """
+    A compiled derived feed expression.
+
+    Calling it evaluates the expression against the latest event of each
+    input; the result is None if an input value is missing or the result
+    is undefined (e.g. division by zero, or the first rate() sample).
+    """
+
+    def __init__(self, source: str, aliases: Iterable[str]):
+        """
+        Compile an expression.
+
+        Args:
+            source: Expression text
+            aliases: Input names the expression may refer to
+
+        Raises:
+            ValueError: If the expression is invalid or not allowed
+        """
+        self.source = source
+        self._aliases = set(aliases)
+        # Aliases the expression actually refers to
+        self.inputs: Set[str] = set()
+        try:
+            tree = ast.parse(source, mode="eval")
+        except SyntaxError as e:
+            raise ValueError(f"Invalid expression {source!r}: {e.msg}") from e
+        self._evaluate = self._compile(tree.body)
+
+    def __call__(self, events: Mapping[str, FeedEvent]) -> float | None:
+        """
+        Evaluate the expression.
+
+        Args:
+            events: Latest event per input alias
+
+        Returns:
+            Numeric result, or None if undefined
+        """
+        try:
+            result = self._evaluate(events)
+        except (ArithmeticError, ValueError, TypeError):
+            return None
+        return result if is_number(result) else None
+
+    def _compile(self, node: ast.AST) -> Evaluator:
+        """Turn a syntax tree node into an evaluator closure."""
+        if isinstance(node, ast.Constant):
+            if not is_number(node.value):
+                raise ValueError(f"Only numeric constants are allowed, got {node.value!r}")
+            value = node.value
+            return lambda events: value
+
+        if isinstance(node, (ast.Attribute, ast.Subscript)):
+            return self._compile_key(node)
+
+        if isinstance(node, ast.BinOp) and type(node.op) in _BINARY_OPERATORS:
+            operator = _BINARY_OPERATORS[type(node.op)]
+            left, right = self._compile(node.left), self._compile(node.right)
+
+            def binary(events: Mapping[str, FeedEvent]) -> Any:
+                a = left(events)
+                b = right(events)
+                if a is None or b is None:
+                    return None
+                return operator(a, b)
+
+            return binary
+
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.USub, ast.UAdd)):
+            operand = self._compile(node.operand)
+            sign = -1 if isinstance(node.op, ast.USub) else 1
+
+            def unary(events: Mapping[str, FeedEvent]) -> Any:
+                value = operand(events)
+                return None if value is None else sign * value
+
+            return unary
+
+        if (
+            isinstance(node, ast.Compare)
+            and len(node.ops) == 1
+            and type(node.ops[0]) in _COMPARISONS
+        ):
+            compare = _COMPARISONS[type(node.ops[0])]
+            left, right = self._compile(node.left), self._compile(node.comparators[0])
+
+            def comparison(events: Mapping[str, FeedEvent]) -> Any:
+                a = left(events)
+                b = right(events)
+                if a is None or b is None:
+                    return None
+                return compare(a, b)
+
+            return comparison
+
+        if isinstance(node, ast.IfExp):
+            test, body, orelse = (self._compile(n) for n in (node.test, node.body, node.orelse))
+
+            def conditional(events: Mapping[str, FeedEvent]) -> Any:
+                condition = test(events)
+                if condition is None:
+                    return None
+                return body(events) if condition else orelse(events)
+
+            return conditional
+
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and not node.keywords:
+            name = node.func.id
+            if name in STATEFUL_FUNCTIONS:
+                return self._compile_stateful(name, node.args)
+            function = FUNCTIONS.get(name)
+            if function is None:
+                raise ValueError(f"Unknown function {name!r}")
+            args = [self._compile(arg) for arg in node.args]
+
+            def call(events: Mapping[str, FeedEvent]) -> Any:
+                values = [arg(events) for arg in args]
+                if any(value is None for value in values):
+                    return None
+                return function(*values)
+
+            return call
+
+        raise ValueError(f"Unsupported syntax in expression {self.source!r}")
+
+    def _input_key(self, node: ast.AST) -> Tuple[str, str]:
+        """Get (alias, payload key) from an alias.key or alias["key"] node."""
+        key: object
+        if isinstance(node, ast.Attribute):
+            target, key = node.value, node.attr
+        elif isinstance(node, ast.Subscript) and isinstance(node.slice, ast.Constant):
+            target, key = node.value, node.slice.value
+        else:
+            raise ValueError(f"Expected input.key in expression {self.source!r}")
+        if not isinstance(target, ast.Name) or not isinstance(key, str):
+            raise ValueError(f"Expected input.key in expression {self.source!r}")
+        if target.id not in self._aliases:
+            raise ValueError(f"Unknown input {target.id!r} in expression {self.source!r}")
+        self.inputs.add(target.id)
+        return target.id, key
+
+    def _compile_key(self, node: ast.AST) -> Evaluator:
+        """Compile a reference to an input's payload key."""
+        alias, key = self._input_key(node)
+
+        def lookup(events: Mapping[str, FeedEvent]) -> Any:
+            event = events.get(alias)
+            if event is None:
+                return None
+            value = event.payload.get(key)
+            return value if is_number(value) else None
+
+        return lookup
+
+    def _compile_stateful(self, name: str, args: List[ast.expr]) -> Evaluator:
+        """Compile rate() or delta() of an input's payload key."""
+        if len(args) != 1:
+            raise ValueError(f"{name}() takes one input.key argument")
+        alias, key = self._input_key(args[0])
+        per_second = name == "rate"
+        # Latest sample (timestamp in microseconds, value) and its result
+        state: Dict[str, Any] = {"current": None, "result": None}
+
+        def stateful(events: Mapping[str, FeedEvent]) -> Any:
+            event = events.get(alias)
+            if event is None:
+                return None
+            ts = to_micros(event.ts)
+            current = state["current"]
+            if current is not None and current[0] == ts:
+                # Another input published; this one has not moved
+                return state["result"]
+
+            value = event.payload.get(key)
+            sample = (ts, value) if is_number(value) else None
+            state["current"] = sample
+            result = None
+            if sample is not None and current is not None and ts > current[0]:
+                change = sample[1] - current[1]
+                if change >= 0 or not per_second:
+                    result = change / ((ts - current[0]) / 1e6) if per_second else change
+                # A counter going down was reset; skip that sample
+            state["result"] = result
+            return result
+
+        return stateful
+
+
+class DerivedComputation:
+    """
+    A derived feed's compiled outputs and its inputs.
+    """
+
+    def __init__(self, feed_id: UUID, inputs: Mapping[str, UUID], outputs: Mapping[str, str]):
+        """
+        Compile a derived feed.
+
+        Args:
+            feed_id: Derived feed identifier
+            inputs: Input feed per alias used in the expressions
+            outputs: Expression per output payload key
+
+        Raises:
+            ValueError: If an expression is invalid or no outputs are given
+        """
+        if not outputs:
+            raise ValueError("A derived feed needs at least one output")
+        self.feed_id = feed_id
+        self.expressions = {key: Expression(source, inputs) for key, source in outputs.items()}
+        used = set().union(*(expression.inputs for expression in self.expressions.values()))
+        self.inputs = {alias: feed_id for alias, feed_id in inputs.items() if alias in used}
+
+    @classmethod
+    def from_config(cls, feed_id: UUID, config: Dict[str, Any]) -> "DerivedComputation":
+        """
+        Build a derived feed from a feed config.
+
+        Config options:
+            - inputs: Input feed ID per alias (required)
+            - outputs: Expression per output payload key
+            - expression: Single expression, published as "value"
+
+        Args:
+            feed_id: Derived feed identifier
+            config: Feed configuration dictionary
+
+        Returns:
+            DerivedComputation
+
+        Raises:
+            ValueError: If the config is invalid
+        """
+        inputs = config.get("inputs")
+        if not isinstance(inputs, dict) or not inputs:
+            raise ValueError("inputs must map names to feed IDs")
+        try:
+            input_ids = {str(alias): UUID(str(value)) for alias, value in inputs.items()}
+        except ValueError as e:
+            raise ValueError(f"Invalid input feed ID: {e}") from e
+
+        outputs = config.get("outputs")
+        if outputs is None and "expression" in config:
+            outputs = {"value": config["expression"]}
+        if not isinstance(outputs, dict) or not all(
+            isinstance(source, str) for source in outputs.values()
+        ):
+            raise ValueError("outputs must map payload keys to expressions")
+        return cls(feed_id, input_ids, outputs)
+
+    def evaluate(self, latest: Mapping[UUID, FeedEvent]) -> Dict[str, Any]:
+        """
+        Compute the derived payload from the latest input events.
+
+        Args:
+            latest: Latest event per feed ID
+
+        Returns:
+            Payload with every output that is defined (may be empty)
+        """
+        events = {}
+        for alias, feed_id in self.inputs.items():
+            event = latest.get(feed_id)
+            if event is not None:
+                events[alias] = event
+        payload = {}
+        for key, expression in self.expressions.items():
+            value = expression(events)
+            if value is not None:
+                payload[key] = value
+        return payload
+
+
+class DerivedGraph:
+    """
+    Dependency graph from feeds to the derived feeds computed from them.
+    """
+
+    def __init__(self) -> None:
+        """Initialize an empty graph."""
+        self.feeds: Dict[UUID, DerivedComputation] = {}
+        # Input feed -> derived feeds using it
+        self._dependents: Dict[UUID, List[DerivedComputation]] = {}
+        # Feed -> derived feeds downstream of it in dependency order, built
+        # on first use and dropped whenever the graph changes
+        self._downstream: Dict[UUID, List[DerivedComputation]] = {}
+
+    def add(self, derived: DerivedComputation) -> None:
+        """
+        Add (or replace) a derived feed.
+
+        Args:
+            derived: Compiled derived feed
+
+        Raises:
+            ValueError: If the feed would depend on itself
+        """
+        for input_id in set(derived.inputs.values()):
+            if input_id == derived.feed_id or derived.feed_id in self.upstream(input_id):
+                raise ValueError(f"Derived feed {derived.feed_id} would depend on itself")
+
+        self.remove(derived.feed_id)
+        self._downstream.clear()
+        self.feeds[derived.feed_id] = derived
+        for input_id in set(derived.inputs.values()):
+            self._dependents.setdefault(input_id, []).append(derived)
+
+    def remove(self, feed_id: UUID) -> None:
+        """
+        Remove a derived feed, if present.
+
+        Args:
+            feed_id: Derived feed identifier
+        """
+        derived = self.feeds.pop(feed_id, None)
+        if derived is None:
+            return
+        self._downstream.clear()
+        for input_id in set(derived.inputs.values()):
+            dependents = self._dependents.get(input_id, [])
+            if derived in dependents:
+                dependents.remove(derived)
+            if not dependents:
+                self._dependents.pop(input_id, None)
+
+    def dependents(self, feed_id: UUID) -> List[DerivedComputation]:
+        """
+        Get the derived feeds that use a feed directly.
+
+        Args:
+            feed_id: Input feed identifier
+
+        Returns:
+            List of derived feeds (empty if none)
+        """
+        return self._dependents.get(feed_id, [])
+
+    def downstream(self, feed_id: UUID) -> List[DerivedComputation]:
+        """
+        Get every derived feed computed from a feed, directly or not.
+
+        They are ordered so each comes after all of its inputs, which is the
+        order to evaluate them in after the feed publishes.
+
+        Args:
+            feed_id: Feed identifier
+
+        Returns:
+            Derived feeds in dependency order (empty if none)
+        """
+        order = self._downstream.get(feed_id)
+        if order is None:
+            order = self._downstream[feed_id] = self._dependency_order(feed_id)
+        return order
+
+    def _dependency_order(self, feed_id: UUID) -> List[DerivedComputation]:
+        """Sort the derived feeds downstream of a feed topologically."""
+        # Reverse depth-first postorder; the graph has no cycles
+        seen: Set[UUID] = set()
+        postorder: List[DerivedComputation] = []
+
+        def visit(input_id: UUID) -> None:
+            for derived in self._dependents.get(input_id, ()):
+                if derived.feed_id not in seen:
+                    seen.add(derived.feed_id)
+                    visit(derived.feed_id)
+                    postorder.append(derived)
+
+        visit(feed_id)
+        postorder.reverse()
+        return postorder
+
+    def inputs(self, feed_id: UUID) -> Set[UUID]:
+        """
+        Get the feeds a derived feed uses directly.
+
+        Args:
+            feed_id: Feed identifier
+
+        Returns:
+            Input feed IDs (empty if the feed is not derived)
+        """
+        derived = self.feeds.get(feed_id)
+        return set(derived.inputs.values()) if derived is not None else set()
+
+    def upstream(self, feed_id: UUID) -> Set[UUID]:
+        """
+        Get every feed a feed is computed from, directly or not.
+
+        Args:
+            feed_id: Feed identifier
+
+        Returns:
+            Upstream feed IDs
+        """
+        seen: Set[UUID] = set()
+        pending = [feed_id]
+        while pending:
+            for input_id in self.inputs(pending.pop()):
+                if input_id not in seen:
+                    seen.add(input_id)
+                    pending.append(input_id)
+        return seen
@@ -0,0 +1,214 @@
+"""
+Downsampling of numeric history series.
+
+Timeseries panels only draw a few hundred points, so long windows are
+reduced server-side before being sent. Every function takes parallel,
+time-ordered lists of timestamps (microseconds since epoch) and values and
+returns at most max_points of them.
+"""
+
+from bisect import bisect_left
+from enum import Enum
+from itertools import pairwise
+from typing import List, Tuple
+
+# (timestamps, values)
+Series = Tuple[List[int], List[float]]
+
+
+class DownsampleMode(str, Enum):
+    """How a series is reduced to a bounded number of points."""
+
+    # Largest-Triangle-Three-Buckets: keeps the visual shape of the line
+    LTTB = "lttb"
+    # Minimum and maximum of each time bucket (two points per bucket)
+    MINMAX = "minmax"
+    # Mean of each time bucket
+    AVG = "avg"
+    # Last point of each time bucket
+    LAST = "last"
+
+
+def lttb(xs: List[int], ys: List[float], max_points: int) -> Series:
+    """
+    Downsample with Largest-Triangle-Three-Buckets.
+
+    The first and last points are always kept; from each bucket in between
+    the point forming the largest triangle with the previously selected
+    point and the average of the next bucket is chosen.
+
+    Args:
+        xs: Timestamps, ascending
+        ys: Values
+        max_points: Maximum number of points to return
+
+    Returns:
+        Downsampled (timestamps, values)
+    """
+    n = len(xs)
+    if max_points >= n:
+        return list(xs), list(ys)
+    if max_points < 3:
+        indices = [n - 1] if max_points == 1 else [0, n - 1]
+        return [xs[i] for i in indices], [ys[i] for i in indices]
+
+    # Work relative to the first timestamp to keep products small
+    x0 = xs[0]
+    every = (n - 2) / (max_points - 2)
+    selected = [0]
+    a = 0
+
+    for i in range(max_points - 2):
+        avg_start = int((i + 1) * every) + 1
+        avg_end = min(int((i + 2) * every) + 1, n)
+        count = avg_end - avg_start
+        avg_x = sum(xs[avg_start:avg_end]) / count - x0
+        avg_y = sum(ys[avg_start:avg_end]) / count
+
+        ax = xs[a] - x0
+        ay = ys[a]
+        best = -1.0
+        next_a = range_start = int(i * every) + 1
+        for j in range(range_start, int((i + 1) * every) + 1):
+            area = abs((ax - avg_x) * (ys[j] - ay) - (ax - (xs[j] - x0)) * (avg_y - ay))
+            if area > best:
+                best = area
+                next_a = j
+
+        selected.append(next_a)
+        a = next_a
+
+    selected.append(n - 1)
+    return [xs[i] for i in selected], [ys[i] for i in selected]
+
+
+def _bucket_edges(xs: List[int], buckets: int) -> List[int]:
+    """
+    Split a series into equal-width time buckets.
+
+    Args:
+        xs: Timestamps, ascending
+        buckets: Number of buckets
+
+    Returns:
+        buckets + 1 indices into xs; bucket k is xs[edges[k]:edges[k + 1]]
+    """
+    first = xs[0]
+    span = xs[-1] - first
+    edges = [0]
+    for k in range(1, buckets):
+        edges.append(bisect_left(xs, first + span * k / buckets, edges[-1]))
+    edges.append(len(xs))
+    return edges
+
+
+def minmax(xs: List[int], ys: List[float], max_points: int) -> Series:
+    """
+    Keep the minimum and maximum of each time bucket, in time order.
+
+    Args:
+        xs: Timestamps, ascending
+        ys: Values
+        max_points: Maximum number of points to return
+
+    Returns:
+        Downsampled (timestamps, values)
+    """
+    if max_points >= len(xs):
+        return list(xs), list(ys)
+    if max_points < 2:
+        return last(xs, ys, max_points)
+
+    out_x: List[int] = []
+    out_y: List[float] = []
+    edges = _bucket_edges(xs, max_points // 2)
+    for lo, hi in pairwise(edges):
+        if lo == hi:
+            continue
+        bucket = ys[lo:hi]
+        low = lo + bucket.index(min(bucket))
+        high = lo + bucket.index(max(bucket))
+        for i in sorted({low, high}):
+            out_x.append(xs[i])
+            out_y.append(ys[i])
+    return out_x, out_y
+
+
+def average(xs: List[int], ys: List[float], max_points: int) -> Series:
+    """
+    Average each time bucket, stamped with the bucket's first timestamp.
+
+    Args:
+        xs: Timestamps, ascending
+        ys: Values
+        max_points: Maximum number of points to return
+
+    Returns:
+        Downsampled (timestamps, values)
+    """
+    if max_points >= len(xs):
+        return list(xs), list(ys)
+
+    out_x: List[int] = []
+    out_y: List[float] = []
+    edges = _bucket_edges(xs, max_points)
+    for lo, hi in pairwise(edges):
+        if lo == hi:
+            continue
+        out_x.append(xs[lo])
+        out_y.append(sum(ys[lo:hi]) / (hi - lo))
+    return out_x, out_y
+
+
+def last(xs: List[int], ys: List[float], max_points: int) -> Series:
+    """
+    Keep the last point of each time bucket.
+
+    Args:
+        xs: Timestamps, ascending
+        ys: Values
+        max_points: Maximum number of points to return
+
+    Returns:
+        Downsampled (timestamps, values)
+    """
+    if max_points >= len(xs):
+        return list(xs), list(ys)
+
+    out_x: List[int] = []
+    out_y: List[float] = []
+    edges = _bucket_edges(xs, max_points)
+    for lo, hi in pairwise(edges):
+        if lo == hi:
+            continue
+        out_x.append(xs[hi - 1])
+        out_y.append(ys[hi - 1])
+    return out_x, out_y
+
+
+_DOWNSAMPLERS = {
+    DownsampleMode.LTTB: lttb,
+    DownsampleMode.MINMAX: minmax,
+    DownsampleMode.AVG: average,
+    DownsampleMode.LAST: last,
+}
+
+
+def downsample(
+    xs: List[int], ys: List[float], max_points: int, mode: DownsampleMode | str
+) -> Series:
+    """
+    Downsample a series with the given mode.
+
+    Args:
+        xs: Timestamps, ascending
+        ys: Values
+        max_points: Maximum number of points to return
+        mode: Downsampling mode
+
+    Returns:
+        Downsampled (timestamps, values); unchanged if already small enough
+    """
+    if not xs:
+        return [], []
+    return _DOWNSAMPLERS[DownsampleMode(mode)](xs, ys, max(1, max_points))
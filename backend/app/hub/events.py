@@ -6,7 +6,7 @@ from datetime import datetime
 from typing import Any, Dict
 from uuid import UUID
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, SerializerFunctionWrapHandler, model_serializer
 
 
 class FeedEvent(BaseModel):
@@ -29,8 +29,18 @@ class FeedEventMessage(BaseModel):
     feed_id: UUID
     ts: datetime
     payload: Dict[str, Any]
+    # Per-feed sequence number, left out of the message when unset
+    seq: int | None = None
+
+    @model_serializer(mode="wrap")
+    def _omit_unset_seq(self, handler: SerializerFunctionWrapHandler) -> Dict[str, Any]:
+        """Drop seq from the serialized message when it is not set."""
+        data: Dict[str, Any] = handler(self)
+        if data.get("seq") is None:
+            data.pop("seq", None)
+        return data
 
     @classmethod
-    def from_feed_event(cls, event: FeedEvent) -> "FeedEventMessage":
-        """Create message from FeedEvent."""
-        return cls(feed_id=event.feed_id, ts=event.ts, payload=event.payload)
+    def from_feed_event(cls, event: FeedEvent, seq: int | None = None) -> "FeedEventMessage":
+        """Create message from FeedEvent, with its sequence number if known."""
+        return cls(feed_id=event.feed_id, ts=event.ts, payload=event.payload, seq=seq)
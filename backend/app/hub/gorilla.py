@@ -0,0 +1,260 @@
+"""
+Gorilla-style bit packing for history blocks.
+
+Integers (timestamps and integer payload values) are stored as
+delta-of-deltas and floats as the XOR with the previous value, following
+Facebook's Gorilla time series paper. Regular series compress to a few bits
+per value.
+
+Timestamps here are microseconds rather than Gorilla's seconds, so the
+delta-of-delta buckets are wider than in the paper.
+"""
+
+from array import array
+from typing import List, Sequence
+
+
+class BitWriter:
+    """Append-only big-endian bit stream."""
+
+    __slots__ = ("_buf", "_acc", "_nacc")
+
+    def __init__(self) -> None:
+        self._buf = bytearray()
+        self._acc = 0
+        self._nacc = 0
+
+    def write(self, value: int, nbits: int) -> None:
+        """
+        Append the low nbits of a non-negative integer.
+
+        Args:
+            value: Value to write (0 <= value < 2**nbits)
+            nbits: Number of bits
+        """
+        self._acc = (self._acc << nbits) | value
+        self._nacc += nbits
+        if self._nacc >= 64:
+            # Flush whole bytes, keep the remainder
+            extra = self._nacc & 7
+            self._buf += (self._acc >> extra).to_bytes((self._nacc - extra) >> 3, "big")
+            self._acc &= (1 << extra) - 1
+            self._nacc = extra
+
+    def getvalue(self) -> bytes:
+        """Get the stream, zero-padded to a whole byte."""
+        data = bytes(self._buf)
+        if self._nacc:
+            pad = -self._nacc & 7
+            data += (self._acc << pad).to_bytes((self._nacc + pad) >> 3, "big")
+        return data
+
+
+class BitReader:
+    """Sequential reader for a BitWriter stream."""
+
+    __slots__ = ("_data", "_pos", "_acc", "_nacc")
+
+    def __init__(self, data: bytes):
+        self._data = data
+        self._pos = 0
+        self._acc = 0
+        self._nacc = 0
+
+    def read(self, nbits: int) -> int:
+        """
+        Read nbits as a non-negative integer.
+
+        Args:
+            nbits: Number of bits
+
+        Returns:
+            Value read
+
+        Raises:
+            ValueError: If the stream is exhausted
+        """
+        while self._nacc < nbits:
+            chunk = self._data[self._pos : self._pos + 8]
+            if not chunk:
+                raise ValueError("Read past end of bit stream")
+            self._acc = (self._acc << (len(chunk) << 3)) | int.from_bytes(chunk, "big")
+            self._nacc += len(chunk) << 3
+            self._pos += len(chunk)
+        self._nacc -= nbits
+        value = self._acc >> self._nacc
+        self._acc &= (1 << self._nacc) - 1
+        return value
+
+
+# (control bits, control length, payload bits) for non-zero delta-of-deltas,
+# tried in order; the last bucket fits any difference of int64 values
+_DOD_BUCKETS = (
+    (0b10, 2, 12),
+    (0b110, 3, 20),
+    (0b1110, 4, 32),
+    (0b1111, 4, 68),
+)
+
+
+def _to_signed(value: int, nbits: int) -> int:
+    """Interpret an nbits two's-complement value."""
+    if value >= 1 << (nbits - 1):
+        value -= 1 << nbits
+    return value
+
+
+def encode_ints(values: Sequence[int]) -> bytes:
+    """
+    Encode int64 values with delta-of-delta compression.
+
+    Args:
+        values: Integers in the int64 range
+
+    Returns:
+        Encoded bytes (the count is not stored)
+    """
+    writer = BitWriter()
+    if not values:
+        return writer.getvalue()
+
+    prev = values[0]
+    writer.write(prev & 0xFFFFFFFFFFFFFFFF, 64)
+    prev_delta = 0
+
+    for value in values[1:]:
+        delta = value - prev
+        dod = delta - prev_delta
+        prev = value
+        prev_delta = delta
+
+        if dod == 0:
+            writer.write(0, 1)
+            continue
+        for control, control_bits, nbits in _DOD_BUCKETS:
+            limit = 1 << (nbits - 1)
+            if -limit <= dod < limit:
+                writer.write(control, control_bits)
+                writer.write(dod & ((1 << nbits) - 1), nbits)
+                break
+
+    return writer.getvalue()
+
+
+def decode_ints(data: bytes, count: int) -> List[int]:
+    """
+    Decode values written by encode_ints.
+
+    Args:
+        data: Encoded bytes
+        count: Number of values
+
+    Returns:
+        Decoded integers
+    """
+    if not count:
+        return []
+
+    reader = BitReader(data)
+    read = reader.read
+    value = _to_signed(read(64), 64)
+    values = [value]
+    delta = 0
+
+    for _ in range(count - 1):
+        if read(1):
+            if not read(1):
+                nbits = 12
+            elif not read(1):
+                nbits = 20
+            elif not read(1):
+                nbits = 32
+            else:
+                nbits = 68
+            delta += _to_signed(read(nbits), nbits)
+        value += delta
+        values.append(value)
+
+    return values
+
+
+def encode_floats(values: Sequence[float]) -> bytes:
+    """
+    Encode floats by XOR with the previous value.
+
+    Identical consecutive values cost one bit; others store only the
+    meaningful (non-zero) bits of the XOR, reusing the previous
+    leading/trailing-zero window when it fits.
+
+    Args:
+        values: Float values
+
+    Returns:
+        Encoded bytes (the count is not stored)
+    """
+    writer = BitWriter()
+    if not values:
+        return writer.getvalue()
+
+    bits = array("Q", array("d", values).tobytes())
+    prev = bits[0]
+    writer.write(prev, 64)
+    prev_lead = -1
+    prev_trail = 0
+
+    for value in bits[1:]:
+        xor = value ^ prev
+        prev = value
+        if xor == 0:
+            writer.write(0, 1)
+            continue
+
+        lead = min(64 - xor.bit_length(), 31)
+        trail = (xor & -xor).bit_length() - 1
+        if prev_lead >= 0 and lead >= prev_lead and trail >= prev_trail:
+            writer.write(0b10, 2)
+            writer.write(xor >> prev_trail, 64 - prev_lead - prev_trail)
+        else:
+            length = 64 - lead - trail
+            writer.write(0b11, 2)
+            writer.write(lead, 5)
+            # A length of 64 does not fit in 6 bits and is stored as 0
+            writer.write(length & 63, 6)
+            writer.write(xor >> trail, length)
+            prev_lead = lead
+            prev_trail = trail
+
+    return writer.getvalue()
+
+
+def decode_floats(data: bytes, count: int) -> List[float]:
+    """
+    Decode values written by encode_floats.
+
+    Args:
+        data: Encoded bytes
+        count: Number of values
+
+    Returns:
+        Decoded floats
+    """
+    if not count:
+        return []
+
+    reader = BitReader(data)
+    read = reader.read
+    value = read(64)
+    bits = array("Q", [value])
+    lead = 0
+    trail = 0
+
+    for _ in range(count - 1):
+        if read(1):
+            if read(1):
+                lead = read(5)
+                length = read(6) or 64
+                trail = 64 - lead - length
+            value ^= read(64 - lead - trail) << trail
+        bits.append(value)
+
+    return array("d", bits.tobytes()).tolist()
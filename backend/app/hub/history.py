@@ -0,0 +1,665 @@
+"""
+Columnar ring buffer for feed event history.
+"""
+
+import math
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta, timezone
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    Iterator,
+    List,
+    Sequence,
+    Tuple,
+    TypeGuard,
+    overload,
+)
+from uuid import UUID
+
+from .events import FeedEvent
+
+if TYPE_CHECKING:
+    from .compressed import CompressedHistoryBuffer
+    from .segments import MmapHistoryBuffer
+
+# Naive UTC epoch; hub timestamps are naive UTC datetimes
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+# Initial allocation; buffers double until they reach their capacity
+_INITIAL_SIZE = 64
+
+_INT64_MIN = -(2**63)
+_INT64_MAX = 2**63 - 1
+_FLOAT_MAX = sys.float_info.max
+
+
+def to_micros(ts: datetime) -> int:
+    """
+    Convert a timestamp to integer microseconds since the Unix epoch.
+
+    Args:
+        ts: Naive UTC or timezone-aware datetime
+
+    Returns:
+        Microseconds since epoch
+    """
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+    return (ts - _EPOCH) // _MICROSECOND
+
+
+def estimate_size(value: Any, depth: int = 0) -> int:
+    """
+    Estimate the memory held by a payload value, including nested values.
+
+    Args:
+        value: JSON-like value
+        depth: Current nesting depth (nesting beyond 8 levels is not followed)
+
+    Returns:
+        Approximate size in bytes
+    """
+    size = sys.getsizeof(value)
+    if depth >= 8:
+        return size
+    if isinstance(value, dict):
+        for key, item in value.items():
+            size += estimate_size(key, depth + 1) + estimate_size(item, depth + 1)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            size += estimate_size(item, depth + 1)
+    return size
+
+
+def is_number(value: Any) -> TypeGuard[float]:
+    """
+    Check whether a payload value can be plotted as a number.
+
+    Args:
+        value: Payload value
+
+    Returns:
+        True for finite floats and ints within float range (not bools)
+    """
+    if type(value) is float:
+        return math.isfinite(value)
+    return type(value) is int and -_FLOAT_MAX <= value <= _FLOAT_MAX
+
+
+def from_micros(micros: int) -> datetime:
+    """
+    Convert integer microseconds since the Unix epoch to a naive UTC datetime.
+
+    Args:
+        micros: Microseconds since epoch
+
+    Returns:
+        Naive UTC datetime
+    """
+    return _EPOCH + timedelta(microseconds=micros)
+
+
+class _Column:
+    """
+    One payload key stored across all rows of a HistoryBuffer.
+
+    Values live in a typed array ('q' for ints, 'd' for floats) while every
+    value seen fits that type; anything else (strings, bools, nested data,
+    mixed types) moves the column to a plain list.
+    """
+
+    __slots__ = ("typecode", "values", "present")
+
+    def __init__(self, typecode: str | None, size: int):
+        self.typecode = typecode
+        self.values: array | List[Any] = (
+            array(typecode, bytes(array(typecode).itemsize * size))
+            if typecode
+            else [None] * size
+        )
+        self.present = bytearray(size)
+
+    @staticmethod
+    def typecode_for(value: Any) -> str | None:
+        """Pick the typed-array code for a value, or None for object storage."""
+        if type(value) is float:
+            return "d"
+        if type(value) is int and _INT64_MIN <= value <= _INT64_MAX:
+            return "q"
+        return None
+
+    def accepts(self, value: Any) -> bool:
+        """Check whether the value can be stored without changing type."""
+        return self.typecode is None or self.typecode_for(value) == self.typecode
+
+    def to_objects(self) -> None:
+        """Switch to object storage, keeping existing values."""
+        if self.typecode is not None:
+            self.values = list(self.values)
+            self.typecode = None
+
+    def resize(self, order: List[int], size: int) -> None:
+        """Copy rows in the given physical order into storage of a new size."""
+        values: array | List[Any]
+        if isinstance(self.values, array):
+            values = array(self.values.typecode, bytes(self.values.itemsize * size))
+        else:
+            values = [None] * size
+        present = bytearray(size)
+        for new_index, old_index in enumerate(order):
+            values[new_index] = self.values[old_index]
+            present[new_index] = self.present[old_index]
+        self.values = values
+        self.present = present
+
+    def clear(self, index: int) -> None:
+        """Mark a row as not having this key."""
+        self.present[index] = 0
+        if self.typecode is None:
+            self.values[index] = None
+
+    def swap(self, a: int, b: int) -> None:
+        """Exchange two rows."""
+        values, present = self.values, self.present
+        values[a], values[b] = values[b], values[a]
+        present[a], present[b] = present[b], present[a]
+
+    @property
+    def row_bytes(self) -> int:
+        """Bytes per row for the value slot and presence flag."""
+        return (self.values.itemsize if isinstance(self.values, array) else 8) + 1
+
+
+class HistoryBuffer:
+    """
+    Fixed-capacity, columnar ring buffer of one feed's events.
+
+    Instead of keeping a FeedEvent (with its own datetime and payload dict)
+    per event, timestamps are stored as int64 microseconds in one array and
+    each numeric payload key in its own typed array. Non-numeric values fall
+    back to a per-key list. Once full, new events overwrite the oldest.
+    FeedEvent objects are only rebuilt when history is read.
+
+    Timestamps are kept in non-decreasing order (an event older than the
+    previous one is inserted at its place among the newer rows), so time
+    range queries are answered by bisection on the timestamp array.
+    """
+
+    def __init__(self, feed_id: UUID, capacity: int = 4096):
+        """
+        Initialize history buffer.
+
+        Args:
+            feed_id: Feed the events belong to
+            capacity: Maximum number of events kept
+        """
+        self.feed_id = feed_id
+        self.capacity = max(1, capacity)
+
+        size = min(_INITIAL_SIZE, self.capacity)
+        self._ts = array("q", bytes(8 * size))
+        self._columns: Dict[str, _Column] = {}
+        self._start = 0
+        self._count = 0
+
+        # Estimated size of the values held in object columns, per row
+        self._extra = array("q", bytes(8 * size))
+        self._object_bytes = 0
+
+        # Number of events ever dropped from the front; views address events
+        # by absolute position so later appends do not shift them
+        self._offset = 0
+
+    @classmethod
+    def from_columns(
+        cls, feed_id: UUID, timestamps: array, columns: Dict[str, _Column]
+    ) -> "HistoryBuffer":
+        """
+        Build a full buffer around existing, oldest-first storage.
+
+        Args:
+            feed_id: Feed the events belong to
+            timestamps: Timestamps in microseconds (typecode 'q')
+            columns: Payload columns with the same number of rows
+
+        Returns:
+            HistoryBuffer holding exactly those rows
+        """
+        buffer = cls(feed_id, capacity=len(timestamps))
+        buffer._ts = timestamps
+        buffer._columns = columns
+        buffer._count = len(timestamps)
+        buffer._extra = array("q", bytes(8 * len(timestamps)))
+        return buffer
+
+    def columns(self) -> Tuple[array, Dict[str, _Column]]:
+        """
+        Copy the buffer's rows into oldest-first storage of exact size.
+
+        Returns:
+            (timestamps, columns) suitable for from_columns()
+        """
+        runs = list(self._runs(0, self._count))
+        ts = array("q")
+        for start, stop in runs:
+            ts.extend(self._ts[start:stop])
+
+        columns: Dict[str, _Column] = {}
+        for key, column in self._columns.items():
+            copy = _Column(column.typecode, 0)
+            for start, stop in runs:
+                copy.values.extend(column.values[start:stop])
+                copy.present.extend(column.present[start:stop])
+            columns[key] = copy
+        return ts, columns
+
+    def __len__(self) -> int:
+        """Number of events in the buffer."""
+        return self._count
+
+    def _physical(self, index: int) -> int:
+        """Map a logical (oldest-first) index to a storage index."""
+        return (self._start + index) % len(self._ts)
+
+    def _grow(self) -> None:
+        """Double the storage (up to capacity), unrolling the ring."""
+        size = min(len(self._ts) * 2, self.capacity)
+        order = [self._physical(i) for i in range(self._count)]
+
+        ts = array("q", bytes(8 * size))
+        extra = array("q", bytes(8 * size))
+        for new_index, old_index in enumerate(order):
+            ts[new_index] = self._ts[old_index]
+            extra[new_index] = self._extra[old_index]
+        self._ts = ts
+        self._extra = extra
+        for column in self._columns.values():
+            column.resize(order, size)
+        self._start = 0
+
+    def append(self, event: FeedEvent) -> None:
+        """
+        Add an event, overwriting the oldest one when full.
+
+        An event older than the newest one is inserted in timestamp order,
+        shifting the newer rows; that costs O(rows moved), so it is cheap
+        for the slightly late events real feeds produce. When the buffer is
+        full, an event older than every buffered one is discarded, since it
+        would be the next to be overwritten.
+
+        Args:
+            event: FeedEvent to store
+        """
+        if self._count == len(self._ts) and len(self._ts) < self.capacity:
+            self._grow()
+
+        size = len(self._ts)
+        ts = to_micros(event.ts)
+        position = self._count
+        if self._count and ts < self._ts[self._physical(self._count - 1)]:
+            position = self._bisect(ts, right=True)
+
+        if self._count == size:
+            if position == 0:
+                return
+            index = self._start
+            self._start = (self._start + 1) % size
+            self._offset += 1
+            position -= 1
+        else:
+            index = (self._start + self._count) % size
+            self._count += 1
+
+        self._ts[index] = ts
+
+        payload = event.payload
+        for key, existing in self._columns.items():
+            if key not in payload:
+                existing.clear(index)
+
+        extra = 0
+        for key, value in payload.items():
+            column = self._columns.get(key)
+            if column is None:
+                column = _Column(_Column.typecode_for(value), size)
+                self._columns[key] = column
+            elif not column.accepts(value):
+                column.to_objects()
+            column.values[index] = value
+            column.present[index] = 1
+            if column.typecode is None:
+                extra += estimate_size(value)
+
+        self._object_bytes += extra - self._extra[index]
+        self._extra[index] = extra
+
+        if position < self._count - 1:
+            self._move_newest(position)
+
+    def _move_newest(self, position: int) -> None:
+        """Move the newest row back to a logical position, shifting later rows up."""
+        columns = list(self._columns.values())
+        for i in range(self._count - 1, position, -1):
+            a, b = self._physical(i), self._physical(i - 1)
+            self._ts[a], self._ts[b] = self._ts[b], self._ts[a]
+            self._extra[a], self._extra[b] = self._extra[b], self._extra[a]
+            for column in columns:
+                column.swap(a, b)
+
+    def trim_before(self, cutoff: datetime) -> None:
+        """
+        Drop events older than a cutoff.
+
+        Args:
+            cutoff: Events with a timestamp before this are removed
+        """
+        self.drop_oldest(self._bisect(to_micros(cutoff), right=False))
+
+    def drop_oldest(self, count: int) -> int:
+        """
+        Drop the oldest events.
+
+        Args:
+            count: Number of events to drop
+
+        Returns:
+            Number of events actually dropped
+        """
+        count = min(count, self._count)
+        for _ in range(count):
+            index = self._start
+            for column in self._columns.values():
+                column.clear(index)
+            self._object_bytes -= self._extra[index]
+            self._extra[index] = 0
+            self._start = (self._start + 1) % len(self._ts)
+        self._count -= count
+        self._offset += count
+        return count
+
+    def _bisect(self, micros: int, right: bool) -> int:
+        """
+        Find the logical insertion point for a timestamp.
+
+        The ring occupies at most two sorted runs of the timestamp array
+        (start..end of storage, then 0..wrap), so each lookup is a C-level
+        bisect over one run.
+
+        Args:
+            micros: Timestamp in microseconds since epoch
+            right: Return the position after equal timestamps
+
+        Returns:
+            Logical index in [0, len(self)]
+        """
+        size = len(self._ts)
+        end = self._start + self._count
+        bisect = bisect_right if right else bisect_left
+
+        if end <= size:
+            return bisect(self._ts, micros, self._start, end) - self._start
+
+        first_run = size - self._start
+        head = self._ts[0]
+        if head < micros or (right and head == micros):
+            return first_run + bisect(self._ts, micros, 0, end - size)
+        return bisect(self._ts, micros, self._start, size) - self._start
+
+    def event_at(self, index: int) -> FeedEvent:
+        """
+        Rebuild the event at a logical index (0 is the oldest).
+
+        Args:
+            index: Logical index
+
+        Returns:
+            FeedEvent
+        """
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("history index out of range")
+
+        physical = self._physical(index)
+        payload = {
+            key: column.values[physical]
+            for key, column in self._columns.items()
+            if column.present[physical]
+        }
+        return FeedEvent.model_construct(
+            feed_id=self.feed_id, ts=from_micros(self._ts[physical]), payload=payload
+        )
+
+    def __iter__(self) -> Iterator[FeedEvent]:
+        """Iterate over events oldest first."""
+        for index in range(self._count):
+            yield self.event_at(index)
+
+    def range(
+        self,
+        since: datetime | None = None,
+        until: datetime | None = None,
+        limit: int | None = None,
+    ) -> "HistoryView":
+        """
+        Get a view of events in a time range in O(log n).
+
+        Args:
+            since: Only include events after this timestamp
+            until: Only include events at or before this timestamp
+            limit: Maximum number of (most recent) events to include
+
+        Returns:
+            HistoryView over the matching events, oldest first
+        """
+        lo = 0 if since is None else self._bisect(to_micros(since), right=True)
+        hi = self._count if until is None else self._bisect(to_micros(until), right=True)
+        if limit:
+            lo = max(lo, hi - limit)
+        hi = max(lo, hi)
+        return HistoryView(self, self._offset + lo, self._offset + hi)
+
+    def events(
+        self,
+        since: datetime | None = None,
+        until: datetime | None = None,
+        limit: int | None = None,
+    ) -> List[FeedEvent]:
+        """
+        Get a materialized list of events in a time range.
+
+        Args:
+            since: Only return events after this timestamp
+            until: Only return events at or before this timestamp
+            limit: Maximum number of (most recent) events to return
+
+        Returns:
+            List of FeedEvents, oldest first
+        """
+        return list(self.range(since=since, until=until, limit=limit))
+
+    def timestamp_at(self, index: int) -> int:
+        """
+        Get the timestamp (microseconds since epoch) at a logical index.
+
+        Args:
+            index: Logical index
+
+        Returns:
+            Timestamp in microseconds
+        """
+        return self._ts[self._physical(index)]
+
+    def keys(self) -> List[str]:
+        """Payload keys seen in the buffer."""
+        return list(self._columns)
+
+    def _runs(self, lo: int, hi: int) -> Iterator[Tuple[int, int]]:
+        """Yield the physical (start, stop) runs covering logical [lo, hi)."""
+        if lo >= hi:
+            return
+        size = len(self._ts)
+        start = self._physical(lo)
+        stop = start + (hi - lo)
+        if stop <= size:
+            yield start, stop
+        else:
+            yield start, size
+            yield 0, stop - size
+
+    def series(self, key: str, lo: int = 0, hi: int | None = None) -> Tuple[List[int], List[float]]:
+        """
+        Extract one payload key as a numeric series without building events.
+
+        Rows missing the key, or holding a non-numeric or non-finite value,
+        are skipped.
+
+        Args:
+            key: Payload key
+            lo: First logical index
+            hi: Logical index after the last row (defaults to the end)
+
+        Returns:
+            (timestamps in microseconds, values as floats)
+        """
+        xs: List[int] = []
+        ys: List[float] = []
+        column = self._columns.get(key)
+        if column is None:
+            return xs, ys
+
+        hi = self._count if hi is None else hi
+        for start, stop in self._runs(lo, hi):
+            rows = zip(
+                self._ts[start:stop],
+                column.values[start:stop],
+                column.present[start:stop],
+                strict=True,
+            )
+            if column.typecode == "q":
+                for ts, value, present in rows:
+                    if present:
+                        xs.append(ts)
+                        ys.append(float(value))
+            else:
+                for ts, value, present in rows:
+                    if present and is_number(value):
+                        xs.append(ts)
+                        ys.append(float(value))
+        return xs, ys
+
+    def nbytes(self) -> int:
+        """
+        Approximate bytes held for the buffered events.
+
+        Counts the timestamp and column slots of each event plus the
+        estimated size of values kept in object columns.
+        """
+        row_bytes = self._ts.itemsize + sum(column.row_bytes for column in self._columns.values())
+        return self._count * row_bytes + self._object_bytes
+
+
+class HistoryView(Sequence[FeedEvent]):
+    """
+    Lazy, read-only view of a contiguous run of a HistoryBuffer.
+
+    Creating a view copies nothing; FeedEvents are rebuilt only for the
+    items actually accessed. Views address events by absolute position, so
+    appending new events does not shift them. Accessing an event that has
+    since been evicted from the buffer raises IndexError.
+    """
+
+    __slots__ = ("_buffer", "_lo", "_hi")
+
+    def __init__(
+        self,
+        buffer: "HistoryBuffer | CompressedHistoryBuffer | MmapHistoryBuffer",
+        lo: int,
+        hi: int,
+    ):
+        """
+        Initialize view.
+
+        Args:
+            buffer: Buffer holding the events
+            lo: Absolute position of the first event
+            hi: Absolute position after the last event
+        """
+        self._buffer = buffer
+        self._lo = lo
+        self._hi = hi
+
+    def __len__(self) -> int:
+        """Number of events in the view."""
+        return self._hi - self._lo
+
+    def _logical(self, position: int) -> int:
+        """Map an absolute position to the buffer's current logical index."""
+        index = position - self._buffer._offset
+        if index < 0:
+            raise IndexError("history event has been evicted")
+        return index
+
+    @overload
+    def __getitem__(self, index: int) -> FeedEvent: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> "HistoryView | List[FeedEvent]": ...
+
+    def __getitem__(self, index: int | slice) -> "FeedEvent | HistoryView | List[FeedEvent]":
+        """Get an event by index, or a sub-view by slice."""
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step == 1:
+                return HistoryView(self._buffer, self._lo + start, self._lo + max(start, stop))
+            return [self[i] for i in range(start, stop, step)]
+
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("history view index out of range")
+        return self._buffer.event_at(self._logical(self._lo + index))
+
+    def __iter__(self) -> Iterator[FeedEvent]:
+        """Iterate over events oldest first."""
+        for position in range(self._lo, self._hi):
+            yield self._buffer.event_at(self._logical(position))
+
+    def __repr__(self) -> str:
+        """Debug representation."""
+        return f"HistoryView(feed_id={self._buffer.feed_id}, events={len(self)})"
+
+    def series(self, key: str) -> Tuple[List[int], List[float]]:
+        """
+        Extract one payload key over the view as a numeric series.
+
+        Args:
+            key: Payload key
+
+        Returns:
+            (timestamps in microseconds, values as floats)
+        """
+        if not len(self):
+            return [], []
+        return self._buffer.series(key, self._logical(self._lo), self._logical(self._hi - 1) + 1)
+
+    def keys(self) -> List[str]:
+        """Payload keys seen in the underlying buffer."""
+        return self._buffer.keys()
+
+    def timestamps(self) -> List[int]:
+        """
+        Get the view's timestamps without building events.
+
+        Returns:
+            Timestamps in microseconds since epoch
+        """
+        return [
+            self._buffer.timestamp_at(self._logical(position))
+            for position in range(self._lo, self._hi)
+        ]
@@ -4,17 +4,40 @@ DataHub for managing feed events and WebSocket connections.
 
 import asyncio
 import logging
-from collections import defaultdict, deque
+import math
+import time
+from collections import defaultdict
 from datetime import datetime, timedelta
-from typing import Any, Deque, Dict, List, Set
-from uuid import UUID
+from pathlib import Path
+from typing import Any, Callable, Dict, FrozenSet, List, Sequence, Set, Tuple
+from uuid import UUID, uuid4
 
 from fastapi import WebSocket
 
-from .events import FeedEvent, FeedEventMessage
+from app.models import AlertRule
+from app.ws.broadcast import Frame
+
+from .aggregates import AggregateSpec, RollingAggregate
+from .alerts import AlertEngine, AlertStore, AlertTransition
+from .batch import FeedBatch, FeedSnapshot
+from .compressed import CompressedHistoryBuffer
+from .connection import ClientConnection, OutboundMessage, SlowConsumerPolicy
+from .delta import FeedUpdate
+from .derived import DerivedGraph
+from .downsample import DownsampleMode, downsample
+from .events import FeedEvent
+from .history import HistoryBuffer, from_micros, is_number, to_micros
+from .relay import RelayPublisher
+from .retention import RetentionPolicy
+from .segments import MmapHistoryBuffer
+from .serialization import FeedEventEncoder, Serializer
+from .shards import HubShard
+from .store import HistoryStore
 
 logger = logging.getLogger(__name__)
 
+AnyHistoryBuffer = HistoryBuffer | CompressedHistoryBuffer | MmapHistoryBuffer
+
 
 class DataHub:
     """
@@ -25,31 +48,475 @@ class DataHub:
     - Recent history window for each feed
     - WebSocket connections grouped by dashboard ID
     - Mapping of which feeds are used by which dashboards
+    - Reverse index of which dashboards subscribe to each feed
     """
 
-    def __init__(self, history_window: timedelta = timedelta(minutes=10)):
+    def __init__(
+        self,
+        history_window: timedelta = timedelta(minutes=10),
+        history_capacity: int = 4096,
+        history_compression: bool = False,
+        history_block_size: int = 512,
+        history_segment_dir: str | Path | None = None,
+        history_segment_duration: timedelta = timedelta(minutes=15),
+        history_segment_records: int = 65536,
+        history_memory_budget: int | None = None,
+        history_store: HistoryStore | None = None,
+        dispatch_queue_size: int = 10000,
+        shards: int = 0,
+        send_timeout: float = 5.0,
+        queue_size: int = 1000,
+        slow_consumer_policy: SlowConsumerPolicy | str = SlowConsumerPolicy.DROP_OLDEST,
+        high_water_mark: int | None = None,
+        disconnect_after: float = 10.0,
+        serializer: str | Serializer = "auto",
+        raw_frames: bool = False,
+        delta_keyframe_interval: int = 100,
+        batch_window: float = 0.0,
+        snapshot_history_points: int = 0,
+        snapshot_history_mode: DownsampleMode | str = DownsampleMode.LTTB,
+        aggregate_slices: int = 60,
+        aggregate_accuracy: float = 0.01,
+        alert_store: AlertStore | None = None,
+        alert_check_interval: float = 1.0,
+        alert_reload_interval: float = 0.0,
+    ):
         """
         Initialize DataHub.
 
         Args:
             history_window: How long to keep event history
+            history_capacity: Maximum number of events kept per feed
+            history_compression: Keep older history in compressed blocks
+            history_block_size: Number of events per compressed block
+            history_segment_dir: Keep history in memory-mapped segment files
+                under this directory instead of on the heap (numeric payload
+                values only); takes precedence over history_compression
+            history_segment_duration: Time span covered by each segment file
+            history_segment_records: Maximum records per segment file
+            history_memory_budget: Approximate bytes of history kept across
+                all feeds; over budget, the least recently viewed feeds lose
+                their oldest events first (None for no limit)
+            history_store: Durable store that events are also written to,
+                and that history reads fall back to
+            dispatch_queue_size: Maximum number of events waiting for delivery
+            shards: Number of event-loop threads that run the outbound queues
+                of connections registered while the hub is started (0 runs
+                them on the hub's own loop; see app.hub.shards)
+            send_timeout: Seconds a single WebSocket send may take before the
+                connection is dropped
+            queue_size: Maximum outbound messages queued per connection
+            slow_consumer_policy: What to do when a connection's queue backs up
+            high_water_mark: Queue depth at which a connection is considered
+                to be falling behind (defaults to 80% of queue_size)
+            disconnect_after: Seconds over the high-water mark before the
+                disconnect policy drops a connection
+            serializer: Wire serializer name ("auto", "pydantic", "json") or
+                function
+            raw_frames: Write pre-built frames straight to connections'
+                transports where the server allows it (see app.ws.broadcast)
+            delta_keyframe_interval: Every Nth update of a feed is sent in
+                full to delta-protocol clients
+            batch_window: Seconds over which updates are collected and sent
+                to each dashboard as one feed_batch frame, keeping only the
+                latest update per feed (0 sends every update on its own)
+            snapshot_history_points: Points of history per payload key sent
+                with the initial snapshot on connect (0 for latest values only)
+            snapshot_history_mode: How that history is downsampled, or "raw"
+                for the most recent points as recorded
+            aggregate_slices: Number of steps a rolling aggregate's window
+                slides in
+            aggregate_accuracy: Relative error of aggregate quantile estimates
+            alert_store: Store that alert state transitions are written to,
+                and that alert rules are reloaded from
+            alert_check_interval: Seconds between checks of absence rules
+            alert_reload_interval: Seconds between reloads of the alert rules
+                from alert_store, for processes whose rules are edited by
+                another process (0 to never reload)
         """
         self.history_window = history_window
+        self.history_capacity = history_capacity
+        self.history_compression = history_compression
+        self.history_block_size = history_block_size
+        self.history_segment_dir = history_segment_dir or None
+        self.history_segment_duration = history_segment_duration
+        self.history_segment_records = history_segment_records
+        self.history_memory_budget = history_memory_budget or None
+        self.history_store = history_store
+        # Relay publisher, set when this process runs feeds for worker processes
+        self.relay: RelayPublisher | None = None
+        # Called with (feed_id, True) when a feed gets its first subscribed
+        # dashboard and (feed_id, False) when it loses its last one
+        self.on_demand_change: Callable[[UUID, bool], None] | None = None
+        self.send_timeout = send_timeout
+        self.queue_size = queue_size
+        self.slow_consumer_policy = SlowConsumerPolicy(slow_consumer_policy)
+        self.high_water_mark = high_water_mark
+        self.disconnect_after = disconnect_after
+        self.encoder = FeedEventEncoder(serializer)
+        self.raw_frames = raw_frames
+        self.delta_keyframe_interval = max(1, delta_keyframe_interval)
+        self.batch_window = max(0.0, batch_window)
+        self.snapshot_history_points = max(0, snapshot_history_points)
+        self.snapshot_history_mode = (
+            None if snapshot_history_mode == "raw" else DownsampleMode(snapshot_history_mode)
+        )
+        self.aggregate_slices = max(1, aggregate_slices)
+        self.aggregate_accuracy = aggregate_accuracy
+        self.alert_store = alert_store
+        self.alert_check_interval = alert_check_interval
+        self.alert_reload_interval = alert_reload_interval
 
         # Latest event per feed
         self.latest: Dict[UUID, FeedEvent] = {}
 
-        # Recent history per feed (time-windowed)
-        self.history: Dict[UUID, Deque[FeedEvent]] = defaultdict(deque)
+        # Per-feed update sequence numbers, and the latest update's frames.
+        # The newest event in a feed's history has sequence number
+        # feed_seq[feed_id]; sequence numbers are only comparable within
+        # one epoch, which changes whenever the hub is recreated
+        self.epoch = uuid4().hex
+        self.feed_seq: Dict[UUID, int] = {}
+        self._updates: Dict[UUID, FeedUpdate] = {}
+
+        # Recent history per feed (time-windowed, columnar ring buffers)
+        self.history: Dict[UUID, AnyHistoryBuffer] = {}
+
+        # Per-feed retention overrides, taken from feed config
+        self.retention: Dict[UUID, RetentionPolicy] = {}
+
+        # Rolling aggregates per feed, updated on publish, from feed config
+        self.aggregates: Dict[UUID, List[RollingAggregate]] = {}
+
+        # Derived feeds, evaluated when one of their input feeds publishes
+        self.derived = DerivedGraph()
+
+        # Alert rules, evaluated on publish, and the task checking the
+        # absence rules
+        self.alerts = AlertEngine()
+        self._alert_task: asyncio.Task | None = None
+
+        # History memory accounting: running total, when each feed's history
+        # was last read, and events evicted to stay within the budget
+        self._history_bytes = 0
+        self.history_viewed: Dict[UUID, float] = {}
+        self.history_evicted: Dict[UUID, int] = defaultdict(int)
 
         # WebSocket connections grouped by dashboard ID
         self.connections: Dict[UUID, List[WebSocket]] = defaultdict(list)
 
+        # Outbound queue and writer per connection, keyed by id(websocket)
+        self.clients: Dict[int, ClientConnection] = {}
+
         # Dashboard -> Feed IDs mapping (which feeds does each dashboard use)
         self.dashboard_feeds: Dict[UUID, Set[UUID]] = defaultdict(set)
 
+        # Feed -> Dashboard IDs reverse index, kept in sync with dashboard_feeds
+        # so a publish only visits the dashboards that actually subscribe
+        self.feed_dashboards: Dict[UUID, Set[UUID]] = {}
+
+        # Events waiting for delivery, drained by the dispatcher task
+        self._dispatch_queue: asyncio.Queue[FeedUpdate] = asyncio.Queue(
+            maxsize=dispatch_queue_size
+        )
+        self._dispatcher_task: asyncio.Task | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+        # Shard threads while started, and the shard each sharded connection
+        # belongs to
+        self.shard_count = max(0, shards)
+        self._shards: List[HubShard] = []
+        self._client_shards: Dict[ClientConnection, HubShard] = {}
+
+        # Updates collected during the current batch window, latest per feed
+        self._pending_updates: Dict[UUID, FeedUpdate] = {}
+        self._batch_timer: asyncio.TimerHandle | None = None
+        self.batch_collapsed = 0
+
         self.logger = logging.getLogger(__name__)
 
+    async def start(self) -> None:
+        """
+        Start the dispatcher task that delivers events to WebSocket clients.
+
+        Until the hub is started, events are delivered inline by
+        publish_feed_event.
+        """
+        if self._dispatcher_task is None or self._dispatcher_task.done():
+            self._loop = asyncio.get_running_loop()
+            self._dispatcher_task = asyncio.create_task(self._dispatch_loop())
+            for client in self.clients.values():
+                client.start()
+            if self.shard_count and not self._shards:
+                self._shards = [HubShard(index) for index in range(self.shard_count)]
+                for shard in self._shards:
+                    shard.start()
+            self.logger.info(f"DataHub dispatcher started with {len(self._shards)} shards")
+        if self._alert_task is None or self._alert_task.done():
+            self._alert_task = asyncio.create_task(self._alert_loop())
+
+    async def stop(self) -> None:
+        """
+        Deliver queued events and stop the dispatcher and alert tasks.
+
+        Shard threads are stopped too, closing the connections they serve.
+        """
+        if self._alert_task is not None:
+            self._alert_task.cancel()
+            try:
+                await self._alert_task
+            except asyncio.CancelledError:
+                pass
+            self._alert_task = None
+
+        if self._dispatcher_task is None:
+            return
+
+        try:
+            await asyncio.wait_for(self._dispatch_queue.join(), timeout=self.send_timeout)
+        except asyncio.TimeoutError:
+            self.logger.warning(
+                f"Dropping {self._dispatch_queue.qsize()} undelivered events on shutdown"
+            )
+        self._flush_batches()
+
+        self._dispatcher_task.cancel()
+        try:
+            await self._dispatcher_task
+        except asyncio.CancelledError:
+            pass
+        self._dispatcher_task = None
+
+        shards, self._shards = self._shards, []
+        for shard in shards:
+            await shard.stop()
+        self.logger.info("DataHub dispatcher stopped")
+
+    async def join(self) -> None:
+        """Wait until every queued event has been delivered."""
+        await self._dispatch_queue.join()
+
+    async def _dispatch_loop(self) -> None:
+        """Deliver queued events to subscribed dashboards."""
+        while True:
+            update = await self._dispatch_queue.get()
+            try:
+                await self._broadcast_update(update)
+            except Exception as e:
+                self.logger.error(
+                    f"Failed to dispatch event for feed {update.feed_id}: {e}", exc_info=True
+                )
+            finally:
+                self._dispatch_queue.task_done()
+
+    def _history_capacity(self, feed_id: UUID) -> int:
+        """Maximum number of events kept for a feed."""
+        retention = self.retention.get(feed_id)
+        if retention is not None and retention.max_points:
+            return retention.max_points
+        return self.history_capacity
+
+    def _new_history_buffer(self, feed_id: UUID) -> AnyHistoryBuffer:
+        """
+        Create the history buffer for a feed.
+
+        Args:
+            feed_id: Feed identifier
+
+        Returns:
+            Memory-mapped, compressed or plain history buffer, depending on
+            configuration
+        """
+        capacity = self._history_capacity(feed_id)
+        if self.history_segment_dir:
+            return MmapHistoryBuffer(
+                feed_id,
+                self.history_segment_dir,
+                capacity=capacity,
+                segment_duration=self.history_segment_duration,
+                segment_capacity=self.history_segment_records,
+            )
+        if self.history_compression:
+            return CompressedHistoryBuffer(
+                feed_id, capacity=capacity, block_size=self.history_block_size
+            )
+        return HistoryBuffer(feed_id, capacity=capacity)
+
+    def _history_buffer(self, feed_id: UUID) -> AnyHistoryBuffer:
+        """
+        Get a feed's history buffer, creating it if needed.
+
+        A new buffer's starting bytes are added to the memory total: a
+        memory-mapped buffer already holds any segment files left on disk.
+
+        Args:
+            feed_id: Feed identifier
+
+        Returns:
+            The feed's history buffer
+        """
+        buffer = self.history.get(feed_id)
+        if buffer is None:
+            buffer = self._new_history_buffer(feed_id)
+            self.history[feed_id] = buffer
+            self._history_bytes += buffer.nbytes()
+        return buffer
+
+    def set_retention(self, feed_id: UUID, retention: RetentionPolicy | None) -> None:
+        """
+        Set (or clear) a feed's history retention overrides.
+
+        Existing history is carried over, trimmed to the new capacity.
+
+        Args:
+            feed_id: Feed identifier
+            retention: Retention overrides, or None to use the hub defaults
+        """
+        if retention is None:
+            self.retention.pop(feed_id, None)
+        else:
+            self.retention[feed_id] = retention
+
+        buffer = self.history.get(feed_id)
+        if buffer is None:
+            return
+
+        if isinstance(buffer, MmapHistoryBuffer):
+            # Segment files cannot be reopened while mapped; resize in place
+            before = buffer.nbytes()
+            buffer.capacity = self._history_capacity(feed_id)
+            buffer.drop_oldest(len(buffer) - buffer.capacity)
+            self._history_bytes += buffer.nbytes() - before
+            return
+
+        resized = self._new_history_buffer(feed_id)
+        if resized.capacity != buffer.capacity:
+            for event in buffer:
+                resized.append(event)
+            self._history_bytes += resized.nbytes() - buffer.nbytes()
+            self.history[feed_id] = resized
+
+    def set_aggregates(self, feed_id: UUID, specs: Sequence[AggregateSpec]) -> None:
+        """
+        Set the rolling aggregates kept for a feed.
+
+        Aggregates that were already kept carry on; new ones start from the
+        feed's in-memory history within their window.
+
+        Args:
+            feed_id: Feed identifier
+            specs: Aggregates to keep (empty to stop aggregating the feed)
+        """
+        existing = {aggregate.spec: aggregate for aggregate in self.aggregates.get(feed_id, ())}
+        aggregates = []
+        for spec in specs:
+            aggregate = existing.get(spec)
+            if aggregate is None:
+                aggregate = RollingAggregate(
+                    spec, slices=self.aggregate_slices, relative_accuracy=self.aggregate_accuracy
+                )
+                buffer = self.history.get(feed_id)
+                if buffer is not None:
+                    view = buffer.range(since=datetime.utcnow() - spec.window)
+                    aggregate.add_series(*view.series(spec.key))
+            aggregates.append(aggregate)
+
+        if aggregates:
+            self.aggregates[feed_id] = aggregates
+        else:
+            self.aggregates.pop(feed_id, None)
+
+    def get_aggregates(self, feed_id: UUID) -> List[Tuple[AggregateSpec, Dict[str, Any]]]:
+        """
+        Get the current values of a feed's rolling aggregates.
+
+        Args:
+            feed_id: Feed identifier
+
+        Returns:
+            (spec, result) pairs, see RollingAggregate.result
+        """
+        now = to_micros(datetime.utcnow())
+        return [
+            (aggregate.spec, aggregate.result(now))
+            for aggregate in self.aggregates.get(feed_id, ())
+        ]
+
+    @staticmethod
+    def _shrink_history(buffer: AnyHistoryBuffer, max_bytes: int) -> int:
+        """
+        Drop a buffer's oldest events until it fits in max_bytes.
+
+        Args:
+            buffer: History buffer
+            max_bytes: Target size in bytes
+
+        Returns:
+            Number of events dropped
+        """
+        dropped = 0
+        size = buffer.nbytes()
+        while len(buffer) and size > max_bytes:
+            per_event = size / len(buffer)
+            dropped += buffer.drop_oldest(max(1, math.ceil((size - max_bytes) / per_event)))
+            size = buffer.nbytes()
+        return dropped
+
+    def _apply_retention(self, feed_id: UUID, buffer: AnyHistoryBuffer) -> None:
+        """
+        Trim a feed's history to its retention window and byte limit.
+
+        Args:
+            feed_id: Feed identifier
+            buffer: The feed's history buffer
+        """
+        retention = self.retention.get(feed_id)
+        window = self.history_window
+        if retention is not None and retention.window:
+            window = retention.window
+        buffer.trim_before(datetime.utcnow() - window)
+
+        if retention is not None and retention.max_bytes:
+            self._shrink_history(buffer, retention.max_bytes)
+
+    def _enforce_memory_budget(self) -> None:
+        """
+        Evict history, least recently viewed feeds first, until under budget.
+
+        Uses the running byte total kept up to date by every append, trim and
+        eviction, so checking the budget does not walk every buffer.
+        """
+        budget = self.history_memory_budget
+        if budget is None or self._history_bytes <= budget:
+            return
+
+        # Free a little extra so eviction does not run on every publish
+        target = budget * 9 // 10
+        evicted = 0
+
+        # Feeds shown on a connected dashboard count as being viewed now
+        order = sorted(
+            self.history,
+            key=lambda f: (f in self.feed_dashboards, self.history_viewed.get(f, 0.0)),
+        )
+        for feed_id in order:
+            if self._history_bytes <= target:
+                break
+            buffer = self.history[feed_id]
+            before = buffer.nbytes()
+            dropped = self._shrink_history(buffer, max(0, before - (self._history_bytes - target)))
+            self._history_bytes += buffer.nbytes() - before
+            self.history_evicted[feed_id] += dropped
+            evicted += dropped
+
+        self.logger.info(
+            f"History over memory budget of {budget} bytes, "
+            f"evicted {evicted} events"
+        )
+
+    def _mark_viewed(self, feed_id: UUID) -> None:
+        """Record that a feed's history was just read."""
+        self.history_viewed[feed_id] = time.time()
+
     async def publish_feed_event(self, feed_id: UUID, payload: Dict[str, Any]) -> None:
         """
         Publish a feed event.
@@ -58,72 +525,335 @@ class DataHub:
             feed_id: Feed identifier
             payload: Data payload from the feed
         """
-        # Create event
-        event = FeedEvent(feed_id=feed_id, ts=datetime.utcnow(), payload=payload)
+        await self.publish_event(FeedEvent(feed_id=feed_id, ts=datetime.utcnow(), payload=payload))
+
+    async def publish_event(self, event: FeedEvent) -> None:
+        """
+        Publish a timestamped feed event, e.g. one relayed from the feed runner.
+
+        The event is published first, then the derived feeds computed from
+        its feed, each once and after all of its inputs.
+
+        Args:
+            event: FeedEvent to store and broadcast
+        """
+        await self._publish(event)
+
+        downstream = self.derived.downstream(event.feed_id)
+        if not downstream:
+            return
+        # Feeds with a new event; a derived feed none of whose inputs
+        # published this round has nothing new to compute
+        published = {event.feed_id}
+        for derived in downstream:
+            if published.isdisjoint(derived.inputs.values()):
+                continue
+            payload = derived.evaluate(self.latest)
+            if payload:
+                await self._publish(
+                    FeedEvent(feed_id=derived.feed_id, ts=event.ts, payload=payload)
+                )
+                published.add(derived.feed_id)
+
+    async def _publish(self, event: FeedEvent) -> None:
+        """
+        Store and broadcast one event, without evaluating derived feeds.
+
+        Args:
+            event: FeedEvent to publish
+        """
+        feed_id = event.feed_id
+
+        # Number the update; delta-protocol clients get changes relative to
+        # the previous one, with a full keyframe every delta_keyframe_interval
+        previous = self.latest.get(feed_id)
+        seq = self.feed_seq.get(feed_id, 0) + 1
+        self.feed_seq[feed_id] = seq
+        update = FeedUpdate(
+            self.encoder,
+            event,
+            seq,
+            previous=previous.payload if previous is not None else None,
+            keyframe=seq % self.delta_keyframe_interval == 0,
+        )
+        self._updates[feed_id] = update
 
         # Update latest
         self.latest[feed_id] = event
 
         # Add to history
-        history_deque = self.history[feed_id]
-        history_deque.append(event)
+        buffer = self._history_buffer(feed_id)
+        before = buffer.nbytes()
+        buffer.append(event)
 
         # Trim old history
-        cutoff = datetime.utcnow() - self.history_window
-        while history_deque and history_deque[0].ts < cutoff:
-            history_deque.popleft()
+        self._apply_retention(feed_id, buffer)
+        self._history_bytes += buffer.nbytes() - before
+        if self.history_memory_budget and self._history_bytes > self.history_memory_budget:
+            self._enforce_memory_budget()
+
+        # Update rolling aggregates
+        aggregates = self.aggregates.get(feed_id)
+        if aggregates:
+            ts = to_micros(event.ts)
+            for aggregate in aggregates:
+                aggregate.add_event(ts, event.payload)
+
+        # Persisted in the background; never waits on disk
+        if self.history_store is not None:
+            self.history_store.add(event)
+
+        # Only the rules whose threshold this event crossed are checked
+        if self.alerts.watches(feed_id):
+            transitions = self.alerts.evaluate(event)
+            if transitions:
+                await self._emit_alerts(transitions)
 
-        # Broadcast to relevant dashboards
-        await self._broadcast_event(event)
+        # Forwarded to worker processes when running as the feed runner
+        if self.relay is not None:
+            self.relay.publish(event)
 
-    async def _broadcast_event(self, event: FeedEvent) -> None:
+        # Hand off to the dispatcher so delivery never blocks the feed
+        if self._dispatcher_task is None:
+            await self._broadcast_update(update)
+            return
+
+        try:
+            self._dispatch_queue.put_nowait(update)
+        except asyncio.QueueFull:
+            self.logger.warning(f"Dispatch queue full, dropping event for feed {feed_id}")
+
+    async def set_alert_rules(self, rules: Sequence[AlertRule]) -> None:
         """
-        Broadcast event to all dashboards that use this feed.
+        Replace the alert rules, keeping the state of unchanged ones.
 
         Args:
-            event: FeedEvent to broadcast
+            rules: Enabled alert rules
         """
-        # Find all dashboards that use this feed
-        relevant_dashboards = [
-            dashboard_id
-            for dashboard_id, feed_ids in self.dashboard_feeds.items()
-            if event.feed_id in feed_ids
-        ]
+        await self._emit_alerts(self.alerts.set_rules(rules))
+
+    async def apply_alert_rule(self, rule: AlertRule) -> None:
+        """
+        Add or update an alert rule (disabled rules are removed).
 
-        # Create message
-        message = FeedEventMessage.from_feed_event(event)
-        message_json = message.model_dump_json()
+        Args:
+            rule: Alert rule
+        """
+        await self._emit_alerts(self.alerts.add(rule))
 
-        # Send to all connections of relevant dashboards
-        for dashboard_id in relevant_dashboards:
-            await self._send_to_dashboard(dashboard_id, message_json)
+    async def remove_alert_rule(self, rule_id: UUID) -> None:
+        """
+        Remove an alert rule, resolving it if it was firing.
 
-    async def _send_to_dashboard(self, dashboard_id: UUID, message: str) -> None:
+        Args:
+            rule_id: Alert rule identifier
         """
-        Send message to all connections of a dashboard.
+        await self._emit_alerts(self.alerts.remove(rule_id))
+
+    async def _emit_alerts(self, transitions: List[AlertTransition]) -> None:
+        """
+        Persist alert state transitions and send them to subscribed dashboards.
 
         Args:
-            dashboard_id: Dashboard identifier
-            message: JSON message to send
+            transitions: Transitions to emit
         """
-        connections = self.connections.get(dashboard_id, [])
-        disconnected = []
+        for transition in transitions:
+            self.logger.info(
+                f"Alert {transition.rule.name!r} on feed {transition.feed_id} "
+                f"is {transition.state.value}"
+            )
+            if self.alert_store is not None:
+                self.alert_store.add(transition)
 
-        for websocket in connections:
+            dashboards = self.feed_dashboards.get(transition.feed_id)
+            if not dashboards:
+                continue
+            # Not conflated with the feed's updates
+            frame = Frame(self.encoder.encode_message(transition.to_message()))
+            if self._dispatcher_task is not None:
+                self._enqueue_to_dashboards(dashboards, frame)
+            else:
+                for dashboard_id in tuple(dashboards):
+                    await self._send_to_dashboard(dashboard_id, frame)
+
+    async def _alert_loop(self) -> None:
+        """Periodically fire absence rules and reload the alert rules."""
+        reloaded = time.monotonic()
+        while True:
+            await asyncio.sleep(self.alert_check_interval)
             try:
-                await websocket.send_text(message)
+                if (
+                    self.alert_store is not None
+                    and self.alert_reload_interval
+                    and time.monotonic() - reloaded >= self.alert_reload_interval
+                ):
+                    reloaded = time.monotonic()
+                    await self.set_alert_rules(await self.alert_store.load_rules())
+                await self._emit_alerts(self.alerts.check_absence())
             except Exception as e:
-                self.logger.warning(
-                    f"Failed to send to connection for dashboard {dashboard_id}: {e}"
-                )
-                disconnected.append(websocket)
+                self.logger.error(f"Alert check failed: {e}")
+
+    async def _broadcast_update(self, update: FeedUpdate) -> None:
+        """
+        Broadcast a feed update to all dashboards that use its feed.
+
+        Args:
+            update: FeedUpdate to broadcast
+        """
+        # Look up subscribed dashboards via the reverse index
+        relevant_dashboards = self.feed_dashboards.get(update.feed_id)
+        if not relevant_dashboards:
+            return
+
+        # The update encodes each wire form once, shared by every recipient
+        if self._dispatcher_task is not None and self.batch_window:
+            self._collect_update(update)
+            return
+
+        if self._dispatcher_task is not None:
+            # Queuing never blocks, so fan out in one pass rather than a
+            # task per dashboard; the writer tasks do the actual sends
+            self._enqueue_to_dashboards(relevant_dashboards, update, update.feed_id)
+            return
+
+        # Fan out to all relevant dashboards concurrently (copy, since a send
+        # failure may unsubscribe a dashboard while we iterate)
+        await asyncio.gather(
+            *(
+                self._send_to_dashboard(dashboard_id, update, update.feed_id)
+                for dashboard_id in list(relevant_dashboards)
+            )
+        )
+
+    def _collect_update(self, update: FeedUpdate) -> None:
+        """
+        Hold an update until the end of the current batch window.
+
+        Args:
+            update: FeedUpdate to send with the next batch
+        """
+        older = self._pending_updates.get(update.feed_id)
+        if older is not None:
+            update = update.collapse(older)
+            self.batch_collapsed += 1
+        self._pending_updates[update.feed_id] = update
+
+        if self._batch_timer is None:
+            self._batch_timer = asyncio.get_running_loop().call_later(
+                self.batch_window, self._flush_batches
+            )
+
+    def _flush_batches(self) -> None:
+        """Send the updates collected in the batch window, one frame per dashboard."""
+        if self._batch_timer is not None:
+            self._batch_timer.cancel()
+            self._batch_timer = None
+        if not self._pending_updates:
+            return
+
+        pending, self._pending_updates = self._pending_updates, {}
+        dashboards: Dict[UUID, List[FeedUpdate]] = defaultdict(list)
+        for feed_id, update in pending.items():
+            for dashboard_id in self.feed_dashboards.get(feed_id, ()):
+                dashboards[dashboard_id].append(update)
+
+        for dashboard_id, updates in dashboards.items():
+            if len(updates) == 1:
+                self._enqueue_to_dashboards({dashboard_id}, updates[0], updates[0].feed_id)
+            else:
+                self._enqueue_to_dashboards({dashboard_id}, FeedBatch(updates))
+
+    def _enqueue_to_dashboards(
+        self,
+        dashboard_ids: Set[UUID],
+        message: OutboundMessage,
+        feed_id: UUID | None = None,
+    ) -> None:
+        """
+        Queue a message on every connection of several dashboards.
+
+        Args:
+            dashboard_ids: Dashboard identifiers
+            message: JSON message, shared Frame, FeedUpdate or FeedBatch to send
+            feed_id: Feed the message belongs to (used for conflation)
+        """
+        clients = self.clients
+        client_shards = self._client_shards
+        # Sharded connections are handed over once per shard
+        sharded: Dict[HubShard, List[ClientConnection]] = defaultdict(list)
+        # Copies, since a client dropped by its slow-consumer policy
+        # unregisters itself while we iterate
+        for dashboard_id in tuple(dashboard_ids):
+            for websocket in tuple(self.connections.get(dashboard_id, ())):
+                client = clients.get(id(websocket))
+                if client is None:
+                    continue
+                shard = client_shards.get(client) if client_shards else None
+                if shard is None:
+                    client.enqueue(message, feed_id)
+                else:
+                    sharded[shard].append(client)
+        for shard, group in sharded.items():
+            shard.enqueue(group, message, feed_id)
+
+    def _on_client(self, client: ClientConnection, callback: Callable[..., Any], *args: Any) -> None:
+        """
+        Call a connection method on the loop the connection's queue runs on.
+
+        Args:
+            client: Client connection
+            callback: Bound method of the connection
+            *args: Arguments to call it with
+        """
+        shard = self._client_shards.get(client)
+        if shard is None:
+            callback(*args)
+        else:
+            shard.call(callback, *args)
+
+    async def _send_to_dashboard(
+        self,
+        dashboard_id: UUID,
+        message: OutboundMessage,
+        feed_id: UUID | None = None,
+    ) -> None:
+        """
+        Send message to all connections of a dashboard.
+
+        Args:
+            dashboard_id: Dashboard identifier
+            message: JSON message, shared Frame, FeedUpdate or FeedBatch to send
+            feed_id: Feed the message belongs to (used for conflation)
+        """
+        if self._dispatcher_task is not None:
+            self._enqueue_to_dashboards({dashboard_id}, message, feed_id)
+            return
+
+        clients = [
+            self.clients[id(websocket)]
+            for websocket in self.connections.get(dashboard_id, [])
+            if id(websocket) in self.clients
+        ]
+
+        # Not started: send inline, concurrently so one slow client does not
+        # hold up the others
+        results = await asyncio.gather(*(client.send_now(message) for client in clients))
 
         # Remove disconnected websockets
-        for ws in disconnected:
-            connections.remove(ws)
+        for client, ok in zip(clients, results, strict=True):
+            if not ok:
+                client.close()
 
     async def register_connection(
-        self, dashboard_id: UUID, websocket: WebSocket, feed_ids: Set[UUID]
+        self,
+        dashboard_id: UUID,
+        websocket: WebSocket,
+        feed_ids: Set[UUID],
+        delta: bool = False,
+        max_rate: float | None = None,
+        projection: Dict[UUID, FrozenSet[str]] | None = None,
+        epoch: str | None = None,
+        resume: Dict[UUID, int] | None = None,
     ) -> None:
         """
         Register a WebSocket connection for a dashboard.
@@ -132,36 +862,269 @@ class DataHub:
             dashboard_id: Dashboard identifier
             websocket: WebSocket connection
             feed_ids: Set of feed IDs used by this dashboard
+            delta: Send feed updates using the delta protocol
+            max_rate: Maximum feed update releases per second for this
+                connection; faster feeds are conflated (None for no limit)
+            projection: Payload keys to send per feed; other feeds are
+                sent in full
+            epoch: Hub epoch the client's sequence numbers belong to
+            resume: Last sequence number the client received per feed, to
+                replay only the updates it missed since
         """
-        # Add connection
+        # Add connection, to the least loaded shard if sharded
         self.connections[dashboard_id].append(websocket)
+        shard = None
+        if self._shards and self._dispatcher_task is not None:
+            shard = min(self._shards, key=lambda s: len(s.clients))
+        client = ClientConnection(
+            dashboard_id,
+            websocket,
+            on_close=self._on_client_closed if shard is None else self._on_sharded_client_closed,
+            max_queue=self.queue_size,
+            policy=self.slow_consumer_policy,
+            high_water_mark=self.high_water_mark,
+            disconnect_after=self.disconnect_after,
+            send_timeout=self.send_timeout,
+            delta=delta,
+            max_rate=max_rate,
+            projection=projection,
+            raw_frames=self.raw_frames,
+            io_loop=self._loop if shard is not None else None,
+        )
+        self.clients[id(websocket)] = client
+        if shard is not None:
+            shard.clients.add(client)
+            self._client_shards[client] = shard
+            shard.call(client.start)
+        elif self._dispatcher_task is not None:
+            client.start()
 
-        # Update dashboard -> feeds mapping
-        self.dashboard_feeds[dashboard_id].update(feed_ids)
+        # Update dashboard -> feeds mapping and the feed -> dashboards index
+        subscribed = self.dashboard_feeds[dashboard_id]
+        for feed_id in feed_ids:
+            if feed_id not in subscribed:
+                subscribed.add(feed_id)
+                dashboards = self.feed_dashboards.setdefault(feed_id, set())
+                dashboards.add(dashboard_id)
+                if len(dashboards) == 1:
+                    self._demand_changed(feed_id, True)
 
         self.logger.info(
             f"Registered connection for dashboard {dashboard_id} with {len(feed_ids)} feeds"
         )
 
         # Send initial state for all feeds
-        await self._send_initial_state(websocket, feed_ids)
+        if resume is not None and epoch != self.epoch:
+            # Sequence numbers from before a restart mean nothing now
+            resume = {}
+        await self._send_initial_state(client, feed_ids, resume=resume)
 
-    async def _send_initial_state(self, websocket: WebSocket, feed_ids: Set[UUID]) -> None:
+        # Then the alerts already firing on them
+        for transition in self.alerts.firing(feed_ids):
+            frame = Frame(self.encoder.encode_message(transition.to_message()))
+            if self._dispatcher_task is not None:
+                self._on_client(client, client.enqueue, frame)
+            elif not await client.send_now(frame):
+                break
+
+    async def _send_initial_state(
+        self,
+        client: ClientConnection,
+        feed_ids: Set[UUID],
+        backfill: bool = True,
+        resume: Dict[UUID, int] | None = None,
+    ) -> None:
         """
-        Send initial state (latest events) to a newly connected client.
+        Send a client the state of its feeds as a single snapshot frame.
+
+        Feeds the client is resuming get the updates it missed instead of
+        their latest state; those that cannot be replayed are listed in the
+        snapshot's resync_required field and sent as usual.
 
         Args:
-            websocket: WebSocket connection
+            client: Client connection
             feed_ids: Feed IDs to send state for
+            backfill: Include recent history of each feed
+            resume: Last sequence number the client received per feed
+                (None if it is not resuming)
         """
+        updates = []
+        history: Dict[str, Dict[str, Dict[str, list]]] = {}
+        resync_required = []
         for feed_id in feed_ids:
-            if feed_id in self.latest:
-                event = self.latest[feed_id]
-                message = FeedEventMessage.from_feed_event(event)
-                try:
-                    await websocket.send_text(message.model_dump_json())
-                except Exception as e:
-                    self.logger.error(f"Failed to send initial state for feed {feed_id}: {e}")
+            self._mark_viewed(feed_id)
+            if resume is not None:
+                replayed = self._replay(feed_id, resume.get(feed_id))
+                if replayed is not None:
+                    updates.extend(replayed)
+                    continue
+                resync_required.append(str(feed_id))
+            update = self._latest_update(feed_id)
+            if update is not None:
+                updates.append(update)
+            if backfill and self.snapshot_history_points:
+                series = self._backfill(feed_id, client.projection.get(feed_id))
+                if series:
+                    history[str(feed_id)] = {
+                        key: {"ts": ts, "values": values} for key, (ts, values) in series.items()
+                    }
+        if not updates and not history and not resync_required:
+            return
+
+        fields = {"epoch": self.epoch, "history": history, "resync_required": resync_required}
+        snapshot = FeedSnapshot(updates, self.encoder.encode_message(fields))
+        if self._dispatcher_task is not None:
+            self._on_client(client, client.enqueue, snapshot)
+        elif not await client.send_now(snapshot):
+            self.logger.error(f"Failed to send initial state to dashboard {client.dashboard_id}")
+
+    def _backfill(
+        self, feed_id: UUID, keys: FrozenSet[str] | None
+    ) -> Dict[str, Tuple[List[datetime], List[float]]]:
+        """
+        Get the history sent with a feed's initial snapshot.
+
+        Args:
+            feed_id: Feed identifier
+            keys: Payload keys the client needs (None for every numeric key)
+
+        Returns:
+            Dict mapping payload key to (timestamps, values)
+        """
+        points = self.snapshot_history_points
+        if self.snapshot_history_mode is not None:
+            return self.get_downsampled_history(
+                feed_id,
+                points,
+                mode=self.snapshot_history_mode,
+                keys=sorted(keys) if keys is not None else None,
+            )
+
+        buffer = self.history.get(feed_id)
+        if buffer is None:
+            return {}
+        view = buffer.range(limit=points)
+        result: Dict[str, Tuple[List[datetime], List[float]]] = {}
+        for key in keys if keys is not None else view.keys():
+            xs, ys = view.series(key)
+            if xs:
+                result[key] = ([from_micros(x) for x in xs], ys)
+        return result
+
+    def _replay(self, feed_id: UUID, last_seq: int | None) -> List[FeedUpdate] | None:
+        """
+        Get the updates of a feed published after a given one, from history.
+
+        Args:
+            feed_id: Feed identifier
+            last_seq: Sequence number of the last update the client received
+                (None if it never received one)
+
+        Returns:
+            Missed updates, oldest first, or None if they are no longer all
+            held in history
+        """
+        if last_seq is None:
+            return None
+        seq = self.feed_seq.get(feed_id, 0)
+        missed = seq - last_seq
+        if missed == 0:
+            return []
+        buffer = self.history.get(feed_id)
+        # Memory-mapped history keeps numeric values only, so it cannot
+        # reproduce the original payloads
+        if missed < 0 or buffer is None or isinstance(buffer, MmapHistoryBuffer):
+            return None
+        if missed > len(buffer):
+            return None
+
+        events = list(buffer.range(limit=missed))
+        latest = self._latest_update(feed_id)
+        updates = []
+        previous = None
+        for index, event in enumerate(events):
+            update_seq = seq - missed + index + 1
+            if latest is not None and update_seq == latest.seq:
+                update = latest
+            else:
+                # The first replayed update is a keyframe, the rest are
+                # deltas against the one before
+                update = FeedUpdate(self.encoder, event, update_seq, previous=previous)
+            updates.append(update)
+            previous = event.payload
+        return updates
+
+    async def resume(
+        self, websocket: WebSocket, epoch: str | None, seqs: Dict[UUID, int]
+    ) -> None:
+        """
+        Replay the updates a connection missed, e.g. after the client
+        reconnected without passing its sequence numbers up front.
+
+        Args:
+            websocket: WebSocket connection
+            epoch: Hub epoch the client's sequence numbers belong to
+            seqs: Last sequence number the client received per feed
+        """
+        client = self.clients.get(id(websocket))
+        if client is None:
+            return
+
+        feed_ids = self.dashboard_feeds.get(client.dashboard_id, set()) & set(seqs)
+        self._on_client(client, client.resync, feed_ids)
+        await self._send_initial_state(
+            client, feed_ids, backfill=False, resume=seqs if epoch == self.epoch else {}
+        )
+
+    def _latest_update(self, feed_id: UUID) -> FeedUpdate | None:
+        """
+        Get the update for a feed's latest event.
+
+        Args:
+            feed_id: Feed identifier
+
+        Returns:
+            FeedUpdate, or None if the feed has no events
+        """
+        latest = self.latest.get(feed_id)
+        if latest is None:
+            return None
+        update = self._updates.get(feed_id)
+        if update is None or update.event is not latest:
+            # Latest event restored without being published here
+            update = FeedUpdate(self.encoder, latest, self.feed_seq.get(feed_id, 0))
+            self._updates[feed_id] = update
+        return update
+
+    async def resync(self, websocket: WebSocket, feed_ids: Set[UUID] | None = None) -> None:
+        """
+        Resend full feed state to a connection, e.g. when a delta-protocol
+        client lost track of a feed.
+
+        Args:
+            websocket: WebSocket connection
+            feed_ids: Feeds to resend (all of the dashboard's feeds if None)
+        """
+        client = self.clients.get(id(websocket))
+        if client is None:
+            return
+
+        subscribed = self.dashboard_feeds.get(client.dashboard_id, set())
+        feed_ids = subscribed if feed_ids is None else feed_ids & subscribed
+        self._on_client(client, client.resync, feed_ids)
+        await self._send_initial_state(client, feed_ids, backfill=False)
+
+    def set_max_rate(self, websocket: WebSocket, max_rate: float | None) -> None:
+        """
+        Change a connection's update rate limit.
+
+        Args:
+            websocket: WebSocket connection
+            max_rate: Maximum feed update releases per second (None for no limit)
+        """
+        client = self.clients.get(id(websocket))
+        if client is not None:
+            self._on_client(client, client.set_max_rate, max_rate)
 
     async def unregister_connection(self, dashboard_id: UUID, websocket: WebSocket) -> None:
         """
@@ -171,6 +1134,10 @@ class DataHub:
             dashboard_id: Dashboard identifier
             websocket: WebSocket connection to remove
         """
+        client = self.clients.pop(id(websocket), None)
+        if client is not None:
+            self._on_client(client, client.close)
+
         connections = self.connections.get(dashboard_id, [])
         if websocket in connections:
             connections.remove(websocket)
@@ -178,10 +1145,162 @@ class DataHub:
 
         # Clean up empty connection lists
         if not connections and dashboard_id in self.connections:
-            del self.connections[dashboard_id]
-            # Also remove feed mapping if no connections
-            if dashboard_id in self.dashboard_feeds:
-                del self.dashboard_feeds[dashboard_id]
+            self._remove_dashboard(dashboard_id)
+
+    def _on_client_closed(self, client: ClientConnection) -> None:
+        """
+        Forget a connection whose writer failed or was dropped.
+
+        Args:
+            client: Client connection that closed
+        """
+        shard = self._client_shards.pop(client, None)
+        if shard is not None:
+            shard.clients.discard(client)
+
+        if self.clients.get(id(client.websocket)) is client:
+            del self.clients[id(client.websocket)]
+
+        connections = self.connections.get(client.dashboard_id)
+        if connections is None:
+            return
+
+        if client.websocket in connections:
+            connections.remove(client.websocket)
+        if not connections:
+            self._remove_dashboard(client.dashboard_id)
+
+    def _on_sharded_client_closed(self, client: ClientConnection) -> None:
+        """
+        Forget a sharded connection that closed; called on its shard's thread.
+
+        Args:
+            client: Client connection that closed
+        """
+        if self._loop is None:
+            return
+        try:
+            self._loop.call_soon_threadsafe(self._on_client_closed, client)
+        except RuntimeError:
+            # The hub's loop has shut down
+            pass
+
+    def _remove_dashboard(self, dashboard_id: UUID) -> None:
+        """
+        Drop a dashboard with no remaining connections from all mappings.
+
+        Args:
+            dashboard_id: Dashboard identifier
+        """
+        self.connections.pop(dashboard_id, None)
+
+        # Also remove feed mapping and its reverse index entries
+        for feed_id in self.dashboard_feeds.pop(dashboard_id, ()):
+            dashboards = self.feed_dashboards.get(feed_id)
+            if dashboards is None:
+                continue
+            dashboards.discard(dashboard_id)
+            if not dashboards:
+                del self.feed_dashboards[feed_id]
+                self._demand_changed(feed_id, False)
+
+    def _demand_changed(self, feed_id: UUID, wanted: bool) -> None:
+        """
+        Notify the demand listener that a feed gained or lost all subscribers.
+
+        Args:
+            feed_id: Feed identifier
+            wanted: Whether any dashboard now subscribes to the feed
+        """
+        if self.on_demand_change is None:
+            return
+        try:
+            self.on_demand_change(feed_id, wanted)
+        except Exception as e:
+            self.logger.error(f"Demand listener failed for feed {feed_id}: {e}", exc_info=True)
+
+        # A derived feed's inputs are wanted while it is
+        for input_id in self.derived.inputs(feed_id):
+            if wanted or not self.has_subscribers(input_id):
+                self._demand_changed(input_id, wanted)
+
+    def has_subscribers(self, feed_id: UUID) -> bool:
+        """
+        Check whether any connected dashboard subscribes to a feed, or to a
+        derived feed computed from it.
+
+        Args:
+            feed_id: Feed identifier
+
+        Returns:
+            True if the feed has subscribers
+        """
+        if feed_id in self.feed_dashboards:
+            return True
+        return any(
+            self.has_subscribers(derived.feed_id) for derived in self.derived.dependents(feed_id)
+        )
+
+    def get_connection_stats(self) -> List[Dict[str, Any]]:
+        """
+        Get outbound queue statistics for every connection.
+
+        Returns:
+            List of per-connection stats dicts
+        """
+        stats = []
+        for client in self.clients.values():
+            entry = client.stats()
+            shard = self._client_shards.get(client)
+            entry["shard"] = shard.index if shard is not None else None
+            stats.append(entry)
+        return stats
+
+    def get_history_stats(self) -> List[Dict[str, Any]]:
+        """
+        Get memory usage of each feed's history.
+
+        Returns:
+            List of dicts with event count, bytes held, bytes per event,
+            retention limits and budget evictions
+        """
+        stats = []
+        for feed_id, buffer in self.history.items():
+            events = len(buffer)
+            nbytes = buffer.nbytes()
+            retention = self.retention.get(feed_id)
+            window = retention.window if retention is not None and retention.window else None
+            stats.append(
+                {
+                    "feed_id": feed_id,
+                    "compressed": isinstance(buffer, CompressedHistoryBuffer),
+                    "events": events,
+                    "bytes": nbytes,
+                    "bytes_per_point": nbytes / events if events else 0.0,
+                    "window_minutes": (window or self.history_window).total_seconds() / 60,
+                    "max_points": buffer.capacity,
+                    "max_bytes": retention.max_bytes if retention is not None else None,
+                    "last_viewed": self.history_viewed.get(feed_id),
+                    "evicted": self.history_evicted.get(feed_id, 0),
+                }
+            )
+        return stats
+
+    def get_history_accounting(self) -> Dict[str, Any]:
+        """
+        Get process-wide history memory accounting.
+
+        Returns:
+            Dict with the memory budget, bytes used, total evictions,
+            durable store counters and per-feed statistics
+        """
+        return {
+            "budget_bytes": self.history_memory_budget,
+            "used_bytes": self._history_bytes,
+            "evicted": sum(self.history_evicted.values()),
+            "store": self.history_store.stats() if self.history_store is not None else None,
+            "feeds": self.get_history_stats(),
+        }
 
     def get_latest(self, feed_id: UUID) -> FeedEvent | None:
         """
@@ -196,32 +1315,233 @@ class DataHub:
         return self.latest.get(feed_id)
 
     def get_history(
-        self, feed_id: UUID, since: datetime | None = None, limit: int | None = None
+        self,
+        feed_id: UUID,
+        since: datetime | None = None,
+        limit: int | None = None,
+        until: datetime | None = None,
     ) -> List[FeedEvent]:
         """
         Get historical events for a feed.
 
+        The range is located by bisection, so the cost is O(log n) plus the
+        events actually returned.
+
         Args:
             feed_id: Feed identifier
             since: Only return events after this timestamp
             limit: Maximum number of events to return
+            until: Only return events at or before this timestamp
 
         Returns:
-            List of FeedEvents
+            List of FeedEvents, oldest first
         """
-        history_deque = self.history.get(feed_id, deque())
+        self._mark_viewed(feed_id)
+        buffer = self.history.get(feed_id)
+        if buffer is None:
+            return []
 
-        # Filter by timestamp if provided
-        if since:
-            events = [e for e in history_deque if e.ts > since]
-        else:
-            events = list(history_deque)
+        return list(buffer.range(since=since, until=until, limit=limit))
+
+    def get_downsampled_history(
+        self,
+        feed_id: UUID,
+        max_points: int,
+        mode: DownsampleMode | str = DownsampleMode.LTTB,
+        since: datetime | None = None,
+        until: datetime | None = None,
+        keys: List[str] | None = None,
+    ) -> Dict[str, Tuple[List[datetime], List[float]]]:
+        """
+        Get history reduced to at most max_points per numeric payload key.
+
+        Values are read straight from the history columns, so no FeedEvents
+        are built for the raw window.
+
+        Args:
+            feed_id: Feed identifier
+            max_points: Maximum number of points per series
+            mode: Downsampling mode
+            since: Only include events after this timestamp
+            until: Only include events at or before this timestamp
+            keys: Payload keys to include (defaults to every numeric key)
+
+        Returns:
+            Dict mapping payload key to (timestamps, values)
+        """
+        self._mark_viewed(feed_id)
+        buffer = self.history.get(feed_id)
+        if buffer is None:
+            return {}
+
+        view = buffer.range(since=since, until=until)
+        result: Dict[str, Tuple[List[datetime], List[float]]] = {}
+        for key in keys if keys is not None else view.keys():
+            xs, ys = view.series(key)
+            if not xs:
+                continue
+            xs, ys = downsample(xs, ys, max_points, mode)
+            result[key] = ([from_micros(x) for x in xs], ys)
+        return result
+
+    def restore_history(
+        self,
+        feed_id: UUID,
+        events: Sequence[FeedEvent],
+        latest: FeedEvent | None = None,
+    ) -> int:
+        """
+        Add previously recorded events to a feed's history, e.g. after a restart.
+
+        Events at or before the newest one already held are skipped, so
+        restoring from more than one source does not duplicate history.
+
+        Args:
+            feed_id: Feed identifier
+            events: Events to add, oldest first
+            latest: Latest event to restore (defaults to the last event)
+
+        Returns:
+            Number of events added
+        """
+        buffer = self._history_buffer(feed_id)
+        if len(buffer):
+            newest = buffer.timestamp_at(len(buffer) - 1)
+            events = [event for event in events if to_micros(event.ts) > newest]
+
+        before = buffer.nbytes()
+        for event in events:
+            buffer.append(event)
+        self._apply_retention(feed_id, buffer)
+        self._history_bytes += buffer.nbytes() - before
+        if self.history_memory_budget and self._history_bytes > self.history_memory_budget:
+            self._enforce_memory_budget()
+
+        # Restored events are numbered like published ones
+        if events:
+            self.feed_seq[feed_id] = self.feed_seq.get(feed_id, 0) + len(events)
+
+        latest = latest or (events[-1] if events else None)
+        if latest is not None:
+            self.latest.setdefault(feed_id, latest)
+        return len(events)
+
+    async def load_history_from_store(self) -> int:
+        """
+        Fill in-memory history from the durable store, e.g. after a restart.
+
+        Loads up to history_capacity events per feed from the history window
+        and restores each feed's latest event.
+
+        Returns:
+            Number of events loaded
+        """
+        if self.history_store is None:
+            return 0
+
+        since = datetime.utcnow() - self.history_window
+        recent = await self.history_store.load_recent(since, self.history_capacity)
+
+        loaded = 0
+        for feed_id, events in recent.items():
+            loaded += self.restore_history(feed_id, events)
+
+        self.logger.info(f"Loaded {loaded} history events for {len(recent)} feeds from store")
+        return loaded
+
+    def _memory_start(self, feed_id: UUID) -> datetime | None:
+        """Timestamp of the oldest event held in memory for a feed."""
+        buffer = self.history.get(feed_id)
+        if buffer is None or not len(buffer):
+            return None
+        return from_micros(buffer.timestamp_at(0))
+
+    async def query_history(
+        self,
+        feed_id: UUID,
+        since: datetime | None = None,
+        until: datetime | None = None,
+        limit: int | None = None,
+    ) -> List[FeedEvent]:
+        """
+        Get historical events, from memory first and the durable store for
+        anything older than the in-memory history.
+
+        Args:
+            feed_id: Feed identifier
+            since: Only return events after this timestamp
+            until: Only return events at or before this timestamp
+            limit: Maximum number of (most recent) events to return
+
+        Returns:
+            List of FeedEvents, oldest first
+        """
+        # Store timestamps are naive UTC
+        since = from_micros(to_micros(since)) if since is not None else None
+        until = from_micros(to_micros(until)) if until is not None else None
+
+        memory = self.get_history(feed_id, since=since, until=until, limit=limit)
+        if self.history_store is None or (limit and len(memory) >= limit):
+            return memory
+
+        before = self._memory_start(feed_id)
+        if before is not None and since is not None and since >= before:
+            return memory
+        if until is not None:
+            after_until = until + timedelta(microseconds=1)
+            before = after_until if before is None else min(before, after_until)
+
+        older = await self.history_store.query(
+            feed_id, since=since, before=before, limit=limit - len(memory) if limit else None
+        )
+        return older + memory
+
+    async def query_downsampled_history(
+        self,
+        feed_id: UUID,
+        max_points: int,
+        mode: DownsampleMode | str = DownsampleMode.LTTB,
+        since: datetime | None = None,
+        until: datetime | None = None,
+        keys: List[str] | None = None,
+    ) -> Dict[str, Tuple[List[datetime], List[float]]]:
+        """
+        Get downsampled history, falling back to the durable store when the
+        range starts before the in-memory history.
+
+        Args:
+            feed_id: Feed identifier
+            max_points: Maximum number of points per series
+            mode: Downsampling mode
+            since: Only include events after this timestamp
+            until: Only include events at or before this timestamp
+            keys: Payload keys to include (defaults to every numeric key)
+
+        Returns:
+            Dict mapping payload key to (timestamps, values)
+        """
+        memory_start = self._memory_start(feed_id)
+        if self.history_store is None or (
+            memory_start is not None and since is not None and since >= memory_start
+        ):
+            return self.get_downsampled_history(
+                feed_id, max_points, mode=mode, since=since, until=until, keys=keys
+            )
 
-        # Apply limit
-        if limit:
-            events = events[-limit:]
+        series: Dict[str, Tuple[List[int], List[float]]] = {}
+        for event in await self.query_history(feed_id, since=since, until=until):
+            ts = to_micros(event.ts)
+            for key, value in event.payload.items():
+                if (keys is None or key in keys) and is_number(value):
+                    xs, ys = series.setdefault(key, ([], []))
+                    xs.append(ts)
+                    ys.append(float(value))
 
-        return events
+        result: Dict[str, Tuple[List[datetime], List[float]]] = {}
+        for key, (xs, ys) in series.items():
+            xs, ys = downsample(xs, ys, max_points, mode)
+            result[key] = ([from_micros(x) for x in xs], ys)
+        return result
 
     def clear_feed_data(self, feed_id: UUID) -> None:
         """
@@ -232,7 +1552,19 @@ class DataHub:
         """
         if feed_id in self.latest:
             del self.latest[feed_id]
+        # feed_seq is kept, so clients resuming the feed are told to resync
+        # rather than replayed updates numbered from scratch
+        self._updates.pop(feed_id, None)
+        self._pending_updates.pop(feed_id, None)
         if feed_id in self.history:
-            del self.history[feed_id]
+            buffer = self.history.pop(feed_id)
+            self._history_bytes -= buffer.nbytes()
+            if isinstance(buffer, MmapHistoryBuffer):
+                # Segment files are kept and picked up again on restart
+                buffer.close()
+        self.retention.pop(feed_id, None)
+        self.aggregates.pop(feed_id, None)
+        self.history_viewed.pop(feed_id, None)
+        self.history_evicted.pop(feed_id, None)
 
         self.logger.info(f"Cleared data for feed {feed_id}")
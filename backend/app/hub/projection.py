@@ -0,0 +1,65 @@
+"""
+Payload projection for WebSocket connections.
+
+Most panels show a single payload key (the "field" option of stat and
+timeseries panels), so a dashboard's connections only need those keys of
+each feed's payload. The keys are worked out from the dashboard's panels
+when it connects; a feed shown by any panel that reads the whole payload
+(bar charts, unknown panel types) is sent in full.
+"""
+
+from typing import Any, Dict, FrozenSet, Iterable, Tuple
+from uuid import UUID
+
+# Panel types that only read options["field"]
+FIELD_PANEL_TYPES = frozenset({"stat", "timeseries"})
+
+# Field shown when a panel does not set one
+DEFAULT_FIELD = "value"
+
+
+def panel_payload_keys(panel_type: str, options: Dict[str, Any]) -> FrozenSet[str] | None:
+    """
+    Get the payload keys a panel reads.
+
+    Args:
+        panel_type: Panel type
+        options: Parsed panel options
+
+    Returns:
+        Set of payload keys, or None if the panel needs the whole payload
+    """
+    if panel_type not in FIELD_PANEL_TYPES:
+        return None
+    field = options.get("field") or DEFAULT_FIELD
+    if not isinstance(field, str):
+        return None
+    return frozenset((field,))
+
+
+def dashboard_projection(
+    panels: Iterable[Tuple[str, Dict[str, Any], Iterable[UUID]]],
+) -> Dict[UUID, FrozenSet[str]]:
+    """
+    Work out which payload keys a dashboard needs from each feed.
+
+    Args:
+        panels: (panel type, parsed options, feed IDs) for each panel
+
+    Returns:
+        Payload keys per feed, for feeds that can be projected; feeds
+        missing from the result are sent in full
+    """
+    keys: Dict[UUID, FrozenSet[str] | None] = {}
+    for panel_type, options, feed_ids in panels:
+        needed = panel_payload_keys(panel_type, options)
+        for feed_id in feed_ids:
+            if feed_id not in keys:
+                keys[feed_id] = needed
+                continue
+            current = keys[feed_id]
+            if current is not None and needed is not None:
+                keys[feed_id] = current | needed
+            else:
+                keys[feed_id] = None
+    return {feed_id: needed for feed_id, needed in keys.items() if needed is not None}
@@ -0,0 +1,298 @@
+"""
+Feed event relay between the feed runner and worker processes.
+
+One process (the feed runner) polls feeds and publishes every event over a
+Unix domain socket. Each uvicorn worker runs a local DataHub replica fed by
+a RelaySubscriber, so WebSocket fan-out uses every core while upstream
+sources are polled only once.
+
+Messages are length-prefixed JSON objects:
+    - {"type": "history", ...}: a feed's latest event and history (see
+      snapshot.dump_feed_state), sent for every feed when a worker connects
+    - {"type": "event", "feed_id", "ts", "payload"}: a newly published event
+"""
+
+import asyncio
+import json
+import logging
+import os
+import struct
+from collections import deque
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Deque, Dict, List
+from uuid import UUID
+
+from pydantic_core import to_json
+
+from .events import FeedEvent
+from .history import from_micros, to_micros
+from .snapshot import dump_feed_state, load_feed_state
+
+if TYPE_CHECKING:
+    from .hub import DataHub
+
+_LENGTH = struct.Struct(">I")
+
+# Largest message accepted from the socket
+MAX_MESSAGE_BYTES = 64 * 1024 * 1024
+
+
+def encode_message(message: Dict[str, Any]) -> bytes:
+    """
+    Encode a relay message as a length-prefixed frame.
+
+    Args:
+        message: JSON-serializable message
+
+    Returns:
+        Frame bytes
+    """
+    body = to_json(message, inf_nan_mode="null", serialize_unknown=True)
+    return _LENGTH.pack(len(body)) + body
+
+
+async def read_message(reader: asyncio.StreamReader) -> Dict[str, Any]:
+    """
+    Read one relay message.
+
+    Args:
+        reader: Stream to read from
+
+    Returns:
+        Decoded message
+
+    Raises:
+        asyncio.IncompleteReadError: If the connection closed
+        ValueError: If the message is too large or not a JSON object
+    """
+    (length,) = _LENGTH.unpack(await reader.readexactly(_LENGTH.size))
+    if length > MAX_MESSAGE_BYTES:
+        raise ValueError(f"Relay message of {length} bytes exceeds limit")
+    message = json.loads(await reader.readexactly(length))
+    if not isinstance(message, dict):
+        raise ValueError("Relay message is not a JSON object")
+    return message
+
+
+class _Subscriber:
+    """Outbound queue and writer task for one connected worker."""
+
+    __slots__ = ("writer", "queue", "wake", "task", "dropped")
+
+    def __init__(self, writer: asyncio.StreamWriter):
+        self.writer = writer
+        self.queue: Deque[bytes] = deque()
+        self.wake = asyncio.Event()
+        self.task: asyncio.Task | None = None
+        self.dropped = 0
+
+
+class RelayPublisher:
+    """
+    Unix socket server that forwards hub events to worker processes.
+
+    Each worker has a bounded queue; a worker that falls behind loses its
+    oldest undelivered events rather than slowing down the runner.
+    """
+
+    def __init__(self, hub: "DataHub", path: str | Path, queue_size: int = 10000):
+        """
+        Initialize relay publisher.
+
+        Args:
+            hub: DataHub whose events are relayed (its history is replayed to
+                workers when they connect)
+            path: Unix socket path
+            queue_size: Maximum messages queued per worker
+        """
+        self.hub = hub
+        self.path = Path(path)
+        self.queue_size = max(1, queue_size)
+
+        self._server: asyncio.AbstractServer | None = None
+        self._subscribers: List[_Subscriber] = []
+
+        self.logger = logging.getLogger(__name__)
+
+    @property
+    def subscribers(self) -> int:
+        """Number of connected workers."""
+        return len(self._subscribers)
+
+    async def start(self) -> None:
+        """Listen on the socket, replacing a stale one left by a previous run."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if self.path.exists():
+            self.path.unlink()
+        self._server = await asyncio.start_unix_server(self._handle, path=str(self.path))
+        os.chmod(self.path, 0o660)
+        self.logger.info(f"Relay publisher listening on {self.path}")
+
+    async def stop(self) -> None:
+        """Close the socket and disconnect all workers."""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+        for subscriber in list(self._subscribers):
+            await self._disconnect(subscriber)
+
+        try:
+            self.path.unlink()
+        except FileNotFoundError:
+            pass
+
+    def publish(self, event: FeedEvent) -> None:
+        """
+        Queue an event for every connected worker without waiting.
+
+        Args:
+            event: Event published on the runner's hub
+        """
+        if not self._subscribers:
+            return
+
+        frame = encode_message(
+            {
+                "type": "event",
+                "feed_id": str(event.feed_id),
+                "ts": to_micros(event.ts),
+                "payload": event.payload,
+            }
+        )
+        for subscriber in self._subscribers:
+            self._enqueue(subscriber, frame)
+
+    def _enqueue(self, subscriber: _Subscriber, frame: bytes) -> None:
+        """Queue a frame for one worker, dropping its oldest on overflow."""
+        if len(subscriber.queue) >= self.queue_size:
+            subscriber.queue.popleft()
+            subscriber.dropped += 1
+            if subscriber.dropped % 1000 == 1:
+                self.logger.warning(
+                    f"Relay worker is falling behind, dropped {subscriber.dropped} events"
+                )
+        subscriber.queue.append(frame)
+        subscriber.wake.set()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Replay current state to a new worker, then stream events to it."""
+        subscriber = _Subscriber(writer)
+        for feed_id in self.hub.latest.keys() | self.hub.history.keys():
+            subscriber.queue.append(
+                encode_message({"type": "history", **dump_feed_state(self.hub, feed_id)})
+            )
+        subscriber.wake.set()
+        self._subscribers.append(subscriber)
+        subscriber.task = asyncio.current_task()
+        self.logger.info(f"Relay worker connected ({len(self._subscribers)} connected)")
+
+        try:
+            while True:
+                await subscriber.wake.wait()
+                subscriber.wake.clear()
+                while subscriber.queue:
+                    writer.write(subscriber.queue.popleft())
+                await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            if subscriber in self._subscribers:
+                self._subscribers.remove(subscriber)
+            writer.close()
+            self.logger.info(f"Relay worker disconnected ({len(self._subscribers)} connected)")
+
+    async def _disconnect(self, subscriber: _Subscriber) -> None:
+        """Stop streaming to a worker."""
+        if subscriber.task is not None and not subscriber.task.done():
+            subscriber.task.cancel()
+            try:
+                await subscriber.task
+            except asyncio.CancelledError:
+                pass
+
+
+class RelaySubscriber:
+    """
+    Feeds a worker's DataHub replica from the runner's relay socket.
+
+    Reconnects automatically; history replayed on reconnect is
+    deduplicated by DataHub.restore_history.
+    """
+
+    def __init__(self, hub: "DataHub", path: str | Path, reconnect_delay: float = 1.0):
+        """
+        Initialize relay subscriber.
+
+        Args:
+            hub: Local DataHub replica
+            path: Unix socket path of the runner
+            reconnect_delay: Seconds to wait before reconnecting
+        """
+        self.hub = hub
+        self.path = Path(path)
+        self.reconnect_delay = reconnect_delay
+
+        self._task: asyncio.Task | None = None
+        self.connected = asyncio.Event()
+        self.received = 0
+
+        self.logger = logging.getLogger(__name__)
+
+    async def start(self) -> None:
+        """Start receiving events in the background."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Disconnect from the runner."""
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+        self.connected.clear()
+
+    async def _run(self) -> None:
+        """Connect to the runner and apply its messages, reconnecting on failure."""
+        while True:
+            try:
+                reader, writer = await asyncio.open_unix_connection(str(self.path))
+            except OSError as e:
+                self.logger.debug(f"Relay socket {self.path} not available: {e}")
+                await asyncio.sleep(self.reconnect_delay)
+                continue
+
+            self.logger.info(f"Connected to relay at {self.path}")
+            self.connected.set()
+            try:
+                while True:
+                    await self._apply(await read_message(reader))
+            except asyncio.IncompleteReadError:
+                self.logger.warning("Relay connection closed by runner, reconnecting")
+            except (ConnectionError, ValueError) as e:
+                self.logger.error(f"Relay connection failed: {e}")
+            finally:
+                self.connected.clear()
+                writer.close()
+            await asyncio.sleep(self.reconnect_delay)
+
+    async def _apply(self, message: Dict[str, Any]) -> None:
+        """Apply one relay message to the local hub."""
+        kind = message.get("type")
+        if kind == "event":
+            self.received += 1
+            await self.hub.publish_event(
+                FeedEvent.model_construct(
+                    feed_id=UUID(message["feed_id"]),
+                    ts=from_micros(message["ts"]),
+                    payload=message["payload"],
+                )
+            )
+        elif kind == "history":
+            load_feed_state(self.hub, message)
+        else:
+            self.logger.warning(f"Ignoring unknown relay message type {kind!r}")
@@ -0,0 +1,87 @@
+"""
+Per-feed history retention.
+"""
+
+from datetime import timedelta
+from typing import Any, Dict
+
+
+class RetentionPolicy:
+    """
+    History retention overrides for a single feed.
+
+    Read from the feed's config:
+        - history_minutes: How long to keep history (default: hub window)
+        - history_max_points: Maximum number of events kept
+          (default: hub capacity)
+        - history_max_bytes: Maximum approximate bytes of history kept
+          (default: unlimited)
+    """
+
+    __slots__ = ("window", "max_points", "max_bytes")
+
+    def __init__(
+        self,
+        window: timedelta | None = None,
+        max_points: int | None = None,
+        max_bytes: int | None = None,
+    ):
+        """
+        Initialize retention policy.
+
+        Args:
+            window: How long to keep history
+            max_points: Maximum number of events kept
+            max_bytes: Maximum approximate bytes of history kept
+        """
+        self.window = window
+        self.max_points = max_points
+        self.max_bytes = max_bytes
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "RetentionPolicy | None":
+        """
+        Build a policy from a feed config.
+
+        Args:
+            config: Feed configuration dictionary
+
+        Returns:
+            RetentionPolicy, or None if the config sets no overrides
+
+        Raises:
+            ValueError: If an override is not a positive number
+        """
+        values = {}
+        for key in ("history_minutes", "history_max_points", "history_max_bytes"):
+            value = config.get(key)
+            if value is None:
+                continue
+            if isinstance(value, bool) or not isinstance(value, (int, float)) or value <= 0:
+                raise ValueError(f"{key} must be a positive number, got {value!r}")
+            values[key] = value
+
+        if not values:
+            return None
+
+        minutes = values.get("history_minutes")
+        max_points = values.get("history_max_points")
+        max_bytes = values.get("history_max_bytes")
+        return cls(
+            window=timedelta(minutes=minutes) if minutes is not None else None,
+            max_points=int(max_points) if max_points is not None else None,
+            max_bytes=int(max_bytes) if max_bytes is not None else None,
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Get the policy as config-style values.
+
+        Returns:
+            Dict with history_minutes, history_max_points and history_max_bytes
+        """
+        return {
+            "history_minutes": self.window.total_seconds() / 60 if self.window else None,
+            "history_max_points": self.max_points,
+            "history_max_bytes": self.max_bytes,
+        }
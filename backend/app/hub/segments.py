@@ -0,0 +1,576 @@
+"""
+Memory-mapped history segments.
+
+Each feed's history is kept in a directory of segment files. A segment has
+a fixed-size header followed by preallocated fixed-width columns: one int64
+column of timestamps (microseconds since epoch) and one int64 or float64
+column per numeric payload key. Files are memory-mapped, so range queries
+bisect and slice the page cache directly and the kernel decides what stays
+resident.
+
+Segments are rotated by time, when full, or when a new payload key appears,
+and sealed when rotated. The record count in the header is updated after
+each record is written, so another process can open the same files
+read-only (MmapHistoryBuffer(..., readonly=True)) and call refresh() to see
+new data.
+
+Only numeric payload values (finite floats and int64 integers) are stored;
+other values are dropped.
+"""
+
+import json
+import logging
+import math
+import mmap
+import os
+import struct
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Tuple
+from uuid import UUID
+
+from .events import FeedEvent
+from .history import HistoryView, from_micros, to_micros
+
+logger = logging.getLogger(__name__)
+
+_MAGIC = b"PBHSEG1\x00"
+_HEADER_SIZE = 4096
+# magic, header size, column count, capacity, count, sealed
+_HEADER = struct.Struct("<8sIIQQB")
+_COUNT_OFFSET = 24
+_SEALED_OFFSET = 32
+_SCHEMA_OFFSET = 40
+
+# Marks a row without a value in an integer column (float columns use NaN)
+_INT_MISSING = -(2**63)
+_INT64_MAX = 2**63 - 1
+
+SEGMENT_SUFFIX = ".seg"
+
+
+def _column_kind(value: Any) -> str | None:
+    """Storage kind for a payload value: 'q', 'd', or None if not stored."""
+    if type(value) is int and _INT_MISSING < value <= _INT64_MAX:
+        return "q"
+    if type(value) is float and math.isfinite(value):
+        return "d"
+    return None
+
+
+class Segment:
+    """One memory-mapped segment file."""
+
+    def __init__(self, path: Path, writable: bool = False):
+        """
+        Open an existing segment.
+
+        Args:
+            path: Segment file
+            writable: Map the file for writing
+
+        Raises:
+            ValueError: If the file is not a segment
+        """
+        self.path = path
+        self._file = open(path, "r+b" if writable else "rb")
+        try:
+            self._mm = mmap.mmap(
+                self._file.fileno(), 0, access=mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ
+            )
+        except Exception:
+            self._file.close()
+            raise
+
+        magic, header_size, ncols, capacity, _, _ = _HEADER.unpack_from(self._mm, 0)
+        if magic != _MAGIC:
+            self.close()
+            raise ValueError(f"Not a history segment: {path}")
+
+        (schema_len,) = struct.unpack_from("<I", self._mm, _SCHEMA_OFFSET)
+        schema = json.loads(bytes(self._mm[_SCHEMA_OFFSET + 4 : _SCHEMA_OFFSET + 4 + schema_len]))
+
+        self.capacity: int = capacity
+        self.start_ts: int = schema["start_ts"]
+        self.columns: List[Tuple[str, str]] = [tuple(column) for column in schema["columns"]]
+        self.index = {name: i for i, (name, _) in enumerate(self.columns)}
+
+        # Zero-copy views of the mapped columns
+        view = memoryview(self._mm)
+        self._views = [view]
+        self.ts = view[header_size : header_size + capacity * 8].cast("q")
+        self._views.append(self.ts)
+        self.values: List[memoryview[Any]] = []
+        for i, (_, kind) in enumerate(self.columns):
+            start = header_size + (i + 1) * capacity * 8
+            raw = view[start : start + capacity * 8]
+            column: memoryview[Any] = raw.cast("d") if kind == "d" else raw.cast("q")
+            self.values.append(column)
+            self._views.append(column)
+
+        if ncols != len(self.columns):
+            self.close()
+            raise ValueError(f"Corrupt history segment header: {path}")
+
+    @classmethod
+    def create(
+        cls, path: Path, columns: List[Tuple[str, str]], capacity: int, start_ts: int
+    ) -> "Segment":
+        """
+        Create and open a new, empty segment.
+
+        Args:
+            path: Segment file to create
+            columns: (name, kind) per payload key, kind 'q' or 'd'
+            capacity: Number of records the segment can hold
+            start_ts: Timestamp (microseconds) the segment starts at
+
+        Returns:
+            Writable Segment
+        """
+        schema = json.dumps({"start_ts": start_ts, "columns": columns}).encode("utf-8")
+        if _SCHEMA_OFFSET + 4 + len(schema) > _HEADER_SIZE:
+            raise ValueError("Too many payload keys for a history segment header")
+
+        header = bytearray(_HEADER_SIZE)
+        _HEADER.pack_into(header, 0, _MAGIC, _HEADER_SIZE, len(columns), capacity, 0, 0)
+        struct.pack_into("<I", header, _SCHEMA_OFFSET, len(schema))
+        header[_SCHEMA_OFFSET + 4 : _SCHEMA_OFFSET + 4 + len(schema)] = schema
+
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "wb") as f:
+            f.write(header)
+            # Sparse on most filesystems until records are written
+            f.truncate(_HEADER_SIZE + (len(columns) + 1) * capacity * 8)
+        os.replace(tmp, path)
+        return cls(path, writable=True)
+
+    @property
+    def count(self) -> int:
+        """Number of records written."""
+        count: int = struct.unpack_from("<Q", self._mm, _COUNT_OFFSET)[0]
+        return count
+
+    @property
+    def sealed(self) -> bool:
+        """Whether the segment is closed for writing."""
+        return bool(self._mm[_SEALED_OFFSET])
+
+    @property
+    def last_ts(self) -> int:
+        """Timestamp of the last record (or the start time if empty)."""
+        count = self.count
+        return self.ts[count - 1] if count else self.start_ts
+
+    def append(self, ts: int, row: List[int | float]) -> None:
+        """
+        Write a record and publish it by bumping the count.
+
+        Args:
+            ts: Timestamp in microseconds
+            row: One value per column (missing markers included)
+        """
+        index = self.count
+        self.ts[index] = ts
+        for column, value in zip(self.values, row, strict=True):
+            column[index] = value
+        struct.pack_into("<Q", self._mm, _COUNT_OFFSET, index + 1)
+
+    def seal(self) -> None:
+        """Mark the segment as complete and flush it to disk."""
+        self._mm[_SEALED_OFFSET] = 1
+        self._mm.flush()
+
+    def value_at(self, column: int, index: int) -> int | float | None:
+        """Read one value, or None if the record has no value for the column."""
+        value = self.values[column][index]
+        if self.columns[column][1] == "q":
+            return None if value == _INT_MISSING else value
+        return None if value != value else value
+
+    def record_bytes(self) -> int:
+        """Bytes per record."""
+        return (len(self.columns) + 1) * 8
+
+    def close(self) -> None:
+        """Release the mapping and file."""
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        self._mm.close()
+        self._file.close()
+
+
+class MmapHistoryBuffer:
+    """
+    History buffer backed by memory-mapped segment files.
+
+    Offers the same interface as HistoryBuffer. Existing segments in the
+    feed's directory are picked up on creation, so history survives
+    restarts.
+    """
+
+    def __init__(
+        self,
+        feed_id: UUID,
+        directory: str | Path,
+        capacity: int = 4096,
+        segment_duration: timedelta = timedelta(minutes=15),
+        segment_capacity: int = 65536,
+        readonly: bool = False,
+    ):
+        """
+        Initialize memory-mapped history buffer.
+
+        Args:
+            feed_id: Feed the events belong to
+            directory: Root directory; segments go in a per-feed subdirectory
+            capacity: Maximum number of events kept
+            segment_duration: Time span after which a segment is rotated
+            segment_capacity: Maximum records per segment
+            readonly: Open existing segments for reading only (e.g. from
+                another process); call refresh() to pick up new data
+        """
+        self.feed_id = feed_id
+        self.directory = Path(directory) / str(feed_id)
+        self.capacity = max(1, capacity)
+        self.segment_duration = segment_duration
+        self.segment_capacity = max(1, segment_capacity)
+        self.readonly = readonly
+
+        self._segments: List[Segment] = []
+        # Records dropped from the front of the first segment
+        self._skip = 0
+        self._offset = 0
+        self._last_ts: int | None = None
+
+        if not readonly:
+            self.directory.mkdir(parents=True, exist_ok=True)
+        self._load()
+        if not readonly and len(self) > self.capacity:
+            self.drop_oldest(len(self) - self.capacity)
+
+    def _load(self) -> None:
+        """Open the segments found on disk, sealing any left open."""
+        if not self.directory.is_dir():
+            return
+
+        for path in sorted(self.directory.glob(f"*{SEGMENT_SUFFIX}")):
+            try:
+                segment = Segment(path, writable=not self.readonly)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Skipping unreadable history segment {path}: {e}")
+                continue
+            if not segment.count:
+                segment.close()
+                if not self.readonly:
+                    path.unlink(missing_ok=True)
+                continue
+            if not self.readonly and not segment.sealed:
+                # Left open by a previous run; new records go to a new segment
+                segment.seal()
+            self._segments.append(segment)
+
+        if self._segments:
+            self._last_ts = self._segments[-1].last_ts
+
+    def refresh(self) -> None:
+        """Re-read the segment directory (for read-only buffers)."""
+        self.close()
+        self._skip = 0
+        self._load()
+
+    def close(self) -> None:
+        """Close all segments, keeping their files."""
+        for segment in self._segments:
+            segment.close()
+        self._segments = []
+
+    def __len__(self) -> int:
+        """Number of events in the buffer."""
+        return sum(segment.count for segment in self._segments) - self._skip
+
+    def _rotate(self, ts: int, row: Dict[str, Any]) -> Segment:
+        """Seal the open segment and create one that fits the new record."""
+        columns: Dict[str, str] = {}
+        if self._segments:
+            current = self._segments[-1]
+            current.seal()
+            columns = dict(current.columns)
+        for key, value in row.items():
+            kind = _column_kind(value)
+            if kind is not None and columns.get(key) != "d":
+                columns[key] = kind
+
+        path = self.directory / f"{ts:020d}{SEGMENT_SUFFIX}"
+        suffix = 1
+        while path.exists():
+            path = self.directory / f"{ts:020d}-{suffix}{SEGMENT_SUFFIX}"
+            suffix += 1
+        segment = Segment.create(path, list(columns.items()), self.segment_capacity, ts)
+        self._segments.append(segment)
+        return segment
+
+    def _fits(self, segment: Segment, ts: int, row: Dict[str, Any]) -> bool:
+        """Check whether a record can go into the open segment."""
+        if segment.sealed or segment.count >= segment.capacity:
+            return False
+        if ts >= segment.start_ts + self.segment_duration // timedelta(microseconds=1):
+            return False
+        for key, value in row.items():
+            column = segment.index.get(key)
+            if column is None:
+                return False
+            if segment.columns[column][1] == "q" and _column_kind(value) != "q":
+                return False
+        return True
+
+    def append(self, event: FeedEvent) -> None:
+        """
+        Add an event, dropping the oldest one when full.
+
+        Args:
+            event: FeedEvent to store
+
+        Raises:
+            RuntimeError: If the buffer is read-only
+        """
+        if self.readonly:
+            raise RuntimeError("Cannot append to a read-only history buffer")
+
+        ts = to_micros(event.ts)
+        if self._last_ts is not None and ts < self._last_ts:
+            # Records are written in place and never moved, so late events are
+            # clamped to keep the segment timestamps sorted
+            ts = self._last_ts
+        self._last_ts = ts
+
+        row = {key: value for key, value in event.payload.items() if _column_kind(value)}
+        segment = self._segments[-1] if self._segments else None
+        if segment is None or not self._fits(segment, ts, row):
+            segment = self._rotate(ts, row)
+
+        segment.append(
+            ts,
+            [
+                row.get(name, _INT_MISSING if kind == "q" else math.nan)
+                for name, kind in segment.columns
+            ],
+        )
+
+        if len(self) > self.capacity:
+            self.drop_oldest(1)
+
+    def _drop_first_segment(self) -> None:
+        """Remove the oldest segment and its file."""
+        segment = self._segments.pop(0)
+        self._offset += segment.count - self._skip
+        self._skip = 0
+        segment.close()
+        try:
+            segment.path.unlink()
+        except OSError as e:
+            logger.warning(f"Failed to delete history segment {segment.path}: {e}")
+
+    def drop_oldest(self, count: int) -> int:
+        """
+        Drop the oldest events, deleting segments that become empty.
+
+        Args:
+            count: Number of events to drop
+
+        Returns:
+            Number of events actually dropped
+        """
+        count = max(0, min(count, len(self)))
+        remaining = count
+        while remaining and self._segments:
+            first = self._segments[0]
+            live = first.count - self._skip
+            if remaining >= live and first is not self._segments[-1]:
+                self._drop_first_segment()
+                remaining -= live
+            else:
+                dropped = min(remaining, live)
+                self._skip += dropped
+                self._offset += dropped
+                remaining -= dropped
+        return count
+
+    def trim_before(self, cutoff: datetime) -> None:
+        """
+        Drop events older than a cutoff.
+
+        Args:
+            cutoff: Events with a timestamp before this are removed
+        """
+        self.drop_oldest(self._bisect(to_micros(cutoff), right=False))
+
+    def _locate(self, index: int) -> Tuple[Segment, int]:
+        """Find the segment and record index for a logical index."""
+        index += self._skip
+        for segment in self._segments:
+            count = segment.count
+            if index < count:
+                return segment, index
+            index -= count
+        raise IndexError("history index out of range")
+
+    def event_at(self, index: int) -> FeedEvent:
+        """
+        Rebuild the event at a logical index (0 is the oldest).
+
+        Args:
+            index: Logical index
+
+        Returns:
+            FeedEvent
+        """
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("history index out of range")
+
+        segment, local = self._locate(index)
+        payload = {}
+        for column, (name, _) in enumerate(segment.columns):
+            value = segment.value_at(column, local)
+            if value is not None:
+                payload[name] = value
+        return FeedEvent.model_construct(
+            feed_id=self.feed_id, ts=from_micros(segment.ts[local]), payload=payload
+        )
+
+    def timestamp_at(self, index: int) -> int:
+        """
+        Get the timestamp (microseconds since epoch) at a logical index.
+
+        Args:
+            index: Logical index
+
+        Returns:
+            Timestamp in microseconds
+        """
+        segment, local = self._locate(index)
+        return segment.ts[local]
+
+    def __iter__(self) -> Iterator[FeedEvent]:
+        """Iterate over events oldest first."""
+        for index in range(len(self)):
+            yield self.event_at(index)
+
+    def _bisect(self, micros: int, right: bool) -> int:
+        """
+        Find the logical insertion point for a timestamp.
+
+        Args:
+            micros: Timestamp in microseconds since epoch
+            right: Return the position after equal timestamps
+
+        Returns:
+            Logical index in [0, len(self)]
+        """
+        bisect = bisect_right if right else bisect_left
+        position = 0
+        for i, segment in enumerate(self._segments):
+            lo = self._skip if i == 0 else 0
+            count = segment.count
+            if count and (segment.last_ts > micros or (not right and segment.last_ts == micros)):
+                return position + bisect(segment.ts, micros, lo, count) - self._skip
+            position += count
+        return position - self._skip
+
+    def range(
+        self,
+        since: datetime | None = None,
+        until: datetime | None = None,
+        limit: int | None = None,
+    ) -> HistoryView:
+        """
+        Get a view of events in a time range.
+
+        Args:
+            since: Only include events after this timestamp
+            until: Only include events at or before this timestamp
+            limit: Maximum number of (most recent) events to include
+
+        Returns:
+            HistoryView over the matching events, oldest first
+        """
+        lo = 0 if since is None else self._bisect(to_micros(since), right=True)
+        hi = len(self) if until is None else self._bisect(to_micros(until), right=True)
+        if limit:
+            lo = max(lo, hi - limit)
+        hi = max(lo, hi)
+        return HistoryView(self, self._offset + lo, self._offset + hi)
+
+    def events(
+        self,
+        since: datetime | None = None,
+        until: datetime | None = None,
+        limit: int | None = None,
+    ) -> List[FeedEvent]:
+        """
+        Get a materialized list of events in a time range.
+
+        Args:
+            since: Only return events after this timestamp
+            until: Only return events at or before this timestamp
+            limit: Maximum number of (most recent) events to return
+
+        Returns:
+            List of FeedEvents, oldest first
+        """
+        return list(self.range(since=since, until=until, limit=limit))
+
+    def keys(self) -> List[str]:
+        """Payload keys seen in the buffer."""
+        keys: Dict[str, None] = {}
+        for segment in self._segments:
+            keys.update(dict.fromkeys(name for name, _ in segment.columns))
+        return list(keys)
+
+    def series(self, key: str, lo: int = 0, hi: int | None = None) -> Tuple[List[int], List[float]]:
+        """
+        Extract one payload key as a numeric series straight from the mapping.
+
+        Args:
+            key: Payload key
+            lo: First logical index
+            hi: Logical index after the last row (defaults to the end)
+
+        Returns:
+            (timestamps in microseconds, values as floats)
+        """
+        hi = len(self) if hi is None else hi
+        xs: List[int] = []
+        ys: List[float] = []
+        start = lo + self._skip
+        stop = hi + self._skip
+
+        for segment in self._segments:
+            count = segment.count
+            a = max(start, 0)
+            b = min(stop, count)
+            column = segment.index.get(key)
+            if a < b and column is not None:
+                kind = segment.columns[column][1]
+                values = segment.values[column][a:b].tolist()
+                for ts, value in zip(segment.ts[a:b].tolist(), values, strict=True):
+                    if (value != _INT_MISSING) if kind == "q" else (value == value):
+                        xs.append(ts)
+                        ys.append(float(value))
+            start -= count
+            stop -= count
+            if stop <= 0:
+                break
+        return xs, ys
+
+    def nbytes(self) -> int:
+        """Approximate mapped bytes used by the buffered events."""
+        total = 0
+        for i, segment in enumerate(self._segments):
+            live = segment.count - (self._skip if i == 0 else 0)
+            total += live * segment.record_bytes()
+        return total
@@ -0,0 +1,186 @@
+"""
+Fast-path wire serialization for feed events.
+
+Encodes FeedEvent straight to JSON bytes without building a pydantic
+FeedEventMessage, producing the same output as
+FeedEventMessage.from_feed_event(event).model_dump_json().
+"""
+
+import json
+import logging
+import math
+import re
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict
+
+from pydantic_core import PydanticSerializationError, to_json
+
+from .events import FeedEvent
+
+logger = logging.getLogger(__name__)
+
+# Encodes a JSON-compatible message dict to UTF-8 bytes
+Serializer = Callable[[Dict[str, Any]], bytes]
+
+# JSON strings (skipped) or a number with the zero-padded negative exponent
+# Python writes ("1e-07"); pydantic writes "1e-7", or "0.00001" for e-05
+_JSON_STRING_OR_PADDED_EXPONENT = re.compile(
+    r'"(?:[^"\\]|\\.)*"|-?[0-9]+(?:\.[0-9]+)?e-0[0-9]'
+)
+
+
+def _encode_pydantic(message: Dict[str, Any]) -> bytes:
+    """Encode with pydantic-core's serializer (what model_dump_json uses)."""
+    return to_json(message, inf_nan_mode="null")
+
+
+def _json_default(value: Any) -> Any:
+    """Convert non-JSON types the way pydantic does."""
+    if isinstance(value, datetime):
+        text = value.isoformat()
+        if value.utcoffset() == timedelta(0):
+            text = text[: -len("+00:00")] + "Z"
+        return text
+    return str(value)
+
+
+def _replace_non_finite(value: Any) -> Any:
+    """Replace NaN and infinity with None, as pydantic does."""
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    if isinstance(value, dict):
+        return {k: _replace_non_finite(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_replace_non_finite(v) for v in value]
+    return value
+
+
+def _encode_json(message: Dict[str, Any]) -> bytes:
+    """
+    Encode with the standard library json module.
+
+    Small floats that Python writes with a zero-padded exponent are
+    rewritten the way pydantic writes them, so the output matches.
+    """
+    try:
+        text = json.dumps(
+            message,
+            default=_json_default,
+            ensure_ascii=False,
+            separators=(",", ":"),
+            allow_nan=False,
+        )
+    except ValueError:
+        text = json.dumps(
+            _replace_non_finite(message),
+            default=_json_default,
+            ensure_ascii=False,
+            separators=(",", ":"),
+        )
+    if "e-0" in text:
+        text = _JSON_STRING_OR_PADDED_EXPONENT.sub(_pydantic_float, text)
+    return text.encode("utf-8")
+
+
+def _pydantic_float(match: re.Match[str]) -> str:
+    """Rewrite a matched float the way pydantic formats it (strings are kept)."""
+    token = match.group()
+    if token[0] == '"':
+        return token
+    return to_json(float(token)).decode("utf-8")
+
+
+# Registry of available serializers
+SERIALIZERS: Dict[str, Serializer] = {
+    "pydantic": _encode_pydantic,
+    "json": _encode_json,
+}
+
+
+def get_serializer(name: str = "auto") -> Serializer:
+    """
+    Get a serializer by name.
+
+    Args:
+        name: Serializer name, or "auto" for the fastest (pydantic-core)
+
+    Returns:
+        Serializer function
+
+    Raises:
+        ValueError: If the serializer is unknown or not installed
+    """
+    if name == "auto":
+        return _encode_pydantic
+
+    serializer = SERIALIZERS.get(name)
+    if serializer is None:
+        raise ValueError(
+            f"Unknown or unavailable serializer: {name} "
+            f"(available: {', '.join(sorted(SERIALIZERS))})"
+        )
+    return serializer
+
+
+def feed_event_message(event: FeedEvent, seq: int | None = None) -> Dict[str, Any]:
+    """
+    Build the wire message dict for a feed event.
+
+    Args:
+        event: FeedEvent to convert
+        seq: Per-feed sequence number of the event, if any
+
+    Returns:
+        Dict with the same fields as FeedEventMessage, plus "seq" if given
+    """
+    message = {
+        "type": "feed_update",
+        "feed_id": event.feed_id,
+        "ts": event.ts,
+        "payload": event.payload,
+    }
+    if seq is not None:
+        message["seq"] = seq
+    return message
+
+
+class FeedEventEncoder:
+    """Encodes feed events and other hub messages to JSON bytes."""
+
+    def __init__(self, serializer: str | Serializer = "auto"):
+        """
+        Initialize encoder.
+
+        Args:
+            serializer: Serializer name or function
+        """
+        self.serialize = get_serializer(serializer) if isinstance(serializer, str) else serializer
+
+    def encode(self, event: FeedEvent, seq: int | None = None) -> bytes:
+        """
+        Encode a feed event as a feed_update message.
+
+        Args:
+            event: FeedEvent to encode
+            seq: Per-feed sequence number of the event, if any
+
+        Returns:
+            UTF-8 JSON bytes
+        """
+        return self.encode_message(feed_event_message(event, seq))
+
+    def encode_message(self, message: Dict[str, Any]) -> bytes:
+        """
+        Encode an arbitrary message dict.
+
+        Args:
+            message: JSON-compatible message
+
+        Returns:
+            UTF-8 JSON bytes
+        """
+        try:
+            return self.serialize(message)
+        except (TypeError, ValueError, PydanticSerializationError) as e:
+            logger.warning(f"Fast-path serialization failed, using pydantic: {e}")
+            return to_json(message, inf_nan_mode="null", serialize_unknown=True)
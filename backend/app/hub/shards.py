@@ -0,0 +1,131 @@
+"""
+Event-loop threads running the outbound side of WebSocket connections.
+
+In sharded mode the hub spreads connections across several shards. Each
+shard is a thread with its own asyncio loop that owns its connections'
+outbound queues: slow-consumer policies, rate limits and turning feed
+updates into each connection's delta, projected or snapshot frames all run
+there. The hub hands a message to a shard once, through a thread-safe
+call, however many of the shard's connections receive it.
+
+A WebSocket still belongs to the server loop that accepted it, so each
+shard hands its coalesced writes back to that loop, one hop per batch
+rather than per message. Encoding still holds the GIL; what moves off the
+hub's loop is the per-connection bookkeeping and frame building.
+"""
+
+import asyncio
+import logging
+import threading
+from typing import TYPE_CHECKING, Any, Callable, List, Set
+from uuid import UUID
+
+if TYPE_CHECKING:
+    from .connection import ClientConnection, OutboundMessage
+
+logger = logging.getLogger(__name__)
+
+
+class HubShard:
+    """One event-loop thread and the connections whose queues it runs."""
+
+    def __init__(self, index: int):
+        """
+        Initialize shard.
+
+        Args:
+            index: Position of the shard in the hub, used in its thread name
+        """
+        self.index = index
+        self.loop = asyncio.new_event_loop()
+        # Only changed from the hub's loop
+        self.clients: Set["ClientConnection"] = set()
+        self._thread: threading.Thread | None = None
+        self.logger = logging.getLogger(__name__)
+
+    @property
+    def running(self) -> bool:
+        """Whether the shard's thread is running."""
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        """Start the shard's thread and wait until its loop runs."""
+        if self._thread is not None:
+            return
+        ready = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, args=(ready,), name=f"hub-shard-{self.index}", daemon=True
+        )
+        self._thread.start()
+        ready.wait()
+
+    def _run(self, ready: threading.Event) -> None:
+        """Run the shard's loop until stopped, then cancel what is left on it."""
+        loop = self.loop
+        asyncio.set_event_loop(loop)
+        loop.call_soon(ready.set)
+        try:
+            loop.run_forever()
+        finally:
+            tasks = asyncio.all_tasks(loop)
+            for task in tasks:
+                task.cancel()
+            loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            loop.close()
+
+    def call(self, callback: Callable[..., Any], *args: Any) -> None:
+        """
+        Run a callback on the shard's loop, from any thread.
+
+        Callbacks run in the order they were handed over.
+
+        Args:
+            callback: Function to call
+            *args: Arguments to call it with
+        """
+        try:
+            self.loop.call_soon_threadsafe(callback, *args)
+        except RuntimeError:
+            # The loop has been closed by stop()
+            pass
+
+    def enqueue(
+        self,
+        clients: List["ClientConnection"],
+        message: "OutboundMessage",
+        feed_id: UUID | None = None,
+    ) -> None:
+        """
+        Queue a message on several of the shard's connections, with one handoff.
+
+        Args:
+            clients: Connections to queue the message on
+            message: JSON message, shared Frame, FeedUpdate or FeedBatch to send
+            feed_id: Feed the message belongs to (used for conflation)
+        """
+        self.call(self._enqueue, clients, message, feed_id)
+
+    @staticmethod
+    def _enqueue(
+        clients: List["ClientConnection"], message: "OutboundMessage", feed_id: UUID | None
+    ) -> None:
+        """Queue a message on connections (runs on the shard's loop)."""
+        for client in clients:
+            client.enqueue(message, feed_id)
+
+    async def stop(self) -> None:
+        """Close the shard's connections and wait for its thread to finish."""
+        thread = self._thread
+        if thread is None:
+            return
+        clients: List["ClientConnection"] = list(self.clients)
+        self.call(self._shutdown, clients)
+        await asyncio.to_thread(thread.join)
+        self._thread = None
+        self.logger.info(f"Hub shard {self.index} stopped")
+
+    def _shutdown(self, clients: List["ClientConnection"]) -> None:
+        """Close connections and stop the loop (runs on the shard's loop)."""
+        for client in clients:
+            client.close()
+        self.loop.stop()
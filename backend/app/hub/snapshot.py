@@ -0,0 +1,222 @@
+"""
+Warm-start snapshots of hub state.
+
+The latest event and recent history of every feed are written to a
+gzip-compressed JSON file periodically and on shutdown, and read back on
+startup so reconnecting clients get data before feeds produce new events.
+"""
+
+import asyncio
+import gzip
+import json
+import logging
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List
+from uuid import UUID
+
+from pydantic_core import to_json
+
+from .events import FeedEvent
+from .history import from_micros, to_micros
+from .segments import MmapHistoryBuffer
+
+if TYPE_CHECKING:
+    from .hub import DataHub
+
+SNAPSHOT_VERSION = 1
+
+
+def dump_feed_state(hub: "DataHub", feed_id: UUID) -> Dict[str, Any]:
+    """
+    Capture one feed's latest event and history.
+
+    History kept in memory-mapped segments is already on disk and left out.
+
+    Args:
+        hub: DataHub holding the feed
+        feed_id: Feed identifier
+
+    Returns:
+        JSON-serializable feed state
+    """
+    latest = hub.latest.get(feed_id)
+    buffer = hub.history.get(feed_id)
+    timestamps: List[int] = []
+    payloads: List[Dict[str, Any]] = []
+    if buffer is not None and not isinstance(buffer, MmapHistoryBuffer):
+        # One pass: each event is rebuilt from the buffer's columns
+        for event in buffer:
+            timestamps.append(to_micros(event.ts))
+            payloads.append(event.payload)
+    return {
+        "feed_id": str(feed_id),
+        "latest": [to_micros(latest.ts), latest.payload] if latest else None,
+        "ts": timestamps,
+        "payloads": payloads,
+    }
+
+
+def load_feed_state(hub: "DataHub", state: Dict[str, Any]) -> int:
+    """
+    Restore one feed's state captured by dump_feed_state.
+
+    Args:
+        hub: DataHub to restore into
+        state: Feed state
+
+    Returns:
+        Number of history events added
+
+    Raises:
+        KeyError, TypeError, ValueError: If the state is malformed
+    """
+    feed_id = UUID(state["feed_id"])
+    events = [
+        FeedEvent.model_construct(feed_id=feed_id, ts=from_micros(ts), payload=payload)
+        for ts, payload in zip(state["ts"], state["payloads"], strict=True)
+    ]
+    latest = None
+    if state.get("latest"):
+        ts, payload = state["latest"]
+        latest = FeedEvent.model_construct(feed_id=feed_id, ts=from_micros(ts), payload=payload)
+    return hub.restore_history(feed_id, events, latest=latest)
+
+
+class HubSnapshot:
+    """
+    Saves and restores DataHub latest values and history.
+    """
+
+    def __init__(self, hub: "DataHub", path: str | Path, interval: float = 60.0):
+        """
+        Initialize hub snapshot.
+
+        Args:
+            hub: DataHub to snapshot
+            path: Snapshot file
+            interval: Seconds between periodic snapshots (0 to only save on
+                shutdown)
+        """
+        self.hub = hub
+        self.path = Path(path)
+        self.interval = interval
+
+        self._task: asyncio.Task | None = None
+        self.saved_at: datetime | None = None
+
+        self.logger = logging.getLogger(__name__)
+
+    async def build(self) -> Dict[str, Any]:
+        """
+        Capture the hub's current state.
+
+        Feeds are captured one at a time, letting the event loop publish and
+        send in between, so a large hub does not stall it for the whole
+        snapshot.
+
+        Returns:
+            JSON-serializable snapshot
+        """
+        feeds = []
+        for feed_id in list(self.hub.latest.keys() | self.hub.history.keys()):
+            feeds.append(dump_feed_state(self.hub, feed_id))
+            await asyncio.sleep(0)
+        return {
+            "version": SNAPSHOT_VERSION,
+            "saved_at": to_micros(datetime.utcnow()),
+            "feeds": feeds,
+        }
+
+    async def save(self) -> None:
+        """Write a snapshot of the hub's current state."""
+        data = await self.build()
+        await asyncio.to_thread(self._write, data)
+        self.saved_at = from_micros(data["saved_at"])
+        self.logger.debug(f"Saved hub snapshot of {len(data['feeds'])} feeds to {self.path}")
+
+    def _write(self, data: Dict[str, Any]) -> None:
+        """Atomically replace the snapshot file (runs in a worker thread)."""
+        encoded = gzip.compress(
+            to_json(data, inf_nan_mode="null", serialize_unknown=True), compresslevel=6
+        )
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp, "wb") as f:
+            f.write(encoded)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+
+    def restore(self, feed_ids: Iterable[UUID] | None = None) -> int:
+        """
+        Load the last snapshot into the hub.
+
+        A missing or unreadable snapshot is logged and ignored.
+
+        Args:
+            feed_ids: Only restore these feeds (e.g. the enabled ones)
+
+        Returns:
+            Number of feeds restored
+        """
+        if not self.path.exists():
+            return 0
+
+        try:
+            with open(self.path, "rb") as f:
+                data = json.loads(gzip.decompress(f.read()))
+            if data.get("version") != SNAPSHOT_VERSION:
+                raise ValueError(f"unsupported version {data.get('version')!r}")
+        except (OSError, EOFError, ValueError) as e:
+            self.logger.warning(f"Ignoring unreadable hub snapshot {self.path}: {e}")
+            return 0
+
+        wanted = set(feed_ids) if feed_ids is not None else None
+        restored = 0
+        events_restored = 0
+        for entry in data.get("feeds", []):
+            try:
+                if wanted is not None and UUID(entry["feed_id"]) not in wanted:
+                    continue
+                events_restored += load_feed_state(self.hub, entry)
+            except (KeyError, TypeError, ValueError) as e:
+                self.logger.warning(f"Skipping malformed hub snapshot entry: {e}")
+                continue
+            restored += 1
+
+        self.logger.info(
+            f"Restored {restored} feeds and {events_restored} history events "
+            f"from hub snapshot {self.path}"
+        )
+        return restored
+
+    async def start(self) -> None:
+        """Start saving snapshots periodically."""
+        if self.interval > 0 and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop periodic snapshots and save a final one."""
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+        try:
+            await self.save()
+        except Exception as e:
+            self.logger.error(f"Failed to save hub snapshot: {e}")
+
+    async def _run(self) -> None:
+        """Save a snapshot every interval."""
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.save()
+            except Exception as e:
+                self.logger.error(f"Failed to save hub snapshot: {e}")
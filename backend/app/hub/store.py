@@ -0,0 +1,322 @@
+"""
+Durable write-behind history store.
+
+Feed events are queued in memory by the publisher and written to the
+database in batches by a background task, so publishing never waits on
+disk I/O. A second task deletes events older than the retention period and
+compacts SQLite databases once enough space has been freed.
+"""
+
+import asyncio
+import json
+import logging
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Any, Deque, Dict, List
+from uuid import UUID
+
+from pydantic_core import to_json
+from sqlalchemy import delete, select, text
+from sqlalchemy.engine import Engine
+from sqlmodel import SQLModel
+
+from app.models import FeedEventRecord
+
+from .events import FeedEvent
+
+# SQLModel classes do not declare __table__ to type checkers
+_EVENTS = SQLModel.metadata.tables[FeedEventRecord.__tablename__]
+
+# Rows deleted per statement, so retention never holds a long write lock
+_DELETE_CHUNK = 5000
+
+# Compact SQLite once this fraction of the file is free pages
+_VACUUM_FREE_RATIO = 0.25
+
+
+class HistoryStore:
+    """
+    Batched, append-only persistence of feed events.
+
+    Events waiting to be written are kept in a bounded queue; if the
+    database falls too far behind, the oldest unwritten events are dropped
+    rather than blocking publishers or growing without limit.
+    """
+
+    def __init__(
+        self,
+        engine: Engine,
+        retention: timedelta = timedelta(hours=24),
+        batch_size: int = 500,
+        flush_interval: float = 1.0,
+        max_pending: int = 100_000,
+        retention_interval: float = 300.0,
+        read_only: bool = False,
+    ):
+        """
+        Initialize history store.
+
+        Args:
+            engine: SQLAlchemy engine (normally app.db.base.engine)
+            retention: How long to keep persisted events
+            batch_size: Events written per transaction
+            flush_interval: Seconds between writes when fewer than
+                batch_size events are waiting
+            max_pending: Maximum events waiting to be written
+            retention_interval: Seconds between retention passes
+            read_only: Only serve queries; events added are ignored and no
+                background tasks run (for worker processes, where the feed
+                runner does the writing)
+        """
+        self.engine = engine
+        self.retention = retention
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.max_pending = max(1, max_pending)
+        self.retention_interval = retention_interval
+        self.read_only = read_only
+
+        self._pending: Deque[FeedEvent] = deque()
+        self._wake = asyncio.Event()
+        self._writer_task: asyncio.Task | None = None
+        self._retention_task: asyncio.Task | None = None
+
+        # Counters
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.deleted = 0
+        self.compactions = 0
+
+        self.logger = logging.getLogger(__name__)
+
+    @property
+    def pending(self) -> int:
+        """Number of events waiting to be written."""
+        return len(self._pending)
+
+    async def start(self) -> None:
+        """Create the table if needed and start the background tasks."""
+        await asyncio.to_thread(_EVENTS.create, self.engine, checkfirst=True)
+        if self.read_only:
+            return
+        if self._writer_task is None or self._writer_task.done():
+            self._writer_task = asyncio.create_task(self._writer_loop())
+        if self._retention_task is None or self._retention_task.done():
+            self._retention_task = asyncio.create_task(self._retention_loop())
+        self.logger.info(f"History store started (retention {self.retention})")
+
+    async def stop(self) -> None:
+        """Stop the background tasks and write any pending events."""
+        for task in (self._writer_task, self._retention_task):
+            if task is not None and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._writer_task = None
+        self._retention_task = None
+
+        await self.flush()
+
+    def add(self, event: FeedEvent) -> None:
+        """
+        Queue an event for writing without waiting.
+
+        Args:
+            event: FeedEvent to persist
+        """
+        if self.read_only:
+            return
+        if len(self._pending) >= self.max_pending:
+            self._pending.popleft()
+            self.dropped += 1
+            if self.dropped % 1000 == 1:
+                self.logger.warning(
+                    f"History store is falling behind, dropped {self.dropped} unwritten events"
+                )
+        self._pending.append(event)
+        if len(self._pending) >= self.batch_size:
+            self._wake.set()
+
+    async def _writer_loop(self) -> None:
+        """Write pending events in batches."""
+        while True:
+            if len(self._pending) < self.batch_size:
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+            await self.flush()
+
+    async def flush(self) -> None:
+        """Write all pending events."""
+        while self._pending:
+            count = min(self.batch_size, len(self._pending))
+            batch = [self._pending.popleft() for _ in range(count)]
+            try:
+                await asyncio.to_thread(self._write_batch, batch)
+                self.written += len(batch)
+            except Exception as e:
+                self.failed += len(batch)
+                self.logger.error(f"Failed to write {len(batch)} history events: {e}")
+
+    def _write_batch(self, batch: List[FeedEvent]) -> None:
+        """Insert a batch of events in one transaction (runs in a worker thread)."""
+        rows = [
+            {
+                "feed_id": event.feed_id,
+                "ts": event.ts,
+                "payload_json": to_json(
+                    event.payload, inf_nan_mode="null", serialize_unknown=True
+                ).decode("utf-8"),
+            }
+            for event in batch
+        ]
+        with self.engine.begin() as conn:
+            conn.execute(_EVENTS.insert(), rows)
+
+    async def _retention_loop(self) -> None:
+        """Periodically delete expired events and compact the database."""
+        while True:
+            await asyncio.sleep(self.retention_interval)
+            try:
+                await self.apply_retention()
+            except Exception as e:
+                self.logger.error(f"History retention pass failed: {e}")
+
+    async def apply_retention(self) -> int:
+        """
+        Delete events older than the retention period.
+
+        Returns:
+            Number of events deleted
+        """
+        cutoff = datetime.utcnow() - self.retention
+        deleted = await asyncio.to_thread(self._delete_before, cutoff)
+        self.deleted += deleted
+        if deleted:
+            self.logger.info(f"Deleted {deleted} history events older than {cutoff}")
+            if await asyncio.to_thread(self._compact):
+                self.compactions += 1
+        return deleted
+
+    def _delete_before(self, cutoff: datetime) -> int:
+        """Delete expired rows in chunks (runs in a worker thread)."""
+        table = _EVENTS
+        total = 0
+        while True:
+            with self.engine.begin() as conn:
+                ids = select(table.c.id).where(table.c.ts < cutoff).limit(_DELETE_CHUNK)
+                result = conn.execute(delete(table).where(table.c.id.in_(ids)))
+            total += result.rowcount
+            if result.rowcount < _DELETE_CHUNK:
+                return total
+
+    def _compact(self) -> bool:
+        """
+        Reclaim free space in SQLite databases (runs in a worker thread).
+
+        Returns:
+            True if the database was compacted
+        """
+        if self.engine.dialect.name != "sqlite":
+            return False
+
+        with self.engine.connect() as conn:
+            pages = conn.execute(text("PRAGMA page_count")).scalar() or 0
+            free = conn.execute(text("PRAGMA freelist_count")).scalar() or 0
+            if not pages or free / pages < _VACUUM_FREE_RATIO:
+                return False
+            conn.execute(text("VACUUM"))
+        self.logger.info(f"Compacted history database ({free} of {pages} pages free)")
+        return True
+
+    async def query(
+        self,
+        feed_id: UUID,
+        since: datetime | None = None,
+        before: datetime | None = None,
+        limit: int | None = None,
+    ) -> List[FeedEvent]:
+        """
+        Read persisted events for a feed.
+
+        Args:
+            feed_id: Feed identifier
+            since: Only return events after this timestamp
+            before: Only return events strictly before this timestamp
+            limit: Maximum number of (most recent) events to return
+
+        Returns:
+            List of FeedEvents, oldest first
+        """
+        return await asyncio.to_thread(self._query, feed_id, since, before, limit)
+
+    def _query(
+        self,
+        feed_id: UUID,
+        since: datetime | None,
+        before: datetime | None,
+        limit: int | None,
+    ) -> List[FeedEvent]:
+        """Read persisted events (runs in a worker thread)."""
+        table = _EVENTS
+        statement = select(table.c.ts, table.c.payload_json).where(table.c.feed_id == feed_id)
+        if since is not None:
+            statement = statement.where(table.c.ts > since)
+        if before is not None:
+            statement = statement.where(table.c.ts < before)
+        statement = statement.order_by(table.c.ts.desc(), table.c.id.desc())
+        if limit:
+            statement = statement.limit(limit)
+
+        with self.engine.connect() as conn:
+            rows = conn.execute(statement).all()
+
+        return [
+            FeedEvent.model_construct(feed_id=feed_id, ts=ts, payload=json.loads(payload_json))
+            for ts, payload_json in reversed(rows)
+        ]
+
+    async def load_recent(self, since: datetime, limit: int) -> Dict[UUID, List[FeedEvent]]:
+        """
+        Read recent events for every feed, e.g. to warm the hub after a restart.
+
+        Args:
+            since: Only return events after this timestamp
+            limit: Maximum number of (most recent) events per feed
+
+        Returns:
+            Dict mapping feed ID to events, oldest first
+        """
+        return await asyncio.to_thread(self._load_recent, since, limit)
+
+    def _load_recent(self, since: datetime, limit: int) -> Dict[UUID, List[FeedEvent]]:
+        """Read recent events for every feed (runs in a worker thread)."""
+        table = _EVENTS
+        with self.engine.connect() as conn:
+            feed_ids = conn.execute(
+                select(table.c.feed_id).where(table.c.ts > since).distinct()
+            ).scalars().all()
+
+        return {feed_id: self._query(feed_id, since, None, limit) for feed_id in feed_ids}
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get write and retention counters.
+
+        Returns:
+            Dict with store statistics
+        """
+        return {
+            "pending": self.pending,
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "deleted": self.deleted,
+            "compactions": self.compactions,
+            "retention_hours": self.retention.total_seconds() / 3600,
+        }
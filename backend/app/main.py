@@ -5,21 +5,30 @@ This module initializes the FastAPI app, sets up database, DataHub,
 FeedManager, and mounts all routes.
 """
 
+import json
 import logging
 from contextlib import asynccontextmanager
 from datetime import timedelta
+from typing import AsyncIterator, Dict, Tuple
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from sqlmodel import Session
+from sqlmodel import Session, select
 
-from app.api.routes import dashboards, feeds, panels
+from app.api.routes import admin, alerts, dashboards, feeds, panels
 from app.core.config import settings
 from app.core.logging import setup_logging
 from app.db.base import create_db_and_tables, engine
 from app.feeds.manager import FeedManager
+from app.hub.aggregates import AggregateSpec
+from app.hub.alerts import AlertStore
 from app.hub.hub import DataHub
+from app.hub.relay import RelayPublisher, RelaySubscriber
+from app.hub.snapshot import HubSnapshot
+from app.hub.store import HistoryStore
+from app.models import FeedDefinition
 from app.ws import router as ws_router
+from app.ws.broadcast import RawSendMiddleware
 
 # Setup logging
 setup_logging()
@@ -28,34 +37,228 @@ logger = logging.getLogger(__name__)
 # Global instances
 hub: DataHub | None = None
 feed_manager: FeedManager | None = None
+history_store: HistoryStore | None = None
+alert_store: AlertStore | None = None
+hub_snapshot: HubSnapshot | None = None
+relay: RelayPublisher | RelaySubscriber | None = None
+
+
+def create_history_store(read_only: bool = False) -> HistoryStore | None:
+    """
+    Create the durable history store if it is enabled.
+
+    Args:
+        read_only: Only serve queries (for worker processes)
+
+    Returns:
+        HistoryStore, or None if disabled
+    """
+    if not settings.history_store_enabled:
+        return None
+    return HistoryStore(
+        engine,
+        retention=timedelta(hours=settings.history_store_retention_hours),
+        batch_size=settings.history_store_batch_size,
+        flush_interval=settings.history_store_flush_interval_sec,
+        read_only=read_only,
+    )
+
+
+def create_alert_store(read_only: bool = False) -> AlertStore:
+    """
+    Create the alert rule and alert event store.
+
+    Args:
+        read_only: Only load rules (for worker processes)
+
+    Returns:
+        AlertStore
+    """
+    return AlertStore(
+        engine, flush_interval=settings.alert_flush_interval_sec, read_only=read_only
+    )
+
+
+def create_hub(
+    history_store: HistoryStore | None,
+    segments: bool = True,
+    alert_store: AlertStore | None = None,
+    alert_reload: bool = False,
+) -> DataHub:
+    """
+    Create a DataHub from settings.
+
+    Args:
+        history_store: Durable history store, if enabled
+        segments: Use memory-mapped history segments if configured (only
+            one process may write a feed's segment files)
+        alert_store: Alert rule and alert event store
+        alert_reload: Periodically reload the alert rules (when they may be
+            edited by another process)
+
+    Returns:
+        DataHub
+    """
+    return DataHub(
+        history_window=timedelta(minutes=settings.history_window_minutes),
+        history_capacity=settings.history_capacity,
+        history_compression=settings.history_compression,
+        history_block_size=settings.history_block_size,
+        history_segment_dir=settings.history_segment_dir if segments else None,
+        history_segment_duration=timedelta(minutes=settings.history_segment_minutes),
+        history_segment_records=settings.history_segment_records,
+        history_memory_budget=settings.history_memory_budget_mb * 1024 * 1024,
+        history_store=history_store,
+        dispatch_queue_size=settings.hub_dispatch_queue_size,
+        shards=settings.hub_shards,
+        send_timeout=settings.ws_send_timeout_sec,
+        queue_size=settings.ws_queue_size,
+        slow_consumer_policy=settings.ws_slow_consumer_policy,
+        high_water_mark=settings.ws_high_water_mark,
+        disconnect_after=settings.ws_disconnect_after_sec,
+        serializer=settings.ws_serializer,
+        raw_frames=settings.ws_raw_frames,
+        delta_keyframe_interval=settings.ws_delta_keyframe_interval,
+        batch_window=settings.ws_batch_window_ms / 1000,
+        snapshot_history_points=settings.ws_snapshot_history_points,
+        snapshot_history_mode=settings.ws_snapshot_history_mode,
+        aggregate_slices=settings.hub_aggregate_slices,
+        aggregate_accuracy=settings.hub_aggregate_accuracy,
+        alert_store=alert_store,
+        alert_check_interval=settings.alert_check_interval_sec,
+        alert_reload_interval=settings.alert_rule_reload_sec if alert_reload else 0.0,
+    )
+
+
+def attach_feed_aggregates(hub: DataHub, session: Session) -> None:
+    """
+    Attach the rolling aggregates configured on enabled feeds.
+
+    Used by worker processes, whose hubs do not run feeds: FeedManager
+    attaches them where feeds run. Feeds with an invalid aggregates config
+    are skipped, as the feed runner refuses to start them.
+
+    Args:
+        hub: DataHub to attach them to
+        session: Database session
+    """
+    feed_defs = session.exec(
+        select(FeedDefinition).where(FeedDefinition.enabled == True)  # noqa: E712
+    ).all()
+    for feed_def in feed_defs:
+        try:
+            specs = AggregateSpec.from_config(json.loads(feed_def.config_json))
+        except (json.JSONDecodeError, AttributeError, ValueError) as e:
+            logger.error(f"Invalid aggregates config for feed {feed_def.id}: {e}")
+            continue
+        hub.set_aggregates(feed_def.id, specs)
+
+
+async def start_feeds(hub: DataHub) -> Tuple[FeedManager, HubSnapshot | None]:
+    """
+    Restore the last hub snapshot, then load and start all enabled feeds.
+
+    The snapshot is restored first so clients get data before feeds
+    produce new events.
+
+    Args:
+        hub: Started DataHub
+
+    Returns:
+        (FeedManager, HubSnapshot or None if snapshots are disabled)
+    """
+    # A feed runner has no WebSocket clients of its own, so it cannot tell
+    # which feeds workers' dashboards use
+    manager = FeedManager(
+        hub,
+        demand_driven=settings.feed_demand_driven and hub.relay is None,
+        grace_period=settings.feed_idle_grace_sec,
+    )
+    snapshot = None
+    with Session(engine) as session:
+        if settings.hub_snapshot_path:
+            snapshot = HubSnapshot(
+                hub, settings.hub_snapshot_path, interval=settings.hub_snapshot_interval_sec
+            )
+            enabled = session.exec(
+                select(FeedDefinition.id).where(FeedDefinition.enabled == True)  # noqa: E712
+            ).all()
+            snapshot.restore(feed_ids=enabled)
+            await snapshot.start()
+        await manager.load_feeds(session)
+    return manager, snapshot
+
+
+async def stop_feeds(manager: FeedManager | None, snapshot: HubSnapshot | None) -> None:
+    """
+    Save a final snapshot and stop all feeds.
+
+    Args:
+        manager: FeedManager, if started
+        snapshot: HubSnapshot, if enabled
+    """
+    # Snapshot before feeds are stopped, which clears their data
+    if snapshot:
+        await snapshot.stop()
+
+    if manager:
+        await manager.stop_all_feeds()
 
 
 @asynccontextmanager
-async def lifespan(app: FastAPI):
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
     """
     Lifespan context manager for startup and shutdown events.
+
+    With HUB_ROLE=worker, feeds are not run here: the hub is a replica fed
+    by the feed runner (python -m app.runner) over the relay socket.
     """
-    global hub, feed_manager
+    global hub, feed_manager, history_store, alert_store, hub_snapshot, relay
 
-    logger.info("Starting Pulseboard application...")
+    role = settings.hub_role
+    logger.info(f"Starting Pulseboard application (hub role: {role})...")
 
     # Create database tables
     create_db_and_tables()
     logger.info("Database initialized")
 
+    # Initialize durable history store
+    history_store = create_history_store(read_only=role == "worker")
+    if history_store:
+        await history_store.start()
+
+    # Initialize alert store
+    alert_store = create_alert_store(read_only=role == "worker")
+    await alert_store.start()
+
     # Initialize DataHub
-    hub = DataHub(history_window=timedelta(minutes=settings.history_window_minutes))
+    hub = create_hub(
+        history_store,
+        segments=role != "worker",
+        alert_store=alert_store,
+        alert_reload=role != "standalone",
+    )
+    await hub.start()
+    await hub.set_alert_rules(await alert_store.load_rules())
     logger.info("DataHub initialized")
 
     # Set hub in WebSocket router
     ws_router.set_hub(hub)
 
-    # Initialize FeedManager
-    feed_manager = FeedManager(hub)
-
-    # Load and start feeds
-    with Session(engine) as session:
-        await feed_manager.load_feeds(session)
+    if role == "worker":
+        # Attached first, so they take in the runner's history replay too
+        with Session(engine) as session:
+            attach_feed_aggregates(hub, session)
+        # Warmed by the runner's history replay on connect
+        relay = RelaySubscriber(hub, settings.hub_relay_socket)
+        await relay.start()
+    else:
+        await hub.load_history_from_store()
+        if role == "runner":
+            relay = RelayPublisher(hub, settings.hub_relay_socket, settings.hub_relay_queue_size)
+            hub.relay = relay
+            await relay.start()
+        feed_manager, hub_snapshot = await start_feeds(hub)
 
     logger.info("Application startup complete")
 
@@ -64,8 +267,19 @@ async def lifespan(app: FastAPI):
     # Shutdown
     logger.info("Shutting down application...")
 
-    if feed_manager:
-        await feed_manager.stop_all_feeds()
+    await stop_feeds(feed_manager, hub_snapshot)
+
+    if relay:
+        await relay.stop()
+
+    if hub:
+        await hub.stop()
+
+    if alert_store:
+        await alert_store.stop()
+
+    if history_store:
+        await history_store.stop()
 
     logger.info("Application shutdown complete")
 
@@ -87,11 +301,17 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Let the hub write pre-built WebSocket frames straight to the transport
+if settings.ws_raw_frames:
+    app.add_middleware(RawSendMiddleware)
+
 # Mount API routes
 app.include_router(dashboards.router, prefix="/api")
 app.include_router(feeds.router, prefix="/api")
 app.include_router(panels.router, prefix="/api")
 app.include_router(panels.standalone_router, prefix="/api")
+app.include_router(admin.router, prefix="/api")
+app.include_router(alerts.router, prefix="/api")
 
 # Mount WebSocket routes
 app.include_router(ws_router.router)
@@ -99,7 +319,7 @@ app.include_router(ws_router.router)
 
 # Health check endpoint
 @app.get("/health")
-def health_check():
+def health_check() -> Dict[str, str]:
     """Health check endpoint."""
     return {
         "status": "ok",
@@ -109,7 +329,7 @@ def health_check():
 
 
 @app.get("/")
-def root():
+def root() -> Dict[str, str]:
     """Root endpoint with API information."""
     return {
         "app": settings.app_name,
@@ -2,6 +2,16 @@
 Database models package.
 """
 
+from .alert import (
+    AlertEventRecord,
+    AlertKind,
+    AlertOperator,
+    AlertRule,
+    AlertRuleCreate,
+    AlertRuleRead,
+    AlertRuleUpdate,
+    AlertState,
+)
 from .dashboard import (
     Dashboard,
     DashboardCreate,
@@ -10,9 +20,19 @@ from .dashboard import (
     DashboardUpdate,
 )
 from .feed import FeedCreate, FeedDefinition, FeedRead, FeedUpdate
+from .history import FeedEventRecord
 from .panel import Panel, PanelCreate, PanelRead, PanelUpdate
 
 __all__ = [
+    # Alert
+    "AlertRule",
+    "AlertRuleCreate",
+    "AlertRuleRead",
+    "AlertRuleUpdate",
+    "AlertEventRecord",
+    "AlertKind",
+    "AlertOperator",
+    "AlertState",
     # Dashboard
     "Dashboard",
     "DashboardCreate",
@@ -24,6 +44,8 @@ __all__ = [
     "FeedCreate",
     "FeedRead",
     "FeedUpdate",
+    # History
+    "FeedEventRecord",
     # Panel
     "Panel",
     "PanelCreate",
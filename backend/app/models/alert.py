@@ -0,0 +1,112 @@
+"""
+Alert rule and alert event database models and schemas.
+"""
+
+from datetime import datetime, timezone
+from enum import Enum
+from typing import Optional
+from uuid import UUID, uuid4
+
+from pydantic import BaseModel, Field
+from sqlalchemy import Index
+from sqlmodel import Column, DateTime, SQLModel, func
+from sqlmodel import Field as SQLField
+
+
+class AlertKind(str, Enum):
+    """What an alert rule watches."""
+
+    # The value of a payload key crosses the threshold
+    THRESHOLD = "threshold"
+    # The per-second rate of change of a payload key crosses the threshold
+    RATE = "rate"
+    # A payload key has not been published for duration_sec
+    ABSENCE = "absence"
+
+
+class AlertOperator(str, Enum):
+    """Which side of the threshold breaches a rule."""
+
+    ABOVE = "above"
+    BELOW = "below"
+
+
+class AlertState(str, Enum):
+    """State of an alert rule."""
+
+    OK = "ok"
+    FIRING = "firing"
+
+
+class AlertRuleBase(SQLModel):
+    """Base alert rule model with common fields."""
+
+    name: str = SQLField(min_length=1, max_length=200)
+    feed_id: UUID = SQLField(index=True)
+    key: str = SQLField(min_length=1, max_length=200)
+    kind: AlertKind = SQLField(default=AlertKind.THRESHOLD)
+    operator: AlertOperator = SQLField(default=AlertOperator.ABOVE)
+    # Unused by absence rules
+    threshold: float = SQLField(default=0.0)
+    # Only used by absence rules
+    duration_sec: float = SQLField(default=60.0, gt=0)
+    enabled: bool = SQLField(default=True, index=True)
+
+
+class AlertRule(AlertRuleBase, table=True):
+    """Alert rule database model."""
+
+    __tablename__ = "alert_rules"
+
+    id: UUID = SQLField(default_factory=uuid4, primary_key=True)
+    created_at: datetime = SQLField(
+        default_factory=lambda: datetime.now(timezone.utc),
+        sa_column=Column(DateTime(timezone=True), server_default=func.now()),
+    )
+    updated_at: datetime = SQLField(
+        default_factory=lambda: datetime.now(timezone.utc),
+        sa_column=Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now()),
+    )
+
+
+class AlertRuleCreate(AlertRuleBase):
+    """Schema for creating an alert rule."""
+
+    pass
+
+
+class AlertRuleUpdate(BaseModel):
+    """Schema for updating an alert rule."""
+
+    name: Optional[str] = Field(default=None, min_length=1, max_length=200)
+    key: Optional[str] = Field(default=None, min_length=1, max_length=200)
+    kind: Optional[AlertKind] = None
+    operator: Optional[AlertOperator] = None
+    threshold: Optional[float] = None
+    duration_sec: Optional[float] = Field(default=None, gt=0)
+    enabled: Optional[bool] = None
+
+
+class AlertRuleRead(AlertRuleBase):
+    """Schema for reading an alert rule, with its current state."""
+
+    id: UUID
+    created_at: datetime
+    updated_at: datetime
+    state: AlertState = AlertState.OK
+
+
+class AlertEventRecord(SQLModel, table=True):
+    """A state transition of an alert rule."""
+
+    __tablename__ = "alert_events"
+    __table_args__ = (Index("ix_alert_events_rule_ts", "rule_id", "ts"),)
+
+    id: int | None = SQLField(default=None, primary_key=True)
+    rule_id: UUID
+    feed_id: UUID = SQLField(index=True)
+    state: AlertState
+    # Value (or rate) that caused the transition; None for absence rules
+    value: float | None = None
+    # Naive UTC, like hub event timestamps
+    ts: datetime = SQLField(sa_column=Column(DateTime(timezone=False), nullable=False, index=True))
@@ -0,0 +1,23 @@
+"""
+Persisted feed event history database model.
+"""
+
+from datetime import datetime
+from uuid import UUID
+
+from sqlalchemy import Index
+from sqlmodel import Column, DateTime, SQLModel
+from sqlmodel import Field as SQLField
+
+
+class FeedEventRecord(SQLModel, table=True):
+    """A feed event written to the durable history store."""
+
+    __tablename__ = "feed_event_history"
+    __table_args__ = (Index("ix_feed_event_history_feed_ts", "feed_id", "ts"),)
+
+    id: int | None = SQLField(default=None, primary_key=True)
+    feed_id: UUID
+    # Naive UTC, like hub event timestamps
+    ts: datetime = SQLField(sa_column=Column(DateTime(timezone=False), nullable=False, index=True))
+    payload_json: str = SQLField(default="{}")
@@ -0,0 +1,84 @@
+"""
+Feed runner process for multi-worker deployments.
+
+Runs the FeedManager and publishes every feed event over the relay socket,
+so uvicorn can serve WebSocket clients from several worker processes
+(HUB_ROLE=worker) without each one polling every feed again:
+
+    python -m app.runner
+    HUB_ROLE=worker uvicorn app.main:app --workers 4
+"""
+
+import asyncio
+import logging
+import signal
+
+from app.core.config import settings
+from app.db.base import create_db_and_tables
+from app.hub.relay import RelayPublisher
+from app.main import (
+    create_alert_store,
+    create_history_store,
+    create_hub,
+    start_feeds,
+    stop_feeds,
+)
+
+logger = logging.getLogger(__name__)
+
+
+async def run(stop: asyncio.Event | None = None) -> None:
+    """
+    Run feeds and relay their events until stopped.
+
+    Args:
+        stop: Event that ends the run (defaults to SIGINT/SIGTERM)
+    """
+    if stop is None:
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop.set)
+
+    logger.info("Starting Pulseboard feed runner...")
+    create_db_and_tables()
+
+    history_store = create_history_store()
+    if history_store:
+        await history_store.start()
+
+    alert_store = create_alert_store()
+    await alert_store.start()
+
+    hub = create_hub(history_store, alert_store=alert_store, alert_reload=True)
+    await hub.start()
+    await hub.set_alert_rules(await alert_store.load_rules())
+    await hub.load_history_from_store()
+
+    relay = RelayPublisher(hub, settings.hub_relay_socket, settings.hub_relay_queue_size)
+    hub.relay = relay
+    await relay.start()
+
+    feed_manager, snapshot = await start_feeds(hub)
+    logger.info("Feed runner started")
+
+    try:
+        await stop.wait()
+    finally:
+        logger.info("Shutting down feed runner...")
+        await stop_feeds(feed_manager, snapshot)
+        await relay.stop()
+        await hub.stop()
+        await alert_store.stop()
+        if history_store:
+            await history_store.stop()
+        logger.info("Feed runner stopped")
+
+
+def main() -> None:
+    """Entry point for python -m app.runner."""
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+"""
+Encode-once WebSocket broadcast.
+
+A message is encoded once and shared by every recipient as a Frame; by
+default it is sent through the public WebSocket.send_text() API, which
+still frames it per connection.
+
+Optionally (WS_RAW_FRAMES), the frame bytes are also built once and written
+straight to each connection's transport, in the spirit of
+websockets.broadcast(). This relies on uvicorn and websockets internals, so
+it is off by default and only used with the versions it has been tested
+against (_RAW_FRAME_VERSIONS). Raw writes are further limited to uvicorn's
+websockets-based protocols with no WebSocket extension negotiated:
+per-message compression rewrites every frame, so a compressed connection
+(uvicorn's default; disable with --ws-per-message-deflate false) falls back
+to a normal send_text().
+"""
+
+import asyncio
+import logging
+import struct
+from functools import lru_cache
+from importlib.metadata import PackageNotFoundError, version
+from typing import Any
+
+from fastapi import WebSocket
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+# ASGI scope key holding the server's own send callable
+RAW_SEND_SCOPE_KEY = "pulseboard.raw_send"
+
+# FIN bit set, opcode 0x1 (text)
+_TEXT_FRAME_HEADER = 0x81
+
+# Pause raw writes while the transport buffers more than this many bytes
+_WRITE_BUFFER_HIGH_WATER = 256 * 1024
+
+# Server package versions (major.minor prefixes) raw writes are tested with
+_RAW_FRAME_VERSIONS = {"uvicorn": ("0.54",), "websockets": ("17.",)}
+
+
+@lru_cache(maxsize=1)
+def raw_frames_supported() -> bool:
+    """
+    Check whether the installed server versions are known to allow raw writes.
+
+    Returns:
+        True if uvicorn and websockets match the tested versions
+    """
+    for package, prefixes in _RAW_FRAME_VERSIONS.items():
+        try:
+            installed = version(package)
+        except PackageNotFoundError:
+            installed = "not installed"
+        if not installed.startswith(prefixes):
+            logger.warning(
+                f"Raw WebSocket frame writes disabled: {package} {installed} is not "
+                f"a tested version ({', '.join(prefixes)})"
+            )
+            return False
+    return True
+
+
+def build_text_frame(data: bytes) -> bytes:
+    """
+    Build an unmasked, unfragmented server-to-client text frame.
+
+    Args:
+        data: UTF-8 encoded message
+
+    Returns:
+        Complete WebSocket frame bytes
+    """
+    length = len(data)
+    if length < 126:
+        header = struct.pack("!BB", _TEXT_FRAME_HEADER, length)
+    elif length < 1 << 16:
+        header = struct.pack("!BBH", _TEXT_FRAME_HEADER, 126, length)
+    else:
+        header = struct.pack("!BBQ", _TEXT_FRAME_HEADER, 127, length)
+    return header + data
+
+
+class Frame:
+    """
+    An outbound text message shared by every recipient.
+
+    The decoded text (for send_text fallbacks) and the WebSocket frame (for
+    raw transport writes) are each built at most once, on first use.
+    """
+
+    __slots__ = ("data", "_text", "_frame")
+
+    def __init__(self, data: bytes | str):
+        """
+        Initialize frame.
+
+        Args:
+            data: Message as UTF-8 bytes or text
+        """
+        if isinstance(data, str):
+            self._text: str | None = data
+            self.data = data.encode("utf-8")
+        else:
+            self._text = None
+            self.data = data
+        self._frame: bytes | None = None
+
+    @property
+    def text(self) -> str:
+        """Message as text."""
+        if self._text is None:
+            self._text = self.data.decode("utf-8")
+        return self._text
+
+    @property
+    def frame(self) -> bytes:
+        """Message as a complete WebSocket text frame."""
+        if self._frame is None:
+            self._frame = build_text_frame(self.data)
+        return self._frame
+
+
+class RawSendMiddleware:
+    """
+    ASGI middleware that records the server's send callable in the scope.
+
+    Starlette wraps send in several layers; keeping the original lets
+    RawTransport find the server protocol behind a WebSocket.
+    """
+
+    def __init__(self, app: ASGIApp):
+        """
+        Initialize middleware.
+
+        Args:
+            app: Wrapped ASGI application
+        """
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Handle an ASGI request."""
+        if scope["type"] == "websocket":
+            scope[RAW_SEND_SCOPE_KEY] = send
+        await self.app(scope, receive, send)
+
+
+class RawTransport:
+    """Direct frame writer for a WebSocket served by a supported server."""
+
+    def __init__(self, protocol: Any, transport: asyncio.Transport):
+        """
+        Initialize raw transport.
+
+        Args:
+            protocol: Server protocol instance owning the connection
+            transport: asyncio transport of the connection
+        """
+        self.protocol = protocol
+        self.transport = transport
+
+    @classmethod
+    def resolve(cls, websocket: WebSocket) -> "RawTransport | None":
+        """
+        Find the raw transport behind a Starlette WebSocket.
+
+        Args:
+            websocket: Accepted WebSocket connection
+
+        Returns:
+            RawTransport, or None if frames cannot be written directly
+        """
+        if not isinstance(websocket, WebSocket) or not raw_frames_supported():
+            return None
+
+        send = websocket.scope.get(RAW_SEND_SCOPE_KEY)
+        protocol = getattr(send, "__self__", None)
+        transport = getattr(protocol, "transport", None)
+        if transport is None or not hasattr(transport, "write"):
+            return None
+
+        # websockets sans-I/O implementation keeps the connection in .conn,
+        # the legacy implementation is the connection itself
+        connection = getattr(protocol, "conn", protocol)
+        extensions = getattr(connection, "extensions", None)
+        if extensions is None or getattr(connection, "state", None) is None:
+            return None
+        if extensions:
+            # Negotiated extensions (e.g. permessage-deflate) transform frames
+            return None
+
+        return cls(protocol, transport)
+
+    def is_open(self) -> bool:
+        """
+        Check whether frames can be written now.
+
+        The legacy implementation finishes the handshake, and negotiates
+        extensions, only after accept() returns; until the connection is
+        open, and for good if an extension was negotiated, callers must use
+        send_text().
+        """
+        if self.transport.is_closing():
+            return False
+        if getattr(self.protocol, "close_sent", False) or getattr(
+            self.protocol, "disconnected", False
+        ):
+            return False
+        connection = getattr(self.protocol, "conn", self.protocol)
+        return getattr(connection.state, "name", "") == "OPEN" and not connection.extensions
+
+    def write(self, frame: bytes) -> None:
+        """
+        Write a complete frame.
+
+        Args:
+            frame: Frame bytes from build_text_frame
+
+        Raises:
+            ConnectionError: If the connection is closing
+        """
+        if not self.is_open():
+            raise ConnectionError("WebSocket is closed")
+        self.transport.write(frame)
+
+    async def drain(self) -> None:
+        """Wait while the transport's write buffer is over its high-water mark."""
+        writable = getattr(self.protocol, "writable", None)
+        if isinstance(writable, asyncio.Event):
+            await writable.wait()
+            return
+        while (
+            self.transport.get_write_buffer_size() > _WRITE_BUFFER_HIGH_WATER
+            and not self.transport.is_closing()
+        ):
+            await asyncio.sleep(0.01)
@@ -4,12 +4,15 @@ WebSocket router for dashboard streaming.
 
 import json
 import logging
+from typing import Dict
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect, status
+from fastapi import APIRouter, Depends, WebSocket, WebSocketDisconnect, status
 
 from app.api.deps import SessionDep
+from app.core.config import settings
 from app.hub.hub import DataHub
+from app.hub.projection import dashboard_projection
 from app.models import Dashboard
 
 logger = logging.getLogger(__name__)
@@ -31,6 +34,26 @@ def get_hub() -> DataHub:
     return _hub
 
 
+def parse_resume(value: str) -> Dict[UUID, int]:
+    """
+    Parse the resume query parameter.
+
+    Args:
+        value: Comma-separated "<feed_id>:<seq>" pairs
+
+    Returns:
+        Last sequence number received per feed
+
+    Raises:
+        ValueError: If a pair is malformed
+    """
+    seqs = {}
+    for pair in filter(None, value.split(",")):
+        feed_id, _, seq = pair.partition(":")
+        seqs[UUID(feed_id)] = int(seq)
+    return seqs
+
+
 router = APIRouter()
 
 
@@ -40,12 +63,29 @@ async def websocket_dashboard(
     dashboard_id: UUID,
     session: SessionDep,
     hub: DataHub = Depends(get_hub),
-):
+) -> None:
     """
     WebSocket endpoint for real-time dashboard updates.
 
     Accepts connection, registers with DataHub, and keeps connection alive.
     DataHub will send feed updates to this connection.
+
+    Connect with ?delta=1 to receive feed_delta messages with only changed
+    payload keys (see app.hub.delta); send {"type": "resync"} (optionally
+    with "feed_ids") to get full feed state again.
+
+    Connect with ?max_rate=N, or send {"type": "set_rate", "max_rate": N},
+    to receive at most N updates per second per feed, always the latest
+    (null or 0 removes the limit).
+
+    Feed payloads are cut down to the keys the dashboard's panels show
+    (see app.hub.projection) unless WS_PAYLOAD_PROJECTION is off.
+
+    Every feed_update carries a per-feed "seq", and the first snapshot an
+    "epoch". To pick up where a dropped connection left off, reconnect with
+    ?epoch=E&resume=<feed_id>:<seq>,... (or send {"type": "resume", "epoch":
+    E, "seqs": {"<feed_id>": seq}}) to get only the missed updates; feeds
+    listed in the snapshot's "resync_required" start over instead.
     """
     try:
         # Verify dashboard exists
@@ -54,24 +94,61 @@ async def websocket_dashboard(
             await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
             return
 
-        # Get feed IDs used by this dashboard
+        # Get feed IDs used by this dashboard, and what each panel shows
         feed_ids = set()
+        panels = []
         for panel in dashboard.panels:
+            panel_ids = set()
             try:
                 panel_feed_ids = json.loads(panel.feed_ids_json)
                 for feed_id_str in panel_feed_ids:
                     try:
-                        feed_ids.add(UUID(feed_id_str))
+                        panel_ids.add(UUID(feed_id_str))
                     except ValueError:
                         logger.warning(f"Invalid feed ID in panel {panel.id}: {feed_id_str}")
             except json.JSONDecodeError:
                 logger.warning(f"Invalid feed_ids_json in panel {panel.id}")
+            feed_ids |= panel_ids
+
+            try:
+                options = json.loads(panel.options_json)
+            except json.JSONDecodeError:
+                options = None
+            if isinstance(options, dict):
+                panels.append((panel.type, options, panel_ids))
+            else:
+                # Unreadable options: send this panel's feeds in full
+                panels.append(("", {}, panel_ids))
 
         # Accept connection
         await websocket.accept()
 
         # Register with DataHub
-        await hub.register_connection(dashboard_id, websocket, feed_ids)
+        delta = websocket.query_params.get("delta", "").lower() in ("1", "true")
+        max_rate = None
+        if "max_rate" in websocket.query_params:
+            try:
+                max_rate = float(websocket.query_params["max_rate"])
+            except ValueError:
+                logger.warning(f"Invalid max_rate: {websocket.query_params['max_rate']}")
+        resume = None
+        if "resume" in websocket.query_params:
+            try:
+                resume = parse_resume(websocket.query_params["resume"])
+            except ValueError:
+                logger.warning(f"Invalid resume: {websocket.query_params['resume']}")
+                resume = {}
+        projection = dashboard_projection(panels) if settings.ws_payload_projection else None
+        await hub.register_connection(
+            dashboard_id,
+            websocket,
+            feed_ids,
+            delta=delta,
+            max_rate=max_rate,
+            projection=projection,
+            epoch=websocket.query_params.get("epoch"),
+            resume=resume,
+        )
 
         logger.info(
             f"WebSocket connected for dashboard {dashboard_id} with {len(feed_ids)} feeds"
@@ -88,8 +165,23 @@ async def websocket_dashboard(
                     message = json.loads(data)
                     if message.get("type") == "ping":
                         await websocket.send_text(json.dumps({"type": "pong"}))
-                except json.JSONDecodeError:
-                    logger.warning(f"Invalid JSON from client: {data}")
+                    elif message.get("type") == "resync":
+                        requested = message.get("feed_ids")
+                        await hub.resync(
+                            websocket,
+                            {UUID(f) for f in requested} if requested is not None else None,
+                        )
+                    elif message.get("type") == "resume":
+                        await hub.resume(
+                            websocket,
+                            message.get("epoch"),
+                            {UUID(f): int(seq) for f, seq in message.get("seqs", {}).items()},
+                        )
+                    elif message.get("type") == "set_rate":
+                        rate = message.get("max_rate")
+                        hub.set_max_rate(websocket, float(rate) if rate is not None else None)
+                except (json.JSONDecodeError, AttributeError, TypeError, ValueError):
+                    logger.warning(f"Invalid message from client: {data}")
 
         except WebSocketDisconnect:
             logger.info(f"WebSocket disconnected for dashboard {dashboard_id}")
@@ -0,0 +1,74 @@
+"""
+Benchmark feed event serialization on the broadcast path.
+
+Compares building a pydantic FeedEventMessage and calling model_dump_json()
+against the fast-path serializers in app.hub.serialization.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_serialization [--events N]
+"""
+
+import argparse
+import timeit
+from datetime import datetime
+from uuid import uuid4
+
+from app.hub.events import FeedEvent, FeedEventMessage
+from app.hub.serialization import SERIALIZERS, FeedEventEncoder
+
+PAYLOADS = {
+    "system_metrics": {
+        "cpu_percent": 12.3,
+        "memory_percent": 45.6,
+        "memory_used_gb": 7.8,
+        "memory_total_gb": 16.0,
+        "net_bytes_sent": 123456789,
+        "net_bytes_recv": 987654321,
+    },
+    "crypto_price": {"coin_id": "bitcoin", "vs_currency": "usd", "price": 67123.45},
+    "http_json": {
+        f"field_{i}": {"value": i * 1.5, "label": f"item {i}", "ok": i % 2 == 0}
+        for i in range(50)
+    },
+}
+
+
+def pydantic_model(event: FeedEvent) -> bytes:
+    """Baseline: the previous broadcast path."""
+    return FeedEventMessage.from_feed_event(event).model_dump_json().encode("utf-8")
+
+
+def main() -> None:
+    """Run the benchmark and print per-event timings."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--events", type=int, default=50000, help="events per measurement")
+    args = parser.parse_args()
+
+    for payload_name, payload in PAYLOADS.items():
+        event = FeedEvent(feed_id=uuid4(), ts=datetime.utcnow(), payload=payload)
+        baseline = min(
+            timeit.repeat(
+                lambda event=event: pydantic_model(event), number=args.events, repeat=3
+            )
+        )
+
+        print(f"\n{payload_name} ({len(pydantic_model(event))} bytes)")
+        print(f"  {'pydantic model':<16} {baseline / args.events * 1e6:8.2f} us/event   1.00x")
+
+        for name in sorted(SERIALIZERS):
+            encoder = FeedEventEncoder(name)
+            elapsed = min(
+                timeit.repeat(
+                    lambda encoder=encoder, event=event: encoder.encode(event),
+                    number=args.events,
+                    repeat=3,
+                )
+            )
+            print(
+                f"  {name:<16} {elapsed / args.events * 1e6:8.2f} us/event "
+                f"{baseline / elapsed:6.2f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+Shared test fixtures.
+"""
+
+import json
+from datetime import datetime, timedelta
+from typing import Any, Callable, List
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.hub.events import FeedEvent
+
+BASE_TS = datetime(2024, 1, 1, 12, 0, 0)
+
+
+@pytest.fixture
+def make_event() -> Callable[..., FeedEvent]:
+    """Factory for events at BASE_TS + seconds."""
+
+    def make(feed_id, seconds: float, payload: dict) -> FeedEvent:
+        return FeedEvent(
+            feed_id=feed_id, ts=BASE_TS + timedelta(seconds=seconds), payload=payload
+        )
+
+    return make
+
+
+@pytest.fixture
+def make_websocket() -> Callable[[], MagicMock]:
+    """Factory for mock WebSockets that record sent messages."""
+
+    def make() -> MagicMock:
+        websocket = MagicMock()
+        websocket.send_text = AsyncMock()
+        return websocket
+
+    return make
+
+
+@pytest.fixture
+def sent_messages() -> Callable[[MagicMock], List[Any]]:
+    """Decoder for every message sent to a mock WebSocket."""
+
+    def decode(websocket: MagicMock) -> List[Any]:
+        return [json.loads(call.args[0]) for call in websocket.send_text.call_args_list]
+
+    return decode
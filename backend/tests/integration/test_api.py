@@ -12,7 +12,7 @@ from sqlmodel.pool import StaticPool
 
 from app.api.deps import get_session
 from app.db.base import SQLModel
-from app.main import app
+from app.main import app, attach_feed_aggregates
 from app.models import Dashboard, FeedDefinition, Panel
 
 
@@ -268,6 +268,129 @@ class TestFeedAPI:
         assert deleted is None
 
 
+    def test_get_feed_history_downsampled(self, client: TestClient, session: Session):
+        """Test fetching downsampled in-memory history for a feed."""
+        from datetime import datetime, timedelta
+
+        from app.hub.events import FeedEvent
+        from app.hub.history import HistoryBuffer
+        from app.hub.hub import DataHub
+        from app.ws import router as ws_router
+
+        feed = FeedDefinition(type="system_metrics", name="History Feed", config_json="{}")
+        session.add(feed)
+        session.commit()
+
+        hub = DataHub()
+        ws_router.set_hub(hub)
+        buffer = HistoryBuffer(feed.id)
+        start = datetime(2024, 1, 1)
+        for i in range(1000):
+            buffer.append(
+                FeedEvent(
+                    feed_id=feed.id,
+                    ts=start + timedelta(seconds=i),
+                    payload={"cpu": float(i % 100), "host": "a"},
+                )
+            )
+        hub.history[feed.id] = buffer
+
+        response = client.get(f"/api/feeds/{feed.id}/history?mode=minmax&points=50")
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["mode"] == "minmax"
+        assert list(data["series"]) == ["cpu"]
+        assert len(data["series"]["cpu"]["values"]) <= 50
+        assert min(data["series"]["cpu"]["values"]) == 0.0
+        assert max(data["series"]["cpu"]["values"]) == 99.0
+
+    def test_get_feed_aggregates(self, client: TestClient, session: Session):
+        """Test reading a feed's rolling aggregates, seeded from history."""
+        import asyncio
+
+        from app.hub.hub import DataHub
+        from app.ws import router as ws_router
+
+        config = {"aggregates": [{"key": "cpu", "window_minutes": 5, "quantiles": [0.5]}]}
+        feed = FeedDefinition(
+            type="system_metrics", name="Aggregate Feed", config_json=json.dumps(config)
+        )
+        session.add(feed)
+        session.commit()
+
+        hub = DataHub()
+        ws_router.set_hub(hub)
+        for value in (10.0, 20.0, 30.0):
+            asyncio.run(hub.publish_feed_event(feed.id, {"cpu": value}))
+        # Reading them does not attach them
+        assert client.get(f"/api/feeds/{feed.id}/aggregates").json()["aggregates"] == []
+        attach_feed_aggregates(hub, session)
+
+        response = client.get(f"/api/feeds/{feed.id}/aggregates")
+
+        assert response.status_code == 200
+        (aggregate,) = response.json()["aggregates"]
+        assert aggregate["name"] == "cpu_5m"
+        assert (aggregate["count"], aggregate["min"], aggregate["max"]) == (3, 10.0, 30.0)
+        assert aggregate["mean"] == 20.0
+        assert abs(aggregate["quantiles"]["p50"] - 20.0) <= 0.2
+
+    def test_attach_feed_aggregates(self, session: Session):
+        """Test that only valid aggregates of enabled feeds are attached."""
+        from app.hub.hub import DataHub
+
+        config = json.dumps({"aggregates": [{"key": "cpu", "window_minutes": 1}]})
+        enabled = FeedDefinition(type="system_metrics", name="Enabled", config_json=config)
+        disabled = FeedDefinition(
+            type="system_metrics", name="Disabled", config_json=config, enabled=False
+        )
+        invalid = FeedDefinition(
+            type="system_metrics",
+            name="Invalid",
+            config_json=json.dumps({"aggregates": [{"key": "cpu"}]}),
+        )
+        session.add_all([enabled, disabled, invalid])
+        session.commit()
+
+        hub = DataHub()
+        attach_feed_aggregates(hub, session)
+
+        assert list(hub.aggregates) == [enabled.id]
+        ((spec, _),) = hub.get_aggregates(enabled.id)
+        assert spec.name == "cpu_1m"
+
+    def test_test_derived_feed(self, client: TestClient, session: Session):
+        """Test that testing a derived feed computes it from the live hub."""
+        import asyncio
+
+        from app.hub.hub import DataHub
+        from app.ws import router as ws_router
+
+        source = uuid4()
+        config = {"inputs": {"s": str(source)}, "expression": "s.cpu * 2"}
+        feed = FeedDefinition(type="derived", name="Derived", config_json=json.dumps(config))
+        session.add(feed)
+        session.commit()
+
+        hub = DataHub()
+        ws_router.set_hub(hub)
+        asyncio.run(hub.publish_feed_event(source, {"cpu": 21.0}))
+
+        response = client.post(f"/api/feeds/{feed.id}/test")
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["success"] is True
+        assert data["data"] == {"value": 42.0}
+
+    def test_get_feed_history_not_found(self, client: TestClient):
+        """Test fetching history for a missing feed."""
+        response = client.get(f"/api/feeds/{uuid4()}/history")
+
+        assert response.status_code == 404
+
+
 class TestPanelAPI:
     """Tests for panel API endpoints."""
 
@@ -355,3 +478,116 @@ class TestPanelAPI:
         assert response.status_code == 200
         data = response.json()
         assert data["title"] == "Test Panel"
+
+
+class TestAlertAPI:
+    """Tests for alert API endpoints."""
+
+    def test_alert_rule_lifecycle(self, client: TestClient, session: Session):
+        """Test creating a rule, seeing it fire, and reading its recorded events."""
+        import asyncio
+
+        from app.hub.alerts import AlertStore
+        from app.hub.hub import DataHub
+        from app.ws import router as ws_router
+
+        feed = FeedDefinition(type="system_metrics", name="Alert Feed")
+        session.add(feed)
+        session.commit()
+
+        store = AlertStore(session.get_bind())
+        hub = DataHub(alert_store=store)
+        ws_router.set_hub(hub)
+
+        response = client.post(
+            "/api/alerts/rules",
+            json={"name": "High CPU", "feed_id": str(feed.id), "key": "cpu", "threshold": 90},
+        )
+        assert response.status_code == 201
+        rule = response.json()
+        assert (rule["kind"], rule["operator"], rule["state"]) == ("threshold", "above", "ok")
+
+        asyncio.run(hub.publish_feed_event(feed.id, {"cpu": 95.0}))
+        assert client.get(f"/api/alerts/rules/{rule['id']}").json()["state"] == "firing"
+
+        # Disabling a firing rule resolves it
+        response = client.patch(f"/api/alerts/rules/{rule['id']}", json={"enabled": False})
+        assert response.json()["state"] == "ok"
+        asyncio.run(store.flush())
+
+        response = client.get("/api/alerts/events", params={"rule_id": rule["id"]})
+
+        assert response.status_code == 200
+        events = response.json()
+        assert [event["state"] for event in events] == ["ok", "firing"]
+        assert events[1]["value"] == 95.0
+
+        assert client.delete(f"/api/alerts/rules/{rule['id']}").status_code == 204
+        assert client.get("/api/alerts/rules").json() == []
+
+    def test_create_alert_rule_unknown_feed(self, client: TestClient):
+        """Test that rules must watch an existing feed."""
+        response = client.post(
+            "/api/alerts/rules",
+            json={"name": "Missing", "feed_id": str(uuid4()), "key": "cpu"},
+        )
+
+        assert response.status_code == 400
+
+
+class TestAdminAPI:
+    """Tests for admin API endpoints."""
+
+    def test_list_connections(self, client: TestClient):
+        """Test listing per-connection queue statistics."""
+        from unittest.mock import AsyncMock, MagicMock
+
+        from app.hub.connection import ClientConnection
+        from app.hub.hub import DataHub
+        from app.ws import router as ws_router
+
+        hub = DataHub()
+        ws_router.set_hub(hub)
+        dashboard_id = uuid4()
+        websocket = MagicMock()
+        websocket.send_text = AsyncMock()
+        hub.connections[dashboard_id].append(websocket)
+        hub.clients[id(websocket)] = ClientConnection(
+            dashboard_id, websocket, on_close=MagicMock()
+        )
+
+        response = client.get("/api/admin/connections")
+
+        assert response.status_code == 200
+        data = response.json()
+        assert len(data) == 1
+        assert data[0]["dashboard_id"] == str(dashboard_id)
+        assert data[0]["queue_depth"] == 0
+        assert data[0]["policy"] == "drop_oldest"
+        assert data[0]["raw_sent"] == 0
+
+    def test_get_history_accounting(self, client: TestClient):
+        """Test history memory accounting."""
+        import asyncio
+
+        from app.hub.hub import DataHub
+        from app.ws import router as ws_router
+
+        hub = DataHub(history_compression=True, history_block_size=4)
+        ws_router.set_hub(hub)
+        feed_id = uuid4()
+        for i in range(10):
+            asyncio.run(hub.publish_feed_event(feed_id, {"v": i}))
+
+        response = client.get("/api/admin/history")
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["budget_bytes"] is None
+        assert data["used_bytes"] == data["feeds"][0]["bytes"]
+        feed = data["feeds"][0]
+        assert feed["feed_id"] == str(feed_id)
+        assert feed["compressed"] is True
+        assert feed["events"] == 10
+        assert feed["bytes_per_point"] > 0
+        assert feed["evicted"] == 0
@@ -0,0 +1,77 @@
+"""
+Integration tests for raw WebSocket frame writes against a real uvicorn server.
+"""
+
+import asyncio
+import json
+from typing import List
+from uuid import uuid4
+
+import pytest
+import uvicorn
+from fastapi import FastAPI, WebSocket
+from websockets.asyncio.client import connect
+
+from app.hub.connection import ClientConnection
+from app.ws.broadcast import Frame, RawSendMiddleware
+
+MESSAGES = [{"n": i} for i in range(5)] + [{"big": "x" * 70_000}]
+
+
+def make_app(clients: List[ClientConnection]) -> FastAPI:
+    """Create an app that sends MESSAGES through a raw-frame ClientConnection."""
+    app = FastAPI()
+    app.add_middleware(RawSendMiddleware)
+
+    @app.websocket("/ws")
+    async def endpoint(websocket: WebSocket) -> None:
+        await websocket.accept()
+        client = ClientConnection(uuid4(), websocket, on_close=lambda c: None, raw_frames=True)
+        clients.append(client)
+        frames = [Frame(json.dumps(message)) for message in MESSAGES]
+        assert await client.send_now(frames[0])
+        assert await client.send_frames(frames[1:])
+        # Keep the connection open until the client has read everything
+        await websocket.receive_text()
+
+    return app
+
+
+@pytest.mark.parametrize("ws", ["websockets", "websockets-sansio"])
+@pytest.mark.parametrize("deflate", [False, True])
+async def test_raw_frames_through_uvicorn(ws: str, deflate: bool):
+    """Test that clients receive raw-written frames intact, or send_text when compressed."""
+    clients: List[ClientConnection] = []
+    config = uvicorn.Config(
+        make_app(clients),
+        host="127.0.0.1",
+        port=0,
+        ws=ws,
+        ws_per_message_deflate=deflate,
+        lifespan="off",
+        log_level="warning",
+    )
+    server = uvicorn.Server(config)
+    task = asyncio.create_task(server.serve())
+    try:
+        while not server.started:
+            await asyncio.sleep(0.01)
+        port = server.servers[0].sockets[0].getsockname()[1]
+
+        compression = "deflate" if deflate else None
+        async with connect(f"ws://127.0.0.1:{port}/ws", compression=compression) as websocket:
+            received = [json.loads(await websocket.recv()) for _ in MESSAGES]
+            await websocket.send("done")
+    finally:
+        server.should_exit = True
+        await task
+
+    assert received == MESSAGES
+    (client,) = clients
+    stats = client.stats()
+    assert stats["sent"] == len(MESSAGES)
+    # Compressed connections fall back to send_text
+    if deflate:
+        assert stats["raw_sent"] == 0
+    else:
+        assert stats["raw_sent"] >= len(MESSAGES) - 1
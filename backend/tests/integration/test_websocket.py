@@ -112,6 +112,7 @@ class TestWebSocketDataFlow:
             type="stat",
             title="Test Panel",
             feed_ids_json=json.dumps([str(feed.id)]),
+            options_json=json.dumps({"field": "cpu"}),
             position_x=0,
             position_y=0,
         )
@@ -131,8 +132,8 @@ class TestWebSocketDataFlow:
 
             assert data["type"] == "feed_update"
             assert data["feed_id"] == str(feed.id)
-            assert data["payload"]["cpu"] == 50.5
-            assert data["payload"]["ram"] == 70.2
+            # Only the key the stat panel shows is sent
+            assert data["payload"] == {"cpu": 50.5}
 
     @pytest.mark.asyncio
     async def test_only_relevant_feeds_broadcast(
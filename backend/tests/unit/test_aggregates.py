@@ -0,0 +1,180 @@
+"""
+Unit tests for rolling aggregates.
+"""
+
+import random
+import statistics
+from datetime import timedelta
+from uuid import uuid4
+
+import pytest
+
+from app.feeds.aggregate import AggregateFeed
+from app.hub.aggregates import (
+    AggregateSpec,
+    QuantileSketch,
+    RollingAggregate,
+    aggregate_payload,
+)
+from app.hub.hub import DataHub
+
+SECOND = 1_000_000
+
+
+class TestQuantileSketch:
+    """Tests for QuantileSketch."""
+
+    def test_relative_accuracy(self):
+        """Test that quantile estimates stay within the relative error."""
+        rng = random.Random(7)
+        values = [rng.lognormvariate(3, 1) for _ in range(5000)] + [0.0, -5.0]
+        sketch = QuantileSketch(relative_accuracy=0.01)
+        for value in values:
+            sketch.add(value)
+
+        ordered = sorted(values)
+        for q in (0.5, 0.95, 0.99):
+            exact = ordered[int(q * (len(ordered) - 1))]
+            assert abs(sketch.quantile(q) - exact) <= 0.01 * abs(exact)
+        assert sketch.quantile(0.0) == pytest.approx(-5.0, rel=0.01)
+
+    def test_subtract(self):
+        """Test that removing a subset leaves the rest's quantiles."""
+        total = QuantileSketch()
+        old = QuantileSketch()
+        for value in range(1, 101):
+            total.add(float(value))
+            if value <= 50:
+                old.add(float(value))
+
+        total.subtract(old)
+
+        assert total.count == 50
+        assert total.quantile(0.0) == pytest.approx(51.0, rel=0.01)
+        assert QuantileSketch().quantile(0.5) is None
+
+
+class TestAggregateSpec:
+    """Tests for AggregateSpec."""
+
+    def test_from_config(self):
+        """Test reading aggregates from feed config."""
+        specs = AggregateSpec.from_config(
+            {
+                "aggregates": [
+                    {"key": "cpu", "window_minutes": 5},
+                    {"key": "latency", "window_minutes": 60, "quantiles": [0.95]},
+                ]
+            }
+        )
+
+        assert [spec.name for spec in specs] == ["cpu_5m", "latency_1h"]
+        assert specs[1].quantiles == (0.95,)
+        assert AggregateSpec.from_config({"interval_sec": 5}) == []
+
+    @pytest.mark.parametrize(
+        "entry",
+        [
+            {"window_minutes": 5},
+            {"key": "cpu", "window_minutes": 0},
+            {"key": "cpu", "window_minutes": 5, "quantiles": [1.5]},
+            "cpu",
+        ],
+    )
+    def test_rejects_invalid_entries(self, entry):
+        """Test that malformed entries are rejected."""
+        with pytest.raises(ValueError):
+            AggregateSpec.from_config({"aggregates": [entry]})
+
+
+class TestRollingAggregate:
+    """Tests for RollingAggregate."""
+
+    def test_statistics(self):
+        """Test count, sum, min, max, mean and variance of the window."""
+        aggregate = RollingAggregate(AggregateSpec("v", timedelta(minutes=1)), slices=6)
+        values = [3.0, 1.0, 4.0, 1.0, 5.0, 9.0, 2.0, 6.0]
+        for i, value in enumerate(values):
+            aggregate.add(i * 5 * SECOND, value)
+
+        result = aggregate.result()
+
+        assert result["count"] == len(values)
+        assert result["sum"] == pytest.approx(sum(values))
+        assert (result["min"], result["max"]) == (1.0, 9.0)
+        assert result["mean"] == pytest.approx(statistics.fmean(values))
+        assert result["variance"] == pytest.approx(statistics.pvariance(values))
+        assert result["quantiles"]["p50"] == pytest.approx(3.0, rel=0.01)
+
+    def test_window_slides(self):
+        """Test that slices older than the window stop counting."""
+        aggregate = RollingAggregate(AggregateSpec("v", timedelta(seconds=60)), slices=6)
+        for second in range(120):
+            aggregate.add(second * SECOND, float(second))
+
+        result = aggregate.result()
+        assert result["min"] >= 50.0
+        assert result["max"] == 119.0
+        median = statistics.median(range(50, 120))
+        assert result["quantiles"]["p50"] == pytest.approx(median, rel=0.05)
+
+        empty = aggregate.result(now=1000 * SECOND)
+        assert empty["count"] == 0
+        assert empty["mean"] is None and empty["quantiles"]["p99"] is None
+
+    def test_payload(self):
+        """Test flattening results into feed payload keys."""
+        spec = AggregateSpec("cpu", timedelta(minutes=5), quantiles=[0.95])
+        aggregate = RollingAggregate(spec)
+        aggregate.add_event(0, {"cpu": 10, "host": "a"})
+        aggregate.add_event(SECOND, {"cpu": "n/a"})
+
+        payload = aggregate_payload([(spec, aggregate.result())])
+
+        assert payload["cpu_5m_count"] == 1
+        assert payload["cpu_5m_mean"] == 10.0
+        assert payload["cpu_5m_p95"] == pytest.approx(10.0, rel=0.01)
+
+
+class TestHubAggregates:
+    """Tests for aggregates on the hub publish path."""
+
+    async def test_publish_updates_aggregates(self):
+        """Test that published events update the feed's aggregates."""
+        hub = DataHub()
+        feed_id = uuid4()
+        await hub.publish_feed_event(feed_id, {"cpu": 10.0})
+        hub.set_aggregates(feed_id, [AggregateSpec("cpu", timedelta(minutes=5))])
+        await hub.publish_feed_event(feed_id, {"cpu": 30.0})
+
+        ((spec, result),) = hub.get_aggregates(feed_id)
+
+        # Seeded from history, then updated on publish
+        assert result["count"] == 2
+        assert result["mean"] == 20.0
+
+        # Re-applying the same config keeps the running aggregate
+        aggregate = hub.aggregates[feed_id][0]
+        hub.set_aggregates(feed_id, [AggregateSpec("cpu", timedelta(minutes=5))])
+        assert hub.aggregates[feed_id][0] is aggregate
+
+        hub.set_aggregates(feed_id, [])
+        assert hub.get_aggregates(feed_id) == []
+
+    async def test_aggregate_feed(self):
+        """Test that an aggregate feed publishes its source's aggregates."""
+        hub = DataHub()
+        source = uuid4()
+        hub.set_aggregates(source, [AggregateSpec("cpu", timedelta(minutes=5), [0.5])])
+        for value in (1.0, 2.0, 3.0):
+            await hub.publish_feed_event(source, {"cpu": value})
+
+        feed = AggregateFeed(uuid4(), {"source_feed_id": str(source)}, hub)
+        payload = await feed.fetch_data()
+
+        assert payload["cpu_5m_mean"] == 2.0
+        assert payload["cpu_5m_p50"] == pytest.approx(2.0, rel=0.01)
+        assert feed.always_on is False
+
+        with pytest.raises(ValueError):
+            await AggregateFeed(uuid4(), {"source_feed_id": str(uuid4())}, hub).fetch_data()
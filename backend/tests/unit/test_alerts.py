@@ -0,0 +1,218 @@
+"""
+Unit tests for alert rules.
+"""
+
+import json
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, MagicMock
+from uuid import uuid4
+
+import pytest
+from sqlmodel import Session, create_engine, select
+from sqlmodel.pool import StaticPool
+
+from app.hub.alerts import ActiveRule, AlertEngine, AlertStore, ThresholdIndex
+from app.hub.events import FeedEvent
+from app.hub.hub import DataHub
+from app.models import AlertEventRecord, AlertRule, AlertState
+
+BASE = datetime(2024, 1, 1)
+
+
+def event(feed_id, payload: dict, seconds: float = 0.0) -> FeedEvent:
+    """Create an event at a fixed offset from a base time."""
+    return FeedEvent(feed_id=feed_id, ts=BASE + timedelta(seconds=seconds), payload=payload)
+
+
+def rule(feed_id, threshold: float = 0.0, **fields) -> AlertRule:
+    """Create an alert rule on the "cpu" key."""
+    fields.setdefault("name", "rule")
+    return AlertRule(feed_id=feed_id, key="cpu", threshold=threshold, **fields)
+
+
+class TestThresholdIndex:
+    """Tests for ThresholdIndex."""
+
+    def test_candidates_are_crossed_thresholds(self):
+        """Test that only rules between the last and new value are returned."""
+        index = ThresholdIndex()
+        feed_id = uuid4()
+        above = [ActiveRule(uuid4(), f"a{t}", feed_id, "v", threshold=t) for t in range(100)]
+        below = [
+            ActiveRule(uuid4(), f"b{t}", feed_id, "v", operator="below", threshold=t)
+            for t in range(100)
+        ]
+        for r in above + below:
+            index.add(r)
+
+        assert len(list(index.candidates(50.0))) == 200
+
+        # Rising from 50 to 52.5: above rules at 50, 51, 52; below at 51, 52
+        crossed = list(index.candidates(52.5))
+        assert [r.threshold for r in crossed] == [50.0, 51.0, 52.0, 51.0, 52.0]
+        assert list(index.candidates(52.5)) == []
+
+        index.remove(above[51])
+        assert [r.threshold for r in index.candidates(50.0)][:2] == [50.0, 52.0]
+
+
+class TestAlertEngine:
+    """Tests for AlertEngine."""
+
+    def test_threshold_transitions(self):
+        """Test that rules fire and resolve as the value crosses them."""
+        engine = AlertEngine()
+        feed_id = uuid4()
+        high = rule(feed_id, 90)
+        low = rule(feed_id, 10, operator="below")
+        engine.set_rules([high, low])
+
+        assert engine.evaluate(event(feed_id, {"cpu": 50})) == []
+
+        (transition,) = engine.evaluate(event(feed_id, {"cpu": 95}, 1))
+        assert (transition.rule.id, transition.state, transition.value) == (
+            high.id,
+            AlertState.FIRING,
+            95.0,
+        )
+        assert engine.evaluate(event(feed_id, {"cpu": 99}, 2)) == []
+        assert engine.evaluate(event(feed_id, {"cpu": "n/a", "mem": 1}, 3)) == []
+
+        states = [(t.rule.id, t.state) for t in engine.evaluate(event(feed_id, {"cpu": 5}, 4))]
+        assert states == [(high.id, AlertState.OK), (low.id, AlertState.FIRING)]
+
+        message = engine.firing([feed_id])[0].to_message()
+        assert message["type"] == "alert" and message["state"] == "firing"
+        assert json.dumps(message)
+
+    def test_rule_changes(self):
+        """Test adding rules against the last value, updates and removal."""
+        engine = AlertEngine()
+        feed_id = uuid4()
+        engine.add(rule(feed_id, 1000))
+        engine.evaluate(event(feed_id, {"cpu": 50}))
+
+        new = rule(feed_id, 40)
+        (transition,) = engine.add(new)
+        assert transition.state is AlertState.FIRING
+
+        # Renaming keeps the state; disabling resolves
+        renamed = rule(feed_id, 40, id=new.id, name="renamed")
+        assert engine.add(renamed) == []
+        assert engine.rules[new.id].name == "renamed"
+        renamed.enabled = False
+        (transition,) = engine.add(renamed)
+        assert transition.state is AlertState.OK
+        assert engine.state(new.id) is AlertState.OK
+
+        engine.set_rules([])
+        assert not engine.watches(feed_id)
+
+    def test_rate(self):
+        """Test rules on the per-second rate of change."""
+        engine = AlertEngine()
+        feed_id = uuid4()
+        engine.add(rule(feed_id, 10, kind="rate"))
+
+        assert engine.evaluate(event(feed_id, {"cpu": 0}, 0)) == []
+        assert engine.evaluate(event(feed_id, {"cpu": 10}, 2)) == []
+        (transition,) = engine.evaluate(event(feed_id, {"cpu": 50}, 4))
+        assert (transition.state, transition.value) == (AlertState.FIRING, 20.0)
+        (transition,) = engine.evaluate(event(feed_id, {"cpu": 50}, 5))
+        assert transition.state is AlertState.OK
+
+    def test_rate_ignores_late_events(self):
+        """Test that late or same-time events do not move the rate baseline."""
+        engine = AlertEngine()
+        feed_id = uuid4()
+        engine.add(rule(feed_id, 10, kind="rate"))
+
+        assert engine.evaluate(event(feed_id, {"cpu": 0}, 10)) == []
+        assert engine.evaluate(event(feed_id, {"cpu": 100}, 10)) == []
+        assert engine.evaluate(event(feed_id, {"cpu": 500}, 5)) == []
+        # Measured from the sample at 10s: (30 - 0) / 2s, not from 5s or 100
+        (transition,) = engine.evaluate(event(feed_id, {"cpu": 30}, 12))
+        assert (transition.state, transition.value) == (AlertState.FIRING, 15.0)
+
+    def test_absence(self):
+        """Test that absence rules fire on the sweep and resolve on publish."""
+        now = [0.0]
+        engine = AlertEngine(clock=lambda: now[0])
+        feed_id = uuid4()
+        engine.add(rule(feed_id, kind="absence", duration_sec=30))
+
+        now[0] = 20.0
+        assert engine.check_absence() == []
+        assert engine.evaluate(event(feed_id, {"cpu": 1})) == []
+
+        now[0] = 49.0
+        assert engine.check_absence() == []
+        now[0] = 51.0
+        (transition,) = engine.check_absence()
+        assert (transition.state, transition.value) == (AlertState.FIRING, None)
+        assert engine.check_absence() == []
+
+        (transition,) = engine.evaluate(event(feed_id, {"cpu": None}))
+        assert transition.state is AlertState.OK
+
+
+class TestHubAlerts:
+    """Tests for alerts on the hub publish path."""
+
+    @pytest.fixture
+    def engine(self):
+        """Create an in-memory SQLite engine shared across threads."""
+        return create_engine(
+            "sqlite:///:memory:",
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool,
+        )
+
+    async def test_transitions_are_sent_and_persisted(self, engine):
+        """Test that transitions reach subscribed dashboards and the database."""
+        store = AlertStore(engine)
+        await store.start()
+        hub = DataHub(alert_store=store)
+        feed_id, other = uuid4(), uuid4()
+        high = rule(feed_id, 90)
+        await hub.set_alert_rules([high])
+
+        websocket = MagicMock()
+        websocket.send_text = AsyncMock()
+        await hub.register_connection(uuid4(), websocket, {feed_id, other})
+        await hub.publish_feed_event(other, {"cpu": 99.0})
+        websocket.send_text.reset_mock()
+
+        await hub.publish_feed_event(feed_id, {"cpu": 95.0})
+        messages = [json.loads(call.args[0]) for call in websocket.send_text.call_args_list]
+        alert = next(m for m in messages if m["type"] == "alert")
+        assert alert["rule_id"] == str(high.id)
+        assert (alert["state"], alert["value"]) == ("firing", 95.0)
+
+        # Connecting while it fires reports it after the snapshot
+        late = MagicMock()
+        late.send_text = AsyncMock()
+        await hub.register_connection(uuid4(), late, {feed_id})
+        assert json.loads(late.send_text.call_args.args[0])["state"] == "firing"
+
+        await hub.remove_alert_rule(high.id)
+        await store.stop()
+
+        with Session(engine) as session:
+            records = session.exec(select(AlertEventRecord).order_by(AlertEventRecord.id)).all()
+        assert [(r.rule_id, r.state) for r in records] == [
+            (high.id, AlertState.FIRING),
+            (high.id, AlertState.OK),
+        ]
+
+    async def test_load_rules(self, engine):
+        """Test that only enabled rules are loaded."""
+        store = AlertStore(engine, read_only=True)
+        await store.start()
+        enabled, disabled = rule(uuid4()), rule(uuid4(), enabled=False)
+        enabled_id = enabled.id
+        with Session(engine) as session:
+            session.add_all([enabled, disabled])
+            session.commit()
+
+        assert [r.id for r in await store.load_rules()] == [enabled_id]
@@ -0,0 +1,132 @@
+"""
+Unit tests for batched feed updates.
+"""
+
+import asyncio
+import json
+from uuid import uuid4
+
+import pytest
+
+from app.hub.batch import FeedBatch
+from app.hub.delta import FeedUpdate
+from app.hub.events import FeedEvent
+from app.hub.hub import DataHub
+from app.hub.serialization import FeedEventEncoder
+
+
+class TestFeedBatch:
+    """Tests for FeedBatch and FeedUpdate.collapse."""
+
+    def test_full_frame(self):
+        """Test that a batch wraps the plain feed_update messages."""
+        encoder = FeedEventEncoder()
+        events = [FeedEvent(feed_id=uuid4(), payload={"v": i}) for i in range(2)]
+        batch = FeedBatch([FeedUpdate(encoder, event, seq=1) for event in events])
+
+        message = json.loads(batch.full.text)
+
+        assert message["type"] == "feed_batch"
+        assert [m["payload"] for m in message["updates"]] == [{"v": 0}, {"v": 1}]
+        assert batch.full is batch.full
+
+    def test_collapse_keeps_older_base(self):
+        """Test that a collapsed update is a delta against the older update's base."""
+        encoder = FeedEventEncoder()
+        feed_id = uuid4()
+        older = FeedUpdate(
+            encoder, FeedEvent(feed_id=feed_id, payload={"a": 1, "b": 2}), 5, previous={"a": 0}
+        )
+        newer = FeedUpdate(
+            encoder, FeedEvent(feed_id=feed_id, payload={"a": 1, "b": 3}), 6, previous={"a": 1}
+        )
+
+        merged = newer.collapse(older)
+        delta = json.loads(merged.frame_for(4).text)
+
+        assert (merged.seq, merged.base) == (6, 4)
+        assert delta["set"] == {"a": 1, "b": 3}
+        assert newer.collapse(FeedUpdate(encoder, older.event, 5)).base is None
+
+
+@pytest.mark.asyncio
+class TestBatchWindow:
+    """Tests for the hub's batch window."""
+
+    async def test_updates_coalesce_per_dashboard(self, make_websocket, sent_messages):
+        """Test that a window's updates go out as one frame, latest per feed."""
+        hub = DataHub(batch_window=0.02)
+        await hub.start()
+        feed_a, feed_b = uuid4(), uuid4()
+        plain_ws = make_websocket()
+        delta_ws = make_websocket()
+        await hub.register_connection(uuid4(), plain_ws, {feed_a, feed_b})
+        await hub.register_connection(uuid4(), delta_ws, {feed_a}, delta=True)
+
+        for value in range(3):
+            await hub.publish_feed_event(feed_a, {"v": value, "k": "x"})
+        await hub.publish_feed_event(feed_b, {"v": 10})
+        await hub.join()
+        await asyncio.sleep(0.06)
+
+        for value in (3, 4):
+            await hub.publish_feed_event(feed_a, {"v": value, "k": "x"})
+        await hub.join()
+        await asyncio.sleep(0.06)
+        await hub.stop()
+
+        plain = sent_messages(plain_ws)
+        delta = sent_messages(delta_ws)
+
+        assert plain[0]["type"] == "feed_batch"
+        assert [m["payload"]["v"] for m in plain[0]["updates"]] == [2, 10]
+        assert plain[1]["type"] == "feed_update" and plain[1]["payload"]["v"] == 4
+        assert len(plain) == 2
+
+        assert [(m["type"], m["seq"]) for m in delta] == [("feed_update", 3), ("feed_delta", 5)]
+        assert (delta[1]["base"], delta[1]["set"]) == (3, {"v": 4})
+        assert hub.batch_collapsed == 3
+
+
+@pytest.mark.asyncio
+class TestInitialSnapshot:
+    """Tests for the snapshot frame sent on connect."""
+
+    async def test_snapshot_with_backfill(self, make_websocket, sent_messages):
+        """Test that connect sends one frame with latest values and history."""
+        hub = DataHub(snapshot_history_points=3, snapshot_history_mode="raw")
+        feed_a, feed_b = uuid4(), uuid4()
+        for value in range(5):
+            await hub.publish_feed_event(feed_a, {"v": value, "w": value * 2})
+        await hub.publish_feed_event(feed_b, {"v": 9})
+
+        websocket = make_websocket()
+        await hub.register_connection(
+            uuid4(), websocket, {feed_a, feed_b}, projection={feed_a: frozenset({"v"})}
+        )
+        await hub.resync(websocket)
+
+        snapshot, resync = sent_messages(websocket)
+        updates = {m["feed_id"]: m["payload"] for m in snapshot["updates"]}
+
+        assert snapshot["type"] == "snapshot"
+        assert updates == {str(feed_a): {"v": 4}, str(feed_b): {"v": 9}}
+        assert list(snapshot["history"][str(feed_a)]) == ["v"]
+        assert snapshot["history"][str(feed_a)]["v"]["values"] == [2.0, 3.0, 4.0]
+        assert len(snapshot["history"][str(feed_a)]["v"]["ts"]) == 3
+        assert snapshot["history"][str(feed_b)]["v"]["values"] == [9.0]
+        assert resync["type"] == "snapshot" and resync["history"] == {}
+        assert len(resync["updates"]) == 2
+
+    async def test_downsampled_backfill(self, make_websocket, sent_messages):
+        """Test that the backfill is downsampled to the configured points."""
+        hub = DataHub(snapshot_history_points=2, snapshot_history_mode="lttb")
+        feed_id = uuid4()
+        for value in range(10):
+            await hub.publish_feed_event(feed_id, {"v": value})
+
+        websocket = make_websocket()
+        await hub.register_connection(uuid4(), websocket, {feed_id})
+
+        (snapshot,) = sent_messages(websocket)
+        assert snapshot["history"][str(feed_id)]["v"]["values"] == [0.0, 9.0]
@@ -0,0 +1,152 @@
+"""
+Unit tests for encode-once WebSocket frame broadcast.
+"""
+
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+from uuid import uuid4
+
+from fastapi import WebSocket
+
+from app.hub.connection import ClientConnection
+from app.ws import broadcast as broadcast_module
+from app.ws.broadcast import (
+    RAW_SEND_SCOPE_KEY,
+    Frame,
+    RawTransport,
+    build_text_frame,
+    raw_frames_supported,
+)
+
+
+class FakeProtocol:
+    """Stand-in for uvicorn's websockets sans-I/O protocol."""
+
+    def __init__(self, extensions=None):
+        self.transport = MagicMock()
+        self.transport.is_closing.return_value = False
+        self.conn = SimpleNamespace(extensions=extensions or [], state=SimpleNamespace(name="OPEN"))
+        self.close_sent = False
+        self.disconnected = False
+        self.writable = asyncio.Event()
+        self.writable.set()
+
+    async def send(self, message):
+        """ASGI send callable."""
+
+
+def make_websocket(protocol: FakeProtocol) -> WebSocket:
+    """Create a Starlette WebSocket whose raw send belongs to the protocol."""
+    scope = {"type": "websocket", "path": "/ws", "headers": [], RAW_SEND_SCOPE_KEY: protocol.send}
+    websocket = WebSocket(scope, receive=AsyncMock(), send=AsyncMock())
+    websocket.send_text = AsyncMock()
+    return websocket
+
+
+class TestBuildTextFrame:
+    """Tests for build_text_frame."""
+
+    def test_length_encodings(self):
+        """Test frame headers for all three payload length encodings."""
+        cases = {
+            0: b"\x81\x00",
+            125: b"\x81\x7d",
+            126: b"\x81\x7e\x00\x7e",
+            65535: b"\x81\x7e\xff\xff",
+            65536: b"\x81\x7f\x00\x00\x00\x00\x00\x01\x00\x00",
+        }
+        for size, header in cases.items():
+            data = b"x" * size
+
+            assert build_text_frame(data) == header + data
+
+    def test_frame_is_built_once(self):
+        """Test that the frame bytes are cached on the shared Frame."""
+        frame = Frame('{"type":"feed_update"}')
+
+        assert frame.frame is frame.frame
+        assert frame.text == '{"type":"feed_update"}'
+
+
+class TestRawTransport:
+    """Tests for RawTransport resolution."""
+
+    def test_resolve_supported_protocol(self):
+        """Test that an uncompressed uvicorn-style connection resolves."""
+        protocol = FakeProtocol()
+        raw = RawTransport.resolve(make_websocket(protocol))
+
+        assert raw is not None
+        assert raw.is_open()
+
+    def test_closing_transport_is_not_open(self):
+        """Test that a closing transport does not take raw writes."""
+        protocol = FakeProtocol()
+        protocol.transport.is_closing.return_value = True
+        raw = RawTransport.resolve(make_websocket(protocol))
+
+        assert raw is not None
+        assert not raw.is_open()
+
+    def test_resolve_with_extensions(self):
+        """Test that negotiated extensions disable raw writes."""
+        protocol = FakeProtocol(extensions=["permessage-deflate"])
+
+        assert RawTransport.resolve(make_websocket(protocol)) is None
+
+    def test_resolve_unknown_websocket(self):
+        """Test that mocks and unknown servers are not resolved."""
+        assert RawTransport.resolve(MagicMock()) is None
+
+    def test_untested_server_version(self, monkeypatch):
+        """Test that raw writes are disabled for untested server versions."""
+        monkeypatch.setitem(broadcast_module._RAW_FRAME_VERSIONS, "uvicorn", ("0.1.",))
+        raw_frames_supported.cache_clear()
+        try:
+            assert RawTransport.resolve(make_websocket(FakeProtocol())) is None
+        finally:
+            raw_frames_supported.cache_clear()
+
+    async def test_client_connection_raw_frames_off_by_default(self):
+        """Test that ClientConnection uses send_text unless raw frames are enabled."""
+        protocol = FakeProtocol()
+        websocket = make_websocket(protocol)
+        client = ClientConnection(uuid4(), websocket, on_close=MagicMock())
+
+        assert await client.send_now(Frame(b"{}"))
+
+        websocket.send_text.assert_called_once_with("{}")
+        protocol.transport.write.assert_not_called()
+
+
+class TestRawFrameWrites:
+    """Tests for ClientConnection writing frames straight to the transport."""
+
+    async def test_client_connection_uses_raw_transport(self):
+        """Test that ClientConnection writes frames directly when possible."""
+        protocol = FakeProtocol()
+        websocket = make_websocket(protocol)
+        client = ClientConnection(uuid4(), websocket, on_close=MagicMock(), raw_frames=True)
+
+        assert await client.send_now(Frame(b"{}"))
+
+        protocol.transport.write.assert_called_once_with(build_text_frame(b"{}"))
+        websocket.send_text.assert_not_called()
+        assert client.stats()["raw_frames"] is True
+
+    async def test_writer_coalesces_queued_frames(self):
+        """Test that frames queued behind a pending write go out in one write."""
+        protocol = FakeProtocol()
+        websocket = make_websocket(protocol)
+        client = ClientConnection(uuid4(), websocket, on_close=MagicMock(), raw_frames=True)
+        frames = [Frame(f'{{"n":{i}}}'.encode()) for i in range(3)]
+        for frame in frames:
+            client.enqueue(frame)
+
+        client.start()
+        await asyncio.sleep(0.01)
+        client.close()
+
+        protocol.transport.write.assert_called_once_with(b"".join(f.frame for f in frames))
+        assert client.sent == 3
@@ -0,0 +1,141 @@
+"""
+Unit tests for compressed history blocks.
+"""
+
+import math
+import random
+from datetime import timedelta
+from uuid import uuid4
+
+import pytest
+
+from app.hub.compressed import CompressedHistoryBuffer
+from app.hub.gorilla import decode_floats, decode_ints, encode_floats, encode_ints
+from app.hub.history import HistoryBuffer
+from tests.conftest import BASE_TS
+
+
+class TestGorilla:
+    """Tests for delta-of-delta and XOR encoding."""
+
+    def test_int_round_trip(self):
+        """Test that integers of every magnitude survive encoding."""
+        rng = random.Random(1)
+        jittered = [1_700_000_000_000_000 + i * 1_000_000 + rng.randint(-5000, 5000) for i in range(500)]
+        extremes = [0, -(2**63), 2**63 - 1, -1, 2**62, 5]
+
+        for values in (jittered, extremes, [42], []):
+            assert decode_ints(encode_ints(values), len(values)) == values
+
+    def test_float_round_trip(self):
+        """Test that floats, including special values, survive encoding."""
+        values = [round(50 + 10 * math.sin(i / 20), 2) for i in range(300)]
+        values += [float("inf"), float("-inf"), -0.0, 1e300, 5e-324, 1.0, 1.0]
+
+        decoded = decode_floats(encode_floats(values), len(values))
+
+        assert decoded == values
+        assert math.copysign(1, decoded[values.index(-0.0)]) == -1
+        nan = decode_floats(encode_floats([float("nan")]), 1)
+        assert math.isnan(nan[0])
+
+    def test_regular_series_compresses(self):
+        """Test that regular timestamps and constant values take few bits."""
+        ts = [1_700_000_000_000_000 + i * 1_000_000 for i in range(512)]
+
+        # First value and first delta, then one bit per value
+        assert len(encode_ints(ts)) <= 16 + 512 // 8
+        assert len(encode_floats([3.5] * 512)) <= 16 + 512 // 8
+
+
+class TestCompressedHistoryBuffer:
+    """Tests for CompressedHistoryBuffer."""
+
+    def test_matches_plain_buffer(self, make_event):
+        """Test that reads match an uncompressed buffer across blocks."""
+        feed_id = uuid4()
+        plain = HistoryBuffer(feed_id, capacity=1000)
+        compressed = CompressedHistoryBuffer(feed_id, capacity=1000, block_size=64)
+        rng = random.Random(2)
+
+        for i in range(1500):
+            payload = {"cpu": rng.random() * 100, "count": i, "host": f"h{i % 3}"}
+            if i % 7 == 0:
+                payload.pop("cpu")
+            event = make_event(feed_id, i + rng.random() * 0.5, payload)
+            plain.append(event)
+            compressed.append(event)
+
+        assert len(compressed) == len(plain) == 1000
+        assert list(compressed) == list(plain)
+        assert compressed.series("cpu") == plain.series("cpu")
+
+        since = BASE_TS + timedelta(seconds=700.25)
+        until = BASE_TS + timedelta(seconds=1300)
+        assert list(compressed.range(since=since, until=until)) == list(
+            plain.range(since=since, until=until)
+        )
+        assert list(compressed.range(limit=10)) == list(plain.range(limit=10))
+
+    def test_trim_before(self, make_event):
+        """Test trimming inside and across sealed blocks."""
+        feed_id = uuid4()
+        buffer = CompressedHistoryBuffer(feed_id, capacity=1000, block_size=16)
+        for i in range(100):
+            buffer.append(make_event(feed_id, i, {"value": i}))
+
+        buffer.trim_before(BASE_TS + timedelta(seconds=37))
+        assert len(buffer) == 63
+        assert buffer.event_at(0).payload["value"] == 37
+
+        buffer.trim_before(BASE_TS + timedelta(seconds=99))
+        assert [e.payload["value"] for e in buffer] == [99]
+
+    def test_out_of_order_events(self, make_event):
+        """Test that late events are ordered in the open block and clamped before it."""
+        feed_id = uuid4()
+        buffer = CompressedHistoryBuffer(feed_id, capacity=1000, block_size=4)
+        for seconds in [0, 1, 2, 3, 5, 4.5, 2.5]:
+            buffer.append(make_event(feed_id, seconds, {"value": seconds}))
+
+        assert [e.payload["value"] for e in buffer] == [0, 1, 2, 3, 2.5, 4.5, 5]
+        assert [e.ts for e in buffer][3:] == [
+            BASE_TS + timedelta(seconds=s) for s in (3, 3, 4.5, 5)
+        ]
+
+    def test_views_survive_sealing(self, make_event):
+        """Test that views stay valid when their rows are compressed."""
+        feed_id = uuid4()
+        buffer = CompressedHistoryBuffer(feed_id, capacity=1000, block_size=8)
+        for i in range(5):
+            buffer.append(make_event(feed_id, i, {"value": i}))
+
+        view = buffer.range()
+        for i in range(5, 30):
+            buffer.append(make_event(feed_id, i, {"value": i}))
+
+        assert [e.payload["value"] for e in view] == [0, 1, 2, 3, 4]
+        assert view.series("value") == buffer.range(limit=30)[:5].series("value")
+
+    def test_uses_less_memory(self, make_event):
+        """Test that sealed blocks are much smaller than plain columns."""
+        feed_id = uuid4()
+        plain = HistoryBuffer(feed_id, capacity=10_000)
+        compressed = CompressedHistoryBuffer(feed_id, capacity=10_000, block_size=512)
+
+        for i in range(10_000):
+            event = make_event(feed_id, i, {"cpu": round(40 + 5 * math.sin(i / 30), 1), "up": 1})
+            plain.append(event)
+            compressed.append(event)
+
+        assert compressed.nbytes() < plain.nbytes() / 2
+
+    @pytest.mark.parametrize("block_size", [1, 3])
+    def test_tiny_blocks(self, block_size: int, make_event):
+        """Test degenerate block sizes."""
+        feed_id = uuid4()
+        buffer = CompressedHistoryBuffer(feed_id, capacity=5, block_size=block_size)
+        for i in range(12):
+            buffer.append(make_event(feed_id, i, {"value": i}))
+
+        assert [e.payload["value"] for e in buffer] == [7, 8, 9, 10, 11]
@@ -0,0 +1,150 @@
+"""
+Unit tests for per-connection outbound queues.
+"""
+
+import asyncio
+import json
+from unittest.mock import AsyncMock, MagicMock
+from uuid import uuid4
+
+from app.hub.connection import ClientConnection, SlowConsumerPolicy
+from app.hub.delta import FeedUpdate
+from app.hub.events import FeedEvent
+from app.hub.serialization import FeedEventEncoder
+
+
+def make_client(policy: SlowConsumerPolicy, **kwargs) -> ClientConnection:
+    """Create a client connection around a mock WebSocket."""
+    websocket = MagicMock()
+    websocket.send_text = AsyncMock()
+    websocket.close = AsyncMock()
+    return ClientConnection(uuid4(), websocket, on_close=MagicMock(), policy=policy, **kwargs)
+
+
+class TestClientConnection:
+    """Tests for ClientConnection."""
+
+    async def test_writer_sends_in_order(self):
+        """Test that queued messages are written in order."""
+        client = make_client(SlowConsumerPolicy.DROP_OLDEST)
+        client.start()
+
+        client.enqueue("a")
+        client.enqueue("b")
+        client.enqueue("c")
+        await asyncio.sleep(0.05)
+
+        sent = [call.args[0] for call in client.websocket.send_text.call_args_list]
+        assert sent == ["a", "b", "c"]
+        assert client.sent == 3
+        assert client.depth == 0
+        client.close()
+
+    async def test_drop_oldest_policy(self):
+        """Test that a full queue discards its oldest message."""
+        client = make_client(SlowConsumerPolicy.DROP_OLDEST, max_queue=3)
+
+        for i in range(5):
+            client.enqueue(f"m{i}")
+
+        assert client.depth == 3
+        assert client.dropped == 2
+
+        client.start()
+        await asyncio.sleep(0.05)
+
+        sent = [call.args[0] for call in client.websocket.send_text.call_args_list]
+        assert sent == ["m2", "m3", "m4"]
+        client.close()
+
+    async def test_conflate_policy(self):
+        """Test that only the latest message per feed is kept."""
+        client = make_client(SlowConsumerPolicy.CONFLATE)
+        feed1 = uuid4()
+        feed2 = uuid4()
+
+        client.enqueue("f1-a", feed1)
+        client.enqueue("f2-a", feed2)
+        client.enqueue("f1-b", feed1)
+        client.enqueue("f1-c", feed1)
+
+        assert client.depth == 2
+        assert client.conflated == 2
+
+        client.start()
+        await asyncio.sleep(0.05)
+
+        sent = [call.args[0] for call in client.websocket.send_text.call_args_list]
+        assert sent == ["f1-c", "f2-a"]
+        client.close()
+
+    async def test_disconnect_policy(self):
+        """Test that a client over the high-water mark too long is closed."""
+        client = make_client(
+            SlowConsumerPolicy.DISCONNECT, max_queue=10, high_water_mark=2, disconnect_after=0.1
+        )
+
+        client.enqueue("a")
+        client.enqueue("b")
+        assert not client.closed
+
+        await asyncio.sleep(0.15)
+        client.enqueue("c")
+        await asyncio.sleep(0)
+
+        assert client.closed
+        client._on_close.assert_called_once_with(client)
+        client.websocket.close.assert_awaited()
+
+    async def test_send_failure_closes_connection(self):
+        """Test that a failed send closes the connection."""
+        client = make_client(SlowConsumerPolicy.DROP_OLDEST)
+        client.websocket.send_text = AsyncMock(side_effect=Exception("Connection closed"))
+        client.start()
+
+        client.enqueue("a")
+        await asyncio.sleep(0.05)
+
+        assert client.closed
+        client._on_close.assert_called_once_with(client)
+
+    def test_stats(self):
+        """Test connection statistics."""
+        client = make_client(SlowConsumerPolicy.CONFLATE, max_queue=5)
+        client.enqueue("a", uuid4())
+
+        stats = client.stats()
+
+        assert stats["policy"] == "conflate"
+        assert stats["queue_depth"] == 1
+        assert stats["max_queue"] == 5
+        assert stats["dropped"] == 0
+
+    async def test_max_rate_conflates_per_feed(self):
+        """Test that a rate-limited client gets the latest update per feed per release."""
+        client = make_client(SlowConsumerPolicy.DROP_OLDEST, max_rate=20)
+        client.start()
+        encoder = FeedEventEncoder()
+        feed1 = uuid4()
+        feed2 = uuid4()
+
+        for seq in range(1, 4):
+            client.enqueue(
+                FeedUpdate(encoder, FeedEvent(feed_id=feed1, payload={"v": seq}), seq), feed1
+            )
+        client.enqueue(FeedUpdate(encoder, FeedEvent(feed_id=feed2, payload={"v": 0}), 1), feed2)
+        await asyncio.sleep(0.1)
+
+        sent = [json.loads(call.args[0]) for call in client.websocket.send_text.call_args_list]
+        assert sent[0]["type"] == "feed_update" and sent[0]["payload"] == {"v": 1}
+        assert sent[1]["type"] == "feed_batch"
+        assert [m["payload"] for m in sent[1]["updates"]] == [{"v": 3}, {"v": 0}]
+        assert client.rate_limited == 1
+        assert client.stats()["max_rate"] == 20
+
+        # Lifting the limit sends updates straight away
+        client.set_max_rate(None)
+        client.enqueue(FeedUpdate(encoder, FeedEvent(feed_id=feed1, payload={"v": 4}), 4), feed1)
+        await asyncio.sleep(0.01)
+        assert client.websocket.send_text.call_count == 3
+        client.close()
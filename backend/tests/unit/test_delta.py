@@ -0,0 +1,220 @@
+"""
+Unit tests for delta-encoded feed updates.
+"""
+
+import asyncio
+import json
+from unittest.mock import MagicMock
+from uuid import uuid4
+
+import pytest
+
+from app.hub.connection import ClientConnection, SlowConsumerPolicy
+from app.hub.delta import FeedUpdate, payload_delta
+from app.hub.events import FeedEvent
+from app.hub.hub import DataHub
+from app.hub.serialization import FeedEventEncoder
+
+
+def feed_messages(messages: list) -> list:
+    """Unwrap the updates of snapshot frames."""
+    flat = []
+    for message in messages:
+        flat.extend(message["updates"] if message["type"] == "snapshot" else [message])
+    return flat
+
+
+class TestPayloadDelta:
+    """Tests for payload_delta."""
+
+    def test_changed_and_removed_keys(self):
+        """Test that only changed, added and removed keys are reported."""
+        previous = {"coin_id": "btc", "price": 100.0, "old": 1}
+        payload = {"coin_id": "btc", "price": 101.5, "new": True}
+
+        changed, removed = payload_delta(previous, payload)
+
+        assert changed == {"price": 101.5, "new": True}
+        assert removed == ["old"]
+
+    def test_type_change_counts_as_change(self):
+        """Test that equal values of different types are sent."""
+        changed, removed = payload_delta({"a": True, "b": 1}, {"a": 1, "b": 1.0})
+
+        assert changed == {"a": 1, "b": 1.0}
+        assert removed == []
+
+
+class TestFeedUpdate:
+    """Tests for FeedUpdate."""
+
+    def test_frames(self):
+        """Test the plain, keyframe and delta forms of an update."""
+        feed_id = uuid4()
+        event = FeedEvent(feed_id=feed_id, payload={"a": 1, "b": 2})
+        update = FeedUpdate(FeedEventEncoder(), event, seq=5, previous={"a": 1, "c": 3})
+
+        full = json.loads(update.full.text)
+        keyframe = json.loads(update.frame_for(None).text)
+        delta = json.loads(update.frame_for(4).text)
+
+        assert full["type"] == "feed_update" and full["seq"] == 5
+        assert keyframe == full
+        assert delta["type"] == "feed_delta"
+        assert (delta["seq"], delta["base"]) == (5, 4)
+        assert delta["set"] == {"b": 2}
+        assert delta["unset"] == ["c"]
+        assert update.frame_for(3) is update.frame_for(None)
+
+    def test_forced_keyframe(self):
+        """Test that a keyframe update never sends a delta."""
+        event = FeedEvent(feed_id=uuid4(), payload={"a": 1})
+        update = FeedUpdate(FeedEventEncoder(), event, seq=2, previous={"a": 0}, keyframe=True)
+
+        assert update.base is None
+        assert json.loads(update.frame_for(1).text)["type"] == "feed_update"
+        assert update.delta is update.full
+
+
+@pytest.mark.asyncio
+class TestDeltaProtocol:
+    """Tests for delta delivery through ClientConnection and DataHub."""
+
+    async def test_connection_falls_back_to_keyframe_after_drop(
+        self, make_websocket, sent_messages
+    ):
+        """Test that a client missing the base update gets a keyframe."""
+        encoder = FeedEventEncoder()
+        feed_id = uuid4()
+        events = [FeedEvent(feed_id=feed_id, payload={"v": i, "k": "x"}) for i in range(4)]
+        updates = [
+            FeedUpdate(encoder, event, seq=i + 1, previous=events[i - 1].payload if i else None)
+            for i, event in enumerate(events)
+        ]
+        websocket = make_websocket()
+        client = ClientConnection(
+            uuid4(),
+            websocket,
+            on_close=MagicMock(),
+            max_queue=2,
+            policy=SlowConsumerPolicy.DROP_OLDEST,
+            delta=True,
+        )
+
+        await client.send_now(updates[0])
+        await client.send_now(updates[1])
+        # Update 3 is dropped before it is written
+        client.enqueue(updates[2], feed_id)
+        client.enqueue(updates[3], feed_id)
+        client.enqueue("{}")
+        client.start()
+        await asyncio.sleep(0.01)
+        client.close()
+
+        types = [(m.get("type"), m.get("seq")) for m in sent_messages(websocket)]
+        assert types == [("feed_update", 1), ("feed_delta", 2), ("feed_update", 4), (None, None)]
+
+    async def test_hub_delta_stream(self, make_websocket, sent_messages):
+        """Test keyframes, deltas and resync through the hub."""
+        hub = DataHub(delta_keyframe_interval=3)
+        feed_id = uuid4()
+        dashboard_id = uuid4()
+        await hub.publish_feed_event(feed_id, {"coin_id": "btc", "price": 1.0})
+
+        delta_ws = make_websocket()
+        plain_ws = make_websocket()
+        await hub.register_connection(dashboard_id, delta_ws, {feed_id}, delta=True)
+        await hub.register_connection(dashboard_id, plain_ws, {feed_id})
+
+        for price in (2.0, 3.0, 4.0):
+            await hub.publish_feed_event(feed_id, {"coin_id": "btc", "price": price})
+        await hub.resync(delta_ws)
+
+        delta = feed_messages(sent_messages(delta_ws))
+        plain = feed_messages(sent_messages(plain_ws))
+
+        assert [(m["type"], m["seq"]) for m in delta] == [
+            ("feed_update", 1),
+            ("feed_delta", 2),
+            ("feed_update", 3),  # keyframe interval
+            ("feed_delta", 4),
+            ("feed_update", 4),  # resync
+        ]
+        assert delta[1]["set"] == {"price": 2.0}
+        assert [(m["type"], m["seq"]) for m in plain] == [("feed_update", i) for i in range(1, 5)]
+
+
+@pytest.mark.asyncio
+class TestResume:
+    """Tests for resuming a feed stream after reconnecting."""
+
+    async def test_replays_missed_updates(self, make_websocket, sent_messages):
+        """Test that a resuming client gets only the updates it missed."""
+        hub = DataHub(snapshot_history_points=10, snapshot_history_mode="raw")
+        feed_a, feed_b = uuid4(), uuid4()
+        for value in range(5):
+            await hub.publish_feed_event(feed_a, {"v": value, "k": "x"})
+        await hub.publish_feed_event(feed_b, {"v": 9})
+
+        websocket = make_websocket()
+        await hub.register_connection(
+            uuid4(),
+            websocket,
+            {feed_a, feed_b},
+            delta=True,
+            epoch=hub.epoch,
+            resume={feed_a: 2, feed_b: 1},
+        )
+
+        (snapshot,) = sent_messages(websocket)
+        assert snapshot["epoch"] == hub.epoch
+        assert snapshot["resync_required"] == [] and snapshot["history"] == {}
+        assert [(m["type"], m["seq"]) for m in snapshot["updates"]] == [
+            ("feed_update", 3),
+            ("feed_delta", 4),
+            ("feed_delta", 5),
+        ]
+        assert snapshot["updates"][0]["payload"] == {"v": 2, "k": "x"}
+        assert snapshot["updates"][2]["set"] == {"v": 4}
+
+    async def test_resync_when_gap_evicted(self, make_websocket, sent_messages):
+        """Test that a gap no longer in history, or a new epoch, needs a resync."""
+        hub = DataHub(history_capacity=3)
+        feed_a, feed_b = uuid4(), uuid4()
+        for value in range(6):
+            await hub.publish_feed_event(feed_a, {"v": value})
+        await hub.publish_feed_event(feed_b, {"v": 1})
+
+        evicted_ws = make_websocket()
+        await hub.register_connection(
+            uuid4(), evicted_ws, {feed_a, feed_b}, epoch=hub.epoch, resume={feed_a: 1, feed_b: 1}
+        )
+        restarted_ws = make_websocket()
+        await hub.register_connection(
+            uuid4(), restarted_ws, {feed_b}, epoch="old", resume={feed_b: 1}
+        )
+
+        (evicted,) = sent_messages(evicted_ws)
+        (restarted,) = sent_messages(restarted_ws)
+        assert evicted["resync_required"] == [str(feed_a)]
+        assert [(m["payload"], m["seq"]) for m in evicted["updates"]] == [({"v": 5}, 6)]
+        assert restarted["resync_required"] == [str(feed_b)]
+        assert [m["seq"] for m in restarted["updates"]] == [1]
+
+    async def test_resume_message(self, make_websocket, sent_messages):
+        """Test replaying on request over an open connection."""
+        hub = DataHub()
+        feed_id = uuid4()
+        websocket = make_websocket()
+        await hub.register_connection(uuid4(), websocket, {feed_id})
+        for value in range(3):
+            await hub.publish_feed_event(feed_id, {"v": value})
+        websocket.send_text.reset_mock()
+
+        await hub.resume(websocket, hub.epoch, {feed_id: 1})
+
+        (snapshot,) = sent_messages(websocket)
+        assert [(m["payload"], m["seq"]) for m in snapshot["updates"]] == [
+            ({"v": 1}, 2),
+            ({"v": 2}, 3),
+        ]
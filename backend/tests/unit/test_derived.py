@@ -0,0 +1,226 @@
+"""
+Unit tests for derived feeds.
+"""
+
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock
+from uuid import uuid4
+
+import pytest
+
+from app.feeds.derived import DerivedFeed
+from app.hub.derived import DerivedComputation, Expression
+from app.hub.events import FeedEvent
+from app.hub.hub import DataHub
+
+
+def event(payload: dict, seconds: float = 0.0) -> FeedEvent:
+    """Create an event at a fixed offset from a base time."""
+    return FeedEvent(
+        feed_id=uuid4(), ts=datetime(2024, 1, 1) + timedelta(seconds=seconds), payload=payload
+    )
+
+
+class TestExpression:
+    """Tests for Expression."""
+
+    def test_arithmetic(self):
+        """Test operators, functions and payload key lookups."""
+        events = {"a": event({"x": 6, "y": 3, "name": "h"}), "b": event({"x": 4})}
+
+        assert Expression("a.x / a.y + b['x'] * 2", "ab")(events) == 10.0
+        assert Expression("max(a.x, b.x) - abs(-1)", "ab")(events) == 5
+        assert Expression("sum(a.x, b.x) if a.x > b.x else 0", "ab")(events) == 10
+        assert Expression("2 ** a.y", "a")(events) == 8.0
+
+    def test_undefined_results(self):
+        """Test that missing values and math errors give None."""
+        events = {"a": event({"x": 0, "name": "h"})}
+
+        assert Expression("1 / a.x", "a")(events) is None
+        assert Expression("a.name + 1", "a")(events) is None
+        assert Expression("a.missing * 2", "a")(events) is None
+        assert Expression("b.x", "ab")(events) is None
+        assert Expression("2 ** 10000", "a")(events) is None
+
+    @pytest.mark.parametrize(
+        "source",
+        [
+            "__import__('os').system('ls')",
+            "a.x.__class__",
+            "a",
+            "c.x",
+            "'text'",
+            "[a.x]",
+            "open('f')",
+            "a.x +",
+            "lambda: 1",
+        ],
+    )
+    def test_rejects_unsafe_or_invalid(self, source):
+        """Test that only the allowed syntax compiles."""
+        with pytest.raises(ValueError):
+            Expression(source, "ab")
+
+    def test_rate_and_delta(self):
+        """Test per-second rates, counter resets and unchanged inputs."""
+        rate = Expression("rate(a.bytes)", "ab")
+        delta = Expression("delta(a.bytes)", "a")
+        other = event({"v": 1})
+
+        assert rate({"a": event({"bytes": 100}, 0), "b": other}) is None
+        assert rate({"a": event({"bytes": 300}, 2), "b": other}) == 100.0
+        # b published; a's rate is unchanged
+        assert rate({"a": event({"bytes": 300}, 2), "b": other}) == 100.0
+        # Counter reset
+        assert rate({"a": event({"bytes": 50}, 3), "b": other}) is None
+        assert rate({"a": event({"bytes": 80}, 4), "b": other}) == 30.0
+
+        delta({"a": event({"bytes": 10}, 0)})
+        assert delta({"a": event({"bytes": 4}, 1)}) == -6
+
+
+class TestDerivedComputation:
+    """Tests for DerivedComputation."""
+
+    def test_from_config(self):
+        """Test reading inputs and outputs from feed config."""
+        source = uuid4()
+        computation = DerivedComputation.from_config(
+            uuid4(), {"inputs": {"h": str(source), "unused": str(uuid4())}, "expression": "h.v * 2"}
+        )
+
+        assert computation.inputs == {"h": source}
+        assert computation.evaluate({source: event({"v": 4})}) == {"value": 8}
+        assert computation.evaluate({}) == {}
+
+    @pytest.mark.parametrize(
+        "config",
+        [
+            {"expression": "1"},
+            {"inputs": {"h": "not-a-uuid"}, "expression": "h.v"},
+            {"inputs": {"h": str(uuid4())}},
+            {"inputs": {"h": str(uuid4())}, "outputs": {"v": 1}},
+        ],
+    )
+    def test_rejects_invalid_config(self, config):
+        """Test that malformed configs are rejected."""
+        with pytest.raises(ValueError):
+            DerivedComputation.from_config(uuid4(), config)
+
+
+class TestHubDerived:
+    """Tests for evaluating derived feeds in the hub."""
+
+    async def test_publish_follows_graph(self):
+        """Test that inputs trigger their derived feeds, and those theirs."""
+        hub = DataHub()
+        host_a, host_b, other = uuid4(), uuid4(), uuid4()
+        total, scaled = uuid4(), uuid4()
+        hub.derived.add(
+            DerivedComputation.from_config(
+                total,
+                {
+                    "inputs": {"a": str(host_a), "b": str(host_b)},
+                    "outputs": {"cpu": "a.cpu + b.cpu"},
+                },
+            )
+        )
+        hub.derived.add(
+            DerivedComputation.from_config(
+                scaled, {"inputs": {"t": str(total)}, "expression": "t.cpu / 100"}
+            )
+        )
+
+        await hub.publish_feed_event(host_a, {"cpu": 20.0})
+        assert hub.get_latest(total) is None
+
+        await hub.publish_feed_event(host_b, {"cpu": 30.0})
+        await hub.publish_feed_event(other, {"cpu": 99.0})
+
+        assert hub.get_latest(total).payload == {"cpu": 50.0}
+        assert hub.get_latest(scaled).payload == {"value": 0.5}
+        assert hub.get_latest(scaled).ts == hub.get_latest(host_b).ts
+        assert hub.feed_seq[total] == 1
+
+    async def test_diamond_is_evaluated_once(self, make_websocket, sent_messages):
+        """Test that a feed reached by two paths gets one event, from fresh inputs."""
+        hub = DataHub()
+        source, doubled, combined = uuid4(), uuid4(), uuid4()
+        hub.derived.add(
+            DerivedComputation.from_config(
+                combined,
+                {
+                    "inputs": {"a": str(source), "b": str(doubled)},
+                    "outputs": {"v": "a.v + b.v"},
+                },
+            )
+        )
+        hub.derived.add(
+            DerivedComputation.from_config(
+                doubled, {"inputs": {"a": str(source)}, "outputs": {"v": "a.v * 2"}}
+            )
+        )
+        assert [d.feed_id for d in hub.derived.downstream(source)] == [doubled, combined]
+
+        websocket = make_websocket()
+        await hub.register_connection(uuid4(), websocket, {source, doubled, combined})
+        websocket.send_text.reset_mock()
+
+        await hub.publish_feed_event(source, {"v": 1.0})
+        await hub.publish_feed_event(source, {"v": 5.0})
+
+        assert hub.feed_seq[combined] == 2
+        assert hub.get_latest(combined).payload == {"v": 15.0}
+        # The source is sent first, then each derived feed once
+        updates = [(m["feed_id"], m["payload"]["v"]) for m in sent_messages(websocket)]
+        assert updates == [
+            (str(source), 1.0),
+            (str(doubled), 2.0),
+            (str(combined), 3.0),
+            (str(source), 5.0),
+            (str(doubled), 10.0),
+            (str(combined), 15.0),
+        ]
+
+    async def test_rejects_cycles(self):
+        """Test that a derived feed cannot depend on itself."""
+        hub = DataHub()
+        first, second = uuid4(), uuid4()
+        hub.derived.add(
+            DerivedComputation.from_config(
+                first, {"inputs": {"s": str(second)}, "expression": "s.v"}
+            )
+        )
+
+        with pytest.raises(ValueError):
+            hub.derived.add(
+                DerivedComputation.from_config(
+                    second, {"inputs": {"f": str(first)}, "expression": "f.value"}
+                )
+            )
+
+    async def test_demand_reaches_inputs(self):
+        """Test that watching a derived feed keeps its inputs wanted."""
+        hub = DataHub()
+        listener = MagicMock()
+        hub.on_demand_change = listener
+        source, derived_id, dashboard_id = uuid4(), uuid4(), uuid4()
+        feed = DerivedFeed(
+            derived_id, {"inputs": {"s": str(source)}, "expression": "s.v + 1"}, hub
+        )
+        await feed.start()
+        websocket = MagicMock()
+
+        await hub.register_connection(dashboard_id, websocket, {derived_id})
+        assert hub.has_subscribers(source)
+        await hub.unregister_connection(dashboard_id, websocket)
+        await feed.stop()
+
+        assert [call.args for call in listener.call_args_list] == [
+            (derived_id, True),
+            (source, True),
+            (derived_id, False),
+            (source, False),
+        ]
+        assert hub.derived.dependents(source) == []
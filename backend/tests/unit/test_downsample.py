@@ -0,0 +1,68 @@
+"""
+Unit tests for history downsampling.
+"""
+
+import math
+
+import pytest
+
+from app.hub.downsample import DownsampleMode, average, downsample, last, lttb, minmax
+
+
+def make_series(n: int):
+    """Create a sine series with one timestamp per second (in microseconds)."""
+    xs = [i * 1_000_000 for i in range(n)]
+    ys = [math.sin(i / 50) * 10 for i in range(n)]
+    return xs, ys
+
+
+class TestDownsample:
+    """Tests for downsampling functions."""
+
+    @pytest.mark.parametrize("mode", list(DownsampleMode))
+    def test_returns_at_most_max_points(self, mode: DownsampleMode):
+        """Test that every mode respects the point budget."""
+        xs, ys = make_series(10_000)
+
+        for max_points in (1, 2, 3, 100, 499):
+            out_x, out_y = downsample(xs, ys, max_points, mode)
+            assert 0 < len(out_x) <= max_points
+            assert len(out_x) == len(out_y)
+            assert out_x == sorted(out_x)
+
+    @pytest.mark.parametrize("mode", list(DownsampleMode))
+    def test_small_series_unchanged(self, mode: DownsampleMode):
+        """Test that series within budget are returned as-is."""
+        xs, ys = make_series(10)
+
+        assert downsample(xs, ys, 10, mode) == (xs, ys)
+        assert downsample([], [], 10, mode) == ([], [])
+
+    def test_lttb_keeps_endpoints_and_spikes(self):
+        """Test that LTTB keeps the first, last, and outlier points."""
+        xs = list(range(1000))
+        ys = [0.0] * 1000
+        ys[500] = 100.0
+
+        out_x, out_y = lttb(xs, ys, 20)
+
+        assert out_x[0] == 0
+        assert out_x[-1] == 999
+        assert 100.0 in out_y
+
+    def test_minmax_keeps_extremes(self):
+        """Test that min/max buckets keep each bucket's extremes."""
+        xs, ys = make_series(10_000)
+
+        _, out_y = minmax(xs, ys, 100)
+
+        assert min(out_y) == min(ys)
+        assert max(out_y) == max(ys)
+
+    def test_average_and_last(self):
+        """Test bucket averages and last values."""
+        xs = [0, 1, 2, 3]
+        ys = [1.0, 3.0, 5.0, 7.0]
+
+        assert average(xs, ys, 2) == ([0, 2], [2.0, 6.0])
+        assert last(xs, ys, 2) == ([1, 3], [3.0, 7.0])
@@ -10,8 +10,11 @@ from uuid import uuid4
 import pytest
 
 from app.feeds.base import BaseFeed
+from app.feeds.manager import FeedManager
 from app.feeds.system_metrics import SystemMetricsFeed
 from app.hub.events import FeedEvent
+from app.hub.hub import DataHub
+from app.models import FeedDefinition
 
 
 class MockFeed(BaseFeed):
@@ -111,6 +114,68 @@ class TestBaseFeed:
         assert feed.call_count >= 2
 
 
+    async def test_dormant_feed_waits_for_activation(self, mock_hub):
+        """Test that a dormant feed stops fetching and fetches again once woken."""
+        feed = MockFeed(uuid4(), {"interval_sec": 0.05}, mock_hub)
+        feed.active = False
+
+        await feed.start()
+        await asyncio.sleep(0.15)
+        assert feed.fetch_count == 0
+
+        feed.set_active(True)
+        await asyncio.sleep(0.01)
+        assert feed.fetch_count == 1
+        await feed.stop()
+
+    async def test_idle_interval(self, mock_hub):
+        """Test that a dormant feed with idle_interval_sec keeps fetching slowly."""
+        feed = MockFeed(uuid4(), {"interval_sec": 0.01, "idle_interval_sec": 0.1}, mock_hub)
+        feed.active = False
+
+        await feed.start()
+        await asyncio.sleep(0.15)
+        await feed.stop()
+
+        assert feed.fetch_count == 1
+
+
+class TestDemandDrivenFeeds:
+    """Tests for FeedManager's demand-driven mode."""
+
+    async def test_feeds_follow_subscriptions(self):
+        """Test that feeds wake on the first subscriber and sleep after the grace period."""
+        hub = DataHub()
+        manager = FeedManager(hub, demand_driven=True, grace_period=0.05)
+        watched = FeedDefinition(type="mock", name="watched", config_json='{"interval_sec": 60}')
+        pinned = FeedDefinition(
+            type="mock", name="pinned", config_json='{"interval_sec": 60, "always_on": true}'
+        )
+        with patch("app.feeds.manager.get_feed_class", return_value=MockFeed):
+            await manager.start_feed(watched)
+            await manager.start_feed(pinned)
+
+        try:
+            assert not manager.is_feed_active(watched.id)
+            assert manager.is_feed_active(pinned.id)
+
+            dashboard_id = uuid4()
+            websocket = MagicMock()
+            websocket.send_text = AsyncMock()
+            await hub.register_connection(dashboard_id, websocket, {watched.id, pinned.id})
+            await asyncio.sleep(0.01)
+            assert manager.is_feed_active(watched.id)
+            assert manager.get_feed(watched.id).fetch_count == 1
+
+            await hub.unregister_connection(dashboard_id, websocket)
+            assert manager.is_feed_active(watched.id)  # grace period
+            await asyncio.sleep(0.1)
+            assert not manager.is_feed_active(watched.id)
+            assert manager.is_feed_active(pinned.id)
+        finally:
+            await manager.stop_all_feeds()
+
+
 class TestSystemMetricsFeed:
     """Tests for SystemMetricsFeed."""
 
@@ -0,0 +1,188 @@
+"""
+Unit tests for columnar history buffers.
+"""
+
+import sys
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+
+import pytest
+
+from app.hub.history import HistoryBuffer, HistoryView, from_micros, to_micros
+from tests.conftest import BASE_TS
+
+
+class TestTimestamps:
+    """Tests for timestamp conversion."""
+
+    def test_round_trip_is_exact(self):
+        """Test that microsecond timestamps survive conversion."""
+        ts = datetime(2024, 5, 6, 7, 8, 9, 123456)
+
+        assert from_micros(to_micros(ts)) == ts
+
+    def test_aware_timestamps_are_normalized(self):
+        """Test that aware timestamps are stored as naive UTC."""
+        ts = datetime(2024, 1, 1, 14, 0, tzinfo=timezone(timedelta(hours=2)))
+
+        assert from_micros(to_micros(ts)) == datetime(2024, 1, 1, 12, 0)
+
+
+class TestHistoryBuffer:
+    """Tests for HistoryBuffer."""
+
+    def test_round_trip_mixed_payloads(self, make_event):
+        """Test that payload values come back unchanged."""
+        feed_id = uuid4()
+        buffer = HistoryBuffer(feed_id)
+        payloads = [
+            {"cpu": 12.5, "count": 3, "name": "a", "ok": True},
+            {"cpu": 13.0, "count": 4, "extra": {"nested": [1, 2]}},
+            {"cpu": 14, "count": 2**70},
+        ]
+
+        for i, payload in enumerate(payloads):
+            buffer.append(make_event(feed_id, i, payload))
+
+        events = buffer.events()
+        assert [e.payload for e in events] == payloads
+        assert [type(e.payload["cpu"]) for e in events] == [float, float, int]
+        assert events[1].ts == BASE_TS + timedelta(seconds=1)
+        assert all(e.feed_id == feed_id for e in events)
+
+    def test_overwrites_oldest_when_full(self, make_event):
+        """Test fixed-capacity ring behaviour."""
+        buffer = HistoryBuffer(uuid4(), capacity=100)
+
+        for i in range(250):
+            buffer.append(make_event(buffer.feed_id, i, {"value": i}))
+
+        assert len(buffer) == 100
+        values = [e.payload["value"] for e in buffer]
+        assert values == list(range(150, 250))
+
+    def test_trim_before(self, make_event):
+        """Test time-based trimming."""
+        buffer = HistoryBuffer(uuid4())
+        for i in range(10):
+            buffer.append(make_event(buffer.feed_id, i, {"value": i}))
+
+        buffer.trim_before(BASE_TS + timedelta(seconds=6))
+
+        assert [e.payload["value"] for e in buffer] == [6, 7, 8, 9]
+
+    def test_events_since_and_limit(self, make_event):
+        """Test filtering by timestamp and limit."""
+        buffer = HistoryBuffer(uuid4())
+        for i in range(10):
+            buffer.append(make_event(buffer.feed_id, i, {"value": i}))
+
+        since = buffer.events(since=BASE_TS + timedelta(seconds=6))
+        limited = buffer.events(limit=3)
+
+        assert [e.payload["value"] for e in since] == [7, 8, 9]
+        assert [e.payload["value"] for e in limited] == [7, 8, 9]
+
+    def test_range_bisects_wrapped_ring(self, make_event):
+        """Test since/until/limit ranges across the ring's wrap point."""
+        buffer = HistoryBuffer(uuid4(), capacity=8)
+        for i in range(13):
+            buffer.append(make_event(buffer.feed_id, i, {"value": i}))
+
+        # Ring now holds 5..12 with storage wrapped around
+        for lo in range(4, 14):
+            for hi in range(lo, 14):
+                view = buffer.range(
+                    since=BASE_TS + timedelta(seconds=lo),
+                    until=BASE_TS + timedelta(seconds=hi),
+                )
+                expected = [v for v in range(5, 13) if lo < v <= hi]
+                assert [e.payload["value"] for e in view] == expected
+
+        limited = buffer.range(until=BASE_TS + timedelta(seconds=10), limit=2)
+        assert [e.payload["value"] for e in limited] == [9, 10]
+
+    def test_range_returns_lazy_view(self, make_event):
+        """Test that range() returns a sliceable view, not a copy."""
+        buffer = HistoryBuffer(uuid4())
+        for i in range(10):
+            buffer.append(make_event(buffer.feed_id, i, {"value": i}))
+
+        view = buffer.range(since=BASE_TS + timedelta(seconds=2))
+
+        assert isinstance(view, HistoryView)
+        assert len(view) == 7
+        assert view[0].payload["value"] == 3
+        assert view[-1].payload["value"] == 9
+        assert [e.payload["value"] for e in view[1:3]] == [4, 5]
+        assert view.timestamps()[0] == to_micros(BASE_TS + timedelta(seconds=3))
+
+    def test_view_is_stable_across_appends(self, make_event):
+        """Test that views keep pointing at the same events."""
+        buffer = HistoryBuffer(uuid4(), capacity=4)
+        for i in range(4):
+            buffer.append(make_event(buffer.feed_id, i, {"value": i}))
+
+        view = buffer.range(since=BASE_TS + timedelta(seconds=1))
+        buffer.append(make_event(buffer.feed_id, 4, {"value": 4}))
+
+        assert [e.payload["value"] for e in view] == [2, 3]
+
+        for i in range(5, 8):
+            buffer.append(make_event(buffer.feed_id, i, {"value": i}))
+        with pytest.raises(IndexError):
+            view[0]
+
+    def test_out_of_order_events_are_inserted_in_order(self, make_event):
+        """Test that late events keep their timestamp and land in order."""
+        buffer = HistoryBuffer(uuid4(), capacity=4)
+        for seconds, payload in [(0, {"v": 0}), (2, {"v": 2}), (3, {"s": "x"}), (1, {"v": 1})]:
+            buffer.append(make_event(buffer.feed_id, seconds, payload))
+
+        assert [e.ts for e in buffer] == [BASE_TS + timedelta(seconds=s) for s in range(4)]
+        assert [e.payload for e in buffer] == [{"v": 0}, {"v": 1}, {"v": 2}, {"s": "x"}]
+
+        # On a full, wrapped ring the oldest event is still the one evicted
+        buffer.append(make_event(buffer.feed_id, 2.5, {"v": 2.5}))
+        assert [e.payload for e in buffer] == [{"v": 1}, {"v": 2}, {"v": 2.5}, {"s": "x"}]
+        assert buffer.series("v") == (
+            [to_micros(BASE_TS + timedelta(seconds=s)) for s in (1, 2, 2.5)],
+            [1.0, 2.0, 2.5],
+        )
+        assert [e.payload for e in buffer.range(since=BASE_TS + timedelta(seconds=2))] == [
+            {"v": 2.5},
+            {"s": "x"},
+        ]
+
+        # Older than everything in a full buffer: it would be evicted next
+        buffer.append(make_event(buffer.feed_id, 0.5, {"v": 0.5}))
+        assert [e.payload for e in buffer] == [{"v": 1}, {"v": 2}, {"v": 2.5}, {"s": "x"}]
+
+    def test_trim_before_on_wrapped_ring(self, make_event):
+        """Test trimming when the ring has wrapped."""
+        buffer = HistoryBuffer(uuid4(), capacity=4)
+        for i in range(6):
+            buffer.append(make_event(buffer.feed_id, i, {"value": i}))
+
+        buffer.trim_before(BASE_TS + timedelta(seconds=4))
+
+        assert [e.payload["value"] for e in buffer] == [4, 5]
+
+    def test_missing_keys_after_wraparound(self, make_event):
+        """Test that overwritten rows do not leak old keys."""
+        buffer = HistoryBuffer(uuid4(), capacity=2)
+        buffer.append(make_event(buffer.feed_id, 0, {"a": 1, "b": 2}))
+        buffer.append(make_event(buffer.feed_id, 1, {"a": 3}))
+        buffer.append(make_event(buffer.feed_id, 2, {"a": 5}))
+
+        assert [e.payload for e in buffer] == [{"a": 3}, {"a": 5}]
+
+    def test_smaller_than_event_objects(self, make_event):
+        """Test that numeric history is far smaller than pydantic events."""
+        buffer = HistoryBuffer(uuid4(), capacity=600)
+        for i in range(600):
+            buffer.append(make_event(buffer.feed_id, i, {"cpu": i * 0.5, "mem": i * 0.25}))
+
+        event = buffer.event_at(0)
+        per_event = sys.getsizeof(event) + sys.getsizeof(event.payload) + sys.getsizeof(event.ts)
+        assert buffer.nbytes() < per_event * 600 / 4
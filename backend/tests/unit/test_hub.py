@@ -110,6 +110,68 @@ class TestDataHub:
         # Should get the last 5 events
         assert history[-1].payload["value"] == 9
 
+    async def test_get_downsampled_history(self, hub: DataHub):
+        """Test downsampling numeric payload keys from history."""
+        feed_id = uuid4()
+
+        for i in range(100):
+            await hub.publish_feed_event(feed_id, {"value": i, "label": "x"})
+
+        series = hub.get_downsampled_history(feed_id, 10, mode="last")
+
+        assert list(series) == ["value"]
+        ts, values = series["value"]
+        assert len(ts) == len(values) <= 10
+        assert values[-1] == 99.0
+        assert hub.get_downsampled_history(uuid4(), 10) == {}
+
+    async def test_compressed_history(self):
+        """Test that compressed history reads back transparently."""
+        hub = DataHub(history_compression=True, history_block_size=4)
+        feed_id = uuid4()
+
+        for i in range(10):
+            await hub.publish_feed_event(feed_id, {"value": i})
+
+        history = hub.get_history(feed_id)
+        stats = hub.get_history_stats()
+
+        assert [e.payload["value"] for e in history] == list(range(10))
+        assert stats[0]["compressed"] is True
+        assert stats[0]["events"] == 10
+        assert stats[0]["bytes_per_point"] > 0
+
+    async def test_segment_history(self, tmp_path):
+        """Test that memory-mapped history reads back and is closed with the feed."""
+        hub = DataHub(history_segment_dir=tmp_path)
+        feed_id = uuid4()
+
+        for i in range(10):
+            await hub.publish_feed_event(feed_id, {"value": i, "label": "x"})
+
+        history = hub.get_history(feed_id)
+        downsampled = hub.get_downsampled_history(feed_id, max_points=5, mode="last")
+
+        assert [e.payload for e in history] == [{"value": i} for i in range(10)]
+        assert downsampled["value"][1][-1] == 9.0
+        assert list((tmp_path / str(feed_id)).glob("*.seg"))
+
+        hub.clear_feed_data(feed_id)
+        assert list((tmp_path / str(feed_id)).glob("*.seg"))
+
+    async def test_get_history_with_until(self, hub: DataHub):
+        """Test bounding history results by an end timestamp."""
+        feed_id = uuid4()
+
+        await hub.publish_feed_event(feed_id, {"value": 1})
+        cutoff = hub.get_latest(feed_id).ts
+        await asyncio.sleep(0.01)
+        await hub.publish_feed_event(feed_id, {"value": 2})
+
+        history = hub.get_history(feed_id, until=cutoff)
+
+        assert [e.payload["value"] for e in history] == [1]
+
     async def test_register_connection(self, hub: DataHub):
         """Test registering a WebSocket connection."""
         dashboard_id = uuid4()
@@ -225,6 +287,47 @@ class TestDataHub:
         assert ws_working in hub.connections[dashboard_id]
         assert ws_working.send_text.call_count == 1
 
+    async def test_feed_dashboards_index(self, hub: DataHub):
+        """Test that the feed -> dashboards index tracks registrations."""
+        dashboard1_id = uuid4()
+        dashboard2_id = uuid4()
+        feed1_id = uuid4()
+        feed2_id = uuid4()
+
+        ws1 = MagicMock()
+        ws1.send_text = AsyncMock()
+        ws2 = MagicMock()
+        ws2.send_text = AsyncMock()
+
+        await hub.register_connection(dashboard1_id, ws1, {feed1_id, feed2_id})
+        await hub.register_connection(dashboard2_id, ws2, {feed1_id})
+
+        assert hub.feed_dashboards[feed1_id] == {dashboard1_id, dashboard2_id}
+        assert hub.feed_dashboards[feed2_id] == {dashboard1_id}
+
+        await hub.unregister_connection(dashboard1_id, ws1)
+
+        assert hub.feed_dashboards[feed1_id] == {dashboard2_id}
+        assert feed2_id not in hub.feed_dashboards
+
+        await hub.unregister_connection(dashboard2_id, ws2)
+
+        assert hub.feed_dashboards == {}
+
+    async def test_index_cleared_when_all_sends_fail(self, hub: DataHub):
+        """Test that a dashboard whose connections all fail leaves the index."""
+        dashboard_id = uuid4()
+        feed_id = uuid4()
+
+        ws_broken = MagicMock()
+        ws_broken.send_text = AsyncMock(side_effect=Exception("Connection closed"))
+
+        await hub.register_connection(dashboard_id, ws_broken, {feed_id})
+        await hub.publish_feed_event(feed_id, {"value": 1})
+
+        assert dashboard_id not in hub.connections
+        assert feed_id not in hub.feed_dashboards
+
     async def test_clear_feed_data(self, hub: DataHub):
         """Test clearing all data for a feed."""
         feed_id = uuid4()
@@ -243,6 +346,89 @@ class TestDataHub:
         assert len(hub.get_history(feed_id)) == 0
 
 
+class TestDispatcher:
+    """Tests for the DataHub delivery dispatcher."""
+
+    async def test_publish_does_not_wait_for_slow_client(self, hub: DataHub):
+        """Test that publish returns before a slow client finishes receiving."""
+        dashboard_id = uuid4()
+        feed_id = uuid4()
+
+        async def slow_send(message):
+            await asyncio.sleep(0.5)
+
+        ws_slow = MagicMock()
+        ws_slow.send_text = AsyncMock(side_effect=slow_send)
+
+        await hub.start()
+        try:
+            await hub.register_connection(dashboard_id, ws_slow, {feed_id})
+
+            loop = asyncio.get_running_loop()
+            started = loop.time()
+            await hub.publish_feed_event(feed_id, {"value": 1})
+            assert loop.time() - started < 0.1
+
+            await hub.join()
+            await asyncio.sleep(0.6)
+            assert ws_slow.send_text.call_count == 1
+        finally:
+            await hub.stop()
+
+    async def test_fan_out_is_concurrent(self, hub: DataHub):
+        """Test that a slow client does not delay delivery to other clients."""
+        dashboard_id = uuid4()
+        feed_id = uuid4()
+
+        async def slow_send(message):
+            await asyncio.sleep(0.5)
+
+        ws_slow = MagicMock()
+        ws_slow.send_text = AsyncMock(side_effect=slow_send)
+        ws_fast = MagicMock()
+        ws_fast.send_text = AsyncMock()
+
+        await hub.start()
+        try:
+            await hub.register_connection(dashboard_id, ws_slow, {feed_id})
+            await hub.register_connection(dashboard_id, ws_fast, {feed_id})
+
+            await hub.publish_feed_event(feed_id, {"value": 1})
+            await asyncio.sleep(0.1)
+
+            assert ws_fast.send_text.call_count == 1
+        finally:
+            await hub.stop()
+
+    async def test_stalled_client_dropped_after_timeout(self):
+        """Test that a client exceeding the send timeout is disconnected."""
+        hub = DataHub(send_timeout=0.1)
+        dashboard_id = uuid4()
+        feed_id = uuid4()
+
+        async def stalled_send(message):
+            await asyncio.sleep(10)
+
+        ws_stalled = MagicMock()
+        ws_stalled.send_text = AsyncMock(side_effect=stalled_send)
+        ws_working = MagicMock()
+        ws_working.send_text = AsyncMock()
+
+        await hub.start()
+        try:
+            await hub.register_connection(dashboard_id, ws_stalled, {feed_id})
+            await hub.register_connection(dashboard_id, ws_working, {feed_id})
+
+            await hub.publish_feed_event(feed_id, {"value": 1})
+            await hub.join()
+            await asyncio.sleep(0.3)
+
+            assert ws_stalled not in hub.connections[dashboard_id]
+            assert ws_working in hub.connections[dashboard_id]
+        finally:
+            await hub.stop()
+
+
 class TestFeedEventMessage:
     """Tests for FeedEventMessage."""
 
@@ -0,0 +1,78 @@
+"""
+Unit tests for payload projection.
+"""
+
+import json
+from unittest.mock import AsyncMock, MagicMock
+from uuid import uuid4
+
+from app.hub.connection import ClientConnection
+from app.hub.delta import FeedUpdate
+from app.hub.events import FeedEvent
+from app.hub.projection import dashboard_projection, panel_payload_keys
+from app.hub.serialization import FeedEventEncoder
+
+
+class TestDashboardProjection:
+    """Tests for working out the payload keys a dashboard needs."""
+
+    def test_panel_payload_keys(self):
+        """Test the keys read by each panel type."""
+        assert panel_payload_keys("stat", {"field": "price"}) == {"price"}
+        assert panel_payload_keys("timeseries", {}) == {"value"}
+        assert panel_payload_keys("bar", {"field": "price"}) is None
+        assert panel_payload_keys("stat", {"field": ["a"]}) is None
+
+    def test_keys_merge_across_panels(self):
+        """Test that panels sharing a feed get the union, or the full payload."""
+        shared, full, single = uuid4(), uuid4(), uuid4()
+
+        projection = dashboard_projection(
+            [
+                ("stat", {"field": "price"}, [shared, full]),
+                ("timeseries", {"field": "volume"}, [shared, single]),
+                ("bar", {}, [full]),
+            ]
+        )
+
+        assert projection == {shared: {"price", "volume"}, single: {"volume"}}
+
+
+class TestProjectedUpdates:
+    """Tests for projected feed updates."""
+
+    def test_projection_is_shared_and_keeps_seq(self):
+        """Test that a key set is projected once, with the update's sequence numbers."""
+        encoder = FeedEventEncoder()
+        event = FeedEvent(feed_id=uuid4(), payload={"price": 2, "volume": 10, "extra": "x"})
+        update = FeedUpdate(encoder, event, seq=7, previous={"price": 1, "volume": 10})
+        keys = frozenset({"price"})
+
+        projected = update.project(keys)
+        delta = json.loads(projected.frame_for(6).text)
+
+        assert update.project(frozenset({"price"})) is projected
+        assert json.loads(projected.full.text)["payload"] == {"price": 2}
+        assert (delta["seq"], delta["base"], delta["set"], delta["unset"]) == (7, 6, {"price": 2}, [])
+        assert event.payload == {"price": 2, "volume": 10, "extra": "x"}
+
+    async def test_connection_sends_projected_payload(self):
+        """Test that a connection only sends its projected keys."""
+        encoder = FeedEventEncoder()
+        projected_feed, full_feed = uuid4(), uuid4()
+        websocket = MagicMock()
+        websocket.send_text = AsyncMock()
+        client = ClientConnection(
+            uuid4(),
+            websocket,
+            on_close=MagicMock(),
+            projection={projected_feed: frozenset({"a"})},
+        )
+
+        for feed_id in (projected_feed, full_feed):
+            event = FeedEvent(feed_id=feed_id, payload={"a": 1, "b": 2})
+            await client.send_now(FeedUpdate(encoder, event, seq=1))
+
+        sent = [json.loads(call.args[0])["payload"] for call in websocket.send_text.call_args_list]
+        assert sent == [{"a": 1}, {"a": 1, "b": 2}]
+        assert client.stats()["projected_feeds"] == 1
@@ -0,0 +1,114 @@
+"""
+Unit tests for the feed event relay.
+"""
+
+import asyncio
+from uuid import uuid4
+
+import pytest
+
+from app.hub.hub import DataHub
+from app.hub.relay import RelayPublisher, RelaySubscriber, encode_message, read_message
+
+
+async def wait_for(condition, timeout: float = 2.0) -> None:
+    """Poll until condition() is true."""
+    async with asyncio.timeout(timeout):
+        while not condition():
+            await asyncio.sleep(0.01)
+
+
+@pytest.fixture
+def socket_path(tmp_path):
+    """Relay socket path."""
+    return tmp_path / "relay.sock"
+
+
+@pytest.mark.asyncio
+class TestRelay:
+    """Tests for RelayPublisher and RelaySubscriber."""
+
+    async def test_message_round_trip(self):
+        """Test length-prefixed message framing."""
+        reader = asyncio.StreamReader()
+        reader.feed_data(encode_message({"type": "event", "value": 1.5}))
+        reader.feed_data(encode_message({"type": "history"}))
+
+        assert await read_message(reader) == {"type": "event", "value": 1.5}
+        assert await read_message(reader) == {"type": "history"}
+
+    async def test_events_reach_worker_replica(self, socket_path):
+        """Test that a worker gets replayed history, then live events."""
+        runner = DataHub()
+        publisher = RelayPublisher(runner, socket_path)
+        runner.relay = publisher
+        await publisher.start()
+        feed_id = uuid4()
+        await runner.publish_feed_event(feed_id, {"value": 1})
+
+        worker = DataHub()
+        subscriber = RelaySubscriber(worker, socket_path, reconnect_delay=0.05)
+        await subscriber.start()
+        try:
+            await wait_for(lambda: publisher.subscribers == 1)
+            await runner.publish_feed_event(feed_id, {"value": 2})
+            await wait_for(lambda: len(worker.get_history(feed_id)) == 2)
+
+            assert [e.payload["value"] for e in worker.get_history(feed_id)] == [1, 2]
+            assert worker.get_latest(feed_id).ts == runner.get_latest(feed_id).ts
+            assert subscriber.received == 1
+        finally:
+            await subscriber.stop()
+            await publisher.stop()
+
+        assert not socket_path.exists()
+
+    async def test_reconnect_does_not_duplicate_history(self, socket_path):
+        """Test that a worker reconnecting to a restarted runner skips replayed events."""
+        runner = DataHub()
+        publisher = RelayPublisher(runner, socket_path)
+        runner.relay = publisher
+        await publisher.start()
+        feed_id = uuid4()
+        for i in range(3):
+            await runner.publish_feed_event(feed_id, {"value": i})
+
+        worker = DataHub()
+        subscriber = RelaySubscriber(worker, socket_path, reconnect_delay=0.05)
+        await subscriber.start()
+        try:
+            await wait_for(lambda: len(worker.get_history(feed_id)) == 3)
+            await publisher.stop()
+            await wait_for(lambda: not subscriber.connected.is_set())
+
+            await runner.publish_feed_event(feed_id, {"value": 3})
+            await publisher.start()
+            await wait_for(lambda: len(worker.get_history(feed_id)) == 4)
+            await asyncio.sleep(0.05)
+
+            assert [e.payload["value"] for e in worker.get_history(feed_id)] == [0, 1, 2, 3]
+        finally:
+            await subscriber.stop()
+            await publisher.stop()
+
+    async def test_slow_worker_drops_oldest(self, socket_path):
+        """Test that a worker's queue is bounded."""
+        runner = DataHub()
+        publisher = RelayPublisher(runner, socket_path, queue_size=2)
+        await publisher.start()
+        reader, writer = await asyncio.open_unix_connection(str(socket_path))
+        try:
+            await wait_for(lambda: publisher.subscribers == 1)
+            subscriber = publisher._subscribers[0]
+            feed_id = uuid4()
+
+            # Queue without letting the writer task run
+            for i in range(5):
+                await runner.publish_feed_event(feed_id, {"value": i})
+                publisher.publish(runner.get_latest(feed_id))
+
+            assert subscriber.dropped == 3
+            assert len(subscriber.queue) == 2
+        finally:
+            writer.close()
+            await publisher.stop()
@@ -0,0 +1,141 @@
+"""
+Unit tests for history retention and the memory budget.
+"""
+
+from datetime import timedelta
+from uuid import uuid4
+
+import pytest
+
+from app.hub.hub import DataHub
+from app.hub.retention import RetentionPolicy
+
+
+class TestRetentionPolicy:
+    """Tests for RetentionPolicy."""
+
+    def test_from_config(self):
+        """Test reading overrides from feed config."""
+        policy = RetentionPolicy.from_config(
+            {"interval_sec": 5, "history_minutes": 60, "history_max_points": 100}
+        )
+
+        assert policy.window == timedelta(minutes=60)
+        assert policy.max_points == 100
+        assert policy.max_bytes is None
+        assert RetentionPolicy.from_config({"interval_sec": 5}) is None
+
+    @pytest.mark.parametrize("value", [0, -1, "10", True])
+    def test_rejects_invalid_values(self, value):
+        """Test that overrides must be positive numbers."""
+        with pytest.raises(ValueError):
+            RetentionPolicy.from_config({"history_max_bytes": value})
+
+
+class TestHubRetention:
+    """Tests for per-feed retention and the global memory budget."""
+
+    async def test_max_points_override(self):
+        """Test that a feed's max_points caps its history."""
+        hub = DataHub(history_capacity=100)
+        feed_id = uuid4()
+        hub.set_retention(feed_id, RetentionPolicy(max_points=5))
+
+        for i in range(20):
+            await hub.publish_feed_event(feed_id, {"value": i})
+
+        assert [e.payload["value"] for e in hub.get_history(feed_id)] == list(range(15, 20))
+
+    async def test_set_retention_resizes_existing_history(self):
+        """Test that changing max_points keeps the newest events."""
+        hub = DataHub()
+        feed_id = uuid4()
+        for i in range(20):
+            await hub.publish_feed_event(feed_id, {"value": i})
+
+        hub.set_retention(feed_id, RetentionPolicy(max_points=3))
+
+        assert [e.payload["value"] for e in hub.get_history(feed_id)] == [17, 18, 19]
+
+    async def test_max_bytes_override(self):
+        """Test that a feed's max_bytes bounds large payloads."""
+        hub = DataHub()
+        feed_id = uuid4()
+        hub.set_retention(feed_id, RetentionPolicy(max_bytes=20_000))
+
+        for i in range(50):
+            await hub.publish_feed_event(feed_id, {"body": "x" * 1000, "i": i})
+
+        history = hub.get_history(feed_id)
+        assert 0 < len(history) < 50
+        assert hub.history[feed_id].nbytes() <= 20_000
+        assert history[-1].payload["i"] == 49
+
+    async def test_window_override(self):
+        """Test that a feed's window replaces the hub window."""
+        hub = DataHub(history_window=timedelta(minutes=10))
+        feed_id = uuid4()
+        hub.set_retention(feed_id, RetentionPolicy(window=timedelta(microseconds=1)))
+
+        await hub.publish_feed_event(feed_id, {"value": 1})
+        await hub.publish_feed_event(feed_id, {"value": 2})
+
+        assert len(hub.get_history(feed_id)) <= 1
+
+    async def test_budget_evicts_least_recently_viewed(self):
+        """Test that the memory budget evicts unviewed feeds first."""
+        hub = DataHub(history_memory_budget=60_000)
+        viewed = uuid4()
+        unviewed = uuid4()
+
+        for i in range(20):
+            await hub.publish_feed_event(viewed, {"body": "x" * 1000, "i": i})
+        hub.get_history(viewed)
+        for i in range(40):
+            await hub.publish_feed_event(unviewed, {"body": "y" * 1000, "i": i})
+
+        accounting = hub.get_history_accounting()
+        assert accounting["used_bytes"] <= 60_000
+        # The running total is kept exact without recounting
+        assert accounting["used_bytes"] == sum(f["bytes"] for f in accounting["feeds"])
+        assert len(hub.get_history(viewed)) == 20
+        assert len(hub.get_history(unviewed)) < 40
+        assert hub.history_evicted[unviewed] > 0
+        assert viewed not in hub.history_evicted
+
+    async def test_clear_feed_data_releases_accounting(self):
+        """Test that clearing a feed removes its bytes and overrides."""
+        hub = DataHub()
+        feed_id = uuid4()
+        hub.set_retention(feed_id, RetentionPolicy(max_points=5))
+        await hub.publish_feed_event(feed_id, {"value": 1})
+
+        hub.clear_feed_data(feed_id)
+
+        assert hub.get_history_accounting()["used_bytes"] == 0
+        assert feed_id not in hub.retention
+
+    async def test_reloaded_segments_are_counted(self, tmp_path):
+        """Test that history reloaded from segment files counts towards the budget."""
+        feed_id = uuid4()
+        first = DataHub(history_segment_dir=tmp_path)
+        for i in range(200):
+            await first.publish_feed_event(feed_id, {"value": i})
+        reloaded = first.history[feed_id].nbytes()
+        first.clear_feed_data(feed_id)
+
+        # Restart with a budget below what the segment files hold
+        hub = DataHub(history_segment_dir=tmp_path, history_memory_budget=reloaded // 2)
+        await hub.publish_feed_event(feed_id, {"value": 200})
+
+        accounting = hub.get_history_accounting()
+        assert accounting["used_bytes"] == hub.history[feed_id].nbytes()
+        assert accounting["used_bytes"] <= reloaded // 2
+        assert hub.history_evicted[feed_id] > 0
+
+        # Clearing and republishing keeps the total exact
+        hub.clear_feed_data(feed_id)
+        assert hub.get_history_accounting()["used_bytes"] == 0
+        await hub.publish_feed_event(feed_id, {"value": 201})
+        assert hub.get_history_accounting()["used_bytes"] == hub.history[feed_id].nbytes()
+        hub.clear_feed_data(feed_id)
@@ -0,0 +1,170 @@
+"""
+Unit tests for memory-mapped history segments.
+"""
+
+import json
+import subprocess
+import sys
+from datetime import timedelta
+from pathlib import Path
+from uuid import uuid4
+
+import pytest
+
+from app.hub.segments import MmapHistoryBuffer, Segment
+from tests.conftest import BASE_TS
+
+
+@pytest.fixture
+def feed_id():
+    """Feed identifier for a test buffer."""
+    return uuid4()
+
+
+def segment_files(directory: Path, feed_id) -> list:
+    """Segment files on disk for a feed, oldest first."""
+    return sorted((directory / str(feed_id)).glob("*.seg"))
+
+
+class TestMmapHistoryBuffer:
+    """Tests for MmapHistoryBuffer."""
+
+    def test_round_trip(self, tmp_path, feed_id, make_event):
+        """Test that numeric payloads read back with their types."""
+        buffer = MmapHistoryBuffer(feed_id, tmp_path)
+
+        buffer.append(make_event(feed_id, 0, {"count": 1, "temp": 20.5, "label": "a"}))
+        buffer.append(make_event(feed_id, 1, {"count": 2}))
+        buffer.append(make_event(feed_id, 2, {"count": 3, "flag": True, "temp": 21.0}))
+
+        events = buffer.events()
+
+        assert len(buffer) == 3
+        assert [e.payload for e in events] == [
+            {"count": 1, "temp": 20.5},
+            {"count": 2},
+            {"count": 3, "temp": 21.0},
+        ]
+        assert isinstance(events[0].payload["count"], int)
+        assert events[2].ts == BASE_TS + timedelta(seconds=2)
+        assert buffer.keys() == ["count", "temp"]
+
+    def test_range_and_series(self, tmp_path, feed_id, make_event):
+        """Test range queries and series extraction across segments."""
+        buffer = MmapHistoryBuffer(
+            feed_id, tmp_path, capacity=1000, segment_duration=timedelta(seconds=10)
+        )
+        for i in range(40):
+            buffer.append(make_event(feed_id, i, {"value": i}))
+
+        view = buffer.range(
+            since=BASE_TS + timedelta(seconds=9), until=BASE_TS + timedelta(seconds=25)
+        )
+        xs, ys = view.series("value")
+
+        assert len(segment_files(tmp_path, feed_id)) == 4
+        assert [e.payload["value"] for e in view] == list(range(10, 26))
+        assert ys == [float(i) for i in range(10, 26)]
+        assert len(xs) == len(ys)
+        assert [e.payload["value"] for e in buffer.range(limit=3)] == [37, 38, 39]
+
+    def test_rotation_seals_segments(self, tmp_path, feed_id, make_event):
+        """Test that full segments and new keys start a new sealed-off segment."""
+        buffer = MmapHistoryBuffer(feed_id, tmp_path, segment_capacity=3)
+        for i in range(4):
+            buffer.append(make_event(feed_id, i, {"value": i}))
+        buffer.append(make_event(feed_id, 4, {"value": 4, "other": 1.5}))
+        buffer.append(make_event(feed_id, 5, {"value": 5.5}))
+
+        files = segment_files(tmp_path, feed_id)
+        segments = [Segment(path) for path in files]
+        try:
+            assert [s.count for s in segments] == [3, 1, 1, 1]
+            assert [s.sealed for s in segments] == [True, True, True, False]
+            assert dict(segments[-1].columns) == {"value": "d", "other": "d"}
+        finally:
+            for segment in segments:
+                segment.close()
+        assert [e.payload.get("value") for e in buffer] == [0, 1, 2, 3, 4, 5.5]
+
+    def test_capacity_and_trim(self, tmp_path, feed_id, make_event):
+        """Test that old events are dropped and empty segments deleted."""
+        buffer = MmapHistoryBuffer(
+            feed_id, tmp_path, capacity=25, segment_duration=timedelta(seconds=10)
+        )
+        for i in range(30):
+            buffer.append(make_event(feed_id, i, {"value": i}))
+
+        assert len(buffer) == 25
+        assert buffer.event_at(0).payload["value"] == 5
+
+        buffer.trim_before(BASE_TS + timedelta(seconds=22))
+
+        assert [e.payload["value"] for e in buffer] == list(range(22, 30))
+        assert len(segment_files(tmp_path, feed_id)) == 1
+        assert buffer.nbytes() == 8 * 16
+
+    def test_view_raises_after_eviction(self, tmp_path, feed_id, make_event):
+        """Test that views address events by absolute position."""
+        buffer = MmapHistoryBuffer(feed_id, tmp_path, capacity=5)
+        for i in range(5):
+            buffer.append(make_event(feed_id, i, {"value": i}))
+        view = buffer.range()
+
+        buffer.append(make_event(feed_id, 5, {"value": 5}))
+
+        assert view[-1].payload["value"] == 4
+        with pytest.raises(IndexError):
+            view[0]
+
+    def test_reopen_keeps_history(self, tmp_path, feed_id, make_event):
+        """Test that segments are picked up again after a restart."""
+        buffer = MmapHistoryBuffer(feed_id, tmp_path)
+        for i in range(5):
+            buffer.append(make_event(feed_id, i, {"value": i}))
+        buffer.close()
+
+        reopened = MmapHistoryBuffer(feed_id, tmp_path)
+        reopened.append(make_event(feed_id, 5, {"value": 5}))
+
+        assert [e.payload["value"] for e in reopened] == list(range(6))
+        assert len(segment_files(tmp_path, feed_id)) == 2
+
+    def test_readonly_reader(self, tmp_path, feed_id, make_event):
+        """Test that a read-only buffer sees new data after refresh."""
+        writer = MmapHistoryBuffer(feed_id, tmp_path)
+        writer.append(make_event(feed_id, 0, {"value": 0}))
+        reader = MmapHistoryBuffer(feed_id, tmp_path, readonly=True)
+
+        writer.append(make_event(feed_id, 1, {"value": 1}))
+        assert len(reader) == 2
+
+        writer.append(make_event(feed_id, 2, {"value": 2, "new": 1}))
+        reader.refresh()
+
+        assert [e.payload for e in reader] == [{"value": 0}, {"value": 1}, {"value": 2, "new": 1}]
+        with pytest.raises(RuntimeError):
+            reader.append(make_event(feed_id, 3, {"value": 3}))
+
+    def test_second_process_can_read(self, tmp_path, feed_id, make_event):
+        """Test that another process reads segments while they are being written."""
+        writer = MmapHistoryBuffer(feed_id, tmp_path)
+        for i in range(10):
+            writer.append(make_event(feed_id, i, {"value": i * 1.5}))
+
+        script = (
+            "import json, sys\n"
+            "from uuid import UUID\n"
+            "from app.hub.segments import MmapHistoryBuffer\n"
+            "buffer = MmapHistoryBuffer(UUID(sys.argv[1]), sys.argv[2], readonly=True)\n"
+            "print(json.dumps(buffer.series('value')[1]))\n"
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", script, str(feed_id), str(tmp_path)],
+            capture_output=True,
+            text=True,
+            cwd=Path(__file__).resolve().parents[2],
+            check=True,
+        )
+
+        assert json.loads(result.stdout) == [i * 1.5 for i in range(10)]
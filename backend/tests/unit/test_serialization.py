@@ -0,0 +1,70 @@
+"""
+Unit tests for the fast-path feed event serializers.
+"""
+
+import json
+from datetime import datetime, timezone
+from uuid import uuid4
+
+import pytest
+
+from app.hub.events import FeedEvent, FeedEventMessage
+from app.hub.serialization import SERIALIZERS, FeedEventEncoder, get_serializer
+
+PAYLOADS = [
+    {"cpu_percent": 45.5, "memory_percent": 60.2, "net_bytes_sent": 123456789},
+    {"coin_id": "bitcoin", "vs_currency": "usd", "price": 67123.45},
+    {"nested": {"list": [1, 2.5, None, True, "é"]}, "empty": {}},
+    {"value": float("nan"), "other": float("inf")},
+    {"big": 2**70, "large": 1e20, "small": 1e-5},
+    {"tiny": [1e-7, -3.5e-8, 1.5e-5, 1e-10], "text": 'not a float: 1e-07 "2e-05"'},
+]
+
+
+def expected_json(event: FeedEvent) -> bytes:
+    """Encode an event the pydantic way."""
+    return FeedEventMessage.from_feed_event(event).model_dump_json().encode("utf-8")
+
+
+class TestFeedEventEncoder:
+    """Tests for FeedEventEncoder."""
+
+    @pytest.mark.parametrize("payload", PAYLOADS)
+    def test_matches_pydantic_output(self, payload: dict):
+        """Test that the fast path produces byte-identical output."""
+        event = FeedEvent(feed_id=uuid4(), ts=datetime.utcnow(), payload=payload)
+        encoder = FeedEventEncoder()
+
+        assert encoder.encode(event) == expected_json(event)
+
+    @pytest.mark.parametrize("payload", PAYLOADS)
+    def test_json_fallback_matches_pydantic_output(self, payload: dict):
+        """Test that the stdlib fallback produces identical output."""
+        event = FeedEvent(feed_id=uuid4(), ts=datetime.utcnow(), payload=payload)
+        encoder = FeedEventEncoder("json")
+
+        assert encoder.encode(event) == expected_json(event)
+
+    @pytest.mark.parametrize("name", sorted(SERIALIZERS))
+    def test_timezone_aware_timestamps(self, name: str):
+        """Test that UTC timestamps are written with a Z suffix."""
+        event = FeedEvent(
+            feed_id=uuid4(), ts=datetime(2024, 1, 1, tzinfo=timezone.utc), payload={"v": 1}
+        )
+
+        assert FeedEventEncoder(name).encode(event) == expected_json(event)
+
+    def test_encode_message(self):
+        """Test encoding a non-feed message."""
+        data = FeedEventEncoder().encode_message({"type": "pong"})
+
+        assert json.loads(data) == {"type": "pong"}
+
+    def test_auto_uses_pydantic(self):
+        """Test that "auto" picks the pydantic-core serializer."""
+        assert get_serializer("auto") is SERIALIZERS["pydantic"]
+
+    def test_unknown_serializer(self):
+        """Test that an unknown serializer name is rejected."""
+        with pytest.raises(ValueError, match="Unknown or unavailable serializer"):
+            get_serializer("does-not-exist")
@@ -0,0 +1,109 @@
+"""
+Unit tests for the sharded hub.
+"""
+
+import asyncio
+import threading
+from uuid import uuid4
+
+from app.hub.hub import DataHub
+
+
+async def wait_for(condition, timeout: float = 2.0) -> None:
+    """Wait until a condition holds."""
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+
+class TestShardedHub:
+    """Tests for DataHub with connections spread across shard threads."""
+
+    async def test_fan_out_across_shards(self, make_websocket, sent_messages):
+        """Test that every connection gets every update in order, sent on the hub's loop."""
+        hub = DataHub(shards=3)
+        await hub.start()
+        feed_id = uuid4()
+        hub_thread = threading.get_ident()
+        send_threads = set()
+
+        websockets = []
+        for _ in range(9):
+            websocket = make_websocket()
+            websocket.send_text.side_effect = lambda text: send_threads.add(
+                threading.get_ident()
+            )
+            await hub.register_connection(uuid4(), websocket, {feed_id})
+            websockets.append(websocket)
+
+        stats = hub.get_connection_stats()
+        assert sorted(entry["shard"] for entry in stats) == [0, 0, 0, 1, 1, 1, 2, 2, 2]
+        assert {thread.name for thread in threading.enumerate()} >= {
+            "hub-shard-0",
+            "hub-shard-1",
+            "hub-shard-2",
+        }
+
+        for i in range(50):
+            await hub.publish_feed_event(feed_id, {"value": i})
+        await hub.join()
+        await wait_for(lambda: all(ws.send_text.call_count == 50 for ws in websockets))
+
+        for websocket in websockets:
+            values = [m["payload"]["value"] for m in sent_messages(websocket)]
+            assert values == list(range(50))
+        # The WebSockets were only used from the hub's loop
+        assert send_threads == {hub_thread}
+
+        await hub.stop()
+        assert not any(t.name.startswith("hub-shard-") for t in threading.enumerate())
+        assert hub.clients == {}
+
+    async def test_failed_connection_is_forgotten(self, make_websocket, sent_messages):
+        """Test that a connection failing on its shard is unregistered on the hub's loop."""
+        hub = DataHub(shards=2, send_timeout=0.5)
+        await hub.start()
+        feed_id = uuid4()
+        good = make_websocket()
+        bad = make_websocket()
+        bad.send_text.side_effect = ConnectionError("gone")
+        await hub.register_connection(uuid4(), good, {feed_id})
+        bad_dashboard = uuid4()
+        await hub.register_connection(bad_dashboard, bad, {feed_id})
+
+        await hub.publish_feed_event(feed_id, {"value": 1})
+        await wait_for(lambda: bad_dashboard not in hub.connections)
+        await hub.publish_feed_event(feed_id, {"value": 2})
+        await wait_for(lambda: good.send_text.call_count == 2)
+
+        assert [m["payload"]["value"] for m in sent_messages(good)] == [1, 2]
+        assert len(hub.get_connection_stats()) == 1
+        await hub.stop()
+
+    async def test_resync_and_unregister_run_on_the_shard(self, make_websocket, sent_messages):
+        """Test that connection changes made through the hub reach sharded queues."""
+        hub = DataHub(shards=1)
+        await hub.start()
+        feed_id = uuid4()
+        await hub.publish_feed_event(feed_id, {"value": 1})
+        await hub.join()
+        dashboard_id = uuid4()
+        websocket = make_websocket()
+        await hub.register_connection(dashboard_id, websocket, {feed_id}, delta=True)
+        await hub.publish_feed_event(feed_id, {"value": 2})
+        await wait_for(lambda: websocket.send_text.call_count == 2)
+
+        await hub.resync(websocket)
+        await wait_for(lambda: websocket.send_text.call_count == 3)
+        snapshot = sent_messages(websocket)[-1]
+        # The resync reset the connection's delta state on its shard
+        assert snapshot["type"] == "snapshot"
+        assert snapshot["updates"][0]["type"] == "feed_update"
+
+        await hub.unregister_connection(dashboard_id, websocket)
+        await wait_for(lambda: not hub.get_connection_stats())
+        await hub.publish_feed_event(feed_id, {"value": 3})
+        await hub.join()
+        await hub.stop()
+        assert websocket.send_text.call_count == 3
@@ -0,0 +1,113 @@
+"""
+Unit tests for hub snapshots.
+"""
+
+import asyncio
+import gzip
+import json
+from uuid import uuid4
+
+import pytest
+
+from app.hub.hub import DataHub
+from app.hub.snapshot import HubSnapshot
+
+
+@pytest.mark.asyncio
+class TestHubSnapshot:
+    """Tests for HubSnapshot."""
+
+    async def test_save_and_restore(self, tmp_path):
+        """Test that latest values and history survive a restart."""
+        path = tmp_path / "snapshot.json.gz"
+        first = DataHub()
+        feed_id = uuid4()
+        for i in range(5):
+            await first.publish_feed_event(feed_id, {"value": i, "label": f"v{i}"})
+        await HubSnapshot(first, path).save()
+
+        second = DataHub()
+        restored = HubSnapshot(second, path).restore()
+
+        assert restored == 1
+        assert second.get_latest(feed_id).payload == {"value": 4, "label": "v4"}
+        assert [e.payload["value"] for e in second.get_history(feed_id)] == list(range(5))
+        assert second.get_history(feed_id)[0].ts == first.get_history(feed_id)[0].ts
+
+    async def test_restore_only_requested_feeds(self, tmp_path):
+        """Test that feeds outside feed_ids are skipped."""
+        path = tmp_path / "snapshot.json.gz"
+        hub = DataHub()
+        kept, dropped = uuid4(), uuid4()
+        await hub.publish_feed_event(kept, {"value": 1})
+        await hub.publish_feed_event(dropped, {"value": 2})
+        await HubSnapshot(hub, path).save()
+
+        restored_hub = DataHub()
+        HubSnapshot(restored_hub, path).restore(feed_ids=[kept])
+
+        assert restored_hub.get_latest(kept) is not None
+        assert restored_hub.get_latest(dropped) is None
+
+    async def test_restore_drops_expired_history(self, tmp_path):
+        """Test that history older than the window is not restored."""
+        path = tmp_path / "snapshot.json.gz"
+        hub = DataHub()
+        feed_id = uuid4()
+        await hub.publish_feed_event(feed_id, {"value": 0})
+        await hub.publish_feed_event(feed_id, {"value": 1})
+        snapshot = HubSnapshot(hub, path)
+        data = await snapshot.build()
+        data["feeds"][0]["ts"][0] -= 3600 * 10**6
+        snapshot._write(data)
+
+        restored_hub = DataHub()
+        HubSnapshot(restored_hub, path).restore()
+
+        assert [e.payload["value"] for e in restored_hub.get_history(feed_id)] == [1]
+
+    async def test_build_yields_between_feeds(self, tmp_path):
+        """Test that building a snapshot lets the event loop run between feeds."""
+        hub = DataHub()
+        feed_ids = [uuid4() for _ in range(3)]
+        for feed_id in feed_ids:
+            await hub.publish_feed_event(feed_id, {"value": 1})
+            await hub.publish_feed_event(feed_id, {"value": 2})
+
+        task = asyncio.create_task(HubSnapshot(hub, tmp_path / "snapshot.json.gz").build())
+        await asyncio.sleep(0)
+        assert not task.done()
+        data = await task
+
+        assert sorted(feed["feed_id"] for feed in data["feeds"]) == sorted(map(str, feed_ids))
+        assert all(feed["payloads"] == [{"value": 1}, {"value": 2}] for feed in data["feeds"])
+
+    async def test_unreadable_snapshot_is_ignored(self, tmp_path):
+        """Test that a corrupt or missing snapshot does not prevent startup."""
+        path = tmp_path / "snapshot.json.gz"
+        hub = DataHub()
+
+        assert HubSnapshot(hub, path).restore() == 0
+
+        path.write_bytes(b"not gzip")
+        assert HubSnapshot(hub, path).restore() == 0
+
+        path.write_bytes(gzip.compress(json.dumps({"version": 99}).encode()))
+        assert HubSnapshot(hub, path).restore() == 0
+        assert hub.latest == {}
+
+    async def test_stop_saves_snapshot(self, tmp_path):
+        """Test that stopping writes a final snapshot atomically."""
+        path = tmp_path / "data" / "snapshot.json.gz"
+        hub = DataHub()
+        feed_id = uuid4()
+        snapshot = HubSnapshot(hub, path, interval=3600)
+        await snapshot.start()
+        await hub.publish_feed_event(feed_id, {"value": 7})
+
+        await snapshot.stop()
+
+        data = json.loads(gzip.decompress(path.read_bytes()))
+        assert data["feeds"][0]["latest"][1] == {"value": 7}
+        assert snapshot.saved_at is not None
+        assert not list(path.parent.glob("*.tmp"))
@@ -0,0 +1,145 @@
+"""
+Unit tests for the durable history store.
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+import pytest
+from sqlmodel import create_engine
+from sqlmodel.pool import StaticPool
+
+from app.hub.events import FeedEvent
+from app.hub.hub import DataHub
+from app.hub.store import HistoryStore
+
+
+@pytest.fixture
+def engine():
+    """Create an in-memory SQLite engine shared across threads."""
+    return create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+
+
+def make_event(feed_id, ts: datetime, value: int) -> FeedEvent:
+    """Create a feed event."""
+    return FeedEvent(feed_id=feed_id, ts=ts, payload={"value": value, "tag": "t"})
+
+
+class TestHistoryStore:
+    """Tests for HistoryStore."""
+
+    async def test_batches_are_written_in_background(self, engine):
+        """Test that queued events are written without an explicit flush."""
+        store = HistoryStore(engine, batch_size=10, flush_interval=0.05)
+        await store.start()
+        feed_id = uuid4()
+        now = datetime.utcnow()
+
+        for i in range(25):
+            store.add(make_event(feed_id, now + timedelta(seconds=i), i))
+        assert store.pending == 25
+
+        await asyncio.sleep(0.3)
+        events = await store.query(feed_id)
+        await store.stop()
+
+        assert store.written == 25
+        assert [e.payload["value"] for e in events] == list(range(25))
+
+    async def test_query_range_and_limit(self, engine):
+        """Test time bounds and limits on persisted reads."""
+        store = HistoryStore(engine)
+        await store.start()
+        feed_id = uuid4()
+        start = datetime(2024, 1, 1)
+        for i in range(10):
+            store.add(make_event(feed_id, start + timedelta(seconds=i), i))
+        store.add(make_event(uuid4(), start, 99))
+        await store.stop()
+
+        events = await store.query(
+            feed_id,
+            since=start + timedelta(seconds=2),
+            before=start + timedelta(seconds=8),
+            limit=3,
+        )
+
+        assert [e.payload["value"] for e in events] == [5, 6, 7]
+        assert events[0].ts == start + timedelta(seconds=5)
+
+    async def test_retention_deletes_expired_events(self, engine):
+        """Test that retention removes events older than the period."""
+        store = HistoryStore(engine, retention=timedelta(hours=1))
+        await store.start()
+        feed_id = uuid4()
+        now = datetime.utcnow()
+        store.add(make_event(feed_id, now - timedelta(hours=2), 1))
+        store.add(make_event(feed_id, now, 2))
+        await store.flush()
+
+        deleted = await store.apply_retention()
+        events = await store.query(feed_id)
+        await store.stop()
+
+        assert deleted == 1
+        assert [e.payload["value"] for e in events] == [2]
+
+    async def test_bounded_pending_queue(self, engine):
+        """Test that a backed-up store drops its oldest unwritten events."""
+        store = HistoryStore(engine, max_pending=5)
+        feed_id = uuid4()
+        now = datetime.utcnow()
+
+        for i in range(8):
+            store.add(make_event(feed_id, now + timedelta(seconds=i), i))
+
+        assert store.pending == 5
+        assert store.dropped == 3
+
+
+class TestHubWithStore:
+    """Tests for DataHub reads backed by the store."""
+
+    async def test_reads_fall_back_to_store(self, engine):
+        """Test that history older than memory comes from the store."""
+        store = HistoryStore(engine)
+        await store.start()
+        hub = DataHub(history_capacity=5, history_store=store)
+        feed_id = uuid4()
+
+        for i in range(12):
+            await hub.publish_feed_event(feed_id, {"value": i})
+        await store.flush()
+
+        assert len(hub.get_history(feed_id)) == 5
+        events = await hub.query_history(feed_id)
+        limited = await hub.query_history(feed_id, limit=8)
+        series = await hub.query_downsampled_history(feed_id, 100)
+        await store.stop()
+
+        assert [e.payload["value"] for e in events] == list(range(12))
+        assert [e.payload["value"] for e in limited] == list(range(4, 12))
+        assert series["value"][1] == [float(i) for i in range(12)]
+
+    async def test_load_history_from_store(self, engine):
+        """Test that a new hub is warmed from persisted history."""
+        store = HistoryStore(engine)
+        await store.start()
+        first = DataHub(history_store=store)
+        feed_id = uuid4()
+        for i in range(3):
+            await first.publish_feed_event(feed_id, {"value": i})
+        await store.flush()
+
+        second = DataHub(history_store=store)
+        loaded = await second.load_history_from_store()
+        await store.stop()
+
+        assert loaded == 3
+        assert [e.payload["value"] for e in second.get_history(feed_id)] == [0, 1, 2]
+        assert second.get_latest(feed_id).payload["value"] == 2
@@ -5,14 +5,27 @@
 import { ref, onUnmounted } from 'vue'
 import { useLiveDataStore } from '../stores/liveData'
 import { useUiStore } from '../stores/ui'
+import { useNotificationsStore } from '../stores/notifications'
 import apiClient from '../api/client'
-import type { FeedEventMessage } from '../types'
+import type {
+  AlertMessage,
+  FeedBatchMessage,
+  FeedDeltaMessage,
+  FeedEventMessage,
+  SnapshotMessage,
+} from '../types'
+
+export interface DashboardWebSocketOptions {
+  maxRate?: number // max updates per second per feed; the server sends the latest
+}
 
-export function useDashboardWebSocket(dashboardId: string) {
+export function useDashboardWebSocket(dashboardId: string, options: DashboardWebSocketOptions = {}) {
   const liveDataStore = useLiveDataStore()
   const uiStore = useUiStore()
+  const notifications = useNotificationsStore()
 
   const ws = ref<WebSocket | null>(null)
+  const firingAlerts = ref<Record<string, AlertMessage>>({}) // rule_id -> alert
   const reconnectAttempts = ref(0)
   const maxReconnectAttempts = 5
   const reconnectDelay = 2000
@@ -20,13 +33,73 @@ export function useDashboardWebSocket(dashboardId: string) {
   let reconnectTimeout: ReturnType<typeof setTimeout> | null = null
   let pingInterval: ReturnType<typeof setInterval> | null = null
 
+  function handleFeedMessage(message: FeedEventMessage | FeedDeltaMessage) {
+    if (message.type === 'feed_update') {
+      liveDataStore.applyFeedUpdate(
+        {
+          feed_id: message.feed_id,
+          ts: message.ts,
+          payload: message.payload,
+        },
+        message.seq
+      )
+    } else if (!liveDataStore.applyFeedDelta(message)) {
+      // Missing the update this delta builds on; ask for the full state
+      ws.value?.send(JSON.stringify({ type: 'resync', feed_ids: [message.feed_id] }))
+    }
+  }
+
+  function handleSnapshot(message: SnapshotMessage) {
+    liveDataStore.setEpoch(message.epoch)
+    for (const feedId of message.resync_required) {
+      // Updates were missed and can't be replayed; start the feed over
+      liveDataStore.clearFeedData(feedId)
+    }
+    for (const [feedId, series] of Object.entries(message.history)) {
+      liveDataStore.setHistorySeries(feedId, series)
+    }
+    for (const update of message.updates) {
+      // The backfill usually ends with the latest event; don't add it twice
+      const history = liveDataStore.getHistory(update.feed_id)
+      if (message.history[update.feed_id] && history[history.length - 1]?.ts === update.ts) {
+        history.pop()
+      }
+      handleFeedMessage(update)
+    }
+  }
+
+  function handleAlert(message: AlertMessage) {
+    const wasFiring = message.rule_id in firingAlerts.value
+    if (message.state === 'firing') {
+      firingAlerts.value[message.rule_id] = message
+      // Rules still firing are re-sent on reconnect; only announce new ones
+      if (!wasFiring) notifications.warning(`Alert firing: ${message.name}`)
+    } else if (wasFiring) {
+      delete firingAlerts.value[message.rule_id]
+      notifications.success(`Alert resolved: ${message.name}`)
+    }
+  }
+
   function connect() {
     if (ws.value?.readyState === WebSocket.OPEN) {
       console.log('WebSocket already connected')
       return
     }
 
-    const url = apiClient.getWebSocketUrl(dashboardId)
+    // Opt in to delta-encoded updates (only changed payload keys)
+    let url = `${apiClient.getWebSocketUrl(dashboardId)}?delta=1`
+    if (options.maxRate) {
+      url += `&max_rate=${options.maxRate}`
+    }
+
+    // After a reconnect, ask for only the updates missed in between
+    const epoch = liveDataStore.getEpoch()
+    const resume = Object.entries(liveDataStore.getSeqs())
+      .map(([feedId, seq]) => `${feedId}:${seq}`)
+      .join(',')
+    if (epoch && resume) {
+      url += `&epoch=${encodeURIComponent(epoch)}&resume=${encodeURIComponent(resume)}`
+    }
     console.log(`Connecting to WebSocket: ${url}`)
 
     uiStore.setWsStatus('connecting')
@@ -48,14 +121,22 @@ export function useDashboardWebSocket(dashboardId: string) {
 
     ws.value.onmessage = (event) => {
       try {
-        const message = JSON.parse(event.data) as FeedEventMessage
-
-        if (message.type === 'feed_update') {
-          liveDataStore.applyFeedUpdate({
-            feed_id: message.feed_id,
-            ts: message.ts,
-            payload: message.payload,
-          })
+        const message = JSON.parse(event.data) as
+          | FeedEventMessage
+          | FeedDeltaMessage
+          | FeedBatchMessage
+          | SnapshotMessage
+          | AlertMessage
+          | { type: 'pong' }
+
+        if (message.type === 'feed_update' || message.type === 'feed_delta') {
+          handleFeedMessage(message)
+        } else if (message.type === 'feed_batch') {
+          message.updates.forEach(handleFeedMessage)
+        } else if (message.type === 'snapshot') {
+          handleSnapshot(message)
+        } else if (message.type === 'alert') {
+          handleAlert(message)
         } else if (message.type === 'pong') {
           // Pong received, connection is alive
         }
@@ -121,6 +202,13 @@ export function useDashboardWebSocket(dashboardId: string) {
     disconnect()
   })
 
+  function setMaxRate(maxRate: number | null) {
+    options.maxRate = maxRate ?? undefined
+    if (ws.value?.readyState === WebSocket.OPEN) {
+      ws.value.send(JSON.stringify({ type: 'set_rate', max_rate: maxRate }))
+    }
+  }
+
   function manualReconnect() {
     reconnectAttempts.value = 0 // Reset reconnect attempts
     disconnect()
@@ -133,6 +221,8 @@ export function useDashboardWebSocket(dashboardId: string) {
     connect,
     disconnect,
     manualReconnect,
+    setMaxRate,
+    firingAlerts,
     reconnectAttempts,
     ws,
   }
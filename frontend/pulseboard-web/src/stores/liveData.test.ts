@@ -123,6 +123,93 @@ describe('LiveData Store', () => {
     })
   })
 
+  describe('applyFeedDelta', () => {
+    it('should merge a delta onto its base update', () => {
+      const store = useLiveDataStore()
+
+      store.applyFeedUpdate(
+        createMockFeedEvent({ feed_id: 'feed-1', payload: { price: 1, coin: 'btc', stale: true } }),
+        1
+      )
+      const applied = store.applyFeedDelta({
+        type: 'feed_delta',
+        feed_id: 'feed-1',
+        ts: '2024-01-01T00:00:01Z',
+        seq: 2,
+        base: 1,
+        set: { price: 2 },
+        unset: ['stale'],
+      })
+
+      expect(applied).toBe(true)
+      expect(store.getLatest('feed-1')?.payload).toEqual({ price: 2, coin: 'btc' })
+      expect(store.getHistory('feed-1').length).toBe(2)
+    })
+
+    it('should reject a delta whose base is not held', () => {
+      const store = useLiveDataStore()
+
+      store.applyFeedUpdate(createMockFeedEvent({ feed_id: 'feed-1', payload: { price: 1 } }), 1)
+      const applied = store.applyFeedDelta({
+        type: 'feed_delta',
+        feed_id: 'feed-1',
+        ts: '2024-01-01T00:00:02Z',
+        seq: 3,
+        base: 2,
+        set: { price: 3 },
+        unset: [],
+      })
+
+      expect(applied).toBe(false)
+      expect(store.getLatest('feed-1')?.payload).toEqual({ price: 1 })
+    })
+  })
+
+  describe('resume', () => {
+    it('should skip updates already held and report seqs', () => {
+      const store = useLiveDataStore()
+      store.setEpoch('epoch-1')
+
+      store.applyFeedUpdate(createMockFeedEvent({ feed_id: 'feed-1', payload: { v: 1 } }), 1)
+      store.applyFeedUpdate(createMockFeedEvent({ feed_id: 'feed-1', payload: { v: 2 } }), 2)
+      store.applyFeedUpdate(createMockFeedEvent({ feed_id: 'feed-1', payload: { v: 1 } }), 1)
+
+      expect(store.getLatest('feed-1')?.payload).toEqual({ v: 2 })
+      expect(store.getHistory('feed-1').length).toBe(2)
+      expect(store.getSeqs()).toEqual({ 'feed-1': 2 })
+    })
+
+    it('should forget seqs from another epoch', () => {
+      const store = useLiveDataStore()
+      store.setEpoch('epoch-1')
+      store.applyFeedUpdate(createMockFeedEvent({ feed_id: 'feed-1' }), 5)
+
+      store.setEpoch('epoch-2')
+
+      expect(store.getEpoch()).toBe('epoch-2')
+      expect(store.getSeqs()).toEqual({})
+    })
+  })
+
+  describe('setHistorySeries', () => {
+    it('should merge per-key series into events', () => {
+      const store = useLiveDataStore()
+
+      store.setHistorySeries('feed-1', {
+        cpu: { ts: ['2024-01-01T00:00:01', '2024-01-01T00:00:02'], values: [10, 20] },
+        ram: { ts: ['2024-01-01T00:00:00', '2024-01-01T00:00:02'], values: [50, 60] },
+      })
+
+      const history = store.getHistory('feed-1')
+      expect(history.map((event) => event.payload)).toEqual([
+        { ram: 50 },
+        { cpu: 10 },
+        { cpu: 20, ram: 60 },
+      ])
+      expect(store.getLatest('feed-1')?.ts).toBe('2024-01-01T00:00:02')
+    })
+  })
+
   describe('clear', () => {
     it('should clear all feed data', () => {
       const store = useLiveDataStore()
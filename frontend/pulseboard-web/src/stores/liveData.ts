@@ -4,7 +4,7 @@
 
 import { defineStore } from 'pinia'
 import { ref } from 'vue'
-import type { FeedEvent } from '../types'
+import type { FeedDeltaMessage, FeedEvent, HistorySeries } from '../types'
 
 export const useLiveDataStore = defineStore('liveData', () => {
   // State
@@ -12,12 +12,27 @@ export const useLiveDataStore = defineStore('liveData', () => {
   const history = ref<Record<string, FeedEvent[]>>({})
   const maxHistorySize = 100 // Keep last 100 events per feed
 
+  // Sequence number of the latest update per feed, and the server epoch
+  // they belong to
+  let seqs: Record<string, number> = {}
+  let epoch: string | null = null
+
   // Actions
-  function applyFeedUpdate(event: FeedEvent) {
+  function applyFeedUpdate(event: FeedEvent, seq?: number) {
     const feedId = event.feed_id
 
+    // Already held, e.g. replayed after a reconnect and then sent again
+    if (seq !== undefined && seqs[feedId] !== undefined && seq <= seqs[feedId]) {
+      return
+    }
+
     // Update latest
     latest.value[feedId] = event
+    if (seq !== undefined) {
+      seqs[feedId] = seq
+    } else {
+      delete seqs[feedId]
+    }
 
     // Update history
     if (!history.value[feedId]) {
@@ -32,9 +47,28 @@ export const useLiveDataStore = defineStore('liveData', () => {
     }
   }
 
+  /**
+   * Apply a delta on top of the latest update of its feed.
+   * Returns false if the base update is not held; the caller should resync.
+   */
+  function applyFeedDelta(delta: FeedDeltaMessage): boolean {
+    const current = latest.value[delta.feed_id]
+    if (!current || seqs[delta.feed_id] !== delta.base) {
+      return false
+    }
+
+    const payload = { ...current.payload, ...delta.set }
+    for (const key of delta.unset) {
+      delete payload[key]
+    }
+    applyFeedUpdate({ feed_id: delta.feed_id, ts: delta.ts, payload }, delta.seq)
+    return true
+  }
+
   function setHistory(feedId: string, events: FeedEvent[]) {
     history.value[feedId] = events.slice(-maxHistorySize)
 
+    delete seqs[feedId]
     const latestEvent = events.length > 0 ? events[events.length - 1] : undefined
     if (latestEvent) {
       latest.value[feedId] = latestEvent
@@ -43,6 +77,50 @@ export const useLiveDataStore = defineStore('liveData', () => {
     }
   }
 
+  /**
+   * Replace a feed's history with per-key series, e.g. a snapshot backfill.
+   * Points of different keys recorded at the same time become one event.
+   */
+  function setHistorySeries(feedId: string, series: Record<string, HistorySeries>) {
+    const payloads = new Map<string, Record<string, any>>()
+    for (const [key, { ts, values }] of Object.entries(series)) {
+      ts.forEach((t, i) => {
+        const payload = payloads.get(t) ?? {}
+        payload[key] = values[i]
+        payloads.set(t, payload)
+      })
+    }
+
+    // ISO timestamps sort chronologically as strings
+    const events = [...payloads.keys()].sort().map((ts) => ({
+      feed_id: feedId,
+      ts,
+      payload: payloads.get(ts)!,
+    }))
+    setHistory(feedId, events)
+  }
+
+  /**
+   * Record the server epoch; sequence numbers from another epoch are dropped.
+   */
+  function setEpoch(value: string) {
+    if (epoch !== value) {
+      seqs = {}
+    }
+    epoch = value
+  }
+
+  function getEpoch(): string | null {
+    return epoch
+  }
+
+  /**
+   * Sequence number of the latest update held per feed, to resume from.
+   */
+  function getSeqs(): Record<string, number> {
+    return { ...seqs }
+  }
+
   function getLatest(feedId: string): FeedEvent | undefined {
     return latest.value[feedId]
   }
@@ -54,11 +132,14 @@ export const useLiveDataStore = defineStore('liveData', () => {
   function clearFeedData(feedId: string) {
     delete latest.value[feedId]
     delete history.value[feedId]
+    delete seqs[feedId]
   }
 
   function clearAll() {
     latest.value = {}
     history.value = {}
+    seqs = {}
+    epoch = null
   }
 
   return {
@@ -68,7 +149,12 @@ export const useLiveDataStore = defineStore('liveData', () => {
 
     // Actions
     applyFeedUpdate,
+    applyFeedDelta,
     setHistory,
+    setHistorySeries,
+    setEpoch,
+    getEpoch,
+    getSeqs,
     getLatest,
     getHistory,
     clearFeedData,
@@ -70,6 +70,7 @@ export function createMockFeedEvent(overrides?: Partial<FeedEventMessage>): Feed
     feed_id: 'test-feed-1',
     ts: new Date().toISOString(),
     payload: { value: 42 },
+    seq: 1,
     ...overrides,
   }
 }
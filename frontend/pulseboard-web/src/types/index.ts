@@ -94,6 +94,51 @@ export interface FeedEventMessage {
   feed_id: string
   ts: string
   payload: Record<string, any>
+  seq: number // per-feed sequence number
+}
+
+export interface FeedDeltaMessage {
+  type: 'feed_delta'
+  feed_id: string
+  ts: string
+  seq: number
+  base: number // seq of the update this delta applies to
+  set: Record<string, any>
+  unset: string[]
+}
+
+export interface FeedBatchMessage {
+  type: 'feed_batch'
+  updates: (FeedEventMessage | FeedDeltaMessage)[]
+}
+
+export interface HistorySeries {
+  ts: string[]
+  values: number[]
+}
+
+// Sent once on connect: latest update per feed plus a history backfill, or
+// the missed updates when resuming after a reconnect
+export interface SnapshotMessage {
+  type: 'snapshot'
+  updates: (FeedEventMessage | FeedDeltaMessage)[]
+  history: Record<string, Record<string, HistorySeries>> // feed_id -> key -> series
+  epoch: string // sequence numbers are only comparable within an epoch
+  resync_required: string[] // feeds that could not be resumed and start over
+}
+
+// Sent when an alert rule on a subscribed feed changes state, and on
+// connect for the rules already firing
+export interface AlertMessage {
+  type: 'alert'
+  rule_id: string
+  name: string
+  feed_id: string
+  key: string
+  kind: 'threshold' | 'rate' | 'absence'
+  state: 'ok' | 'firing'
+  value: number | null // value or rate that caused the change
+  ts: string
 }
 
 export type PanelType = 'stat' | 'timeseries' | 'bar' | 'table'